@@ -29,18 +29,26 @@
   /* ╭────────── Comunicación con la extensión ──────────╮ */
   const send = (command, payload = {}) => vscode.postMessage({ command, ...payload });
 
-  function navigate(direction)             { send('navigate',              { direction });        }
-  function toggleRefactoring(checked)      { send('toggleRefactoring',     { checked   });        }
-  function openCsvFile()                   { send('openCsvFile');                                  }
-
-  /* Highlights */
-  function highlightDuplicatedCode()       { send('highlightDuplicatedCode'); }
-  function highlightLoops()                { send('highlightLoops');          }
-  function highlightMethods()              { send('highlightMethods');        }
-  function highlightMaxDepth()             { send('highlightMaxDepth');       }
-  function highlightIfs()                  { send('highlightIfs');            }
-  function highlightConstructors()         { send('highlightConstructors');   }
-  function highlightLambdas()              { send('highlightLambdas');        }
+  /* Los botones de acción y de highlight llevan data-command con el nombre del mensaje */
+  document.addEventListener('click', (event) => {
+    const commandElement = event.target.closest('[data-command]');
+    if (commandElement) {
+      send(commandElement.dataset.command);
+      return;
+    }
+
+    const actionElement = event.target.closest('[data-action]');
+    if (actionElement && actions[actionElement.dataset.action]) {
+      actions[actionElement.dataset.action]();
+      return;
+    }
+
+    const collapsible = event.target.closest('.collapsible');
+    if (collapsible) toggleCollapsible(collapsible);
+  });
+
+  document.getElementById('refactoringCheckbox')
+    ?.addEventListener('change', (event) => send('toggleRefactoring', { checked: event.target.checked }));
 
   /* ╭────────── Collapsibles ──────────╮ */
   function toggleCollapsible(el) {
@@ -56,10 +64,171 @@
     }
   }
 
-  document.addEventListener('DOMContentLoaded', () => {
-    Array.from(document.getElementsByClassName('collapsible'))
-      .forEach(el => el.addEventListener('click', () => toggleCollapsible(el)));
-  });
+  /* Un collapsible abierto cuyo contenido cambió debe recalcular su altura */
+  function refreshOpenCollapsibles() {
+    document.querySelectorAll('.collapsible.active').forEach(el => {
+      el.nextElementSibling.style.maxHeight = `${el.nextElementSibling.scrollHeight}px`;
+    });
+  }
+
+  /* ╭────────── Métricas (actualizaciones incrementales) ──────────╮ */
+  const metricElements = new Map();   /* nombre → { section, root, refs } */
+
+  function el(tag, attributes = {}, children = []) {
+    const element = document.createElement(tag);
+    for (const [key, value] of Object.entries(attributes)) {
+      if (key === 'text') element.textContent = value;
+      else element.setAttribute(key, value);
+    }
+    children.forEach(child => element.appendChild(child));
+    return element;
+  }
+
+  function actionButton(command) {
+    const button = el('button', {
+      'data-command': command,
+      style: 'background: none; border: none; cursor: pointer; padding: 0; margin: 0;'
+    });
+    button.innerHTML = `
+        <svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" fill="#4169E1" viewBox="0 0 16 16">
+          <path d="M16 8s-3-5.5-8-5.5S0 8 0 8s3 5.5 8 5.5S16 8 16 8zm-8 4a4 4 0 1 1 0-8 4 4 0 0 1 0 8z"/>
+          <path d="M8 5a3 3 0 1 0 0 6 3 3 0 0 0 0-6z"/>
+        </svg>`;
+    return button;
+  }
+
+  function createMetricElement(entry) {
+    const refs = {};
+    let root;
+
+    if (entry.section === 'nonZero' || entry.section === 'ai') {
+      refs.value = el('span', { class: 'metric-value' });
+      refs.label = el('span');
+      refs.detailValue = el('p');
+      refs.detailLabel = el('p');
+      refs.detailLine = el('p');
+      const details = [el('p', {}, [el('strong', { text: 'Detalles:' })])];
+      if (entry.section === 'nonZero') {
+        details.push(el('p', {}, entry.action ? [actionButton(entry.action)] : []));
+      }
+      details.push(refs.detailValue, refs.detailLabel);
+      if (entry.section === 'nonZero') {
+        details.push(refs.detailLine, el('p', { text: `Name : ${entry.name}` }));
+      }
+      details.push(el('p', { text: `Esta métrica indica ${entry.description}` }));
+
+      const buttonClass = entry.section === 'ai' ? 'collapsible ai-metric' : 'collapsible';
+      root = el('div', { 'data-metric': entry.name }, [
+        el('button', { class: buttonClass, style: 'display: flex; align-items: center; gap: 8px; flex-grow: 1;' }, [
+          refs.value, refs.label, el('span', { class: 'collapsible-dots', text: '...' })
+        ]),
+        el('div', { class: 'collapsible-content' }, [el('div', { style: 'padding: 15px;' }, details)])
+      ]);
+    } else if (entry.section === 'aiLoading') {
+      refs.label = el('span');
+      const spinner = el('div', { class: 'spinner' }, [
+        el('img', { src: document.body.dataset.spinnerUri || '', alt: 'Loading...', width: '24', height: '24' })
+      ]);
+      root = el('div', { class: 'ai-metric-loading', 'data-metric': entry.name }, [spinner, refs.label]);
+    } else {
+      refs.label = el('strong');
+      refs.description = document.createTextNode('');
+      root = el('li', { 'data-metric': entry.name }, [refs.label]);
+      root.appendChild(refs.description);
+    }
+
+    return { section: entry.section, root, refs };
+  }
+
+  function fillMetricElement(item, entry) {
+    const { refs } = item;
+    if (refs.value) refs.value.textContent = entry.value;
+    if (refs.label) refs.label.textContent = entry.label;
+    if (refs.detailValue) refs.detailValue.textContent = `Valor: ${entry.value}`;
+    if (refs.detailLabel) refs.detailLabel.textContent = `Métrica: ${entry.label}`;
+    if (refs.detailLine) {
+      refs.detailLine.textContent = entry.lineNumber !== undefined && entry.lineNumber !== null ? `Línea: ${entry.lineNumber + 1}` : '';
+      refs.detailLine.style.display = refs.detailLine.textContent ? '' : 'none';
+    }
+    if (refs.description) refs.description.textContent = ` - Esta métrica indica ${entry.description}`;
+  }
+
+  function containerFor(section) {
+    if (section === 'nonZero') return document.getElementById('nonZeroMetrics');
+    if (section === 'zero') return document.getElementById('zeroMetrics');
+    if (section === 'skipped') return document.getElementById('skippedMetrics');
+    return document.getElementById('ai-metrics-container');
+  }
+
+  function toggleEmptyMessage(containerId, messageId) {
+    const container = document.getElementById(containerId);
+    const message = document.getElementById(messageId);
+    if (container && message) message.style.display = container.children.length === 0 ? '' : 'none';
+  }
+
+  function showError(message) {
+    const errorElement = document.getElementById('viewError');
+    if (!errorElement) return;
+    errorElement.textContent = message || '';
+    errorElement.style.display = message ? '' : 'none';
+  }
+
+  function updateMetrics(msg) {
+    showError('');
+    if (msg.fileName !== undefined) {
+      const fileElement = document.getElementById('fileNameElement');
+      if (fileElement) fileElement.textContent = msg.fileName;
+    }
+    if (msg.processedFilesCount !== undefined) {
+      const countElement = document.getElementById('processedFilesCount');
+      if (countElement) countElement.textContent = msg.processedFilesCount;
+    }
+    if (msg.pending) {
+      const pendingElement = document.getElementById('metricsPending');
+      const pendingText = document.getElementById('metricsPendingText');
+      if (pendingElement && pendingText) {
+        pendingElement.style.display = msg.pending.count > 0 ? '' : 'none';
+        pendingText.textContent = `Calculando ${msg.pending.count} de ${msg.pending.total} métricas...`;
+      }
+    }
+
+    for (const name of msg.removed) {
+      metricElements.get(name)?.root.remove();
+      metricElements.delete(name);
+    }
+
+    for (const entry of msg.changed) {
+      let item = metricElements.get(entry.name);
+      /* Al cambiar de sección (o de acción) el elemento se crea de nuevo */
+      if (item && (item.section !== entry.section || item.action !== entry.action)) {
+        item.root.remove();
+        item = undefined;
+      }
+      if (!item) {
+        item = createMetricElement(entry);
+        item.action = entry.action;
+        metricElements.set(entry.name, item);
+        containerFor(entry.section)?.appendChild(item.root);
+      }
+      fillMetricElement(item, entry);
+    }
+
+    /* appendChild mueve los nodos existentes sin recrearlos, así se conserva su estado */
+    if (msg.order) {
+      const container = containerFor('nonZero');
+      msg.order.forEach(name => {
+        const item = metricElements.get(name);
+        if (item && container) container.appendChild(item.root);
+      });
+    }
+
+    toggleEmptyMessage('nonZeroMetrics', 'nonZeroMetricsEmpty');
+    toggleEmptyMessage('ai-metrics-container', 'aiMetricsEmpty');
+    toggleEmptyMessage('zeroMetrics', 'zeroMetricsEmpty');
+    const skippedSection = document.getElementById('skippedMetricsSection');
+    if (skippedSection) skippedSection.style.display = containerFor('skipped')?.children.length ? '' : 'none';
+    refreshOpenCollapsibles();
+  }
 
   /* ╭────────── Panel de configuración ──────────╮ */
   function openSettings()  {
@@ -79,6 +248,8 @@
     closeSettings();
   }
 
+  const actions = { closeSettings, saveSettings };
+
   /* ╭────────── Mensajes desde la extensión ──────────╮ */
   window.addEventListener('message', (event) => {
     const msg = event.data;
@@ -97,6 +268,12 @@
       case 'openSettings':
         openSettings();
         break;
+      case 'updateMetrics':
+        updateMetrics(msg);
+        break;
+      case 'showError':
+        showError(msg.message);
+        break;
     }
   });
 
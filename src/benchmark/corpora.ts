@@ -0,0 +1,370 @@
+import { generateDuplicatedSource } from './duplicationBenchmark';
+
+export type CorpusLanguage = 'csharp' | 'typescript' | 'java' | 'python';
+
+/**
+ * typical: ordinary classes, methods, lambdas and comments
+ * deepNesting: control blocks nested dozens of levels deep
+ * longLines: ordinary code mixed with lines of tens of thousands of characters
+ * hugeStrings: multi-line string literals spanning thousands of lines
+ * duplication: methods repeated with the same body
+ */
+export type CorpusShape = 'typical' | 'deepNesting' | 'longLines' | 'hugeStrings' | 'duplication';
+
+export const CORPUS_LANGUAGES: CorpusLanguage[] = ['csharp', 'typescript', 'java', 'python'];
+export const CORPUS_SHAPES: CorpusShape[] = ['typical', 'deepNesting', 'longLines', 'hugeStrings', 'duplication'];
+
+const LONG_LINE_LENGTH = 20000;
+
+export const FILE_EXTENSIONS: { [language in CorpusLanguage]: string } = {
+  csharp: 'cs',
+  typescript: 'ts',
+  java: 'java',
+  python: 'py'
+};
+
+/**
+ * Small seeded generator, so every run produces the same corpus
+ * @param seed Any 32-bit integer
+ */
+export function createRandom(seed: number): () => number {
+  let state = seed >>> 0;
+  return () => {
+    state = (state + 0x6D2B79F5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+/**
+ * Generates a deterministic source file of a language and shape
+ * @param language The language of the file
+ * @param shape What the file stresses
+ * @param lineCount Approximate number of lines
+ * @returns The file text
+ */
+export function generateCorpus(language: CorpusLanguage, shape: CorpusShape, lineCount: number): string {
+  const random = createRandom(lineCount * 31 + CORPUS_SHAPES.indexOf(shape) * 7 + CORPUS_LANGUAGES.indexOf(language));
+  const writer = language === 'python' ? new PythonWriter(random) : new BraceWriter(language, random);
+
+  if (shape === 'duplication' && language === 'csharp') {
+    return generateDuplicatedSource(lineCount);
+  }
+
+  const lines: string[] = writer.header();
+  let unit = 0;
+  while (lines.length < lineCount) {
+    switch (shape) {
+      case 'typical':
+        lines.push(...writer.typicalClass(unit));
+        break;
+      case 'deepNesting':
+        lines.push(...writer.nestedMethod(unit, 40));
+        break;
+      case 'longLines':
+        // One in four classes holds two lines of tens of thousands of characters
+        lines.push(...(unit % 4 === 0 ? writer.longLineMethod(unit, LONG_LINE_LENGTH) : writer.typicalClass(unit)));
+        break;
+      case 'hugeStrings':
+        lines.push(...writer.hugeString(unit, Math.min(2000, Math.max(50, lineCount / 4))));
+        break;
+      case 'duplication':
+        // Every third class repeats one written earlier, names included
+        lines.push(...writer.typicalClass(unit % 3 === 2 ? Math.floor(unit / 7) : unit));
+        break;
+    }
+    unit++;
+  }
+  lines.push(...writer.footer());
+  return lines.join('\n');
+}
+
+interface CorpusWriter {
+  header(): string[];
+  footer(): string[];
+  typicalClass(id: number): string[];
+  nestedMethod(id: number, depth: number): string[];
+  longLineMethod(id: number, length: number): string[];
+  hugeString(id: number, lineCount: number): string[];
+}
+
+/**
+ * Writes C#, TypeScript and Java; they differ only in declarations, lambdas and strings
+ */
+class BraceWriter implements CorpusWriter {
+  constructor(private readonly language: CorpusLanguage, private readonly random: () => number) {}
+
+  public header(): string[] {
+    switch (this.language) {
+      case 'csharp':
+        return ['using System;', 'using System.Linq;', 'using System.Collections.Generic;', '', 'namespace Generated', '{'];
+      case 'java':
+        return ['package generated;', '', 'import java.util.List;', 'import java.util.stream.Collectors;', ''];
+      default:
+        return ["import { EventEmitter } from 'events';", ''];
+    }
+  }
+
+  public footer(): string[] {
+    return this.language === 'csharp' ? ['}'] : [];
+  }
+
+  public typicalClass(id: number): string[] {
+    const name = `Service${id}`;
+    const threshold = Math.floor(this.random() * 100);
+    const lines = [
+      `/**`,
+      ` * Generated service ${id}`,
+      ` */`,
+      `${this.classModifier()}class ${name}${this.language === 'typescript' ? ' extends EventEmitter' : ''} {`,
+      `  ${this.field('count', 'int', '0')}`,
+      `  ${this.field('items', this.listType(), this.newList())}`,
+      '',
+      `  ${this.constructorHeader(name)} {`,
+      `    this.count = ${threshold};`,
+      '  }',
+      ''
+    ];
+
+    const methodCount = 2 + Math.floor(this.random() * 3);
+    for (let method = 0; method < methodCount; method++) {
+      lines.push(
+        `  ${this.methodHeader(`process${method}`, 'value')} {`,
+        `    // Method ${method} of ${name}`,
+        `    ${this.local('total', '0')}`,
+        `    for (${this.loopVariable('i')} = 0; i < value; i++) {`,
+        `      if (i % ${method + 2} == 0 && this.count > ${threshold}) {`,
+        `        total += i;`,
+        `      } else if (i > ${threshold}) {`,
+        `        total -= this.count;`,
+        '      } else {',
+        '        continue;',
+        '      }',
+        '    }',
+        `    ${this.local('filtered', this.lambdaCall('x', `x > ${threshold}`))}`,
+        `    while (total > ${threshold * 10}) {`,
+        '      total /= 2;',
+        '    }',
+        `    return total + this.count;`,
+        '  }',
+        ''
+      );
+    }
+    lines.push('}', '');
+    return lines;
+  }
+
+  public nestedMethod(id: number, depth: number): string[] {
+    const lines = [`${this.classModifier()}class Nested${id} {`, `  ${this.methodHeader('run', 'value')} {`, `    ${this.local('total', '0')}`];
+    for (let level = 0; level < depth; level++) {
+      const indent = '  '.repeat(level + 2);
+      const keyword = level % 3 === 0 ? `for (${this.loopVariable(`i${level}`)} = 0; i${level} < value; i${level}++)` : level % 3 === 1 ? `if (value > ${level})` : `while (value-- > ${level})`;
+      lines.push(`${indent}${keyword} {`);
+    }
+    lines.push(`${'  '.repeat(depth + 2)}total++;`);
+    for (let level = depth - 1; level >= 0; level--) {
+      lines.push(`${'  '.repeat(level + 2)}}`);
+    }
+    lines.push('    return total;', '  }', '}', '');
+    return lines;
+  }
+
+  public longLineMethod(id: number, length: number): string[] {
+    const terms: string[] = [];
+    let size = 0;
+    for (let term = 0; size < length; term++) {
+      const text = term % 5 === 0 ? `(value > ${term} ? ${term} : -${term})` : term % 5 === 1 ? this.lambdaCall('x', `x + ${term}`) : `value * ${term}`;
+      terms.push(text);
+      size += text.length + 3;
+    }
+    return [
+      `${this.classModifier()}class LongLine${id} {`,
+      `  ${this.methodHeader('compute', 'value')} {`,
+      `    return ${terms.join(' + ')};`,
+      '  }',
+      `  ${this.field('table', 'string', `"${'{[(;'.repeat(Math.floor(length / 8))}"`)}`,
+      '}',
+      ''
+    ];
+  }
+
+  public hugeString(id: number, lineCount: number): string[] {
+    const body: string[] = [];
+    // Verbatim strings double their quotes
+    const quote = this.language === 'csharp' ? '""' : '"';
+    for (let line = 0; line < lineCount; line++) {
+      body.push(`  if (x) { return ${quote}${line}${quote}; } // class Fake${line} { void method() {} }`);
+    }
+    let open: string;
+    let close: string;
+    switch (this.language) {
+      case 'csharp':
+        open = '@"';
+        close = '";';
+        break;
+      case 'java':
+        open = '"""';
+        close = '""";';
+        break;
+      default:
+        open = '`';
+        close = '`;';
+    }
+    return [
+      `${this.classModifier()}class Template${id} {`,
+      `  ${this.field('text', 'string', open)}`.replace(/;$/, ''),
+      ...body,
+      close,
+      '}',
+      ''
+    ];
+  }
+
+  private classModifier(): string {
+    return this.language === 'typescript' ? 'export ' : 'public ';
+  }
+
+  private field(name: string, type: string, value: string): string {
+    if (this.language === 'typescript') {
+      return `private ${name}: ${type === 'int' ? 'number' : type} = ${value};`;
+    }
+    const javaType = this.language === 'java' && type === 'string' ? 'String' : type;
+    return `private ${javaType} ${name} = ${value};`;
+  }
+
+  private listType(): string {
+    switch (this.language) {
+      case 'csharp':
+        return 'List<int>';
+      case 'java':
+        return 'List<Integer>';
+      default:
+        return 'number[]';
+    }
+  }
+
+  private newList(): string {
+    switch (this.language) {
+      case 'csharp':
+        return 'new List<int>()';
+      case 'java':
+        return 'new java.util.ArrayList<>()';
+      default:
+        return '[]';
+    }
+  }
+
+  private constructorHeader(name: string): string {
+    return this.language === 'typescript' ? 'constructor(initial: number)' : `public ${name}(int initial)`;
+  }
+
+  private methodHeader(name: string, parameter: string): string {
+    return this.language === 'typescript' ? `public ${name}(${parameter}: number): number` : `public int ${name}(int ${parameter})`;
+  }
+
+  private local(name: string, value: string): string {
+    return `${this.language === 'typescript' ? 'let' : 'var'} ${name} = ${value};`;
+  }
+
+  private loopVariable(name: string): string {
+    return this.language === 'typescript' ? `let ${name}` : `int ${name}`;
+  }
+
+  private lambdaCall(parameter: string, body: string): string {
+    switch (this.language) {
+      case 'csharp':
+        return `this.items.Where(${parameter} => ${body}).Count()`;
+      case 'java':
+        return `this.items.stream().filter(${parameter} -> ${body}).count()`;
+      default:
+        return `this.items.filter(${parameter} => ${body}).length`;
+    }
+  }
+}
+
+class PythonWriter implements CorpusWriter {
+  constructor(private readonly random: () => number) {}
+
+  public header(): string[] {
+    return ['import os', 'from typing import List', ''];
+  }
+
+  public footer(): string[] {
+    return [];
+  }
+
+  public typicalClass(id: number): string[] {
+    const threshold = Math.floor(this.random() * 100);
+    const lines = [
+      `class Service${id}:`,
+      `    """Generated service ${id}."""`,
+      '',
+      '    def __init__(self, initial: int):',
+      '        self.count = initial',
+      '        self.items: List[int] = []',
+      ''
+    ];
+
+    const methodCount = 2 + Math.floor(this.random() * 3);
+    for (let method = 0; method < methodCount; method++) {
+      lines.push(
+        '    @log_calls',
+        `    def process${method}(self, value):`,
+        `        # Method ${method} of Service${id}`,
+        '        total = 0',
+        '        for i in range(value):',
+        `            if i % ${method + 2} == 0 and self.count > ${threshold}:`,
+        '                total += i',
+        `            elif i > ${threshold}:`,
+        '                total -= self.count',
+        '            else:',
+        '                continue',
+        `        filtered = [x for x in self.items if x > ${threshold}]`,
+        `        key = lambda x: x + ${threshold}`,
+        `        while total > ${threshold * 10}:`,
+        '            total //= 2',
+        '        return total + self.count',
+        ''
+      );
+    }
+    return lines;
+  }
+
+  public nestedMethod(id: number, depth: number): string[] {
+    const lines = [`class Nested${id}:`, '    def run(self, value):', '        total = 0'];
+    for (let level = 0; level < depth; level++) {
+      const indent = '    '.repeat(level + 2);
+      const keyword = level % 3 === 0 ? `for i${level} in range(value):` : level % 3 === 1 ? `if value > ${level}:` : `while value > ${level}:`;
+      lines.push(`${indent}${keyword}`);
+    }
+    lines.push(`${'    '.repeat(depth + 2)}total += 1`, '        return total', '');
+    return lines;
+  }
+
+  public longLineMethod(id: number, length: number): string[] {
+    const terms: string[] = [];
+    let size = 0;
+    for (let term = 0; size < length; term++) {
+      const text = term % 5 === 0 ? `(${term} if value > ${term} else -${term})` : term % 5 === 1 ? `sum(x + ${term} for x in self.items)` : `value * ${term}`;
+      terms.push(text);
+      size += text.length + 3;
+    }
+    return [
+      `class LongLine${id}:`,
+      '    def compute(self, value):',
+      `        return ${terms.join(' + ')}`,
+      `    table = "${'[({:'.repeat(Math.floor(length / 8))}"`,
+      ''
+    ];
+  }
+
+  public hugeString(id: number, lineCount: number): string[] {
+    const body: string[] = [];
+    for (let line = 0; line < lineCount; line++) {
+      body.push(`    def fake${line}(self): return [x for x in "${line}"]  # class Fake${line}:`);
+    }
+    return [`class Template${id}:`, '    text = """', ...body, '"""', ''];
+  }
+}
@@ -0,0 +1,77 @@
+import { performance } from 'perf_hooks';
+import { CodeDuplicationMetric } from '../metrics/CodeDuplicationMetric';
+import { createTextDocumentSnapshot } from '../metrics/execution/TextDocumentSnapshot';
+
+const SIZES = [1000, 10000, 25000, 50000, 100000];
+const RUNS = 5;
+// Linear growth from 10k to 100k lines is 10x; anything far above that is superlinear
+const BASELINE_SIZE = 10000;
+const MAX_GROWTH_FACTOR = 25;
+
+/**
+ * Generates a deterministic C#-like file where about a third of the methods are
+ * copies of earlier ones
+ * @param lineCount Approximate number of lines
+ */
+export function generateDuplicatedSource(lineCount: number): string {
+  const lines: string[] = ['using System;', '', 'public class Generated', '{'];
+  let method = 0;
+  while (lines.length < lineCount) {
+    // Every third method repeats the body of a method written earlier
+    const bodyId = method % 3 === 2 ? Math.floor(method / 7) : method;
+    lines.push(
+      `    public int Method${method}(int value)`,
+      '    {',
+      `        // Method ${method}`,
+      `        var first = value * ${bodyId};`,
+      `        var second = first + ${bodyId * 2};`,
+      `        if (second > ${bodyId}) {`,
+      `            Console.WriteLine("Value {0}", second);`,
+      '        }',
+      `        return first - second + ${bodyId};`,
+      '    }',
+      ''
+    );
+    method++;
+  }
+  lines.push('}');
+  return lines.join('\n');
+}
+
+/**
+ * Times CodeDuplicationMetric on generated files of growing size
+ * @param log Receives one line per size
+ * @returns Median milliseconds per size
+ */
+export function runDuplicationBenchmark(log: (line: string) => void = line => console.log(line)): Map<number, number> {
+  const medians = new Map<number, number>();
+
+  for (const size of SIZES) {
+    const document = createTextDocumentSnapshot(generateDuplicatedSource(size), 'csharp', `Generated${size}.cs`);
+    const timings: number[] = [];
+    let value = 0;
+    for (let run = 0; run < RUNS; run++) {
+      const start = performance.now();
+      value = CodeDuplicationMetric.extract(document).value;
+      timings.push(performance.now() - start);
+    }
+
+    timings.sort((a, b) => a - b);
+    const median = timings[Math.floor(RUNS / 2)];
+    medians.set(size, median);
+    log(`${size} lines: ${median.toFixed(2)} ms (${(median / size * 1000).toFixed(3)} ms per 1k lines), duplication ${value}%`);
+  }
+
+  return medians;
+}
+
+if (require.main === module) {
+  const medians = runDuplicationBenchmark();
+  const largestSize = SIZES[SIZES.length - 1];
+  const growth = medians.get(largestSize)! / medians.get(BASELINE_SIZE)!;
+  console.log(`Growth from ${BASELINE_SIZE} to ${largestSize} lines: ${growth.toFixed(1)}x`);
+  if (growth > MAX_GROWTH_FACTOR) {
+    console.error(`Duplication detection grows faster than near-linear (limit ${MAX_GROWTH_FACTOR}x)`);
+    process.exitCode = 1;
+  }
+}
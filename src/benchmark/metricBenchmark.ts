@@ -0,0 +1,291 @@
+import * as fs from 'fs';
+import * as path from 'path';
+import { performance } from 'perf_hooks';
+import * as vscode from 'vscode';
+import { MetricFactory } from '../metrics/MetricFactory';
+import { MetricRegistry } from '../metrics/MetricRegistry';
+import { createTextDocumentSnapshot } from '../metrics/execution/TextDocumentSnapshot';
+import { buildBraceScopeTree } from '../metrics/common/BraceScopeTree';
+import { buildPythonScopeTree } from '../metrics/python/PythonScopeTree';
+import { scanKeywords } from '../metrics/common/KeywordScan';
+import { CORPUS_LANGUAGES, CORPUS_SHAPES, CorpusLanguage, CorpusShape, FILE_EXTENSIONS, generateCorpus } from './corpora';
+
+const USAGE = 'Usage: node --expose-gc out/benchmark/metricBenchmark.js [--baseline <file>] [--update] [--tolerance <fraction>] [--runs <n>] [--quick]';
+
+const SIZES = [100, 1000, 10000, 100000];
+// Pathological shapes stop here so a full run takes minutes, not hours
+const PATHOLOGICAL_MAX_LINES = 10000;
+const QUICK_MAX_LINES = 10000;
+// Differences below these are noise whatever the tolerance
+const MIN_TIME_DELTA_MS = 10;
+const MIN_HEAP_DELTA_MB = 16;
+// Scope tree builds land in a fast or a slow mode per process, 12 or 35 ms on the same
+// 10k-line corpus, so larger corpora get a larger floor
+const MIN_TIME_DELTA_MS_PER_1K_LINES = 2.5;
+
+const DEFAULT_BASELINE = path.join(__dirname, '..', '..', 'src', 'benchmark', 'baselines', 'metrics.json');
+
+export interface MetricMeasurement {
+  // Median of the runs after a warm-up run; one lucky or one slow run does not move it
+  medianMs: number;
+  linesPerSecond: number;
+  // Largest heap growth seen during one extraction, an approximation of its peak
+  heapMb: number;
+}
+
+export interface BenchmarkReport {
+  // Time of a fixed workload on the machine that produced the report, median of the
+  // calibrations taken before each corpus
+  calibrationMs: number;
+  // "language/shape/lines" -> metric name -> measurement
+  results: { [corpus: string]: { [metricName: string]: MetricMeasurement } };
+}
+
+export interface BenchmarkOptions {
+  baseline: string;
+  update: boolean;
+  tolerance: number;
+  runs: number;
+  quick: boolean;
+}
+
+export interface BenchmarkRegression {
+  corpus: string;
+  metricName: string;
+  kind: 'time' | 'heap';
+  baseline: number;
+  current: number;
+  limit: number;
+}
+
+interface BenchmarkTarget {
+  name: string;
+  run(document: vscode.TextDocument): unknown;
+}
+
+/**
+ * Parses the command line arguments of the benchmark
+ * @param argv The arguments after the script name
+ * @returns The benchmark options
+ */
+export function parseArguments(argv: string[]): BenchmarkOptions {
+  const options: BenchmarkOptions = { baseline: DEFAULT_BASELINE, update: false, tolerance: 1, runs: 7, quick: false };
+
+  for (let i = 0; i < argv.length; i++) {
+    const arg = argv[i];
+    if (arg === '--baseline') {
+      options.baseline = path.resolve(argv[++i]);
+    } else if (arg === '--update') {
+      options.update = true;
+    } else if (arg === '--tolerance') {
+      options.tolerance = parseFloat(argv[++i]);
+    } else if (arg === '--runs') {
+      options.runs = parseInt(argv[++i], 10);
+    } else if (arg === '--quick') {
+      options.quick = true;
+    } else {
+      throw new Error(`Unexpected argument: ${arg}\n${USAGE}`);
+    }
+  }
+
+  if (!(options.tolerance >= 0)) {
+    throw new Error(`--tolerance must be a non-negative fraction\n${USAGE}`);
+  }
+  if (!Number.isInteger(options.runs) || options.runs < 1) {
+    throw new Error(`--runs must be a positive integer\n${USAGE}`);
+  }
+  return options;
+}
+
+/**
+ * The corpora of a run, as language, shape and line count
+ * @param quick Only the sizes up to 10k lines
+ */
+export function listCorpora(quick: boolean): { language: CorpusLanguage, shape: CorpusShape, lineCount: number }[] {
+  const corpora: { language: CorpusLanguage, shape: CorpusShape, lineCount: number }[] = [];
+  for (const language of CORPUS_LANGUAGES) {
+    for (const shape of CORPUS_SHAPES) {
+      for (const lineCount of SIZES) {
+        const maxLines = Math.min(quick ? QUICK_MAX_LINES : Infinity, shape === 'typical' ? Infinity : PATHOLOGICAL_MAX_LINES);
+        if (lineCount <= maxLines && (shape === 'typical' || lineCount >= 1000)) {
+          corpora.push({ language, shape, lineCount });
+        }
+      }
+    }
+  }
+  return corpora;
+}
+
+/**
+ * Compares a run against a baseline. Baseline times are scaled by the ratio of the
+ * calibration times, so a baseline recorded on another machine still applies.
+ * Corpora or metrics missing from either report are ignored.
+ * @param current The report of this run
+ * @param baseline The stored report
+ * @param tolerance Allowed relative growth, 1 allows twice the time or heap
+ * @returns The measurements that exceed their limit
+ */
+export function compareWithBaseline(current: BenchmarkReport, baseline: BenchmarkReport, tolerance: number): BenchmarkRegression[] {
+  const scale = baseline.calibrationMs > 0 ? current.calibrationMs / baseline.calibrationMs : 1;
+  const regressions: BenchmarkRegression[] = [];
+
+  for (const [corpus, metrics] of Object.entries(baseline.results)) {
+    const lineCount = parseInt(corpus.split('/')[2], 10) || 0;
+    const minTimeDelta = Math.max(MIN_TIME_DELTA_MS, lineCount / 1000 * MIN_TIME_DELTA_MS_PER_1K_LINES);
+    for (const [metricName, expected] of Object.entries(metrics)) {
+      const measured = current.results[corpus]?.[metricName];
+      if (!measured) {
+        continue;
+      }
+
+      const expectedMs = expected.medianMs * scale;
+      const timeLimit = Math.max(expectedMs * (1 + tolerance), expectedMs + minTimeDelta);
+      if (measured.medianMs > timeLimit) {
+        regressions.push({ corpus, metricName, kind: 'time', baseline: expectedMs, current: measured.medianMs, limit: timeLimit });
+      }
+
+      const heapLimit = Math.max(expected.heapMb * (1 + tolerance), expected.heapMb + MIN_HEAP_DELTA_MB);
+      if (measured.heapMb > heapLimit) {
+        regressions.push({ corpus, metricName, kind: 'heap', baseline: expected.heapMb, current: measured.heapMb, limit: heapLimit });
+      }
+    }
+  }
+
+  return regressions;
+}
+
+/**
+ * Times a fixed string workload, used to compare machines
+ */
+export function calibrate(): number {
+  const text = generateCorpus('csharp', 'typical', 5000);
+  const timings: number[] = [];
+  // The first run warms up the JIT and is discarded
+  for (let run = 0; run <= 5; run++) {
+    const start = performance.now();
+    for (let pass = 0; pass < 10; pass++) {
+      text.split('\n').filter(line => /\b(?:if|for|while)\b/.test(line));
+    }
+    if (run > 0) {
+      timings.push(performance.now() - start);
+    }
+  }
+  return median(timings);
+}
+
+/**
+ * Measures every metric registered for the corpus languages, plus the shared scope
+ * trees and keyword scan, on each generated corpus
+ * @param options The benchmark options
+ * @param log Receives one line per corpus and metric
+ * @returns The report of the run
+ */
+export function runMetricBenchmark(options: BenchmarkOptions, log: (line: string) => void = line => console.log(line)): BenchmarkReport {
+  MetricFactory.initializeRegistry();
+  const registry = MetricRegistry.getInstance();
+
+  const report: BenchmarkReport = { calibrationMs: 0, results: {} };
+  // The speed of a shared machine drifts during a run, so one calibration at the start
+  // would scale every baseline by the speed of that moment
+  const calibrations: number[] = [];
+
+  for (const { language, shape, lineCount } of listCorpora(options.quick)) {
+    calibrations.push(calibrate());
+    const corpus = `${language}/${shape}/${lineCount}`;
+    const text = generateCorpus(language, shape, lineCount);
+    const actualLines = text.split('\n').length;
+    const fileName = `/benchmark/${shape}${lineCount}.${FILE_EXTENSIONS[language]}`;
+
+    const targets: BenchmarkTarget[] = [
+      language === 'python'
+        ? { name: 'pythonScopeTree', run: document => buildPythonScopeTree(document.getText()) }
+        : { name: 'braceScopeTree', run: document => buildBraceScopeTree(document.getText(), language) },
+      { name: 'keywordScan', run: document => scanKeywords(document.getText(), language) },
+      // Metrics that need the extension host (clone index, SRP analysis) cannot run here
+      ...registry.getMetricsForLanguage(language)
+        .filter(metric => !metric.requiresEditor)
+        .map(metric => ({ name: metric.name, run: (document: vscode.TextDocument) => metric.extract(document) }))
+    ];
+
+    report.results[corpus] = {};
+    for (const target of targets) {
+      const measurement = measure(target, text, language, fileName, actualLines, options.runs);
+      report.results[corpus][target.name] = measurement;
+      log(`${corpus.padEnd(28)} ${target.name.padEnd(36)} ${measurement.medianMs.toFixed(2).padStart(10)} ms ` +
+        `${Math.round(measurement.linesPerSecond).toString().padStart(12)} lines/s ${measurement.heapMb.toFixed(1).padStart(8)} MB`);
+    }
+  }
+
+  report.calibrationMs = round(median(calibrations));
+  log(`Calibration: ${report.calibrationMs.toFixed(2)} ms, median of ${calibrations.length}`);
+  return report;
+}
+
+function measure(target: BenchmarkTarget, text: string, language: string, fileName: string, lineCount: number, runs: number): MetricMeasurement {
+  const collectGarbage = (global as { gc?: () => void }).gc;
+  const timings: number[] = [];
+  let heapMb = 0;
+
+  // The first run warms up the JIT and is discarded
+  for (let run = 0; run <= runs; run++) {
+    // A new document per run, so per-document caches such as the scope trees are rebuilt
+    const document = createTextDocumentSnapshot(text, language, fileName);
+    collectGarbage?.();
+    const heapBefore = process.memoryUsage().heapUsed;
+    const start = performance.now();
+    target.run(document);
+    const elapsed = performance.now() - start;
+    if (run > 0) {
+      timings.push(elapsed);
+      heapMb = Math.max(heapMb, (process.memoryUsage().heapUsed - heapBefore) / (1024 * 1024));
+    }
+  }
+
+  const medianMs = median(timings);
+  return {
+    medianMs: round(medianMs),
+    linesPerSecond: Math.round(lineCount / Math.max(medianMs, 0.001) * 1000),
+    heapMb: round(heapMb)
+  };
+}
+
+function median(values: number[]): number {
+  const sorted = [...values].sort((a, b) => a - b);
+  const middle = Math.floor(sorted.length / 2);
+  return sorted.length % 2 === 1 ? sorted[middle] : (sorted[middle - 1] + sorted[middle]) / 2;
+}
+
+function round(value: number): number {
+  return Math.round(value * 100) / 100;
+}
+
+if (require.main === module) {
+  try {
+    const options = parseArguments(process.argv.slice(2));
+    const report = runMetricBenchmark(options);
+
+    if (options.update) {
+      fs.mkdirSync(path.dirname(options.baseline), { recursive: true });
+      fs.writeFileSync(options.baseline, `${JSON.stringify(report, null, 2)}\n`);
+      console.log(`Baseline written to ${options.baseline}`);
+    } else if (!fs.existsSync(options.baseline)) {
+      console.error(`No baseline at ${options.baseline}, run with --update to record one`);
+      process.exitCode = 1;
+    } else {
+      const baseline = JSON.parse(fs.readFileSync(options.baseline, 'utf8')) as BenchmarkReport;
+      const regressions = compareWithBaseline(report, baseline, options.tolerance);
+      for (const regression of regressions) {
+        const unit = regression.kind === 'time' ? 'ms' : 'MB';
+        console.error(`Regression in ${regression.metricName} on ${regression.corpus}: ${regression.current.toFixed(2)} ${unit} ` +
+          `(baseline ${regression.baseline.toFixed(2)} ${unit}, limit ${regression.limit.toFixed(2)} ${unit})`);
+      }
+      console.log(`${regressions.length} regression(s) against ${options.baseline}`);
+      if (regressions.length > 0) {
+        process.exitCode = 1;
+      }
+    }
+  } catch (error) {
+    console.error(error instanceof Error ? error.message : `${error}`);
+    process.exitCode = 1;
+  }
+}
@@ -0,0 +1,69 @@
+import * as fs from 'fs';
+import { parentPort } from 'worker_threads';
+import { MetricFactory } from '../metrics/MetricFactory';
+import { MetricRegistry } from '../metrics/MetricRegistry';
+import { LanguageDetector } from '../language/LanguageDetector';
+import { createTextDocumentSnapshot } from '../metrics/execution/TextDocumentSnapshot';
+import { getContentHash } from '../csv/MetricsCSVFormat';
+
+export interface LabelTask {
+  id: number;
+  filePath: string;
+  languageId: string;
+  // Content hash of the file's row when it has the current metrics; the file is not
+  // labeled again while its content has this hash
+  labeledHash?: string;
+}
+
+export interface LabelTaskReply {
+  id: number;
+  languageName?: string;
+  // Undefined for the metrics that were not computed
+  values?: (number | undefined)[];
+  contentHash?: string;
+  // Stat of the file read, recorded with its row
+  mtime?: number;
+  size?: number;
+  // The content still has the labeled hash, nothing was extracted
+  unchanged?: boolean;
+  error?: string;
+}
+
+/*
+ * Worker thread entry point for the batch labeler: reads one file per task and
+ * extracts every metric registered for its language.
+ */
+MetricFactory.initializeRegistry();
+const registry = MetricRegistry.getInstance();
+
+parentPort?.on('message', (task: LabelTask) => {
+  let reply: LabelTaskReply;
+
+  try {
+    // Stat before reading: a change in between leaves an older mtime, which only costs a hash later
+    const stat = fs.statSync(task.filePath);
+    const text = fs.readFileSync(task.filePath, 'utf8');
+    const contentHash = getContentHash(text);
+    if (contentHash === task.labeledHash) {
+      parentPort?.postMessage({ id: task.id, contentHash, unchanged: true });
+      return;
+    }
+
+    const document = createTextDocumentSnapshot(text, task.languageId, task.filePath);
+    const metrics = registry.getLabeledMetricsForLanguage(task.languageId);
+
+    reply = {
+      id: task.id,
+      languageName: LanguageDetector.detectLanguage(document).name,
+      // The SRP metric needs the extension host; its cell stays empty
+      values: metrics.map(metric => metric.requiresEditor ? undefined : metric.extract(document).value),
+      contentHash,
+      mtime: stat.mtimeMs,
+      size: stat.size
+    };
+  } catch (error) {
+    reply = { id: task.id, error: `${error}` };
+  }
+
+  parentPort?.postMessage(reply);
+});
@@ -0,0 +1,284 @@
+#!/usr/bin/env node
+import * as fs from 'fs';
+import * as os from 'os';
+import * as path from 'path';
+import { Worker } from 'worker_threads';
+import { MetricFactory } from '../metrics/MetricFactory';
+import { MetricsStore } from '../csv/MetricsStore';
+import { getMetricSchema } from '../csv/MetricsCSVFormat';
+import { getProjectLanguageId } from '../language/ProjectLanguages';
+import { LabelTask, LabelTaskReply } from './labelWorker';
+
+// Excluded like in NavigationManager.loadProjectFiles
+const EXCLUDED_DIRECTORIES = new Set(['node_modules']);
+
+// Workers that may crash in a row, without labeling a file, before the run stops replacing them
+const MAX_CONSECUTIVE_FAILURES = 3;
+
+const USAGE = 'Usage: node out/cli/labeler.js <directory> [--out <metrics-data directory>] [--jobs <n>]';
+
+export interface LabelerOptions {
+  root: string;
+  out: string;
+  jobs: number;
+}
+
+export interface LabelerSummary {
+  files: number;
+  failed: number;
+  // Files whose content and metrics did not change since their row was written
+  skipped: number;
+  elapsedMs: number;
+}
+
+/**
+ * Parses the command line arguments of the batch labeler
+ * @param argv The arguments after the script name
+ * @returns The labeler options
+ */
+export function parseArguments(argv: string[]): LabelerOptions {
+  let root: string | undefined;
+  let out: string | undefined;
+  let jobs = os.cpus().length;
+
+  for (let i = 0; i < argv.length; i++) {
+    const arg = argv[i];
+    if (arg === '--out') {
+      out = argv[++i];
+    } else if (arg === '--jobs' || arg === '-j') {
+      jobs = parseInt(argv[++i], 10);
+    } else if (!root) {
+      root = arg;
+    } else {
+      throw new Error(`Unexpected argument: ${arg}\n${USAGE}`);
+    }
+  }
+
+  if (!root) {
+    throw new Error(USAGE);
+  }
+  if (!Number.isInteger(jobs) || jobs < 1) {
+    throw new Error(`--jobs must be a positive integer\n${USAGE}`);
+  }
+
+  const resolvedRoot = path.resolve(root);
+  return {
+    root: resolvedRoot,
+    out: path.resolve(out ?? path.join(resolvedRoot, 'metrics-data')),
+    jobs
+  };
+}
+
+/**
+ * Lists the files to label under a directory, sorted like the navigation order
+ * @param root The directory to walk
+ * @returns Absolute file paths
+ */
+export function collectProjectFiles(root: string): string[] {
+  const files: string[] = [];
+  const pending = [root];
+
+  while (pending.length > 0) {
+    const directory = pending.pop()!;
+    for (const entry of fs.readdirSync(directory, { withFileTypes: true })) {
+      const fullPath = path.join(directory, entry.name);
+      if (entry.isDirectory()) {
+        if (!EXCLUDED_DIRECTORIES.has(entry.name)) {
+          pending.push(fullPath);
+        }
+      } else if (entry.isFile() && getProjectLanguageId(entry.name)) {
+        files.push(fullPath);
+      }
+    }
+  }
+
+  return files.sort((a, b) => a.localeCompare(b));
+}
+
+/**
+ * Labels every project file under a directory and appends the rows to the CSV file of
+ * each file's language. A worker that crashes, for example out of memory on a huge
+ * file, fails the file it was labeling and is replaced.
+ * @param options The labeler options
+ * @param log Receives progress and error lines
+ * @param workerScript The worker thread script that labels one file per task
+ * @returns Counters of the run
+ */
+export async function runLabeler(
+  options: LabelerOptions,
+  log: (line: string) => void = line => console.error(line),
+  workerScript: string = path.join(__dirname, 'labelWorker.js')
+): Promise<LabelerSummary> {
+  MetricFactory.initializeRegistry();
+
+  const startTime = Date.now();
+  const files = collectProjectFiles(options.root);
+  log(`Found ${files.length} files under ${options.root}`);
+  if (files.length === 0) {
+    return { files: 0, failed: 0, skipped: 0, elapsedMs: Date.now() - startTime };
+  }
+
+  const store = new MetricsStore(options.out, log);
+  await store.load();
+
+  let nextIndex = 0;
+  let completed = 0;
+  let failed = 0;
+  let skipped = 0;
+  let lastReport = startTime;
+
+  const report = () => {
+    const seconds = (Date.now() - startTime) / 1000;
+    const rate = seconds > 0 ? completed / seconds : 0;
+    log(`Labeled ${completed}/${files.length} files (${rate.toFixed(1)} files/s)`);
+  };
+
+  const createTask = (id: number): LabelTask => {
+    const filePath = files[id];
+    const languageId = getProjectLanguageId(filePath)!;
+    const row = store.getLabeledRow(filePath);
+    return {
+      id,
+      filePath,
+      languageId,
+      labeledHash: row && !row.partial && row.metricSchema === getMetricSchema(MetricFactory.getLabeledMetricsForLanguage(languageId))
+        ? row.contentHash || undefined
+        : undefined
+    };
+  };
+
+  const onReply = (reply: LabelTaskReply) => {
+    completed++;
+    if (reply.unchanged) {
+      skipped++;
+    } else if (reply.values && reply.languageName) {
+      const languageId = getProjectLanguageId(files[reply.id])!;
+      store.append({
+        filePath: files[reply.id],
+        languageId,
+        languageName: reply.languageName,
+        needsRefactoring: false,
+        metrics: MetricFactory.getLabeledMetricsForLanguage(languageId),
+        values: reply.values,
+        contentHash: reply.contentHash,
+        mtime: reply.mtime,
+        size: reply.size
+      }).catch(error => {
+        failed++;
+        log(`Error saving ${files[reply.id]}: ${error}`);
+      });
+    } else {
+      failed++;
+      log(`Error labeling ${files[reply.id]}: ${reply.error}`);
+    }
+
+    if (Date.now() - lastReport >= 1000) {
+      lastReport = Date.now();
+      report();
+    }
+  };
+
+  try {
+    await new Promise<void>(resolve => {
+      let activeWorkers = 0;
+      let consecutiveFailures = 0;
+
+      const startWorker = () => {
+        let worker: Worker;
+        try {
+          worker = new Worker(workerScript);
+        } catch (error) {
+          log(`Error starting a worker: ${error}`);
+          return;
+        }
+        activeWorkers++;
+
+        // The file the worker is labeling, undefined while idle
+        let current: number | undefined;
+        let retired = false;
+
+        const feed = () => {
+          if (nextIndex >= files.length) {
+            retired = true;
+            worker.terminate();
+            return;
+          }
+          current = nextIndex++;
+          worker.postMessage(createTask(current));
+        };
+
+        const failCurrent = (reason: string) => {
+          if (current === undefined) {
+            return;
+          }
+          completed++;
+          failed++;
+          log(`Error labeling ${files[current]}: ${reason}`);
+          current = undefined;
+        };
+
+        worker.on('message', (reply: LabelTaskReply) => {
+          current = undefined;
+          consecutiveFailures = 0;
+          onReply(reply);
+          feed();
+        });
+        worker.on('error', error => failCurrent(`${error}`));
+        worker.on('exit', code => {
+          failCurrent(`worker stopped with exit code ${code}`);
+          activeWorkers--;
+          if (!retired) {
+            consecutiveFailures++;
+          }
+          if (!retired && nextIndex < files.length && consecutiveFailures < MAX_CONSECUTIVE_FAILURES) {
+            startWorker();
+          }
+          if (activeWorkers === 0) {
+            resolve();
+          }
+        });
+
+        feed();
+      };
+
+      const workerCount = Math.min(options.jobs, files.length);
+      for (let i = 0; i < workerCount; i++) {
+        startWorker();
+      }
+      if (activeWorkers === 0) {
+        resolve();
+      }
+    });
+
+    // Left over when the workers kept crashing
+    if (nextIndex < files.length) {
+      log(`Workers kept failing, ${files.length - nextIndex} files were not labeled`);
+      failed += files.length - nextIndex;
+      completed += files.length - nextIndex;
+    }
+  } finally {
+    await store.close();
+  }
+
+  report();
+  log(`Wrote ${completed - failed - skipped} rows to ${options.out}, skipped ${skipped} unchanged files`);
+
+  return { files: completed, failed, skipped, elapsedMs: Date.now() - startTime };
+}
+
+if (require.main === module) {
+  let options: LabelerOptions;
+  try {
+    options = parseArguments(process.argv.slice(2));
+  } catch (error) {
+    console.error(error instanceof Error ? error.message : `${error}`);
+    process.exit(2);
+  }
+
+  runLabeler(options).then(summary => {
+    process.exitCode = summary.failed > 0 ? 1 : 0;
+  }, error => {
+    console.error(`Batch labeling failed: ${error}`);
+    process.exitCode = 1;
+  });
+}
@@ -0,0 +1,172 @@
+import * as crypto from 'crypto';
+import { Metric } from '../metrics/Metric';
+
+/**
+ * Columns written before the metric values in every CSV row
+ */
+export const BASE_CSV_COLUMNS = ['UUID', 'Timestamp', 'LabelingDateTime', 'Filename', 'FilePath', 'Language', 'NeedsRefactoring'];
+
+// Second half of an unquoted LabelingDateTime value, such as " 10:00:00 AM"
+const UNQUOTED_TIME = /^\s\d{1,2}:\d{2}:\d{2}\s[AP]M$/;
+
+// Increase when a metric changes how it computes its value, so files labeled before are labeled again
+// 2: comment lines inside strings that span lines are no longer counted
+// 3: Python metrics read the Python scope tree, which skips comments and strings:
+//    - averageMethodSizePython measures each method up to its end, nested methods included
+//    - lambdaCountPython counts every lambda
+//    - methodCohesionPython no longer counts local variables as attributes, nor attribute uses
+//      inside comments and strings (f-strings included)
+//    - nestingDepthPython no longer adds depth for lines continued inside brackets
+// 4: C#, Java, TypeScript and JavaScript metrics read the brace scope tree, which skips comments,
+//    strings, template literals and regular expressions:
+//    - methodCount counts generic methods and no longer counts C#/Java constructors
+//    - constructorCount finds constructors after other members or with parameters on several
+//      lines, and Java constructors are no longer always 0
+//    - averageMethodSize measures methods with { on the signature line and includes constructors
+//    - methodCohesion compares each method with the fields and properties of its own class,
+//      ignores local variables and leaves constructors out of the average
+//    - nestingDepth no longer adds a level for } else {
+//    - cognitiveComplexity and lambdaCount ignore keywords and arrows inside template literals,
+//      strings and regular expressions
+const METRIC_SCHEMA_VERSION = 4;
+
+/**
+ * The values of a row before the metric values
+ */
+export interface CsvRowFields {
+  uuid: string;
+  date: Date;
+  filePath: string;
+  languageName: string;
+  needsRefactoring: boolean;
+}
+
+/**
+ * Builds the CSV header line for a list of metrics
+ * @param metrics The metrics whose names become columns
+ * @returns The header line, without line break
+ */
+export function buildCsvHeader(metrics: Metric[]): string {
+  return [...BASE_CSV_COLUMNS, ...metrics.map(metric => metric.name)].join(',');
+}
+
+/**
+ * Builds one CSV row for a labeled file
+ * @param fields The values of the base columns
+ * @param metricValues The metric values, in header order, empty for columns without a value
+ * @returns The row line, without line break
+ */
+export function buildCsvRow(fields: CsvRowFields, metricValues: (number | string)[]): string {
+  const fileName = fields.filePath.split('/').pop() || 'Unknown';
+  const row = [
+    fields.uuid,
+    fields.date.toISOString(),
+    escapeCsvValue(fields.date.toLocaleString('en-US', { timeZone: 'America/Guayaquil' })),
+    escapeCsvValue(fileName),
+    escapeCsvValue(fields.filePath),
+    escapeCsvValue(fields.languageName),
+    fields.needsRefactoring ? '1' : '0',
+    ...metricValues
+  ];
+  return row.join(',');
+}
+
+/**
+ * Builds one row of the legacy metrics.csv, in the format written before the rows were
+ * split by language: LabelingDateTime is not quoted, so it spans two values, and the
+ * metric values follow in the order of the file's own metrics, whatever the header says
+ * @param fields The values of the base columns
+ * @param metricValues The metric values, in the order of the file's metrics
+ * @returns The row line, without line break
+ */
+export function buildLegacyCsvRow(fields: CsvRowFields, metricValues: (number | string)[]): string {
+  const fileName = fields.filePath.split('/').pop() || 'Unknown';
+  const row = [
+    fields.uuid,
+    fields.date.toISOString(),
+    fields.date.toLocaleString('en-US', { timeZone: 'America/Guayaquil' }),
+    escapeCsvValue(fileName),
+    escapeCsvValue(fields.filePath),
+    escapeCsvValue(fields.languageName),
+    fields.needsRefactoring ? '1' : '0',
+    ...metricValues
+  ];
+  return row.join(',');
+}
+
+/**
+ * Hash of a file's content. A byte order mark and CRLF line breaks are ignored, so the
+ * text of an editor document and the file read from disk hash the same.
+ * @param text The file content
+ */
+export function getContentHash(text: string): string {
+  const normalized = text.replace(/^\uFEFF/, '').replace(/\r\n/g, '\n');
+  return crypto.createHash('sha256').update(normalized).digest('hex');
+}
+
+/**
+ * Version of the metric columns of a row: changes when metrics are added, removed or
+ * reordered, or when METRIC_SCHEMA_VERSION is increased
+ * @param metrics The metrics of the row, in column order
+ */
+export function getMetricSchema(metrics: Metric[]): string {
+  const names = crypto.createHash('sha256').update(metrics.map(metric => metric.name).join(',')).digest('hex');
+  return `${METRIC_SCHEMA_VERSION}.${names.slice(0, 8)}`;
+}
+
+/**
+ * Escapes a value for CSV format
+ * @param value The value to escape
+ * @returns The escaped value
+ */
+export function escapeCsvValue(value: string): string {
+  // If the value contains commas, quotes, or newlines, wrap it in quotes
+  if (value.includes(',') || value.includes('"') || value.includes('\n')) {
+    // Double up any quotes
+    return `"${value.replace(/"/g, '""')}"`;
+  }
+  return value;
+}
+
+/**
+ * Splits a CSV line into its values, undoing the quoting of escapeCsvValue
+ * @param line The CSV line, without line break
+ * @param columnCount The number of columns of the header. Legacy rows, whose
+ * LabelingDateTime value is not quoted, have one extra value, which is merged back;
+ * it is also merged back when it has the form of the time of a date.
+ * @returns The values of the line
+ */
+export function parseCsvLine(line: string, columnCount?: number): string[] {
+  const values: string[] = [];
+  let current = '';
+  let inQuotes = false;
+
+  for (let i = 0; i < line.length; i++) {
+    const char = line[i];
+    if (inQuotes) {
+      if (char === '"' && line[i + 1] === '"') {
+        current += '"';
+        i++;
+      } else if (char === '"') {
+        inQuotes = false;
+      } else {
+        current += char;
+      }
+    } else if (char === '"') {
+      inQuotes = true;
+    } else if (char === ',') {
+      values.push(current);
+      current = '';
+    } else {
+      current += char;
+    }
+  }
+  values.push(current);
+
+  const dateIndex = BASE_CSV_COLUMNS.indexOf('LabelingDateTime');
+  // A legacy metrics.csv mixes languages, so its rows may not have the header's length
+  if ((columnCount !== undefined && values.length === columnCount + 1) || UNQUOTED_TIME.test(values[dateIndex + 1] ?? '')) {
+    values.splice(dateIndex, 2, `${values[dateIndex]},${values[dateIndex + 1]}`);
+  }
+  return values;
+}
@@ -1,130 +1,138 @@
 import * as vscode from 'vscode';
 import * as fs from 'fs';
 import * as path from 'path';
-import { v4 as uuidv4 } from 'uuid';
-import { Metric, MetricResult } from '../metrics/Metric';
+import { Metric } from '../metrics/Metric';
+import { MetricRegistry } from '../metrics/MetricRegistry';
 import { LanguageDetector } from '../language/LanguageDetector';
+import { getProjectLanguageId } from '../language/ProjectLanguages';
+import { getContentHash } from './MetricsCSVFormat';
+import { MetricsStore } from './MetricsStore';
 
-export class MetricsCSVManager {
-    private csvFilePath: string | null = null;
+export class MetricsCSVManager implements vscode.Disposable {
+    private store: MetricsStore | null = null;
     private output: vscode.OutputChannel;
-    
-    constructor(
-        private readonly metrics: Metric[],
-        outputChannel: vscode.OutputChannel
-    ) {
+
+    constructor(outputChannel: vscode.OutputChannel) {
         this.output = outputChannel;
-        this.initializeCSVFile();
+
+        const workspaceFolder = vscode.workspace.workspaceFolders?.[0];
+        if (workspaceFolder) {
+            const metricsDir = path.join(workspaceFolder.uri.fsPath, 'metrics-data');
+            this.store = new MetricsStore(metricsDir, line => this.output.appendLine(line));
+        }
     }
-    
+
+    /**
+     * Reads the existing CSV files once, in the background
+     */
+    public initialize(): Promise<void> {
+        return this.store ? this.store.load() : Promise.resolve();
+    }
+
     /**
-     * Gets the number of files processed (number of rows in the CSV file excluding the header)
+     * Gets the number of files processed (number of rows in the CSV files excluding the headers and replaced rows)
      * @returns The number of files processed
      */
     public getProcessedFilesCount(): number {
-        if (!this.csvFilePath || !fs.existsSync(this.csvFilePath)) {
-            return 0;
-        }
-        
-        try {
-            const content = fs.readFileSync(this.csvFilePath, 'utf8');
-            const lines = content.split('\n').filter(line => line.trim().length > 0);
-            
-            // Subtract 1 for the header row
-            return Math.max(0, lines.length - 1);
-        } catch (error) {
-            this.output.appendLine(`Error counting processed files: ${error}`);
-            return 0;
-        }
+        return this.store ? this.store.rowCount : 0;
     }
-    
+
     /**
-     * Initializes the CSV file with headers if it doesn't exist
+     * Whether a file already has a row in the CSV files
+     * @param uri The file
      */
-    private initializeCSVFile(): void {
-        const workspaceFolder = vscode.workspace.workspaceFolders?.[0];
-        if (workspaceFolder) {
-            const metricsDir = path.join(workspaceFolder.uri.fsPath, 'metrics-data');
-            this.csvFilePath = path.join(metricsDir, 'metrics.csv');
-            
-            // Create metrics directory if it doesn't exist
-            if (!fs.existsSync(metricsDir)) {
-                fs.mkdirSync(metricsDir, { recursive: true });
-                this.output.appendLine(`Created metrics directory: ${metricsDir}`);
-            }
-            
-            // Create CSV header if file doesn't exist
-            if (!fs.existsSync(this.csvFilePath)) {
-                const header = ['UUID', 'Timestamp', 'LabelingDateTime', 'Filename', 'FilePath', 'Language', 'NeedsRefactoring'];
-                
-                // Add metric names to header
-                this.metrics.forEach(metric => {
-                    header.push(metric.name);
-                });
-                
-                fs.writeFileSync(this.csvFilePath, header.join(',') + '\n');
-                this.output.appendLine(`Created metrics CSV file: ${this.csvFilePath}`);
-            }
-        }
+    public isLabeled(uri: vscode.Uri): boolean {
+        return this.store ? this.store.isLabeled(uri.fsPath) : false;
     }
-    
+
+    /**
+     * Whether a file has a row for its current content on disk and the current metrics.
+     * Rows written before content hashes were recorded count as labeled. The file is only
+     * read when its modification time or size changed since it was labeled.
+     * @param uri The file
+     */
+    public async isLabeledUpToDate(uri: vscode.Uri): Promise<boolean> {
+        if (!this.store) return false;
+
+        const languageId = getProjectLanguageId(uri.fsPath);
+        const metrics = languageId ? MetricRegistry.getInstance().getLabeledMetricsForLanguage(languageId) : undefined;
+        return this.store.isLabeledOnDisk(uri.fsPath, metrics);
+    }
+
     /**
-     * Saves the document's metrics to the CSV file
+     * Gets the CSV file that holds the rows of a language
+     * @param languageId The VS Code language id
+     */
+    public getCsvFilePath(languageId: string): string | null {
+        return this.store ? this.store.getCsvFilePath(languageId) : null;
+    }
+
+    /**
+     * Saves the document's metrics to the CSV file of its language
      * @param document The document to extract metrics from
+     * @param metrics The metrics registered for the document's language
      * @param needsRefactoring Whether the file needs refactoring (1 for yes, 0 for no)
      */
-    public saveMetricsToCSV(document: vscode.TextDocument, needsRefactoring: boolean = false): void {
-        if (!this.csvFilePath) return;
+    public async saveMetricsToCSV(document: vscode.TextDocument, metrics: Metric[], needsRefactoring: boolean = false): Promise<void> {
+        if (!this.store) return;
 
         try {
-            const uuid = uuidv4();
-            const timestamp = new Date().toISOString();
             const fileName = document.uri.fsPath.split('/').pop() || 'Unknown';
-            const filePath = document.uri.fsPath;
-            
+
+            // Same content, metrics and label as the row it has: nothing to compute or write
+            await this.store.load();
+            const contentHash = getContentHash(document.getText());
+            if (this.store.isUnchanged(document.uri.fsPath, contentHash, metrics, needsRefactoring)) {
+                this.output.appendLine(`Unchanged since it was labeled, row kept: ${fileName}`);
+                return;
+            }
+
             // Detect language
             const languageInfo = LanguageDetector.detectLanguage(document);
-            const languageName = languageInfo.name;
-            this.output.appendLine(`Detected language for CSV: ${languageName}`);
-            
+            this.output.appendLine(`Detected language for CSV: ${languageInfo.name}`);
+
             // Extract all metrics
-            const metricValues: number[] = [];
-            for (const metric of this.metrics) {
-                const result = metric.extract(document);
-                metricValues.push(result.value);
+            const results = MetricRegistry.getInstance().extractMetrics(document, metrics, 'csv');
+            const values = results.map(result => result.value);
+
+            // Large files only get the streaming metrics, the rest are left empty
+            const skipped = metrics.filter((metric, index) => results[index].skipped).map(metric => metric.name);
+            if (skipped.length > 0) {
+                this.output.appendLine(`Large file ${fileName}: ${skipped.join(', ')} left empty`);
             }
-            
-            // Create CSV row
-            const row = [
-                uuid,
-                timestamp,
-                new Date().toLocaleString('en-US', { timeZone: 'America/Guayaquil' }),
-                this.escapeCsvValue(fileName),
-                this.escapeCsvValue(filePath),
-                this.escapeCsvValue(languageName),
-                needsRefactoring ? '1' : '0',
-                ...metricValues
-            ];
-            
-            // Append to CSV file
-            fs.appendFileSync(this.csvFilePath, row.join(',') + '\n');
+
+            // A saved document has the content on disk, so its stat can skip hashing it later
+            const stat = document.isDirty || document.uri.scheme !== 'file'
+                ? undefined
+                : await fs.promises.stat(document.uri.fsPath);
+
+            await this.store.append({
+                filePath: document.uri.fsPath,
+                languageId: document.languageId.toLowerCase(),
+                languageName: languageInfo.name,
+                needsRefactoring,
+                metrics,
+                values,
+                contentHash,
+                mtime: stat?.mtimeMs,
+                size: stat?.size,
+                // Saving the file again, or the batch labeler, recomputes the skipped metrics
+                partial: skipped.length > 0
+            });
             this.output.appendLine(`Metrics saved to CSV for file: ${fileName}`);
         } catch (error) {
             this.output.appendLine(`Error saving metrics to CSV: ${error}`);
         }
     }
-    
+
     /**
-     * Escapes a value for CSV format
-     * @param value The value to escape
-     * @returns The escaped value
+     * Flushes the CSV files and removes the rows of re-labeled files from them
      */
-    private escapeCsvValue(value: string): string {
-        // If the value contains commas, quotes, or newlines, wrap it in quotes
-        if (value.includes(',') || value.includes('"') || value.includes('\n')) {
-            // Double up any quotes
-            return `"${value.replace(/"/g, '""')}"`;
-        }
-        return value;
+    public close(): Promise<void> {
+        return this.store ? this.store.close() : Promise.resolve();
+    }
+
+    public dispose(): Promise<void> {
+        return this.close();
     }
 }
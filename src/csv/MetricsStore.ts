@@ -0,0 +1,627 @@
+import * as fs from 'fs';
+import * as path from 'path';
+import * as readline from 'readline';
+import { v4 as uuidv4 } from 'uuid';
+import { Metric } from '../metrics/Metric';
+import {
+  BASE_CSV_COLUMNS,
+  buildCsvHeader,
+  buildCsvRow,
+  buildLegacyCsvRow,
+  getContentHash,
+  getMetricSchema,
+  parseCsvLine
+} from './MetricsCSVFormat';
+
+/**
+ * A labeled file to append to the store
+ */
+export interface LabeledFile {
+  filePath: string;
+  languageId: string;
+  languageName: string;
+  needsRefactoring: boolean;
+  metrics: Metric[];
+  // Undefined for a metric that was not computed, written as an empty cell
+  values: (number | undefined)[];
+  // Hash of the labeled content, see getContentHash
+  contentHash?: string;
+  // Modification time (ms) and size of the file on disk when it had the labeled content
+  mtime?: number;
+  size?: number;
+  // Some metrics were skipped (large-file mode); the row never makes the file up to date
+  partial?: boolean;
+}
+
+/**
+ * The row that currently labels a file
+ */
+export interface LabeledRow {
+  uuid: string;
+  // Language of the CSV file that holds the row, empty for a row only in the legacy file
+  languageId: string;
+  timestamp: string;
+  // Empty for rows without an entry in the index file, such as rows written before it existed
+  contentHash: string;
+  metricSchema: string;
+  needsRefactoring: boolean;
+  mtime?: number;
+  size?: number;
+  partial?: boolean;
+}
+
+/**
+ * Columns of one CSV file and the stream that appends to it
+ */
+interface LanguageTable {
+  csvFilePath: string;
+  columns: string[];
+  stream?: fs.WriteStream;
+}
+
+/**
+ * One line of the index file: the hashes of the row that labels a file
+ */
+interface IndexEntry {
+  file: string;
+  uuid: string;
+  contentHash: string;
+  metricSchema: string;
+  mtime?: number;
+  size?: number;
+  partial?: boolean;
+}
+
+// Every row is also appended here in the format of the versions that mixed every language
+// under one header, for the readers of that file
+const LEGACY_CSV_FILE = 'metrics.csv';
+const CSV_FILE_PATTERN = /^metrics-(.+)\.csv$/;
+// Content hash and metric schema of the labeled rows, one JSON line per written row
+const INDEX_FILE = 'metrics-index.jsonl';
+// Copy of a CSV file as it was before it was last compacted
+const BACKUP_SUFFIX = '.bak';
+// The index file is rewritten on close when it has more lines than twice its entries, and at least
+const MIN_INDEX_LINES_TO_COMPACT = 200;
+
+/**
+ * Labeled metrics under metrics-data/, one CSV file per language so every row lines
+ * up with its header. Existing files are read once; after that the row count and
+ * the row that labels each file path are kept in memory and rows are appended
+ * through one write stream per language. Every row is also appended to metrics.csv,
+ * in the format it had before the rows were split by language.
+ *
+ * A file has one row. Labeling it again appends the new row, and the row with the
+ * latest timestamp labels the file; the rows it replaced are removed on close, when
+ * the CSV files are compacted. The content hash and metric schema of each row are
+ * kept apart, in metrics-index.jsonl, so the CSV columns stay the same; an index line
+ * only applies while its UUID is the one of the latest row.
+ */
+export class MetricsStore {
+  private tables: Map<string, LanguageTable> = new Map();
+  private legacyStream: fs.WriteStream | undefined;
+  // File path -> its latest row
+  private labeledFiles: Map<string, LabeledRow> = new Map();
+  private rows = 0;
+  // Rows on disk that a later row of the same file replaced
+  private replacedRows = 0;
+  // CSV files that could not be read, never compacted since their rows are not indexed
+  private unreadCsvFiles: Set<string> = new Set();
+  private indexStream: fs.WriteStream | undefined;
+  private indexLines = 0;
+  private loading: Promise<void> | undefined;
+  private lastWrite: Promise<void> = Promise.resolve();
+  // Set by the first close, later calls wait for the same flush and compaction
+  private closing: Promise<void> | undefined;
+
+  /**
+   * @param directory The metrics-data directory
+   * @param log Receives progress and error lines
+   */
+  constructor(
+    private readonly directory: string,
+    private readonly log: (line: string) => void = () => {}
+  ) {}
+
+  /**
+   * Number of labeled files, in every language: rows without the replaced ones
+   */
+  public get rowCount(): number {
+    return this.rows;
+  }
+
+  /**
+   * The row that currently labels a file
+   * @param filePath The absolute file path
+   */
+  public getLabeledRow(filePath: string): LabeledRow | undefined {
+    return this.labeledFiles.get(filePath);
+  }
+
+  /**
+   * Whether a file has a row. With a content hash, the row must also be for that
+   * content and for the current metrics, with every metric computed; rows without an
+   * index entry match any content.
+   * @param filePath The absolute file path
+   * @param contentHash The hash of the file's current content
+   * @param metrics The metrics the file would be labeled with
+   */
+  public isLabeled(filePath: string, contentHash?: string, metrics?: Metric[]): boolean {
+    const row = this.labeledFiles.get(filePath);
+    if (!row || contentHash === undefined || !row.contentHash) {
+      return !!row;
+    }
+    return row.contentHash === contentHash && !row.partial && (!metrics || row.metricSchema === getMetricSchema(metrics));
+  }
+
+  /**
+   * Whether appending a file would write the row it already has: same content, same
+   * metrics and same label, and no metric was skipped
+   * @param filePath The absolute file path
+   * @param contentHash The hash of the file's current content
+   * @param metrics The metrics the file would be labeled with
+   * @param needsRefactoring The label
+   */
+  public isUnchanged(filePath: string, contentHash: string, metrics: Metric[], needsRefactoring: boolean): boolean {
+    const row = this.labeledFiles.get(filePath);
+    return !!row && !!row.contentHash && row.contentHash === contentHash && !row.partial
+      && row.metricSchema === getMetricSchema(metrics) && row.needsRefactoring === needsRefactoring;
+  }
+
+  /**
+   * Whether a file has a row for its content on disk and for the current metrics. The
+   * file is only read and hashed when its modification time or size differ from the
+   * ones recorded with the row; when the content still matches, the new ones are
+   * recorded, so the next check only needs the file's stat.
+   * @param filePath The absolute file path
+   * @param metrics The metrics the file would be labeled with
+   */
+  public async isLabeledOnDisk(filePath: string, metrics?: Metric[]): Promise<boolean> {
+    await this.load();
+    const row = this.labeledFiles.get(filePath);
+    if (!row || !row.contentHash) {
+      return !!row;
+    }
+    if (row.partial || (metrics && row.metricSchema !== getMetricSchema(metrics))) {
+      return false;
+    }
+
+    const stat = await fs.promises.stat(filePath);
+    if (row.mtime === stat.mtimeMs && row.size === stat.size) {
+      return true;
+    }
+    const text = await fs.promises.readFile(filePath, 'utf8');
+    if (getContentHash(text) !== row.contentHash || this.labeledFiles.get(filePath) !== row) {
+      return false;
+    }
+
+    row.mtime = stat.mtimeMs;
+    row.size = stat.size;
+    this.writeIndexEntry(this.getIndexEntry(filePath, row));
+    return true;
+  }
+
+  /**
+   * The CSV file that holds the rows of a language
+   * @param languageId The VS Code language id
+   */
+  public getCsvFilePath(languageId: string): string {
+    return this.tables.get(languageId)?.csvFilePath ?? path.join(this.directory, `metrics-${languageId}.csv`);
+  }
+
+  /**
+   * Read the existing CSV files and the index file once. Later calls return the same promise.
+   */
+  public load(): Promise<void> {
+    if (!this.loading) {
+      this.loading = this.readExistingFiles();
+    }
+    return this.loading;
+  }
+
+  /**
+   * Append the row of a labeled file, which replaces the row it had; the replaced row
+   * is removed from the CSV files on close. Values are written in the column order of
+   * the language's CSV file; columns of metrics that no longer exist are left empty. Nothing is written when the file is unchanged.
+   * @param file The labeled file
+   */
+  public append(file: LabeledFile): Promise<void> {
+    const write = this.lastWrite.then(() => this.load()).then(() => this.writeRow(file));
+    this.lastWrite = write.catch(() => undefined);
+    return write;
+  }
+
+  /**
+   * Flush and close the write streams, after the rows appended so far, then remove
+   * the replaced rows from the CSV files. Calling it again returns the same promise.
+   */
+  public close(): Promise<void> {
+    if (!this.closing) {
+      this.closing = this.flushAndCompact();
+    }
+    return this.closing;
+  }
+
+  private async flushAndCompact(): Promise<void> {
+    await this.lastWrite;
+
+    const streams = Array.from(this.tables.values())
+      .map(table => table.stream)
+      .filter((stream): stream is fs.WriteStream => !!stream);
+    for (const stream of [this.legacyStream, this.indexStream]) {
+      if (stream) {
+        streams.push(stream);
+      }
+    }
+
+    for (const table of this.tables.values()) {
+      table.stream = undefined;
+    }
+    this.legacyStream = undefined;
+    this.indexStream = undefined;
+    await Promise.all(streams.map(stream => new Promise<void>(resolve => stream.end(resolve))));
+
+    // Every existing row must be indexed, or the rows not read yet would be removed
+    const loaded = await this.loading?.then(() => true, () => false);
+    if (loaded && this.replacedRows > 0) {
+      await this.compactCsvFiles();
+    }
+    if (this.indexLines > 2 * Math.max(this.labeledFiles.size, MIN_INDEX_LINES_TO_COMPACT)) {
+      await this.compactIndex();
+    }
+  }
+
+  private writeRow(file: LabeledFile): void {
+    const contentHash = file.contentHash ?? '';
+    if (contentHash && this.isUnchanged(file.filePath, contentHash, file.metrics, file.needsRefactoring)) {
+      return;
+    }
+
+    let table = this.tables.get(file.languageId);
+    if (!table) {
+      table = {
+        csvFilePath: this.getCsvFilePath(file.languageId),
+        columns: [...BASE_CSV_COLUMNS, ...file.metrics.map(metric => metric.name)]
+      };
+      this.tables.set(file.languageId, table);
+    }
+    if (!table.stream) {
+      table.stream = this.openStream(table, file.metrics);
+    }
+
+    const valueByName = new Map(file.metrics.map((metric, index) => [metric.name, file.values[index]]));
+    const values = table.columns.slice(BASE_CSV_COLUMNS.length).map(name => valueByName.get(name) ?? '');
+    const row: LabeledRow = {
+      uuid: uuidv4(),
+      languageId: file.languageId,
+      timestamp: new Date().toISOString(),
+      contentHash,
+      metricSchema: getMetricSchema(file.metrics),
+      needsRefactoring: file.needsRefactoring,
+      mtime: file.mtime,
+      size: file.size,
+      partial: file.partial
+    };
+    const fields = {
+      uuid: row.uuid,
+      date: new Date(row.timestamp),
+      filePath: file.filePath,
+      languageName: file.languageName,
+      needsRefactoring: file.needsRefactoring
+    };
+    table.stream.write(buildCsvRow(fields, values) + '\n');
+    this.writeLegacyRow(buildLegacyCsvRow(fields, file.values.map(value => value ?? '')), file.metrics);
+
+    this.rows++;
+    this.setLabeledRow(file.filePath, row);
+    if (contentHash) {
+      this.writeIndexEntry(this.getIndexEntry(file.filePath, row));
+    }
+  }
+
+  /**
+   * Index the row of a file; a previous row of the file is replaced
+   */
+  private setLabeledRow(filePath: string, row: LabeledRow): void {
+    if (this.labeledFiles.has(filePath)) {
+      this.rows--;
+      this.replacedRows++;
+    }
+    this.labeledFiles.set(filePath, row);
+  }
+
+  private getIndexEntry(filePath: string, row: LabeledRow): IndexEntry {
+    return {
+      file: filePath,
+      uuid: row.uuid,
+      contentHash: row.contentHash,
+      metricSchema: row.metricSchema,
+      mtime: row.mtime,
+      size: row.size,
+      partial: row.partial || undefined
+    };
+  }
+
+  private writeIndexEntry(entry: IndexEntry): void {
+    if (!this.indexStream) {
+      const indexFilePath = path.join(this.directory, INDEX_FILE);
+      this.indexStream = fs.createWriteStream(indexFilePath, { flags: 'a' });
+      this.indexStream.on('error', error => this.log(`Error writing ${indexFilePath}: ${error}`));
+    }
+    this.indexStream.write(JSON.stringify(entry) + '\n');
+    this.indexLines++;
+  }
+
+  private writeLegacyRow(line: string, metrics: Metric[]): void {
+    if (!this.legacyStream) {
+      const legacyFilePath = path.join(this.directory, LEGACY_CSV_FILE);
+      const isNewFile = !fs.existsSync(legacyFilePath) || fs.statSync(legacyFilePath).size === 0;
+      this.legacyStream = fs.createWriteStream(legacyFilePath, { flags: 'a' });
+      this.legacyStream.on('error', error => this.log(`Error writing ${legacyFilePath}: ${error}`));
+      if (isNewFile) {
+        this.legacyStream.write(buildCsvHeader(metrics) + '\n');
+      }
+    }
+    this.legacyStream.write(line + '\n');
+  }
+
+  private openStream(table: LanguageTable, metrics: Metric[]): fs.WriteStream {
+    fs.mkdirSync(this.directory, { recursive: true });
+    const isNewFile = !fs.existsSync(table.csvFilePath) || fs.statSync(table.csvFilePath).size === 0;
+
+    const stream = fs.createWriteStream(table.csvFilePath, { flags: 'a' });
+    stream.on('error', error => this.log(`Error writing ${table.csvFilePath}: ${error}`));
+    if (isNewFile) {
+      stream.write(buildCsvHeader(metrics) + '\n');
+      this.log(`Created metrics CSV file: ${table.csvFilePath}`);
+    } else {
+      const missing = metrics.filter(metric => !table.columns.includes(metric.name));
+      if (missing.length > 0) {
+        this.log(`Metrics not in the header of ${table.csvFilePath}, not saved: ${missing.map(metric => metric.name).join(', ')}`);
+      }
+    }
+    return stream;
+  }
+
+  private async readExistingFiles(): Promise<void> {
+    if (!fs.existsSync(this.directory)) {
+      return;
+    }
+
+    // The legacy file last, so its copies of the rows of the language files are recognized
+    const fileNames = (await fs.promises.readdir(this.directory))
+      .sort((a, b) => Number(a === LEGACY_CSV_FILE) - Number(b === LEGACY_CSV_FILE));
+    for (const fileName of fileNames) {
+      const match = CSV_FILE_PATTERN.exec(fileName);
+      if (!match && fileName !== LEGACY_CSV_FILE) {
+        continue;
+      }
+
+      const csvFilePath = path.join(this.directory, fileName);
+      const languageId = match ? match[1] : '';
+      const table: LanguageTable = { csvFilePath, columns: [] };
+      if (match) {
+        this.tables.set(languageId, table);
+      }
+      try {
+        const columns = await this.readRows(csvFilePath, languageId);
+        if (columns) {
+          table.columns = columns;
+        } else {
+          this.tables.delete(languageId);
+        }
+      } catch (error) {
+        this.tables.delete(languageId);
+        this.unreadCsvFiles.add(csvFilePath);
+        this.log(`Error reading ${csvFilePath}: ${error}`);
+      }
+    }
+
+    try {
+      await this.readIndex();
+    } catch (error) {
+      this.log(`Error reading ${path.join(this.directory, INDEX_FILE)}: ${error}`);
+    }
+    this.log(`Loaded ${this.rows} labeled rows from ${this.directory}`);
+  }
+
+  /**
+   * Count the rows of a CSV file and index them by file path. When a file has several
+   * rows, the one with the latest timestamp labels it. A row of the legacy file with the
+   * UUID of a row already read is its copy and is not counted again.
+   * @param languageId The language of the CSV file, empty for the legacy file
+   * @returns The columns of the header, undefined for an empty file
+   */
+  private async readRows(csvFilePath: string, languageId: string): Promise<string[] | undefined> {
+    const lines = readline.createInterface({
+      input: fs.createReadStream(csvFilePath, 'utf8'),
+      crlfDelay: Infinity
+    });
+
+    let columns: string[] | undefined;
+    let index: { [name: string]: number } = {};
+    for await (const line of lines) {
+      if (line.trim().length === 0) {
+        continue;
+      }
+      if (!columns) {
+        columns = parseCsvLine(line);
+        index = Object.fromEntries(BASE_CSV_COLUMNS.map(name => [name, columns!.indexOf(name)]));
+        continue;
+      }
+
+      this.rows++;
+      const values = parseCsvLine(line, columns.length);
+      const filePath = values[index.FilePath];
+      if (!filePath) {
+        continue;
+      }
+
+      const row: LabeledRow = {
+        uuid: values[index.UUID] ?? '',
+        languageId,
+        timestamp: values[index.Timestamp] ?? '',
+        contentHash: '',
+        metricSchema: '',
+        needsRefactoring: values[index.NeedsRefactoring] === '1'
+      };
+      const previous = this.labeledFiles.get(filePath);
+      if (previous && previous.uuid === row.uuid) {
+        this.rows--;
+      } else if (previous && previous.timestamp > row.timestamp) {
+        this.rows--;
+        this.replacedRows++;
+      } else {
+        this.setLabeledRow(filePath, row);
+      }
+    }
+    return columns;
+  }
+
+  /**
+   * Add the hashes of the index file to the rows they were written for. Later lines of
+   * a file win; a line whose UUID is not the one of the file's latest row is ignored.
+   */
+  private async readIndex(): Promise<void> {
+    const indexFilePath = path.join(this.directory, INDEX_FILE);
+    if (!fs.existsSync(indexFilePath)) {
+      return;
+    }
+
+    const lines = readline.createInterface({
+      input: fs.createReadStream(indexFilePath, 'utf8'),
+      crlfDelay: Infinity
+    });
+    const entries: Map<string, IndexEntry> = new Map();
+    for await (const line of lines) {
+      if (line.trim().length === 0) {
+        continue;
+      }
+      this.indexLines++;
+      try {
+        const entry = JSON.parse(line) as IndexEntry;
+        entries.set(entry.file, entry);
+      } catch {
+        // A line cut short by a crash; the row it was written for has no hashes
+      }
+    }
+
+    for (const entry of entries.values()) {
+      const row = this.labeledFiles.get(entry.file);
+      if (row && row.uuid === entry.uuid) {
+        row.contentHash = entry.contentHash;
+        row.metricSchema = entry.metricSchema;
+        row.mtime = entry.mtime;
+        row.size = entry.size;
+        row.partial = entry.partial;
+      }
+    }
+  }
+
+  /**
+   * Remove the replaced rows from every CSV file, the legacy one included
+   */
+  private async compactCsvFiles(): Promise<void> {
+    const csvFilePaths = Array.from(this.tables.values()).map(table => table.csvFilePath);
+    const legacyFilePath = path.join(this.directory, LEGACY_CSV_FILE);
+    if (fs.existsSync(legacyFilePath)) {
+      csvFilePaths.push(legacyFilePath);
+    }
+
+    let compacted = true;
+    for (const csvFilePath of csvFilePaths) {
+      compacted = await this.compactCsvFile(csvFilePath) && compacted;
+    }
+    if (compacted) {
+      this.replacedRows = 0;
+    }
+  }
+
+  /**
+   * Rewrite a CSV file with the header and the rows that label their file, in their
+   * order and unchanged, into a temporary file. The original is copied to a backup
+   * before the temporary file is renamed over it.
+   * @returns Whether the file was rewritten
+   */
+  private async compactCsvFile(csvFilePath: string): Promise<boolean> {
+    if (!fs.existsSync(csvFilePath) || this.unreadCsvFiles.has(csvFilePath)) {
+      return true;
+    }
+
+    const temporaryPath = `${csvFilePath}.tmp`;
+    const output = fs.createWriteStream(temporaryPath);
+    const finished = new Promise<void>((resolve, reject) => {
+      output.on('error', reject);
+      output.on('finish', resolve);
+    });
+    finished.catch(() => undefined);
+    try {
+      const lines = readline.createInterface({
+        input: fs.createReadStream(csvFilePath, 'utf8'),
+        crlfDelay: Infinity
+      });
+
+      let columns: string[] | undefined;
+      const written: Set<string> = new Set();
+      for await (const line of lines) {
+        if (line.trim().length === 0) {
+          continue;
+        }
+        if (columns) {
+          const values = parseCsvLine(line, columns.length);
+          const uuid = values[columns.indexOf('UUID')];
+          const filePath = values[columns.indexOf('FilePath')];
+          if (filePath && (this.labeledFiles.get(filePath)?.uuid !== uuid || written.has(uuid))) {
+            continue;
+          }
+          written.add(uuid);
+        } else {
+          columns = parseCsvLine(line);
+        }
+        if (!output.write(line + '\n')) {
+          await new Promise<void>(resolve => output.once('drain', resolve));
+        }
+      }
+      output.end();
+      await finished;
+
+      await fs.promises.copyFile(csvFilePath, `${csvFilePath}${BACKUP_SUFFIX}`);
+      await fs.promises.rename(temporaryPath, csvFilePath);
+      return true;
+    } catch (error) {
+      output.destroy();
+      await fs.promises.rm(temporaryPath, { force: true });
+      this.log(`Error compacting ${csvFilePath}: ${error}`);
+      return false;
+    }
+  }
+
+  /**
+   * Rewrite the index file with one line per labeled row, into a temporary file that
+   * then replaces it.
+   */
+  private async compactIndex(): Promise<void> {
+    const indexFilePath = path.join(this.directory, INDEX_FILE);
+    const temporaryPath = `${indexFilePath}.tmp`;
+    const output = fs.createWriteStream(temporaryPath);
+    let lines = 0;
+    for (const [file, row] of this.labeledFiles) {
+      if (row.contentHash) {
+        if (!output.write(JSON.stringify(this.getIndexEntry(file, row)) + '\n')) {
+          await new Promise<void>(resolve => output.once('drain', resolve));
+        }
+        lines++;
+      }
+    }
+
+    try {
+      await new Promise<void>((resolve, reject) => {
+        output.on('error', reject);
+        output.end(resolve);
+      });
+      await fs.promises.rename(temporaryPath, indexFilePath);
+      this.indexLines = lines;
+    } catch (error) {
+      this.log(`Error compacting ${indexFilePath}: ${error}`);
+    }
+  }
+}
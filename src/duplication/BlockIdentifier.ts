@@ -0,0 +1,14 @@
+const BLOCK_IDENTIFIERS = 'abcdefghijklmnopqrstuvwxyz';
+
+/**
+ * Identifier of the nth set of duplicated blocks: a, b, ... z, then a1, b1, ...
+ * @param index Zero-based index of the set
+ */
+export function blockIdentifier(index: number): string {
+  if (index < BLOCK_IDENTIFIERS.length) {
+    return BLOCK_IDENTIFIERS[index];
+  }
+  const letterIndex = index % BLOCK_IDENTIFIERS.length;
+  const numberSuffix = Math.floor(index / BLOCK_IDENTIFIERS.length);
+  return BLOCK_IDENTIFIERS[letterIndex] + numberSuffix;
+}
@@ -0,0 +1,440 @@
+import * as fs from 'fs';
+import { normalizeCodeLine } from './CodeNormalizer';
+
+/**
+ * A window of consecutive non-empty normalized lines
+ */
+interface CloneWindow {
+  hash: number;
+  startLine: number;
+  endLine: number;
+}
+
+export interface CloneMatch {
+  startLine: number;
+  endLine: number;
+  filePath: string;
+  matchStartLine: number;
+  matchEndLine: number;
+}
+
+export interface CrossFileDuplication {
+  duplicatedLineCount: number;
+  totalNonEmptyLines: number;
+  matches: CloneMatch[];
+}
+
+interface IndexedFile {
+  mtime: number;
+  // Flat [hash, startLine, endLine] triples
+  windows: number[];
+}
+
+// First line of a serialized index
+interface SerializedHeader {
+  version: number;
+  windowSize: number;
+}
+
+// One line per file; a later line of the same file replaces the earlier ones
+interface SerializedFile {
+  file: string;
+  mtime?: number;
+  windows?: number[];
+  removed?: boolean;
+}
+
+// Two 26-bit rolling hashes combined into one 52-bit integer, exact in a JS number
+const MODULUS_HIGH = 67108859;
+const MODULUS_LOW = 67108837;
+const BASE = 1000003;
+const HIGH_SHIFT = 67108864;
+
+/**
+ * Workspace-wide index of normalized code windows, used to find code duplicated
+ * across files. Windows are hashed with a rolling hash, and the index is updated
+ * one file at a time. Only the hashes are kept, so a window whose hash matches is
+ * compared line by line with the other file's content before it counts as a clone.
+ */
+export class CloneIndex {
+  private static instance: CloneIndex;
+
+  // Minimum normalized characters for a window to count, same as CodeDuplicationMetricV2
+  private static readonly MIN_WINDOW_LENGTH = 20;
+  private static readonly FORMAT_VERSION = 2;
+
+  private files: Map<string, IndexedFile> = new Map();
+  private filePaths: string[] = [];
+  private fileIds: Map<string, number> = new Map();
+  // Window hash -> file id -> flat [startLine, endLine] pairs
+  private postings: Map<number, Map<number, number[]>> = new Map();
+  // Files indexed or removed since the last takeChangedFiles call
+  private changedFiles: Set<string> = new Set();
+
+  /**
+   * @param windowSize Number of non-empty lines of a window
+   * @param readText Reads the content of an indexed file, undefined when it cannot be read
+   */
+  constructor(
+    private readonly windowSize: number = 3,
+    private readonly readText: (filePath: string) => string | undefined = readFileText
+  ) {}
+
+  /**
+   * Get the shared workspace index
+   */
+  public static getInstance(): CloneIndex {
+    if (!CloneIndex.instance) {
+      CloneIndex.instance = new CloneIndex();
+    }
+    return CloneIndex.instance;
+  }
+
+  /**
+   * Number of indexed files
+   */
+  public get fileCount(): number {
+    return this.files.size;
+  }
+
+  /**
+   * Modification time recorded when a file was indexed
+   * @param filePath The absolute file path
+   */
+  public getIndexedMtime(filePath: string): number | undefined {
+    return this.files.get(filePath)?.mtime;
+  }
+
+  /**
+   * Paths of all indexed files
+   */
+  public getIndexedFiles(): string[] {
+    return Array.from(this.files.keys());
+  }
+
+  /**
+   * Add or replace the windows of a file
+   * @param filePath The absolute file path
+   * @param text The file content
+   * @param mtime The file modification time
+   */
+  public indexFile(filePath: string, text: string, mtime: number = Date.now()): void {
+    const windows: number[] = [];
+    for (const window of this.computeWindows(text.split('\n').map(normalizeCodeLine))) {
+      windows.push(window.hash, window.startLine, window.endLine);
+    }
+    this.setFile(filePath, { mtime, windows });
+    this.changedFiles.add(filePath);
+  }
+
+  /**
+   * Remove a file from the index
+   * @param filePath The absolute file path
+   */
+  public removeFile(filePath: string): void {
+    if (this.deleteFile(filePath)) {
+      this.changedFiles.add(filePath);
+    }
+  }
+
+  /**
+   * The files indexed or removed since the last call, whose serialized lines must be saved
+   */
+  public takeChangedFiles(): string[] {
+    const changed = Array.from(this.changedFiles);
+    this.changedFiles.clear();
+    return changed;
+  }
+
+  /**
+   * Find the blocks of a document that also appear in other indexed files
+   * @param filePath The absolute path of the document, its own windows are ignored
+   * @param text The current document content
+   */
+  public findCrossFileDuplicates(filePath: string, text: string): CrossFileDuplication {
+    const ownId = this.fileIds.get(filePath);
+    const lines = text.split('\n');
+    const totalNonEmptyLines = lines.filter(line => line.trim() !== '').length;
+    const normalizedLines = lines.map(normalizeCodeLine);
+    // File id -> normalized lines of the other file, null when it cannot be read
+    const otherFiles = new Map<number, string[] | null>();
+
+    const covered = new Set<number>();
+    const matches: CloneMatch[] = [];
+    let current: CloneMatch | undefined;
+
+    for (const window of this.computeWindows(normalizedLines)) {
+      const entries = this.postings.get(window.hash);
+      let match: { fileId: number, startLine: number, endLine: number } | undefined;
+      if (entries) {
+        const windowLines = getWindowLines(normalizedLines, window.startLine, window.endLine);
+        for (const [fileId, ranges] of entries) {
+          if (fileId === ownId) {
+            continue;
+          }
+          if (!otherFiles.has(fileId)) {
+            const otherText = this.readText(this.filePaths[fileId]);
+            otherFiles.set(fileId, otherText === undefined ? null : otherText.split('\n').map(normalizeCodeLine));
+          }
+          const otherLines = otherFiles.get(fileId);
+          if (!otherLines) {
+            continue;
+          }
+          // Same hash is not enough: the lines must be the same, which a hash collision
+          // or a file changed since it was indexed would not give
+          for (let i = 0; i < ranges.length && !match; i += 2) {
+            if (getWindowLines(otherLines, ranges[i], ranges[i + 1]) === windowLines) {
+              match = { fileId, startLine: ranges[i], endLine: ranges[i + 1] };
+            }
+          }
+          if (match) {
+            break;
+          }
+        }
+      }
+
+      if (!match) {
+        continue;
+      }
+
+      for (let line = window.startLine; line <= window.endLine; line++) {
+        if (lines[line].trim() !== '') {
+          covered.add(line);
+        }
+      }
+
+      const matchPath = this.filePaths[match.fileId];
+      if (current && window.startLine <= current.endLine && current.filePath === matchPath) {
+        // Overlapping windows extend the current block
+        current.endLine = Math.max(current.endLine, window.endLine);
+        current.matchEndLine = Math.max(current.matchEndLine, match.endLine);
+      } else {
+        current = {
+          startLine: window.startLine,
+          endLine: window.endLine,
+          filePath: matchPath,
+          matchStartLine: match.startLine,
+          matchEndLine: match.endLine
+        };
+        matches.push(current);
+      }
+    }
+
+    return { duplicatedLineCount: covered.size, totalNonEmptyLines, matches };
+  }
+
+  /**
+   * The first line of a serialized index, with its format and window size
+   */
+  public serializeHeader(): string {
+    const header: SerializedHeader = { version: CloneIndex.FORMAT_VERSION, windowSize: this.windowSize };
+    return JSON.stringify(header);
+  }
+
+  /**
+   * The line of one file: its windows, or a removal when it is no longer indexed.
+   * Appending the lines of the changed files to a serialized index updates it.
+   * @param filePath The absolute file path
+   */
+  public serializeFile(filePath: string): string {
+    const indexed = this.files.get(filePath);
+    const line: SerializedFile = indexed
+      ? { file: filePath, mtime: indexed.mtime, windows: indexed.windows }
+      : { file: filePath, removed: true };
+    return JSON.stringify(line);
+  }
+
+  /**
+   * Serialize the whole index, one line at a time: the header, then every file
+   */
+  public *serializeLines(): Generator<string> {
+    yield this.serializeHeader();
+    for (const filePath of this.getIndexedFiles()) {
+      yield this.serializeFile(filePath);
+    }
+  }
+
+  /**
+   * Replace the index content with a serialized index. Content written with another
+   * format or window size is ignored.
+   * @param lines The lines of the serialized index, the header first
+   * @returns Whether the content was loaded
+   */
+  public load(lines: Iterable<string>): boolean {
+    this.clear();
+    let header: SerializedHeader | undefined;
+    for (const line of lines) {
+      if (line.trim() === '') {
+        continue;
+      }
+      if (!header) {
+        header = JSON.parse(line) as SerializedHeader;
+        if (header.version !== CloneIndex.FORMAT_VERSION || header.windowSize !== this.windowSize) {
+          return false;
+        }
+        continue;
+      }
+
+      const entry = JSON.parse(line) as SerializedFile;
+      if (entry.removed) {
+        this.deleteFile(entry.file);
+      } else {
+        this.setFile(entry.file, { mtime: entry.mtime ?? 0, windows: entry.windows ?? [] });
+      }
+    }
+    return header !== undefined;
+  }
+
+  /**
+   * Remove every file from the index
+   */
+  public clear(): void {
+    this.files.clear();
+    this.filePaths = [];
+    this.fileIds.clear();
+    this.postings.clear();
+    this.changedFiles.clear();
+  }
+
+  /**
+   * Drop the postings of a file
+   * @returns Whether the file was indexed
+   */
+  private deleteFile(filePath: string): boolean {
+    const indexed = this.files.get(filePath);
+    if (!indexed) {
+      return false;
+    }
+
+    const fileId = this.fileIds.get(filePath)!;
+    for (let i = 0; i < indexed.windows.length; i += 3) {
+      const hash = indexed.windows[i];
+      const entries = this.postings.get(hash);
+      if (entries && entries.delete(fileId) && entries.size === 0) {
+        this.postings.delete(hash);
+      }
+    }
+    this.files.delete(filePath);
+    return true;
+  }
+
+  private setFile(filePath: string, indexed: IndexedFile): void {
+    this.deleteFile(filePath);
+
+    let fileId = this.fileIds.get(filePath);
+    if (fileId === undefined) {
+      fileId = this.filePaths.length;
+      this.filePaths.push(filePath);
+      this.fileIds.set(filePath, fileId);
+    }
+
+    for (let i = 0; i < indexed.windows.length; i += 3) {
+      const hash = indexed.windows[i];
+      let entries = this.postings.get(hash);
+      if (!entries) {
+        entries = new Map();
+        this.postings.set(hash, entries);
+      }
+      let ranges = entries.get(fileId);
+      if (!ranges) {
+        ranges = [];
+        entries.set(fileId, ranges);
+      }
+      ranges.push(indexed.windows[i + 1], indexed.windows[i + 2]);
+    }
+    this.files.set(filePath, indexed);
+  }
+
+  /**
+   * @param normalizedLines Every line of the file, normalized with normalizeCodeLine
+   */
+  private computeWindows(normalizedLines: string[]): CloneWindow[] {
+    const size = this.windowSize;
+
+    // Non-empty normalized lines with their position in the file
+    const lineNumbers: number[] = [];
+    const lineLengths: number[] = [];
+    const hashesHigh: number[] = [];
+    const hashesLow: number[] = [];
+    for (let i = 0; i < normalizedLines.length; i++) {
+      const normalized = normalizedLines[i];
+      if (normalized === '') {
+        continue;
+      }
+      const lineHash = hashString(normalized);
+      lineNumbers.push(i);
+      lineLengths.push(normalized.length);
+      hashesHigh.push(lineHash % MODULUS_HIGH);
+      hashesLow.push((lineHash * 31 + normalized.length) % MODULUS_LOW);
+    }
+
+    const windows: CloneWindow[] = [];
+    if (lineNumbers.length < size) {
+      return windows;
+    }
+
+    // BASE^(size - 1), used to drop the outgoing line from the rolling hash
+    let powerHigh = 1;
+    let powerLow = 1;
+    for (let k = 1; k < size; k++) {
+      powerHigh = (powerHigh * BASE) % MODULUS_HIGH;
+      powerLow = (powerLow * BASE) % MODULUS_LOW;
+    }
+
+    let rollingHigh = 0;
+    let rollingLow = 0;
+    let rollingLength = 0;
+    for (let i = 0; i < lineNumbers.length; i++) {
+      if (i >= size) {
+        const outgoing = i - size;
+        rollingHigh = (rollingHigh - (hashesHigh[outgoing] * powerHigh) % MODULUS_HIGH + MODULUS_HIGH) % MODULUS_HIGH;
+        rollingLow = (rollingLow - (hashesLow[outgoing] * powerLow) % MODULUS_LOW + MODULUS_LOW) % MODULUS_LOW;
+        rollingLength -= lineLengths[outgoing];
+      }
+
+      rollingHigh = (rollingHigh * BASE + hashesHigh[i]) % MODULUS_HIGH;
+      rollingLow = (rollingLow * BASE + hashesLow[i]) % MODULUS_LOW;
+      rollingLength += lineLengths[i];
+
+      if (i >= size - 1 && rollingLength >= CloneIndex.MIN_WINDOW_LENGTH) {
+        windows.push({
+          hash: rollingHigh * HIGH_SHIFT + rollingLow,
+          startLine: lineNumbers[i - size + 1],
+          endLine: lineNumbers[i]
+        });
+      }
+    }
+
+    return windows;
+  }
+}
+
+/**
+ * The non-empty normalized lines of a window, joined, to compare two windows
+ */
+function getWindowLines(normalizedLines: string[], startLine: number, endLine: number): string {
+  return normalizedLines.slice(startLine, endLine + 1).filter(line => line !== '').join('\n');
+}
+
+/**
+ * Reads an indexed file from disk
+ */
+function readFileText(filePath: string): string | undefined {
+  try {
+    return fs.readFileSync(filePath, 'utf8');
+  } catch {
+    return undefined;
+  }
+}
+
+/**
+ * 32-bit FNV-1a hash of a string
+ */
+function hashString(value: string): number {
+  let hash = 0x811c9dc5;
+  for (let i = 0; i < value.length; i++) {
+    hash ^= value.charCodeAt(i);
+    hash = Math.imul(hash, 0x01000193);
+  }
+  return hash >>> 0;
+}
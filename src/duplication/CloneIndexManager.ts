@@ -0,0 +1,252 @@
+import * as vscode from 'vscode';
+import * as fs from 'fs';
+import * as path from 'path';
+import * as readline from 'readline';
+import { CloneIndex } from './CloneIndex';
+import { MetricRegistry } from '../metrics/MetricRegistry';
+import { getProjectFilesGlob } from '../language/ProjectLanguages';
+
+/**
+ * Keeps the workspace clone index in sync with the files on disk and persists it
+ * under metrics-data/. Files are reindexed one by one from a file watcher.
+ *
+ * The index is saved as JSON lines, one per file. A save appends the lines of the
+ * files that changed since the last one; the file is rewritten, asynchronously and
+ * line by line, only once replaced lines outnumber the indexed files.
+ */
+export class CloneIndexManager implements vscode.Disposable {
+  private static readonly DEFAULT_FILE_GLOB = '**/*.{cs,py}';
+  private static readonly EXCLUDE_GLOB = '**/node_modules/**';
+  private static readonly SAVE_DELAY_MS = 5000;
+  // Files indexed or written between yields to the event loop
+  private static readonly BATCH_SIZE = 200;
+  // Lines the saved index may hold per indexed file before it is rewritten
+  private static readonly MAX_LINES_PER_FILE = 2;
+
+  private index = CloneIndex.getInstance();
+  private disposables: vscode.Disposable[] = [];
+  private saveTimer: NodeJS.Timeout | undefined;
+  private indexFilePath: string | null = null;
+  // The project files of every language with metrics, as navigated and labeled
+  private fileGlob = CloneIndexManager.DEFAULT_FILE_GLOB;
+  // Lines of the saved index, 0 when there is none
+  private savedLines = 0;
+  private saving: Promise<void> = Promise.resolve();
+
+  constructor(private readonly output: vscode.OutputChannel) {}
+
+  /**
+   * Load the persisted index, start watching files and reconcile with the disk
+   * in the background
+   */
+  public async initialize(): Promise<void> {
+    const workspaceFolder = vscode.workspace.workspaceFolders?.[0];
+    if (!workspaceFolder) {
+      return;
+    }
+
+    this.indexFilePath = path.join(workspaceFolder.uri.fsPath, 'metrics-data', 'clone-index.jsonl');
+    // Single-document index of earlier versions, replaced by the JSON lines file
+    await fs.promises.rm(path.join(workspaceFolder.uri.fsPath, 'metrics-data', 'clone-index.json'), { force: true });
+    await this.loadIndex();
+
+    this.fileGlob = getProjectFilesGlob(MetricRegistry.getInstance().getSupportedLanguages()) || CloneIndexManager.DEFAULT_FILE_GLOB;
+    const watcher = vscode.workspace.createFileSystemWatcher(this.fileGlob);
+    this.disposables.push(
+      watcher,
+      watcher.onDidCreate(uri => this.reindexFile(uri)),
+      watcher.onDidChange(uri => this.reindexFile(uri)),
+      watcher.onDidDelete(uri => this.removeFile(uri))
+    );
+
+    await this.reconcile();
+  }
+
+  public dispose(): void {
+    this.disposables.forEach(disposable => disposable.dispose());
+    this.disposables = [];
+    if (this.saveTimer) {
+      clearTimeout(this.saveTimer);
+      this.saveTimer = undefined;
+      this.appendChangesOnExit();
+    }
+  }
+
+  private async loadIndex(): Promise<void> {
+    if (!this.indexFilePath || !fs.existsSync(this.indexFilePath)) {
+      return;
+    }
+
+    try {
+      const lines: string[] = [];
+      const reader = readline.createInterface({
+        input: fs.createReadStream(this.indexFilePath, 'utf8'),
+        crlfDelay: Infinity
+      });
+      for await (const line of reader) {
+        lines.push(line);
+      }
+
+      const loaded = this.index.load(lines);
+      this.savedLines = loaded ? lines.length : 0;
+      this.output.appendLine(loaded
+        ? `Loaded clone index with ${this.index.fileCount} files`
+        : 'Clone index format changed, rebuilding');
+    } catch (error) {
+      this.index.clear();
+      this.savedLines = 0;
+      this.output.appendLine(`Error loading clone index: ${error}`);
+    }
+  }
+
+  /**
+   * Index new or modified files and drop deleted ones, comparing modification times
+   */
+  private async reconcile(): Promise<void> {
+    const uris = await vscode.workspace.findFiles(this.fileGlob, CloneIndexManager.EXCLUDE_GLOB);
+    const present = new Set(uris.map(uri => uri.fsPath));
+
+    let changed = 0;
+    for (const filePath of this.index.getIndexedFiles()) {
+      if (!present.has(filePath)) {
+        this.index.removeFile(filePath);
+        changed++;
+      }
+    }
+
+    for (let i = 0; i < uris.length; i++) {
+      try {
+        const stat = await fs.promises.stat(uris[i].fsPath);
+        if (this.index.getIndexedMtime(uris[i].fsPath) !== stat.mtimeMs) {
+          const text = await fs.promises.readFile(uris[i].fsPath, 'utf8');
+          this.index.indexFile(uris[i].fsPath, text, stat.mtimeMs);
+          changed++;
+        }
+      } catch (error) {
+        this.output.appendLine(`Error indexing ${uris[i].fsPath}: ${error}`);
+      }
+
+      if (i % CloneIndexManager.BATCH_SIZE === 0) {
+        await new Promise(resolve => setImmediate(resolve));
+      }
+    }
+
+    this.output.appendLine(`Clone index reconciled: ${this.index.fileCount} files, ${changed} updated`);
+    if (changed > 0) {
+      this.onIndexChanged();
+    }
+  }
+
+  private async reindexFile(uri: vscode.Uri): Promise<void> {
+    if (uri.fsPath.includes(`${path.sep}node_modules${path.sep}`)) {
+      return;
+    }
+
+    try {
+      const stat = await fs.promises.stat(uri.fsPath);
+      const text = await fs.promises.readFile(uri.fsPath, 'utf8');
+      this.index.indexFile(uri.fsPath, text, stat.mtimeMs);
+      this.onIndexChanged();
+    } catch (error) {
+      this.output.appendLine(`Error indexing ${uri.fsPath}: ${error}`);
+    }
+  }
+
+  private removeFile(uri: vscode.Uri): void {
+    this.index.removeFile(uri.fsPath);
+    this.onIndexChanged();
+  }
+
+  private onIndexChanged(): void {
+    // Results of other documents may depend on the file that changed
+    MetricRegistry.getInstance().invalidateResults(undefined, 'crossFileDuplication');
+
+    if (this.saveTimer) {
+      clearTimeout(this.saveTimer);
+    }
+    this.saveTimer = setTimeout(() => {
+      this.saveTimer = undefined;
+      this.saving = this.saving
+        .then(() => this.saveIndex())
+        .catch(error => this.output.appendLine(`Error saving clone index: ${error}`));
+    }, CloneIndexManager.SAVE_DELAY_MS);
+  }
+
+  /**
+   * Append the lines of the changed files, or rewrite the saved index when there is
+   * none yet or most of its lines were replaced
+   */
+  private async saveIndex(): Promise<void> {
+    if (!this.indexFilePath) {
+      return;
+    }
+
+    const changed = this.index.takeChangedFiles();
+    if (changed.length === 0) {
+      return;
+    }
+
+    try {
+      const maxLines = CloneIndexManager.MAX_LINES_PER_FILE * Math.max(this.index.fileCount, CloneIndexManager.BATCH_SIZE);
+      if (this.savedLines === 0 || this.savedLines + changed.length > maxLines) {
+        await this.rewriteIndex();
+        return;
+      }
+
+      await fs.promises.appendFile(this.indexFilePath, changed.map(filePath => this.index.serializeFile(filePath) + '\n').join(''));
+      this.savedLines += changed.length;
+    } catch (error) {
+      // The changed lines may be missing from the saved index: the next save rewrites it
+      this.savedLines = 0;
+      throw error;
+    }
+  }
+
+  /**
+   * Write the whole index to a temporary file, one line per file, and rename it over
+   * the saved index. Yields to the event loop between batches of files.
+   */
+  private async rewriteIndex(): Promise<void> {
+    const indexFilePath = this.indexFilePath!;
+    const temporaryPath = `${indexFilePath}.tmp`;
+    await fs.promises.mkdir(path.dirname(indexFilePath), { recursive: true });
+
+    const stream = fs.createWriteStream(temporaryPath);
+    const finished = new Promise<void>((resolve, reject) => {
+      stream.on('error', reject);
+      stream.on('finish', resolve);
+    });
+
+    let lines = 0;
+    for (const line of this.index.serializeLines()) {
+      if (!stream.write(line + '\n')) {
+        await new Promise(resolve => stream.once('drain', resolve));
+      }
+      if (++lines % CloneIndexManager.BATCH_SIZE === 0) {
+        await new Promise(resolve => setImmediate(resolve));
+      }
+    }
+    stream.end();
+    await finished;
+
+    await fs.promises.rename(temporaryPath, indexFilePath);
+    this.savedLines = lines;
+  }
+
+  /**
+   * On shutdown there is no time for asynchronous writes: only the lines of the
+   * changed files are appended, and only to an existing saved index
+   */
+  private appendChangesOnExit(): void {
+    if (!this.indexFilePath || this.savedLines === 0) {
+      return;
+    }
+
+    try {
+      const changed = this.index.takeChangedFiles();
+      fs.appendFileSync(this.indexFilePath, changed.map(filePath => this.index.serializeFile(filePath) + '\n').join(''));
+    } catch (error) {
+      this.output.appendLine(`Error saving clone index: ${error}`);
+    }
+  }
+}
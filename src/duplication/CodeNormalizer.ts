@@ -0,0 +1,16 @@
+/**
+ * Normalizes a line of code for clone detection: comments are removed, strings,
+ * numbers and identifiers are replaced by placeholders and whitespace is collapsed.
+ * @param line The raw line
+ * @returns The normalized line, empty when nothing remains
+ */
+export function normalizeCodeLine(line: string): string {
+  return line
+    .replace(/\/\/.*$/g, '')     // remove single-line comments
+    .replace(/\/\*.*?\*\//g, '') // remove inline block comments
+    .replace(/(["'`])(?:(?!\1|\\).|\\.)*\1/g, 'STR') // replace strings
+    .replace(/\b\d+\b/g, 'NUM')  // replace numbers
+    .replace(/\b\w+\b/g, 'VAR')  // replace variable names
+    .replace(/\s+/g, ' ')        // normalize spaces
+    .trim();
+}
@@ -0,0 +1,138 @@
+import { blockIdentifier } from './BlockIdentifier';
+
+export interface ExactLineDuplication {
+  duplicatedLineCount: number;
+  totalNonEmptyLines: number;
+  duplicatedBlocks: { startLine: number, endLine: number, blockId: string }[];
+}
+
+// Minimum number of consecutive lines to consider as a duplication
+const MIN_DUPLICATION_LINES = 3;
+// Lines of this length or shorter never match
+const MAX_IGNORED_LINE_LENGTH = 5;
+
+function isCommentOrEmpty(trimmed: string): boolean {
+  return trimmed === '' || trimmed.startsWith('//') || trimmed.startsWith('/*') || trimmed.startsWith('*');
+}
+
+/**
+ * Finds runs of identical trimmed lines repeated in a file, with the counting rules of
+ * CodeDuplicationMetric: a run has at least 3 lines longer than 5 characters, comments
+ * and empty lines break runs, and every start line counts each distinct run length it
+ * has with a later line once.
+ *
+ * Lines are trimmed and interned once, then only start lines whose first 3 lines repeat
+ * are compared, and each diagonal (distance between the two runs) is extended only once,
+ * so the cost grows with the number of repeated windows instead of with n².
+ * @param lines The lines of the file
+ */
+export function findExactLineDuplication(lines: string[]): ExactLineDuplication {
+  const n = lines.length;
+
+  // Interned id of every line that may take part in a run, -1 otherwise
+  const lineIds = new Int32Array(n);
+  const internedLines = new Map<string, number>();
+  let totalNonEmptyLines = 0;
+  for (let i = 0; i < n; i++) {
+    const trimmed = lines[i].trim();
+    if (isCommentOrEmpty(trimmed)) {
+      lineIds[i] = -1;
+      continue;
+    }
+
+    totalNonEmptyLines++;
+    if (trimmed.length <= MAX_IGNORED_LINE_LENGTH) {
+      lineIds[i] = -1;
+      continue;
+    }
+
+    let id = internedLines.get(trimmed);
+    if (id === undefined) {
+      id = internedLines.size;
+      internedLines.set(trimmed, id);
+    }
+    lineIds[i] = id;
+  }
+
+  // Start lines grouped by the ids of their first 3 lines; only lines in the same group can match
+  const windows = new Map<string, number[]>();
+  const windowOf: (number[] | undefined)[] = new Array(n);
+  const positionInWindow = new Int32Array(n);
+  for (let i = 0; i + MIN_DUPLICATION_LINES <= n; i++) {
+    let key = '';
+    let comparable = true;
+    for (let k = 0; k < MIN_DUPLICATION_LINES; k++) {
+      if (lineIds[i + k] < 0) {
+        comparable = false;
+        break;
+      }
+      key += `${lineIds[i + k]},`;
+    }
+    if (!comparable) {
+      continue;
+    }
+
+    let starts = windows.get(key);
+    if (!starts) {
+      starts = [];
+      windows.set(key, starts);
+    }
+    positionInWindow[i] = starts.length;
+    starts.push(i);
+    windowOf[i] = starts;
+  }
+
+  // Distance between two runs -> first line after the last run found on that diagonal
+  const runEnds = new Map<number, number>();
+  // `${startLine}:${length}` -> block id, so every copy of a run shares its id
+  const blockIds = new Map<string, string>();
+  let blockCount = 0;
+  const duplicatedBlocks: { startLine: number, endLine: number, blockId: string }[] = [];
+  const addBlock = (startLine: number, length: number, blockId: string) => {
+    const key = `${startLine}:${length}`;
+    if (!blockIds.has(key)) {
+      blockIds.set(key, blockId);
+      duplicatedBlocks.push({ startLine, endLine: startLine + length - 1, blockId });
+    }
+  };
+
+  let duplicatedLineCount = 0;
+  const lengths = new Set<number>();
+  for (let i = 0; i < n; i++) {
+    const starts = windowOf[i];
+    if (!starts || starts[starts.length - 1] === i) {
+      continue;
+    }
+
+    lengths.clear();
+    for (let s = positionInWindow[i] + 1; s < starts.length; s++) {
+      const distance = starts[s] - i;
+      let end = runEnds.get(distance);
+      const isNewRun = end === undefined || end <= i;
+      if (isNewRun) {
+        end = i + MIN_DUPLICATION_LINES;
+        while (end + distance < n && lineIds[end] >= 0 && lineIds[end] === lineIds[end + distance]) {
+          end++;
+        }
+        runEnds.set(distance, end);
+      }
+
+      const length = end! - i;
+      if (!lengths.has(length)) {
+        lengths.add(length);
+        duplicatedLineCount += length;
+      }
+
+      // Highlight maximal runs only, not their suffixes
+      if (isNewRun) {
+        const blockId = blockIds.get(`${i}:${length}`)
+          ?? blockIds.get(`${starts[s]}:${length}`)
+          ?? blockIdentifier(blockCount++);
+        addBlock(i, length, blockId);
+        addBlock(starts[s], length, blockId);
+      }
+    }
+  }
+
+  return { duplicatedLineCount, totalNonEmptyLines, duplicatedBlocks };
+}
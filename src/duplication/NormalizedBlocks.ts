@@ -0,0 +1,101 @@
+import * as vscode from 'vscode';
+import * as crypto from 'crypto';
+import { normalizeCodeLine } from './CodeNormalizer';
+import { blockIdentifier } from './BlockIdentifier';
+
+// Number of consecutive lines in a block
+export const BLOCK_SIZE = 3;
+// Blocks with less normalized text are too short to be reported as duplicates
+const MIN_BLOCK_LENGTH = 20;
+
+/**
+ * Hashed blocks of normalized lines of a document, the input of CodeDuplicationMetricV2
+ */
+export interface NormalizedBlocks {
+  // Hash of the block starting at every line, undefined when the block is too short or
+  // runs past the last line
+  hashes: (string | undefined)[];
+  // Lines that are not blank
+  nonEmptyLineCount: number;
+}
+
+export interface NormalizedBlockDuplication {
+  // BLOCK_SIZE lines for every repetition of a block after its first occurrence
+  duplicatedLineCount: number;
+  duplicatedBlocks: { startLine: number, endLine: number, blockId: string }[];
+}
+
+/**
+ * Hash the blocks of every line of a document
+ * @param document The document to hash
+ */
+export function hashDocumentBlocks(document: vscode.TextDocument): NormalizedBlocks {
+  const normalizedLines: string[] = new Array(document.lineCount);
+  let nonEmptyLineCount = 0;
+  for (let line = 0; line < document.lineCount; line++) {
+    const text = document.lineAt(line).text;
+    if (text.trim() !== '') {
+      nonEmptyLineCount++;
+    }
+    normalizedLines[line] = normalizeCodeLine(text);
+  }
+
+  const hashes: (string | undefined)[] = new Array(normalizedLines.length);
+  for (let line = 0; line < normalizedLines.length; line++) {
+    hashes[line] = hashBlock(normalizedLines, line);
+  }
+  return { hashes, nonEmptyLineCount };
+}
+
+/**
+ * Hash of the block of normalized lines starting at a line; its blank lines are left out
+ * @param normalizedLines The normalized lines of a document
+ * @param startLine The first line of the block
+ * @returns The hash, undefined when the block is too short or runs past the last line
+ */
+export function hashBlock(normalizedLines: readonly string[], startLine: number): string | undefined {
+  if (startLine < 0 || startLine + BLOCK_SIZE > normalizedLines.length) {
+    return undefined;
+  }
+  const block = normalizedLines.slice(startLine, startLine + BLOCK_SIZE).filter(normalized => normalized !== '').join('\n');
+  if (block.length < MIN_BLOCK_LENGTH) {
+    return undefined;
+  }
+  return crypto.createHash('md5').update(block).digest('hex');
+}
+
+/**
+ * Group the blocks with the same hash. Sets of duplicated blocks are identified in the
+ * order of their first occurrence.
+ * @param hashes Hash of the block starting at every line
+ */
+export function findNormalizedBlockDuplication(hashes: readonly (string | undefined)[]): NormalizedBlockDuplication {
+  const occurrences = new Map<string, number[]>();
+  let duplicatedLineCount = 0;
+  for (let line = 0; line < hashes.length; line++) {
+    const hash = hashes[line];
+    if (hash === undefined) {
+      continue;
+    }
+    const startLines = occurrences.get(hash);
+    if (startLines) {
+      duplicatedLineCount += BLOCK_SIZE;
+      startLines.push(line);
+    } else {
+      occurrences.set(hash, [line]);
+    }
+  }
+
+  const duplicatedBlocks: NormalizedBlockDuplication['duplicatedBlocks'] = [];
+  let blockIdCounter = 0;
+  occurrences.forEach(startLines => {
+    if (startLines.length > 1) {
+      const blockId = blockIdentifier(blockIdCounter++);
+      for (const startLine of startLines) {
+        duplicatedBlocks.push({ startLine, endLine: startLine + BLOCK_SIZE - 1, blockId });
+      }
+    }
+  });
+
+  return { duplicatedLineCount, duplicatedBlocks };
+}
@@ -1,13 +1,21 @@
 import * as vscode from 'vscode';
 import * as fs from 'fs';
-import * as path from 'path';
+import { performance } from 'perf_hooks';
 import { StatusBarAlignment } from 'vscode';
 import { MetricsCSVManager } from './csv/MetricsCSVManager';
 import { MetricFactory } from './metrics/MetricFactory';
+import { MetricRegistry } from './metrics/MetricRegistry';
 import { LanguageDetector, LanguageInfo } from './language/LanguageDetector';
 import { NavigationManager } from './navigation/NavigationManager';
 import { MetricsRenderer } from './metrics/renderization/MetricsRenderer';
+import { UpdateScheduler } from './scheduling/UpdateScheduler';
+import { LookAheadScheduler } from './scheduling/LookAheadScheduler';
+import { applyIncrementalChanges, trackIncrementalDocument } from './metrics/common/IncrementalBraceAnalysis';
+import { MetricOutcome } from './metrics/Metric';
+import { MetricBudgets } from './metrics/profiling/MetricProfiler';
 import { MessageHandlerRegistry } from './webview/MessageHandlerRegistry';
+import { CloneIndexManager } from './duplication/CloneIndexManager';
+import { SrpAnalysisService } from './srp/SrpAnalysisService';
 import { 
   ILineCountViewProvider,
   NavigateHandler,
@@ -24,19 +32,29 @@ import {
   HighlightMaxDepthHandler,
   HighlightIfsHandler,
   HighlightConstructorsHandler,
-  HighlightLambdasHandler
+  HighlightLambdasHandler,
+  HighlightCrossFileDuplicatesHandler
 } from './webview/MessageHandlers';
 
 const output = vscode.window.createOutputChannel("LineCounter");
 output.appendLine('Canal LineCounter iniciado');
 
 let statusBarItem: vscode.StatusBarItem;
+let viewProvider: LineCountViewProvider | undefined;
 let isLoading = false;
 
-MetricFactory.initializeRegistry();
+// Minimum time between re-renders while metric results are still arriving
+const PARTIAL_RENDER_INTERVAL_MS = 150;
+
+// Milliseconds spent in activate() and until the view first showed metrics
+const startupTimings: { activateMs?: number, firstViewMs?: number } = {};
 
 export function activate(context: vscode.ExtensionContext) {
+  const activationStart = performance.now();
   output.appendLine("Activando extensión chontaduro");
+
+  // Only registers loaders: metric modules load when a language is first analyzed
+  MetricFactory.initializeRegistry();
   
   statusBarItem = vscode.window.createStatusBarItem(StatusBarAlignment.Right, 100);
   statusBarItem.text = "$(symbol-misc)";
@@ -47,7 +65,8 @@ export function activate(context: vscode.ExtensionContext) {
 
   statusBarItem.text = "$(symbol-misc)";
   
-  const provider = new LineCountViewProvider(context.extensionUri);
+  const provider = new LineCountViewProvider(context.extensionUri, context.workspaceState);
+  viewProvider = provider;
 
   context.subscriptions.push(
     vscode.window.registerWebviewViewProvider('lineCounterView', provider)
@@ -59,17 +78,86 @@ export function activate(context: vscode.ExtensionContext) {
     })
   );
 
-    vscode.window.onDidChangeActiveTextEditor(() => {
-      if (provider.hasView) {
-        provider.update();
-      }
+  context.subscriptions.push(provider);
+
+  // The clone index scan and the SRP cache are only needed once the view is shown
+  const cloneIndexManager = new CloneIndexManager(output);
+  context.subscriptions.push(cloneIndexManager);
+  const srpAnalysisService = SrpAnalysisService.getInstance();
+  context.subscriptions.push(srpAnalysisService);
+  provider.onFirstResolve = () => {
+    srpAnalysisService.initialize(output);
+    cloneIndexManager.initialize().catch(error => {
+      output.appendLine(`Error initializing clone index: ${error}`);
     });
+  };
 
-    vscode.workspace.onDidChangeTextDocument(() => {
-      if (provider.hasView) {
-        provider.update();
+  MetricRegistry.getInstance().setLargeFileThreshold(getLargeFileThreshold());
+
+  const profiler = MetricRegistry.getInstance().getProfiler();
+  profiler.setBudgets(getMetricBudgets());
+  profiler.onSlowMetric = (timing, budgetMs) => {
+    const message = `La métrica ${timing.metricName} tardó ${Math.round(timing.durationMs)} ms (presupuesto ${budgetMs} ms); ` +
+      `se omitirá en archivos de ${timing.textLength} caracteres o más`;
+    output.appendLine(message);
+    vscode.window.showWarningMessage(message);
+  };
+
+  context.subscriptions.push(
+    vscode.window.onDidChangeActiveTextEditor(editor => {
+      if (provider.hasView && editor && provider.isTrackedDocument(editor.document)) {
+        provider.scheduleUpdate();
       }
-    });
+    })
+  );
+
+  context.subscriptions.push(
+    vscode.workspace.onDidChangeTextDocument(event => {
+      // Only reanalyzes the edited method when the edit keeps the structure
+      applyIncrementalChanges(event.document, event.contentChanges);
+      if (provider.hasView && event.contentChanges.length > 0 && provider.isTrackedDocument(event.document)) {
+        provider.scheduleUpdate();
+      }
+    })
+  );
+
+  context.subscriptions.push(
+    vscode.workspace.onDidSaveTextDocument(document => {
+      // The SRP analysis only runs on saved content
+      if (provider.hasView && provider.isTrackedDocument(document)) {
+        MetricRegistry.getInstance().invalidateResults(document.uri, 'singleResponsibility');
+        provider.scheduleUpdate();
+      }
+    })
+  );
+
+  context.subscriptions.push(
+    vscode.workspace.onDidChangeConfiguration(event => {
+      if (event.affectsConfiguration('lineCounter.update.debounceMs')) {
+        provider.updateScheduler.setDelay(getUpdateDebounceMs());
+      }
+      if (event.affectsConfiguration('lineCounter.profiling')) {
+        MetricRegistry.getInstance().getProfiler().setBudgets(getMetricBudgets());
+      }
+      if (event.affectsConfiguration('lineCounter.largeFile.thresholdMB')) {
+        MetricRegistry.getInstance().setLargeFileThreshold(getLargeFileThreshold());
+        MetricRegistry.getInstance().invalidateResults();
+        provider.scheduleUpdate();
+      }
+      if (event.affectsConfiguration('lineCounter.files') && provider.hasView) {
+        provider.reloadProjectFiles();
+      }
+      if (event.affectsConfiguration('lineCounter.navigation.idleDelayMs')) {
+        provider.lookAheadScheduler.setIdleDelay(getLookAheadIdleDelayMs());
+      }
+    })
+  );
+
+  context.subscriptions.push(
+    vscode.workspace.onDidCloseTextDocument(document => {
+      MetricRegistry.getInstance().invalidateResults(document.uri);
+    })
+  );
     
   context.subscriptions.push(
     vscode.commands.registerCommand('lineCounterView.openSettings', () => {
@@ -79,6 +167,14 @@ export function activate(context: vscode.ExtensionContext) {
     })
   );
   
+  context.subscriptions.push(
+    vscode.commands.registerCommand('lineCounterView.showMetricProfile', () => {
+      output.appendLine(getStartupReport());
+      output.appendLine(MetricRegistry.getInstance().getProfiler().getReport());
+      output.show(true);
+    })
+  );
+
   context.subscriptions.push(
     vscode.commands.registerCommand('chontaduro.startLoading', () => {
       startLoading();
@@ -106,20 +202,64 @@ export function activate(context: vscode.ExtensionContext) {
       }
     })
   );
+
+  context.subscriptions.push(
+    vscode.commands.registerCommand('lineCounterView.jumpToFirstUnlabeled', () => {
+      if (provider.hasView) {
+        provider.jumpToFirstUnlabeled();
+      }
+    })
+  );
   
   context.subscriptions.push(
     vscode.commands.registerCommand('chontaduro.updateAIMetrics', () => {
+      // The SRP result arrives asynchronously for an unchanged document version
+      MetricRegistry.getInstance().invalidateResults(undefined, 'singleResponsibility');
       if (provider.hasView) {
         provider.update();
       }
     })
   );
+
+  startupTimings.activateMs = performance.now() - activationStart;
+  output.appendLine(`Extensión activada en ${startupTimings.activateMs.toFixed(1)} ms`);
 }
 
-export function deactivate() {
+export async function deactivate(): Promise<void> {
+  MetricRegistry.getInstance().disposeWorkers();
   if (statusBarItem) {
     statusBarItem.dispose();
   }
+  // VS Code waits for the returned promise, so the CSV files are flushed and compacted
+  await viewProvider?.csvManager.close();
+  viewProvider = undefined;
+}
+
+function getUpdateDebounceMs(): number {
+  return vscode.workspace.getConfiguration('lineCounter').get<number>('update.debounceMs', 300);
+}
+
+function getMetricBudgets(): MetricBudgets {
+  const config = vscode.workspace.getConfiguration('lineCounter');
+  return {
+    enabled: config.get<boolean>('profiling.budgetsEnabled', false),
+    defaultMs: config.get<number>('profiling.defaultBudgetMs', 1000),
+    perMetric: config.get<{ [metricName: string]: number }>('profiling.budgets', {})
+  };
+}
+
+function getLargeFileThreshold(): number {
+  const megabytes = vscode.workspace.getConfiguration('lineCounter').get<number>('largeFile.thresholdMB', 5);
+  return megabytes > 0 ? megabytes * 1024 * 1024 : Infinity;
+}
+
+function getStartupReport(): string {
+  const format = (ms?: number) => ms === undefined ? 'pendiente' : `${ms.toFixed(1)} ms`;
+  return `Activación: ${format(startupTimings.activateMs)}; primera vista: ${format(startupTimings.firstViewMs)}`;
+}
+
+function getLookAheadIdleDelayMs(): number {
+  return vscode.workspace.getConfiguration('lineCounter').get<number>('navigation.idleDelayMs', 500);
 }
 
 export function startLoading() {
@@ -137,25 +277,56 @@ export function stopLoading() {
 }
 
 
-export class LineCountViewProvider implements vscode.WebviewViewProvider, ILineCountViewProvider {
+export class LineCountViewProvider implements vscode.WebviewViewProvider, ILineCountViewProvider, vscode.Disposable {
   public _view?: vscode.WebviewView;
   public navigationManager: NavigationManager;
   public csvManager: MetricsCSVManager;
   public needsRefactoring: boolean = false;
   public metricsRenderer: MetricsRenderer;
   public currentLanguageInfo?: LanguageInfo;
-
-  constructor(private readonly _extensionUri: vscode.Uri) {
-    const defaultMetrics = MetricFactory.getCommonMetrics();
-    this.navigationManager = new NavigationManager(this._extensionUri, output);
-    this.csvManager = new MetricsCSVManager(defaultMetrics, output);
+  public updateScheduler: UpdateScheduler;
+  public lookAheadScheduler: LookAheadScheduler;
+  // Starts the services deferred until the view is first shown
+  public onFirstResolve?: () => void;
+
+  constructor(private readonly _extensionUri: vscode.Uri, workspaceState: vscode.Memento) {
+    this.csvManager = new MetricsCSVManager(output);
+    this.navigationManager = new NavigationManager(this._extensionUri, output, this.csvManager, workspaceState);
+    this.navigationManager.onDidChangeFiles(() => {
+      if (this._view) {
+        this.scheduleUpdate();
+      }
+    });
     this.metricsRenderer = new MetricsRenderer(this._extensionUri, output);
+    this.updateScheduler = new UpdateScheduler(token => this.refresh(token), output, getUpdateDebounceMs());
+    this.lookAheadScheduler = new LookAheadScheduler((uri, token) => this.precompute(uri, token), output, getLookAheadIdleDelayMs());
   }
 
   public get hasView(): boolean {
     return !!this._view;
   }
 
+  /**
+   * Whether a document is the one shown in the metrics view
+   */
+  public isTrackedDocument(document: vscode.TextDocument): boolean {
+    return document.uri.toString() === this.navigationManager.currentFile?.toString();
+  }
+
+  /**
+   * Request a debounced update, used for editor events
+   */
+  public scheduleUpdate(): void {
+    this.updateScheduler.schedule();
+  }
+
+  public dispose(): Promise<void> {
+    this.updateScheduler.dispose();
+    this.lookAheadScheduler.dispose();
+    this.navigationManager.dispose();
+    return this.csvManager.dispose();
+  }
+
   private messageHandlerRegistry = new MessageHandlerRegistry();
 
   private initializeMessageHandlers(): void {
@@ -168,12 +339,14 @@ export class LineCountViewProvider implements vscode.WebviewViewProvider, ILineC
     this.messageHandlerRegistry.registerHandler('startOpenAIRequest', new StartOpenAIRequestHandler());
     this.messageHandlerRegistry.registerHandler('endOpenAIRequest', new EndOpenAIRequestHandler());
     this.messageHandlerRegistry.registerHandler('highlightDuplicatedCode', new HighlightDuplicatedCodeHandler());
+    this.messageHandlerRegistry.registerHandler('highlightExactDuplicatedCode', new HighlightDuplicatedCodeHandler('codeDuplication'));
     this.messageHandlerRegistry.registerHandler('highlightLoops', new HighlightLoopsHandler());
     this.messageHandlerRegistry.registerHandler('highlightMethods', new HighlightMethodsHandler());
     this.messageHandlerRegistry.registerHandler('highlightMaxDepth', new HighlightMaxDepthHandler());
     this.messageHandlerRegistry.registerHandler('highlightIfs', new HighlightIfsHandler());
     this.messageHandlerRegistry.registerHandler('highlightConstructors', new HighlightConstructorsHandler());
     this.messageHandlerRegistry.registerHandler('highlightLambdas', new HighlightLambdasHandler());
+    this.messageHandlerRegistry.registerHandler('highlightCrossFileDuplicates', new HighlightCrossFileDuplicatesHandler());
   }
 
   resolveWebviewView(
@@ -181,8 +354,16 @@ export class LineCountViewProvider implements vscode.WebviewViewProvider, ILineC
     _context: vscode.WebviewViewResolveContext,
     _token: vscode.CancellationToken
   ) {
+    const resolveStart = performance.now();
+    if (this.onFirstResolve) {
+      const onFirstResolve = this.onFirstResolve;
+      this.onFirstResolve = undefined;
+      onFirstResolve();
+    }
+
     this._view = webviewView;
     webviewView.webview.options = { enableScripts: true };
+    this.metricsRenderer.attachView(webviewView);
 
     if (this.messageHandlerRegistry.getRegisteredCommands().length === 0) {
       this.initializeMessageHandlers();
@@ -196,8 +377,14 @@ export class LineCountViewProvider implements vscode.WebviewViewProvider, ILineC
       }
     });
 
-    this.loadProjectFiles().then(() => {
-      this.update();
+    Promise.all([this.loadProjectFiles(), this.csvManager.initialize()]).then(() => this.update()).then(() => {
+      if (startupTimings.firstViewMs === undefined) {
+        startupTimings.firstViewMs = performance.now() - resolveStart;
+        output.appendLine(`Vista de métricas lista en ${startupTimings.firstViewMs.toFixed(1)} ms`);
+      }
+    }).catch(error => {
+      output.appendLine(`Error loading the metrics view: ${error}`);
+      this.metricsRenderer.renderError(`No se pudieron cargar las métricas: ${error instanceof Error ? error.message : error}`);
     });
   }
 
@@ -205,51 +392,135 @@ export class LineCountViewProvider implements vscode.WebviewViewProvider, ILineC
     await this.navigationManager.loadProjectFiles();
   }
 
-  public update() {
+  /**
+   * Rebuild the file index after its globs changed
+   */
+  public reloadProjectFiles(): void {
+    this.loadProjectFiles().then(() => this.update(), error => {
+      output.appendLine(`Error loading project files: ${error}`);
+    });
+  }
+
+  public update(): Promise<void> {
+    return this.updateScheduler.runNow();
+  }
+
+  public onWebviewReady(): void {
+    this.metricsRenderer.onViewReady();
+  }
+
+  private async refresh(token: vscode.CancellationToken): Promise<void> {
     if (!this._view || !this.navigationManager.hasFiles) return;
-    
-    this.metricsRenderer.clearHighlights();
+
+    // The current file takes over the worker threads
+    this.lookAheadScheduler.cancel();
 
     const uri = this.navigationManager.currentFile!;
-    vscode.workspace.openTextDocument(uri).then(document => {
-      const fileName = uri.fsPath.split('/').pop() || 'Archivo';
-      
-      const languageInfo = LanguageDetector.detectLanguage(document);
-      output.appendLine(`Detected language: ${languageInfo.name}`);
-      
-      this.currentLanguageInfo = languageInfo;
-      
-      const metrics = MetricFactory.getMetricsForLanguage(document.languageId.toLowerCase());
-      
-      this.csvManager = new MetricsCSVManager(metrics, output);
-      const processedFilesCount = this.csvManager.getProcessedFilesCount();
-
-      this.metricsRenderer.renderMetrics(
-        document,
-        metrics,
-        this._view!,
-        fileName,
-        processedFilesCount,
-        isLoading
-      );
-      
-      setTimeout(() => {
-        if (this._view) {
-          output.appendLine(`Sending language info: ${languageInfo.name}, ${languageInfo.icon}, ${languageInfo.color}`);
-          this._view.webview.postMessage({
-            command: 'setLanguageInfo',
-            name: languageInfo.name,
-            icon: languageInfo.icon,
-            color: languageInfo.color
-          });
+    const document = await vscode.workspace.openTextDocument(uri);
+    if (token.isCancellationRequested) return;
+
+    const fileName = uri.fsPath.split('/').pop() || 'Archivo';
+    
+    const languageInfo = LanguageDetector.detectLanguage(document);
+    output.appendLine(`Detected language: ${languageInfo.name}`);
+    
+    const metrics = MetricFactory.getMetricsForLanguage(document.languageId.toLowerCase());
+    const incrementalEnabled = vscode.workspace.getConfiguration('lineCounter').get<boolean>('incremental.enabled', true);
+    // Large files only run the streaming metrics, which need no per-method state
+    const incremental = incrementalEnabled && !MetricRegistry.getInstance().isLargeFile(document);
+    trackIncrementalDocument(incremental ? document : undefined);
+
+    this.currentLanguageInfo = languageInfo;
+    this.metricsRenderer.clearHighlights();
+    
+    const processedFilesCount = this.csvManager.getProcessedFilesCount();
+
+    const results = new Map<string, MetricOutcome>();
+    const render = () => {
+      if (this._view) {
+        this.metricsRenderer.renderMetrics(
+          document,
+          metrics,
+          results,
+          this._view,
+          fileName,
+          processedFilesCount,
+          isLoading
+        );
+      }
+    };
+
+    // Metrics run in worker threads; partial results are shown while the slow ones finish
+    let lastRender = Date.now();
+    try {
+      await MetricRegistry.getInstance().executeMetricsAsync(document, metrics, (metric, result) => {
+        results.set(metric.name, result);
+        if (!token.isCancellationRequested && Date.now() - lastRender >= PARTIAL_RENDER_INTERVAL_MS) {
+          lastRender = Date.now();
+          render();
         }
-      }, 100); 
+      }, token);
+    } catch (error) {
+      if (token.isCancellationRequested) return;
+      throw error;
+    }
+    if (token.isCancellationRequested) return;
+
+    render();
+    this.prefetchSrpAnalyses();
+    this.scheduleLookAhead();
+    
+    setTimeout(() => {
+      if (this._view) {
+        output.appendLine(`Sending language info: ${languageInfo.name}, ${languageInfo.icon}, ${languageInfo.color}`);
+        this._view.webview.postMessage({
+          command: 'setLanguageInfo',
+          name: languageInfo.name,
+          icon: languageInfo.icon,
+          color: languageInfo.color
+        });
+      }
+    }, 100); 
+  }
+
+  /**
+   * Start the SRP analyses of the next files while the current one is reviewed
+   */
+  private prefetchSrpAnalyses(): void {
+    const count = vscode.workspace.getConfiguration('lineCounter').get<number>('openai.prefetchCount', 2);
+    if (count <= 0) return;
+
+    SrpAnalysisService.getInstance().prefetch(this.navigationManager.getUpcomingFiles(count)).catch(error => {
+      output.appendLine(`Error prefetching SRP analyses: ${error}`);
     });
   }
 
+  /**
+   * Precompute the metrics of the neighbouring files once the user is idle
+   */
+  private scheduleLookAhead(): void {
+    const count = vscode.workspace.getConfiguration('lineCounter').get<number>('navigation.prefetchCount', 2);
+    this.lookAheadScheduler.schedule(count > 0 ? this.navigationManager.getNeighbourFiles(count) : []);
+  }
 
-  public openCsvFile() {
-    const csvFilePath = this.getCsvFilePath();
+  /**
+   * Warm the metric result cache with a file, so the CSV save and the first render
+   * after navigating to it are cache hits
+   * @param uri The file to analyze
+   * @param token Cancelled when foreground work starts
+   */
+  private async precompute(uri: vscode.Uri, token: vscode.CancellationToken): Promise<void> {
+    const document = await vscode.workspace.openTextDocument(uri);
+    if (token.isCancellationRequested) return;
+
+    // Only the metrics that run in worker threads, the idle work never blocks the editor
+    const metrics = MetricFactory.getMetricsForLanguage(document.languageId.toLowerCase())
+      .filter(metric => !metric.requiresEditor);
+    await MetricRegistry.getInstance().executeMetricsAsync(document, metrics, undefined, token, 'prefetch');
+  }
+
+  public async openCsvFile() {
+    const csvFilePath = await this.getCsvFilePath();
     
     if (csvFilePath && fs.existsSync(csvFilePath)) {
       output.appendLine(`Opening CSV file: ${csvFilePath}`);
@@ -266,14 +537,16 @@ export class LineCountViewProvider implements vscode.WebviewViewProvider, ILineC
     }
   }
   
-  private getCsvFilePath(): string | null {
-
-    const workspaceFolder = vscode.workspace.workspaceFolders?.[0];
-    if (workspaceFolder) {
-      const metricsDir = path.join(workspaceFolder.uri.fsPath, 'metrics-data');
-      return path.join(metricsDir, 'metrics.csv');
+  /**
+   * The CSV file of the current file's language
+   */
+  private async getCsvFilePath(): Promise<string | null> {
+    const uri = this.navigationManager.currentFile;
+    if (!uri) {
+      return null;
     }
-    return null;
+    const document = await vscode.workspace.openTextDocument(uri);
+    return this.csvManager.getCsvFilePath(document.languageId.toLowerCase());
   }
 
   public async navigateFile(direction: 'next' | 'prev') {
@@ -294,6 +567,23 @@ export class LineCountViewProvider implements vscode.WebviewViewProvider, ILineC
     this.update();
   }
 
+  public async jumpToFirstUnlabeled() {
+    if (!this.navigationManager.hasFiles) return;
+
+    this.metricsRenderer.clearHighlights();
+
+    if (!(await this.navigationManager.jumpToFirstUnlabeled())) {
+      vscode.window.showInformationMessage('Todos los archivos están etiquetados.');
+      return;
+    }
+
+    this.needsRefactoring = false;
+    if (this._view) {
+      this._view.webview.postMessage({ command: 'resetRefactoringCheckbox' });
+    }
+    this.update();
+  }
+
   
   public openSettings() {
     output.appendLine('openSettings method called');
@@ -0,0 +1,161 @@
+import type * as vscode from 'vscode';
+
+export interface PooledDecoration {
+    range: vscode.Range;
+    // Text shown before the range, set per range so one decoration type serves many labels
+    label?: string;
+}
+
+export interface VisibleRangeLimit {
+    // Documents with fewer lines are decorated entirely
+    minLineCount: number;
+    // Lines decorated above and below the visible ranges
+    marginLines: number;
+}
+
+export interface DecorationPoolStats {
+    created: number;
+    applied: number;
+    unchanged: number;
+}
+
+interface SlotState {
+    editor: vscode.TextEditor;
+    decorations: PooledDecoration[];
+    // Ranges and labels last sent to the editor, to skip identical updates
+    signature: string;
+    applied: boolean;
+}
+
+/**
+ * Keeps one decoration type per slot (a palette color or a kind of highlight) for the
+ * lifetime of the extension, instead of creating and disposing types on every update.
+ * Each update is compared with what the editor already shows, and only slots whose
+ * ranges or labels changed are sent to setDecorations.
+ */
+export class DecorationPool {
+    private types: Map<string, vscode.TextEditorDecorationType> = new Map();
+    private slots: Map<string, SlotState> = new Map();
+    private visibleRangeLimit?: VisibleRangeLimit;
+    private stats: DecorationPoolStats = { created: 0, applied: 0, unchanged: 0 };
+
+    constructor(private readonly createType: (options: vscode.DecorationRenderOptions) => vscode.TextEditorDecorationType) {
+    }
+
+    /**
+     * Only decorate the visible ranges plus a margin on large documents
+     * @param limit The limit, undefined to always decorate whole documents
+     */
+    public setVisibleRangeLimit(limit: VisibleRangeLimit | undefined): void {
+        this.visibleRangeLimit = limit;
+    }
+
+    /**
+     * Shows decorations in a slot, replacing what the slot showed before
+     * @param editor The editor to decorate
+     * @param slot The slot name; its type is created from options on first use
+     * @param options The render options of the slot's decoration type
+     * @param decorations The ranges to decorate, with their optional labels
+     */
+    public apply(editor: vscode.TextEditor, slot: string, options: vscode.DecorationRenderOptions, decorations: PooledDecoration[]): void {
+        let type = this.types.get(slot);
+        if (!type) {
+            type = this.createType(options);
+            this.types.set(slot, type);
+            this.stats.created++;
+        }
+
+        const previous = this.slots.get(slot);
+        if (previous && previous.editor !== editor && previous.applied) {
+            this.send(previous.editor, type, []);
+        }
+
+        const state: SlotState = { editor, decorations, signature: '', applied: false };
+        this.slots.set(slot, state);
+        this.render(state, type, previous?.editor === editor ? previous.signature : '');
+    }
+
+    /**
+     * Removes the decorations of the given slots, or of every slot. The decoration
+     * types are kept for the next highlight.
+     * @param slotPrefix Only clear the slots whose name starts with this prefix
+     */
+    public clear(slotPrefix: string = ''): void {
+        this.slots.forEach((state, slot) => {
+            if (!slot.startsWith(slotPrefix)) {
+                return;
+            }
+            const type = this.types.get(slot);
+            if (type && state.applied) {
+                this.send(state.editor, type, []);
+            }
+            this.slots.delete(slot);
+        });
+    }
+
+    /**
+     * Recomputes the decorated part of an editor after it scrolled. Only has an effect
+     * when a visible range limit applies to the editor's document.
+     * @param editor The editor whose visible ranges changed
+     */
+    public refreshVisible(editor: vscode.TextEditor): void {
+        if (!this.isLimited(editor)) {
+            return;
+        }
+        this.slots.forEach((state, slot) => {
+            const type = this.types.get(slot);
+            if (type && state.editor === editor) {
+                this.render(state, type, state.signature);
+            }
+        });
+    }
+
+    public getStats(): DecorationPoolStats {
+        return { ...this.stats };
+    }
+
+    public dispose(): void {
+        this.types.forEach(type => type.dispose());
+        this.types.clear();
+        this.slots.clear();
+    }
+
+    private render(state: SlotState, type: vscode.TextEditorDecorationType, currentSignature: string): void {
+        const decorations = this.isLimited(state.editor)
+            ? this.filterVisible(state.editor, state.decorations)
+            : state.decorations;
+        const signature = decorations.map(getSignature).join(';');
+
+        state.signature = signature;
+        if (signature === currentSignature) {
+            state.applied = signature !== '';
+            this.stats.unchanged++;
+            return;
+        }
+        this.send(state.editor, type, decorations);
+        state.applied = decorations.length > 0;
+    }
+
+    private send(editor: vscode.TextEditor, type: vscode.TextEditorDecorationType, decorations: PooledDecoration[]): void {
+        editor.setDecorations(type, decorations.map(decoration => decoration.label === undefined
+            ? { range: decoration.range }
+            : { range: decoration.range, renderOptions: { before: { contentText: decoration.label } } }));
+        this.stats.applied++;
+    }
+
+    private isLimited(editor: vscode.TextEditor): boolean {
+        return this.visibleRangeLimit !== undefined && editor.document.lineCount >= this.visibleRangeLimit.minLineCount;
+    }
+
+    private filterVisible(editor: vscode.TextEditor, decorations: PooledDecoration[]): PooledDecoration[] {
+        const margin = this.visibleRangeLimit!.marginLines;
+        const windows = editor.visibleRanges.map(range => ({ start: range.start.line - margin, end: range.end.line + margin }));
+        return decorations.filter(decoration => windows.some(window =>
+            decoration.range.end.line >= window.start && decoration.range.start.line <= window.end));
+    }
+}
+
+function getSignature(decoration: PooledDecoration): string {
+    const { start, end } = decoration.range;
+    return `${start.line}:${start.character}-${end.line}:${end.character}${decoration.label === undefined ? '' : `|${decoration.label}`}`;
+}
@@ -1,83 +1,43 @@
 import * as vscode from 'vscode';
 import { Uri } from 'vscode';
+import { DecorationPool, PooledDecoration } from './DecorationPool';
+
+// Colors cycled through by methods and duplicated block IDs; each color is one pooled decoration type
+const PALETTE = [
+    'rgba(255, 165, 0, 0.2)',  // Orange
+    'rgba(0, 128, 255, 0.2)',  // Blue
+    'rgba(255, 0, 0, 0.2)',    // Red
+    'rgba(0, 255, 0, 0.2)',    // Green
+    'rgba(128, 0, 128, 0.2)',  // Purple
+    'rgba(255, 192, 203, 0.2)', // Pink
+    'rgba(0, 255, 255, 0.2)',  // Cyan
+    'rgba(255, 255, 0, 0.2)'   // Yellow
+];
+
+// Lines decorated above and below the visible ranges when only those are decorated
+const VISIBLE_MARGIN_LINES = 200;
 
 export class HighlightManager {
-    private maxDepthDecorationType: vscode.TextEditorDecorationType;
-    private duplicatedCodeDecorationType: vscode.TextEditorDecorationType;
-    private duplicatedCodeDecorationTypes: Map<string, vscode.TextEditorDecorationType> = new Map();
-    private methodDecorationTypes: Map<number, vscode.TextEditorDecorationType> = new Map();
-    private loopDecorationType: vscode.TextEditorDecorationType | null = null;
-    private constructorDecorationType: vscode.TextEditorDecorationType | null = null;
+    private pool: DecorationPool;
+    private visibleRangesListener: vscode.Disposable;
 
     constructor(private readonly extensionUri: vscode.Uri) {
-        this.maxDepthDecorationType = vscode.window.createTextEditorDecorationType({
-            gutterIconPath: Uri.joinPath(this.extensionUri, 'media', 'icon-inverted.svg'),
-            gutterIconSize: 'contain',
-            overviewRulerColor: 'rgba(0, 122, 204, 0.7)',
-            overviewRulerLane: vscode.OverviewRulerLane.Right
-        });
-        
-        this.duplicatedCodeDecorationType = vscode.window.createTextEditorDecorationType({
-            backgroundColor: 'rgba(255, 165, 0, 0.2)',
-            overviewRulerColor: 'rgba(255, 165, 0, 0.7)',
-            overviewRulerLane: vscode.OverviewRulerLane.Right
+        this.pool = new DecorationPool(options => vscode.window.createTextEditorDecorationType(options));
+        this.visibleRangesListener = vscode.window.onDidChangeTextEditorVisibleRanges(event => {
+            this.pool.refreshVisible(event.textEditor);
         });
     }
 
     public clearMaxDepthHighlight(): void {
-        const editor = vscode.window.activeTextEditor;
-        if (editor) {
-            editor.setDecorations(this.maxDepthDecorationType, []);
-        }
+        this.pool.clear('maxDepth');
     }
 
     public clearAllHighlights(): void {
-        const editor = vscode.window.activeTextEditor;
-        if (editor) {
-            // Clear max depth highlight
-            editor.setDecorations(this.maxDepthDecorationType, []);
-            
-            // Clear duplicated code highlights
-            editor.setDecorations(this.duplicatedCodeDecorationType, []);
-            this.duplicatedCodeDecorationTypes.forEach((decorationType) => {
-                editor.setDecorations(decorationType, []);
-                decorationType.dispose();
-            });
-            this.duplicatedCodeDecorationTypes.clear();
-            
-            // Clear method highlights
-            this.methodDecorationTypes.forEach((decorationType) => {
-                editor.setDecorations(decorationType, []);
-                decorationType.dispose();
-            });
-            this.methodDecorationTypes.clear();
-            
-            // Clear loop highlight
-            if (this.loopDecorationType) {
-                editor.setDecorations(this.loopDecorationType, []);
-                this.loopDecorationType.dispose();
-                this.loopDecorationType = null;
-            }
-            
-            // Clear constructor highlight
-            if (this.constructorDecorationType) {
-                editor.setDecorations(this.constructorDecorationType, []);
-                this.constructorDecorationType.dispose();
-                this.constructorDecorationType = null;
-            }
-        }
+        this.pool.clear();
     }
 
     public clearMethodHighlights(): void {
-        const editor = vscode.window.activeTextEditor;
-        if (editor) {
-            // Clear method highlights
-            this.methodDecorationTypes.forEach((decorationType) => {
-                editor.setDecorations(decorationType, []);
-                decorationType.dispose();
-            });
-            this.methodDecorationTypes.clear();
-        }
+        this.pool.clear('method:');
     }
 
     public highlightMaxDepth(document: vscode.TextDocument, lineNumber: number): void {
@@ -91,214 +51,102 @@ export class HighlightManager {
                 vscode.TextEditorRevealType.InCenter
             );
             
-            const range = new vscode.Range(position, position);
-            editor.setDecorations(this.maxDepthDecorationType, [range]);
+            this.updateVisibleRangeLimit();
+            this.pool.apply(editor, 'maxDepth', {
+                gutterIconPath: Uri.joinPath(this.extensionUri, 'media', 'icon-inverted.svg'),
+                gutterIconSize: 'contain',
+                overviewRulerColor: 'rgba(0, 122, 204, 0.7)',
+                overviewRulerLane: vscode.OverviewRulerLane.Right
+            }, [{ range: new vscode.Range(position, position) }]);
         }
     }
 
     public highlightDuplicatedCode(document: vscode.TextDocument, duplicatedBlocks: { startLine: number, endLine: number, blockId?: string }[]): void {
-        const editor = vscode.window.activeTextEditor;
-        if (!editor || editor.document.uri.toString() !== document.uri.toString()) {
+        const editor = this.getEditor(document);
+        if (!editor) {
             return;
         }
+        this.updateVisibleRangeLimit();
         
-        // Clear any existing decorations and dispose them
-        editor.setDecorations(this.duplicatedCodeDecorationType, []);
-        
-        // Dispose of all existing decoration types
-        this.duplicatedCodeDecorationTypes.forEach((decorationType, blockId) => {
-            editor.setDecorations(decorationType, []);
-            decorationType.dispose();
-        });
-        
-        // Clear the map of decoration types
-        this.duplicatedCodeDecorationTypes.clear();
-        
-        // Define a set of colors for different block IDs
-        const colors = [
-            'rgba(255, 165, 0, 0.2)', // Orange
-            'rgba(0, 128, 255, 0.2)',  // Blue
-            'rgba(255, 0, 0, 0.2)',    // Red
-            'rgba(0, 255, 0, 0.2)',    // Green
-            'rgba(128, 0, 128, 0.2)',  // Purple
-            'rgba(255, 192, 203, 0.2)', // Pink
-            'rgba(0, 255, 255, 0.2)',  // Cyan
-            'rgba(255, 255, 0, 0.2)'   // Yellow
-        ];
-        
-        // Group blocks by blockId
-        const blocksByBlockId = new Map<string, { startLine: number, endLine: number }[]>();
-        const blocksWithoutId: { startLine: number, endLine: number }[] = [];
+        // Group blocks by blockId; blocks without ID share the plain duplicate slot
+        const blocksWithoutId: PooledDecoration[] = [];
+        const blocksByBlockId = new Map<string, PooledDecoration[]>();
         
         for (const block of duplicatedBlocks) {
+            const range = this.getLinesRange(document, block.startLine, block.endLine);
             if (block.blockId) {
-                // Block has an ID, group it
                 if (!blocksByBlockId.has(block.blockId)) {
                     blocksByBlockId.set(block.blockId, []);
                 }
-                blocksByBlockId.get(block.blockId)?.push({
-                    startLine: block.startLine,
-                    endLine: block.endLine
-                });
+                blocksByBlockId.get(block.blockId)?.push({ range, label: `${block.blockId} ` });
             } else {
-                // Block doesn't have an ID, add to the list of blocks without ID
-                blocksWithoutId.push({
-                    startLine: block.startLine,
-                    endLine: block.endLine
-                });
+                blocksWithoutId.push({ range });
             }
         }
         
-        // Handle blocks without ID using the original decoration type
-        if (blocksWithoutId.length > 0) {
-            const ranges: vscode.Range[] = [];
-            
-            for (const block of blocksWithoutId) {
-                const startPos = new vscode.Position(block.startLine, 0);
-                const endPos = new vscode.Position(block.endLine, document.lineAt(block.endLine).text.length);
-                ranges.push(new vscode.Range(startPos, endPos));
-            }
-            
-            editor.setDecorations(this.duplicatedCodeDecorationType, ranges);
-        }
+        this.pool.apply(editor, 'duplicate', {
+            backgroundColor: 'rgba(255, 165, 0, 0.2)',
+            overviewRulerColor: 'rgba(255, 165, 0, 0.7)',
+            overviewRulerLane: vscode.OverviewRulerLane.Right
+        }, blocksWithoutId);
         
-        // Create and apply decorations for each blockId
+        // Block IDs take the palette colors in order; IDs that share a color share its slot
+        const decorationsByColor: PooledDecoration[][] = PALETTE.map(() => []);
         let colorIndex = 0;
-        blocksByBlockId.forEach((blocks, blockId) => {
-            // Always create a new decoration type for this blockId
-            const color = colors[colorIndex % colors.length];
-            const rulerColor = color.replace('0.2', '0.7');
-            
-            this.duplicatedCodeDecorationTypes.set(blockId, vscode.window.createTextEditorDecorationType({
-                backgroundColor: color,
-                overviewRulerColor: rulerColor,
-                overviewRulerLane: vscode.OverviewRulerLane.Right,
-                before: {
-                    contentText: `${blockId} `,
-                    color: '#ffffff', // Pure white color
-                    backgroundColor: '#333333', // Dark background for contrast
-                    margin: '0 5px 0 0',
-                    border: '0px' // Remove border
-                }
-            }));
-            
+        blocksByBlockId.forEach(decorations => {
+            decorationsByColor[colorIndex % PALETTE.length].push(...decorations);
             colorIndex++;
-            
-            // Create ranges for all blocks with this blockId
-            const ranges: vscode.Range[] = [];
-            
-            for (const block of blocks) {
-                const startPos = new vscode.Position(block.startLine, 0);
-                const endPos = new vscode.Position(block.endLine, document.lineAt(block.endLine).text.length);
-                ranges.push(new vscode.Range(startPos, endPos));
-            }
-            
-            // Apply the decorations
-            const decorationType = this.duplicatedCodeDecorationTypes.get(blockId);
-            if (decorationType) {
-                editor.setDecorations(decorationType, ranges);
-            }
+        });
+        decorationsByColor.forEach((decorations, index) => {
+            this.pool.apply(editor, `duplicate:${index}`, this.getLabeledOptions(PALETTE[index], '0 5px 0 0'), decorations);
         });
         
         // Scroll to the first duplicated block if there is one
         if (duplicatedBlocks.length > 0) {
             const firstBlock = duplicatedBlocks[0];
-            const startPos = new vscode.Position(firstBlock.startLine, 0);
-            const endPos = new vscode.Position(firstBlock.endLine, document.lineAt(firstBlock.endLine).text.length);
-            
             editor.revealRange(
-                new vscode.Range(startPos, endPos),
+                this.getLinesRange(document, firstBlock.startLine, firstBlock.endLine),
                 vscode.TextEditorRevealType.InCenter
             );
         }
     }
 
     public highlightMethods(document: vscode.TextDocument, methodBlocks: { startLine: number, endLine: number, size: number, name?: string }[]): void {
-        const editor = vscode.window.activeTextEditor;
-        if (!editor || editor.document.uri.toString() !== document.uri.toString()) {
+        const editor = this.getEditor(document);
+        if (!editor) {
             return;
         }
+        this.updateVisibleRangeLimit();
         
-        // Clear any existing method decorations and dispose them
-        this.methodDecorationTypes.forEach(decorationType => {
-            editor.setDecorations(decorationType, []);
-            decorationType.dispose();
-        });
-        
-        // Clear the map of decoration types
-        this.methodDecorationTypes.clear();
-        
-        // Define a set of colors for different methods
-        const colors = [
-            'rgba(255, 165, 0, 0.2)',  // Orange
-            'rgba(0, 128, 255, 0.2)',  // Blue
-            'rgba(255, 0, 0, 0.2)',    // Red
-            'rgba(0, 255, 0, 0.2)',    // Green
-            'rgba(128, 0, 128, 0.2)',  // Purple
-            'rgba(255, 192, 203, 0.2)', // Pink
-            'rgba(0, 255, 255, 0.2)',  // Cyan
-            'rgba(255, 255, 0, 0.2)'   // Yellow
-        ];
-        
-        // Create decorations for each method
+        // Methods cycle through the palette; each method keeps its own label
+        const decorationsByColor: PooledDecoration[][] = PALETTE.map(() => []);
         methodBlocks.forEach((block, index) => {
-            const colorIndex = index % colors.length;
-            const color = colors[colorIndex];
-            const rulerColor = color.replace('0.2', '0.7');
-            
-            // Always create a new decoration type for each method
-            this.methodDecorationTypes.set(index, vscode.window.createTextEditorDecorationType({
-                backgroundColor: color,
-                overviewRulerColor: rulerColor,
-                overviewRulerLane: vscode.OverviewRulerLane.Right,
-                before: {
-                    contentText: `${block.name || 'Method'} (${block.size} líneas) `,
-                    color: '#ffffff', // Pure white color
-                    backgroundColor: '#333333', // Dark background for contrast
-                    margin: '0 15px 0 0',
-                    border: '0px' // Remove border
-                }
-            }));
-            
-            // Create range for this method
-            const startPos = new vscode.Position(block.startLine, 0);
-            const endPos = new vscode.Position(block.endLine, document.lineAt(Math.min(block.endLine, document.lineCount - 1)).text.length);
-            const range = new vscode.Range(startPos, endPos);
-            
-            // Apply the decoration
-            const decorationType = this.methodDecorationTypes.get(index);
-            if (decorationType) {
-                editor.setDecorations(decorationType, [range]);
-            }
+            decorationsByColor[index % PALETTE.length].push({
+                range: this.getLinesRange(document, block.startLine, block.endLine),
+                label: `${block.name || 'Method'} (${block.size} líneas) `
+            });
+        });
+        decorationsByColor.forEach((decorations, index) => {
+            this.pool.apply(editor, `method:${index}`, this.getLabeledOptions(PALETTE[index], '0 15px 0 0'), decorations);
         });
         
         if (methodBlocks.length > 0) {
             const firstBlock = methodBlocks[0];
-            const startPos = new vscode.Position(firstBlock.startLine, 0);
-            const endPos = new vscode.Position(firstBlock.endLine, document.lineAt(Math.min(firstBlock.endLine, document.lineCount - 1)).text.length);
-            
             editor.revealRange(
-                new vscode.Range(startPos, endPos),
+                this.getLinesRange(document, firstBlock.startLine, firstBlock.endLine),
                 vscode.TextEditorRevealType.InCenter
             );
         }
     }
 
     public highlightLoops(document: vscode.TextDocument, loopBlocks: { startLine: number, endLine: number, loopType: string }[]): void {
-        const editor = vscode.window.activeTextEditor;
-        if (!editor || editor.document.uri.toString() !== document.uri.toString()) {
+        const editor = this.getEditor(document);
+        if (!editor) {
             return;
         }
+        this.updateVisibleRangeLimit();
         
-        // Dispose of previous loop decoration type if it exists
-        if (this.loopDecorationType) {
-            editor.setDecorations(this.loopDecorationType, []);
-            this.loopDecorationType.dispose();
-            this.loopDecorationType = null;
-        }
-        
-        // Create a new loop decoration type
-        this.loopDecorationType = vscode.window.createTextEditorDecorationType({
+        this.pool.apply(editor, 'loop', {
             backgroundColor: 'rgba(65, 105, 225, 0.2)', // Royal blue with transparency
             overviewRulerColor: 'rgba(65, 105, 225, 0.7)',
             overviewRulerLane: vscode.OverviewRulerLane.Right,
@@ -307,45 +155,25 @@ export class HighlightManager {
                 color: '#4169E1',
                 margin: '0 5px 0 0'
             }
-        });
-        
-        const ranges: vscode.Range[] = [];
-        
-        for (const block of loopBlocks) {
-            const startPos = new vscode.Position(block.startLine, 0);
-            const endPos = new vscode.Position(block.startLine, document.lineAt(block.startLine).text.length);
-            ranges.push(new vscode.Range(startPos, endPos));
-        }
-        
-        editor.setDecorations(this.loopDecorationType, ranges);
+        }, loopBlocks.map(block => ({ range: this.getLinesRange(document, block.startLine, block.startLine) })));
         
         if (loopBlocks.length > 0) {
             const firstBlock = loopBlocks[0];
-            const startPos = new vscode.Position(firstBlock.startLine, 0);
-            const endPos = new vscode.Position(firstBlock.startLine, document.lineAt(firstBlock.startLine).text.length);
-            
             editor.revealRange(
-                new vscode.Range(startPos, endPos),
+                this.getLinesRange(document, firstBlock.startLine, firstBlock.startLine),
                 vscode.TextEditorRevealType.InCenter
             );
         }
     }
 
     public highlightConstructors(document: vscode.TextDocument, constructorBlocks: { startLine: number, endLine: number, name?: string }[]): void {
-        const editor = vscode.window.activeTextEditor;
-        if (!editor || editor.document.uri.toString() !== document.uri.toString()) {
+        const editor = this.getEditor(document);
+        if (!editor) {
             return;
         }
+        this.updateVisibleRangeLimit();
         
-        // Dispose of previous constructor decoration type if it exists
-        if (this.constructorDecorationType) {
-            editor.setDecorations(this.constructorDecorationType, []);
-            this.constructorDecorationType.dispose();
-            this.constructorDecorationType = null;
-        }
-        
-        // Create a new constructor decoration type
-        this.constructorDecorationType = vscode.window.createTextEditorDecorationType({
+        this.pool.apply(editor, 'constructor', {
             backgroundColor: 'rgba(75, 0, 130, 0.2)', // Indigo with transparency
             overviewRulerColor: 'rgba(75, 0, 130, 0.7)',
             overviewRulerLane: vscode.OverviewRulerLane.Right,
@@ -354,41 +182,57 @@ export class HighlightManager {
                 color: '#4B0082',
                 margin: '0 5px 0 0'
             }
-        });
-        
-        const ranges: vscode.Range[] = [];
-        
-        for (const block of constructorBlocks) {
-            const startPos = new vscode.Position(block.startLine, 0);
-            const endPos = new vscode.Position(block.endLine, document.lineAt(Math.min(block.endLine, document.lineCount - 1)).text.length);
-            ranges.push(new vscode.Range(startPos, endPos));
-        }
-        
-        editor.setDecorations(this.constructorDecorationType, ranges);
+        }, constructorBlocks.map(block => ({ range: this.getLinesRange(document, block.startLine, block.endLine) })));
         
         if (constructorBlocks.length > 0) {
             const firstBlock = constructorBlocks[0];
-            const startPos = new vscode.Position(firstBlock.startLine, 0);
-            const endPos = new vscode.Position(firstBlock.endLine, document.lineAt(Math.min(firstBlock.endLine, document.lineCount - 1)).text.length);
-            
             editor.revealRange(
-                new vscode.Range(startPos, endPos),
+                this.getLinesRange(document, firstBlock.startLine, firstBlock.endLine),
                 vscode.TextEditorRevealType.InCenter
             );
         }
     }
 
     public dispose(): void {
-        // Dispose of all decoration types
-        this.maxDepthDecorationType.dispose();
-        this.duplicatedCodeDecorationType.dispose();
-        this.duplicatedCodeDecorationTypes.forEach(decorationType => decorationType.dispose());
-        this.methodDecorationTypes.forEach(decorationType => decorationType.dispose());
-        if (this.loopDecorationType) {
-            this.loopDecorationType.dispose();
-        }
-        if (this.constructorDecorationType) {
-            this.constructorDecorationType.dispose();
-        }
+        this.visibleRangesListener.dispose();
+        this.pool.dispose();
+    }
+
+    private getEditor(document: vscode.TextDocument): vscode.TextEditor | undefined {
+        const editor = vscode.window.activeTextEditor;
+        return editor && editor.document.uri.toString() === document.uri.toString() ? editor : undefined;
+    }
+
+    /**
+     * The range from the start of a line to the end of another, clamped to the document
+     */
+    private getLinesRange(document: vscode.TextDocument, startLine: number, endLine: number): vscode.Range {
+        const lastLine = Math.min(endLine, document.lineCount - 1);
+        return new vscode.Range(
+            new vscode.Position(startLine, 0),
+            new vscode.Position(endLine, document.lineAt(lastLine).text.length)
+        );
+    }
+
+    /**
+     * Render options of a palette color whose ranges carry a label before them
+     */
+    private getLabeledOptions(color: string, margin: string): vscode.DecorationRenderOptions {
+        return {
+            backgroundColor: color,
+            overviewRulerColor: color.replace('0.2', '0.7'),
+            overviewRulerLane: vscode.OverviewRulerLane.Right,
+            before: {
+                color: '#ffffff', // Pure white color
+                backgroundColor: '#333333', // Dark background for contrast
+                margin,
+                border: '0px' // Remove border
+            }
+        };
+    }
+
+    private updateVisibleRangeLimit(): void {
+        const minLineCount = vscode.workspace.getConfiguration('lineCounter').get<number>('highlight.visibleRangesAboveLines', 0);
+        this.pool.setVisibleRangeLimit(minLineCount > 0 ? { minLineCount, marginLines: VISIBLE_MARGIN_LINES } : undefined);
     }
 }
@@ -0,0 +1,38 @@
+import * as path from 'path';
+
+/**
+ * Languages of the project files that are navigated and labeled, by file extension.
+ * Every language with metrics in MetricFactory has an entry.
+ */
+export const LANGUAGE_ID_BY_EXTENSION: Record<string, string> = {
+  '.cs': 'csharp',
+  '.py': 'python',
+  '.ts': 'typescript',
+  '.js': 'javascript',
+  '.java': 'java'
+};
+
+/**
+ * VS Code language id of a project file
+ * @param filePath The file path
+ * @returns The language id, undefined for files that are not project files
+ */
+export function getProjectLanguageId(filePath: string): string | undefined {
+  return LANGUAGE_ID_BY_EXTENSION[path.extname(filePath).toLowerCase()];
+}
+
+/**
+ * Glob matching the project files of some languages, e.g. `**\/*.{cs,py}`
+ * @param languageIds The languages to include, usually the ones with registered metrics
+ * @returns The glob, undefined when no extension belongs to those languages
+ */
+export function getProjectFilesGlob(languageIds: string[]): string | undefined {
+  const extensions = Object.keys(LANGUAGE_ID_BY_EXTENSION)
+    .filter(extension => languageIds.includes(LANGUAGE_ID_BY_EXTENSION[extension]))
+    .map(extension => extension.slice(1))
+    .sort();
+  if (extensions.length === 0) {
+    return undefined;
+  }
+  return extensions.length === 1 ? `**/*.${extensions[0]}` : `**/*.{${extensions.join(',')}}`;
+}
@@ -0,0 +1,26 @@
+import * as vscode from 'vscode';
+
+/**
+ * Iterates the lines of a document through lineAt, without joining them into one
+ * string the way getText() does. Editor documents already hold their lines, so
+ * this allocates nothing proportional to the file size.
+ * @param document The document to read
+ */
+export function* iterateLines(document: vscode.TextDocument): IterableIterator<string> {
+  for (let i = 0; i < document.lineCount; i++) {
+    yield document.lineAt(i).text;
+  }
+}
+
+/**
+ * Number of characters of a document, counting one per line break, computed
+ * from its lines instead of a copy of its text
+ * @param document The document to measure
+ */
+export function getDocumentLength(document: vscode.TextDocument): number {
+  let length = Math.max(0, document.lineCount - 1);
+  for (let i = 0; i < document.lineCount; i++) {
+    length += document.lineAt(i).text.length;
+  }
+  return length;
+}
@@ -0,0 +1,25 @@
+import * as vscode from 'vscode';
+import { Metric, MetricResult } from './Metric';
+
+export type MetricDescriptor = Omit<Metric, 'extract'>;
+
+/**
+ * Creates a metric whose implementation module is only loaded the first time it is
+ * extracted, so registering it does not pull the module's dependencies (vscode, openai)
+ * into processes that never run it, such as metric workers.
+ * @param descriptor Name, description and flags of the metric
+ * @param load Loads the real metric implementation
+ */
+export function createLazyMetric(descriptor: MetricDescriptor, load: () => Metric): Metric {
+  let implementation: Metric | undefined;
+
+  return {
+    ...descriptor,
+    extract(document: vscode.TextDocument): MetricResult {
+      if (!implementation) {
+        implementation = load();
+      }
+      return implementation.extract(document);
+    }
+  };
+}
@@ -8,8 +8,25 @@ export interface MetricResult {
   loopBlocks?: { startLine: number, endLine: number, loopType: string }[];
   methodBlocks?: { startLine: number, endLine: number, size: number, name?: string }[];
   constructorBlocks?: { startLine: number, endLine: number, name?: string }[];
+  cloneMatches?: { startLine: number, endLine: number, filePath: string, matchStartLine: number, matchEndLine: number }[];
+  skipped?: false;
 }
 
+/**
+ * Placeholder for a metric that was not run, because it exceeded its time budget or the
+ * file is too large. It has no value, so it is never taken for a measurement: the view
+ * lists it apart and CSV rows get an empty cell.
+ */
+export interface SkippedMetricResult extends Omit<MetricResult, 'value' | 'skipped'> {
+  value: undefined;
+  skipped: true;
+}
+
+/**
+ * What the registry returns for a metric: its result, or a placeholder when it was skipped
+ */
+export type MetricOutcome = MetricResult | SkippedMetricResult;
+
 export interface MetricAction {
   method: string;
 }
@@ -19,5 +36,14 @@ export interface Metric {
   description: string;
   hasAction?: boolean;
   action?: MetricAction;
+  // Metrics that use the vscode API must run on the extension host, not in a worker
+  requiresEditor?: boolean;
+  // Shown in the sidebar only: left out of the CSV rows and of their metric schema
+  sidebarOnly?: boolean;
+  // Reads the document only through lineAt (see iterateLines), never getText(), so it
+  // still runs on files above the large-file threshold
+  streaming?: boolean;
+  // Recombines per-method results after edits to the tracked document, see IncrementalBraceAnalysis
+  incremental?: boolean;
   extract(document: vscode.TextDocument): MetricResult;
 }
@@ -1,5 +1,5 @@
 import * as vscode from 'vscode';
-import { Metric, MetricResult } from './Metric';
+import { Metric, MetricOutcome } from './Metric';
 import { MetricRegistry } from './MetricRegistry';
 import { MetricFactory } from './MetricFactory';
 
@@ -24,7 +24,7 @@ export class MetricExtractor {
    * @param document The document to analyze
    * @returns Array of metric results
    */
-  public extractMetrics(document: vscode.TextDocument): MetricResult[] {
+  public extractMetrics(document: vscode.TextDocument): MetricOutcome[] {
     return this.registry.executeMetrics(document);
   }
 
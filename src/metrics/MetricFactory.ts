@@ -1,140 +1,134 @@
-import { Metric } from './Metric';
+import type { Metric } from './Metric';
 import { MetricRegistry } from './MetricRegistry';
-import { LineCountMetric } from './common/LineCountMetric';
-import { IfCountMetric } from './common/IfCountMetric';
-import { UsingCountMetric } from './common/UsingCountMetric';
-import { LoopCountMetric } from './common/LoopCountMetric';
-import { LambdaCountMetric } from './common/LambdaCountMetric';
-import { MethodCountMetric } from './common/MethodCountMetric';
-import { ClassCountMetric } from './common/ClassCountMetric';
-import { AverageMethodSizeMetric } from './common/AverageMethodSizeMetric';
-import { MethodCohesionMetric } from './common/MethodCohesionMetric';
-import { NestingDepthMetric } from './common/NestingDepthMetric';
-import { CommentLineCountMetric } from './common/CommentLineCountMetric';
-import { CommentRatioMetric } from './common/CommentRatioMetric';
-import { CodeDuplicationMetric } from './CodeDuplicationMetric';
-import { GetterSetterCountMetric } from './GetterSetterCountMetric';
-import { ObjectTypeMetric } from './common/ObjectTypeMetric';
-import { ConstructorCountMetric } from './common/ConstructorCountMetric';
-import { InterfaceConstructorParameterCountMetric } from './InterfaceConstructorParameterCountMetric';
-import { SingleResponsibilityMetric } from './SingleResponsibilityMetric';
-import { CognitiveComplexityMetric } from './common/CognitiveComplexityMetric';
-import { CommentLineCountMetricPython } from './python/CommentLineCountMetricPython';
-import { CommentRatioMetricPython } from './python/CommentRatioMetricPython';
-import { CodeDuplicationMetricV2 } from './common/CodeDuplicationMetricV2';
-import { NestingDepthMetricPython } from './python/NestingDepthMetricPython';
-import { MethodCountMetricPython } from './python/MethodCountMetricPython';
-import { CognitiveComplexityMetricPython } from './python/CognitiveComplexityMetricPython';
-import { AverageMethodSizeMetricPython } from './python/AverageMethodSizeMetricPython';
-import { PythonClassCountMetricPython } from './python/ClassCountMetricPython';
-import { ConstructorCountMetricPython } from './python/ConstructorCountMetricPython';
-import { ObjectTypeMetricPython } from './python/ObjectTypeMetricPython';
-import { MethodCohesionMetricPython } from './python/MethodCohesionMetricPython';
-import { LambdaCountMetricPython } from './python/LambdaCountMetricPython';
+import { createLazyMetric } from './LazyMetric';
 
-export class MetricFactory {
-  private static registry = MetricRegistry.getInstance();
+// Loaded on first use: it depends on the vscode API and the openai SDK
+const SingleResponsibilityMetric: Metric = createLazyMetric(
+  {
+    name: 'singleResponsibility',
+    description: 'evalúa si la clase cumple con el principio de responsabilidad única (SRP).',
+    requiresEditor: true
+  },
+  () => require('./SingleResponsibilityMetric').SingleResponsibilityMetric
+);
 
+/*
+ * Metric modules are required by the language loaders below rather than imported, so
+ * activating the extension loads none of them and analyzing a Python file never loads
+ * the brace-language metrics. Modules shared between languages are loaded once.
+ */
 
-  public static initializeRegistry(): void {
-    this.registerCommonMetrics();
-    this.registerLanguageSpecificMetrics();
-  }
+function loadCommonMetrics(): Metric[] {
+  return [
+    require('./common/LineCountMetric').LineCountMetric,
+    require('./CodeDuplicationMetric').CodeDuplicationMetric,
+    require('./common/CodeDuplicationMetricV2').CodeDuplicationMetricV2,
+    require('./common/UsingCountMetric').UsingCountMetric,
+    require('./common/IfCountMetric').IfCountMetric,
+    require('./common/LoopCountMetric').LoopCountMetric,
+    require('./common/CrossFileDuplicationMetric').CrossFileDuplicationMetric,
+  ];
+}
+
+function loadCSharpMetrics(): Metric[] {
+  return [
+    require('./common/ClassCountMetric').ClassCountMetric,
+    require('./common/MethodCountMetric').MethodCountMetric,
+    require('./common/LambdaCountMetric').LambdaCountMetric,
+    require('./common/AverageMethodSizeMetric').AverageMethodSizeMetric,
+    require('./common/MethodCohesionMetric').MethodCohesionMetric,
+    require('./GetterSetterCountMetric').GetterSetterCountMetric,
+    require('./common/ObjectTypeMetric').ObjectTypeMetric,
+    require('./InterfaceConstructorParameterCountMetric').InterfaceConstructorParameterCountMetric,
+    SingleResponsibilityMetric,
+    require('./common/CognitiveComplexityMetric').CognitiveComplexityMetric,
+    require('./common/CommentLineCountMetric').CommentLineCountMetric,
+    require('./common/CommentRatioMetric').CommentRatioMetric,
+    require('./common/ConstructorCountMetric').ConstructorCountMetric,
+    require('./common/NestingDepthMetric').NestingDepthMetric
+  ];
+}
+
+function loadJavaScriptMetrics(): Metric[] {
+  return [
+    require('./common/LambdaCountMetric').LambdaCountMetric,
+    require('./common/MethodCountMetric').MethodCountMetric,
+    require('./common/ClassCountMetric').ClassCountMetric,
+    require('./common/AverageMethodSizeMetric').AverageMethodSizeMetric,
+    require('./common/CognitiveComplexityMetric').CognitiveComplexityMetric,
+    require('./common/CommentLineCountMetric').CommentLineCountMetric,
+    require('./common/CommentRatioMetric').CommentRatioMetric,
+    require('./common/ConstructorCountMetric').ConstructorCountMetric,
+    require('./common/ObjectTypeMetric').ObjectTypeMetric,
+    require('./common/NestingDepthMetric').NestingDepthMetric,
+    require('./common/MethodCohesionMetric').MethodCohesionMetric
+  ];
+}
 
-  private static registerCommonMetrics(): void {
-    const commonMetrics: Metric[] = [
-      LineCountMetric,
-      CodeDuplicationMetric,
-      CodeDuplicationMetricV2,
-      UsingCountMetric,
-      IfCountMetric,
-      LoopCountMetric,
+function loadTypeScriptMetrics(): Metric[] {
+  return [
+    require('./common/LambdaCountMetric').LambdaCountMetric,
+    require('./common/MethodCountMetric').MethodCountMetric,
+    require('./common/ClassCountMetric').ClassCountMetric,
+    require('./common/AverageMethodSizeMetric').AverageMethodSizeMetric,
+    require('./InterfaceConstructorParameterCountMetric').InterfaceConstructorParameterCountMetric,
+    require('./common/CognitiveComplexityMetric').CognitiveComplexityMetric,
+    require('./common/CommentLineCountMetric').CommentLineCountMetric,
+    require('./common/CommentRatioMetric').CommentRatioMetric,
+    require('./common/ConstructorCountMetric').ConstructorCountMetric,
+    require('./common/ObjectTypeMetric').ObjectTypeMetric,
+    require('./common/NestingDepthMetric').NestingDepthMetric,
+    require('./common/MethodCohesionMetric').MethodCohesionMetric
+  ];
+}
 
-    ];
+function loadPythonMetrics(): Metric[] {
+  return [
+    require('./python/LambdaCountMetricPython').LambdaCountMetricPython,
+    require('./python/MethodCountMetricPython').MethodCountMetricPython,
+    require('./python/CommentLineCountMetricPython').CommentLineCountMetricPython,
+    require('./python/CommentRatioMetricPython').CommentRatioMetricPython,
+    require('./python/NestingDepthMetricPython').NestingDepthMetricPython,
+    require('./python/CognitiveComplexityMetricPython').CognitiveComplexityMetricPython,
+    require('./python/AverageMethodSizeMetricPython').AverageMethodSizeMetricPython,
+    require('./python/ClassCountMetricPython').PythonClassCountMetricPython,
+    require('./python/ConstructorCountMetricPython').ConstructorCountMetricPython,
+    require('./python/ObjectTypeMetricPython').ObjectTypeMetricPython,
+    require('./python/MethodCohesionMetricPython').MethodCohesionMetricPython
+  ];
+}
 
-    this.registry.registerCommonMetrics(commonMetrics);
-  }
+function loadJavaMetrics(): Metric[] {
+  return [
+    require('./common/LambdaCountMetric').LambdaCountMetric,
+    require('./common/MethodCountMetric').MethodCountMetric,
+    require('./common/ClassCountMetric').ClassCountMetric,
+    require('./common/AverageMethodSizeMetric').AverageMethodSizeMetric,
+    require('./GetterSetterCountMetric').GetterSetterCountMetric,
+    require('./common/CognitiveComplexityMetric').CognitiveComplexityMetric,
+    require('./common/CommentLineCountMetric').CommentLineCountMetric,
+    require('./common/CommentRatioMetric').CommentRatioMetric,
+    require('./common/ConstructorCountMetric').ConstructorCountMetric,
+    require('./common/ObjectTypeMetric').ObjectTypeMetric,
+    require('./common/NestingDepthMetric').NestingDepthMetric,
+    require('./common/MethodCohesionMetric').MethodCohesionMetric
+  ];
+}
+
+export class MetricFactory {
+  private static registry = MetricRegistry.getInstance();
 
-  private static registerLanguageSpecificMetrics(): void {
-    const csharpMetrics: Metric[] = [
-      ClassCountMetric,
-      MethodCountMetric,
-      LambdaCountMetric,
-      AverageMethodSizeMetric,
-      MethodCohesionMetric,
-      GetterSetterCountMetric,
-      ObjectTypeMetric,
-      InterfaceConstructorParameterCountMetric,
-      SingleResponsibilityMetric,
-      CognitiveComplexityMetric,
-      CommentLineCountMetric,
-      CommentRatioMetric,
-      ConstructorCountMetric,
-      NestingDepthMetric
-    ];
-    this.registry.registerLanguageMetrics('csharp', csharpMetrics);
-    
-    const javascriptMetrics: Metric[] = [
-      LambdaCountMetric,
-      MethodCountMetric,
-      ClassCountMetric,
-      AverageMethodSizeMetric,
-      CognitiveComplexityMetric,
-      CommentLineCountMetric,
-      CommentRatioMetric,
-      ConstructorCountMetric,
-      ObjectTypeMetric,
-      NestingDepthMetric,
-      MethodCohesionMetric
-    ];
-    this.registry.registerLanguageMetrics('javascript', javascriptMetrics);
-    
-    const typescriptMetrics: Metric[] = [
-      LambdaCountMetric,
-      MethodCountMetric,
-      ClassCountMetric,
-      AverageMethodSizeMetric,
-      InterfaceConstructorParameterCountMetric,
-      CognitiveComplexityMetric,
-      CommentLineCountMetric,
-      CommentRatioMetric,
-      ConstructorCountMetric,
-      ObjectTypeMetric,
-      NestingDepthMetric,
-      MethodCohesionMetric
-    ];
-    this.registry.registerLanguageMetrics('typescript', typescriptMetrics);
-    
-    const pythonMetrics: Metric[] = [
-      LambdaCountMetricPython,
-      MethodCountMetricPython,
-      CommentLineCountMetricPython,
-      CommentRatioMetricPython,
-      NestingDepthMetricPython,
-      CognitiveComplexityMetricPython,
-      AverageMethodSizeMetricPython,
-      PythonClassCountMetricPython,
-      ConstructorCountMetricPython,
-      ObjectTypeMetricPython,
-      MethodCohesionMetricPython
-    ];
-    this.registry.registerLanguageMetrics('python', pythonMetrics);
-    
-    const javaMetrics: Metric[] = [
-      LambdaCountMetric,
-      MethodCountMetric,
-      ClassCountMetric,
-      AverageMethodSizeMetric,
-      GetterSetterCountMetric,
-      CognitiveComplexityMetric,
-      CommentLineCountMetric,
-      CommentRatioMetric,
-      ConstructorCountMetricPython,
-      ObjectTypeMetric,
-      NestingDepthMetric,
-      MethodCohesionMetric
-    ];
-    this.registry.registerLanguageMetrics('java', javaMetrics);
+  /**
+   * Register the metric loaders of every language. No metric module is loaded until
+   * the metrics of a language are first requested.
+   */
+  public static initializeRegistry(): void {
+    this.registry.registerCommonMetricsLoader(loadCommonMetrics);
+    this.registry.registerLanguageMetricsLoader('csharp', loadCSharpMetrics);
+    this.registry.registerLanguageMetricsLoader('javascript', loadJavaScriptMetrics);
+    this.registry.registerLanguageMetricsLoader('typescript', loadTypeScriptMetrics);
+    this.registry.registerLanguageMetricsLoader('python', loadPythonMetrics);
+    this.registry.registerLanguageMetricsLoader('java', loadJavaMetrics);
   }
 
   /**
@@ -146,6 +140,15 @@ export class MetricFactory {
     return this.registry.getMetricsForLanguage(languageId);
   }
 
+  /**
+   * Get the metrics of a language that are written to the CSV rows
+   * @param languageId The language identifier
+   * @returns Array of metrics for the language without the sidebar-only ones
+   */
+  public static getLabeledMetricsForLanguage(languageId: string): Metric[] {
+    return this.registry.getLabeledMetricsForLanguage(languageId);
+  }
+
   /**
    * Get all common metrics
    * @returns Array of common metrics
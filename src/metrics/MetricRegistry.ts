@@ -1,5 +1,11 @@
 import * as vscode from 'vscode';
-import { Metric, MetricResult } from './Metric';
+import { performance } from 'perf_hooks';
+import { Metric, MetricOutcome, SkippedMetricResult } from './Metric';
+import { getDocumentLength } from './DocumentLines';
+import { adoptIncrementalState, hasIncrementalState, isIncrementalDocument } from './common/IncrementalBraceAnalysis';
+import { MetricResultCache } from './MetricResultCache';
+import { MetricWorkerPool } from './execution/MetricWorkerPool';
+import { MetricCallSite, MetricProfiler } from './profiling/MetricProfiler';
 
 /**
  * Registry for code metrics that supports common metrics and language-specific metrics.
@@ -13,6 +19,25 @@ export class MetricRegistry {
   // Language-specific metrics
   private languageMetrics: Map<string, Map<string, Metric>> = new Map();
 
+  // Loaders of metric modules not required yet, run the first time their metrics are needed
+  private commonMetricsLoader?: () => Metric[];
+  private languageMetricsLoaders: Map<string, () => Metric[]> = new Map();
+
+  // Results per (document URI, document version, metric name)
+  private resultCache: MetricResultCache = new MetricResultCache();
+
+  // Created on first asynchronous execution
+  private workerPool?: MetricWorkerPool;
+
+  // Timing of every extraction that did not come from the cache
+  private profiler: MetricProfiler = new MetricProfiler();
+
+  // Text length per document version, used to label timings by file size
+  private textLengths: WeakMap<vscode.TextDocument, { version: number, length: number }> = new WeakMap();
+
+  // Above this many characters only streaming metrics run
+  private largeFileThreshold: number = Infinity;
+
   /**
    * Get the singleton instance of the MetricRegistry
    */
@@ -62,12 +87,42 @@ export class MetricRegistry {
     metrics.forEach(metric => this.registerLanguageMetric(languageId, metric));
   }
 
+  /**
+   * Register a loader for the common metrics. Their modules are only required the
+   * first time the metrics of any language are requested.
+   * @param load Requires the metric modules and returns the metrics
+   */
+  public registerCommonMetricsLoader(load: () => Metric[]): void {
+    this.commonMetricsLoader = load;
+  }
+
+  /**
+   * Register a loader for the metrics of a language. Their modules are only required
+   * the first time a document of that language is analyzed.
+   * @param languageId The language identifier
+   * @param load Requires the metric modules and returns the metrics
+   */
+  public registerLanguageMetricsLoader(languageId: string, load: () => Metric[]): void {
+    this.languageMetricsLoaders.set(languageId, load);
+  }
+
+  /**
+   * Whether the metric modules of a language have been loaded
+   * @param languageId The language identifier
+   */
+  public isLanguageLoaded(languageId: string): boolean {
+    return !this.commonMetricsLoader && !this.languageMetricsLoaders.has(languageId);
+  }
+
   /**
    * Get all metrics for a specific language (common + language-specific)
    * @param languageId The language identifier
    * @returns Array of all applicable metrics for the language
    */
   public getMetricsForLanguage(languageId: string): Metric[] {
+    this.loadCommonMetrics();
+    this.loadLanguageMetrics(languageId);
+
     const metrics: Metric[] = [];
     
     // Add all common metrics
@@ -82,16 +137,268 @@ export class MetricRegistry {
     return metrics;
   }
 
+  /**
+   * Get the metrics of a language that are written to the CSV rows, in column order
+   * @param languageId The language identifier
+   * @returns The metrics of the language without the sidebar-only ones
+   */
+  public getLabeledMetricsForLanguage(languageId: string): Metric[] {
+    return this.getMetricsForLanguage(languageId).filter(metric => !metric.sidebarOnly);
+  }
+
   /**
    * Execute all applicable metrics on a document
    * @param document The document to analyze
    * @returns Array of metric results
    */
-  public executeMetrics(document: vscode.TextDocument): MetricResult[] {
+  public executeMetrics(document: vscode.TextDocument): MetricOutcome[] {
     const languageId = document.languageId.toLowerCase();
     const metrics = this.getMetricsForLanguage(languageId);
     
-    return metrics.map(metric => metric.extract(document));
+    return this.extractMetrics(document, metrics);
+  }
+
+  /**
+   * Get the profiler that times the metric extractions
+   */
+  public getProfiler(): MetricProfiler {
+    return this.profiler;
+  }
+
+  /**
+   * Set the size from which a document is analyzed in large-file mode: only the
+   * metrics marked as streaming run, the rest are reported as skipped
+   * @param characters The threshold in characters, Infinity to disable the mode
+   */
+  public setLargeFileThreshold(characters: number): void {
+    this.largeFileThreshold = characters > 0 ? characters : Infinity;
+  }
+
+  /**
+   * Whether a document is above the large-file threshold
+   * @param document The document to check
+   */
+  public isLargeFile(document: vscode.TextDocument): boolean {
+    return this.largeFileThreshold !== Infinity && this.getTextLength(document) > this.largeFileThreshold;
+  }
+
+  /**
+   * Extract a metric through the result cache, so each metric runs at most
+   * once per document version
+   * @param document The document to analyze
+   * @param metric The metric to extract
+   * @param callSite Where the extraction is requested from, for profiling
+   * @returns The metric result, or a placeholder without value when the metric is skipped
+   */
+  public extractMetric(document: vscode.TextDocument, metric: Metric, callSite: MetricCallSite = 'render'): MetricOutcome {
+    const cached = this.resultCache.get(document, metric.name);
+    if (cached) {
+      return cached;
+    }
+
+    const skipped = this.getSkippedResult(document, metric, callSite);
+    if (skipped) {
+      return skipped;
+    }
+
+    const start = performance.now();
+    const result = metric.extract(document);
+    this.recordTiming(document, metric, callSite, performance.now() - start);
+    this.resultCache.set(document, metric.name, result);
+    return result;
+  }
+
+  /**
+   * Extract several metrics through the result cache
+   * @param document The document to analyze
+   * @param metrics The metrics to extract
+   * @param callSite Where the extraction is requested from, for profiling
+   * @returns Array of metric results, in the same order as the metrics
+   */
+  public extractMetrics(document: vscode.TextDocument, metrics: Metric[], callSite: MetricCallSite = 'render'): MetricOutcome[] {
+    return metrics.map(metric => this.extractMetric(document, metric, callSite));
+  }
+
+  /**
+   * Extract metrics in a worker thread pool, off the calling thread. Cached results
+   * are reported first, the rest as each metric finishes.
+   * @param document The document to analyze
+   * @param metrics The metrics to extract (all applicable metrics if omitted)
+   * @param onResult Called for every metric as its result becomes available
+   * @param token Cancels the extractions that have not started yet
+   * @param callSite Where the extraction is requested from, for profiling
+   * @returns Array of metric results, in the same order as the metrics
+   */
+  public async executeMetricsAsync(
+    document: vscode.TextDocument,
+    metrics: Metric[] = this.getMetricsForLanguage(document.languageId.toLowerCase()),
+    onResult?: (metric: Metric, result: MetricOutcome) => void,
+    token?: vscode.CancellationToken,
+    callSite: MetricCallSite = 'render'
+  ): Promise<MetricOutcome[]> {
+    const results: MetricOutcome[] = new Array(metrics.length);
+    const missingIndexes: number[] = [];
+
+    metrics.forEach((metric, index) => {
+      const available = this.resultCache.get(document, metric.name) ?? this.getSkippedResult(document, metric, callSite);
+      if (available) {
+        results[index] = available;
+        onResult?.(metric, available);
+      } else {
+        missingIndexes.push(index);
+      }
+    });
+
+    if (missingIndexes.length === 0) {
+      return results;
+    }
+
+    // On large files only streaming metrics are left, and sending the whole text to a
+    // worker would copy it
+    if (this.isLargeFile(document)) {
+      await this.extractOnThisThread(document, metrics, missingIndexes, results, onResult, token, callSite);
+      return results;
+    }
+
+    // Incremental metrics of the tracked document recombine its per-method state on this
+    // thread. The state itself is built in a worker: the first time, and after every edit
+    // that applyIncrementalChanges could not follow.
+    const incrementalIndexes = isIncrementalDocument(document)
+      ? missingIndexes.filter(index => metrics[index].incremental)
+      : [];
+    const pooledIndexes = missingIndexes.filter(index => !incrementalIndexes.includes(index));
+
+    let stateReady = Promise.resolve(true);
+    if (incrementalIndexes.length > 0 && !hasIncrementalState(document)) {
+      stateReady = this.getWorkerPool().buildIncrementalState(document, token)
+        .then(built => adoptIncrementalState(document, built), () => false);
+    }
+
+    await Promise.all([
+      this.extractInWorkers(document, metrics, pooledIndexes, results, onResult, token, callSite),
+      stateReady.then(ready => ready && hasIncrementalState(document)
+        ? this.extractOnThisThread(document, metrics, incrementalIndexes, results, onResult, token, callSite)
+        : this.extractInWorkers(document, metrics, incrementalIndexes, results, onResult, token, callSite))
+    ]);
+
+    return results;
+  }
+
+  /**
+   * Extract metrics one by one on this thread, yielding between them
+   * @param indexes The indexes of the metrics to extract, results are stored at the same index
+   */
+  private async extractOnThisThread(
+    document: vscode.TextDocument,
+    metrics: Metric[],
+    indexes: number[],
+    results: MetricOutcome[],
+    onResult: ((metric: Metric, result: MetricOutcome) => void) | undefined,
+    token: vscode.CancellationToken | undefined,
+    callSite: MetricCallSite
+  ): Promise<void> {
+    for (const index of indexes) {
+      if (token?.isCancellationRequested) {
+        return;
+      }
+      results[index] = this.extractMetric(document, metrics[index], callSite);
+      onResult?.(metrics[index], results[index]);
+      await new Promise(resolve => setImmediate(resolve));
+    }
+  }
+
+  /**
+   * Extract metrics in the worker thread pool
+   * @param indexes The indexes of the metrics to extract, results are stored at the same index
+   */
+  private async extractInWorkers(
+    document: vscode.TextDocument,
+    metrics: Metric[],
+    indexes: number[],
+    results: MetricOutcome[],
+    onResult: ((metric: Metric, result: MetricOutcome) => void) | undefined,
+    token: vscode.CancellationToken | undefined,
+    callSite: MetricCallSite
+  ): Promise<void> {
+    if (indexes.length === 0) {
+      return;
+    }
+
+    await this.getWorkerPool().run(document, indexes.map(index => metrics[index]), (metric, result, position, durationMs) => {
+      this.recordTiming(document, metric, callSite, durationMs);
+      this.resultCache.set(document, metric.name, result);
+      results[indexes[position]] = result;
+      onResult?.(metric, result);
+    }, token);
+  }
+
+  private getWorkerPool(): MetricWorkerPool {
+    if (!this.workerPool) {
+      this.workerPool = new MetricWorkerPool();
+    }
+    return this.workerPool;
+  }
+
+  /**
+   * A placeholder result for a metric that does not stream on a large file, or that
+   * exceeded its time budget on a file of this size or smaller. CSV rows get the real
+   * value unless the file is large.
+   */
+  private getSkippedResult(document: vscode.TextDocument, metric: Metric, callSite: MetricCallSite): SkippedMetricResult | undefined {
+    if (!metric.streaming && this.isLargeFile(document)) {
+      return {
+        label: `${metric.name}: omitida en modo archivo grande`,
+        value: undefined,
+        skipped: true
+      };
+    }
+
+    if (callSite === 'csv' || !this.profiler.shouldSkip(metric.name, this.getTextLength(document))) {
+      return undefined;
+    }
+
+    return {
+      label: `${metric.name}: omitida, superó su presupuesto de ${this.profiler.getBudget(metric.name)} ms`,
+      value: undefined,
+      skipped: true
+    };
+  }
+
+  private recordTiming(document: vscode.TextDocument, metric: Metric, callSite: MetricCallSite, durationMs: number): void {
+    this.profiler.record({
+      metricName: metric.name,
+      languageId: document.languageId.toLowerCase(),
+      textLength: this.getTextLength(document),
+      callSite,
+      durationMs
+    });
+  }
+
+  private getTextLength(document: vscode.TextDocument): number {
+    const known = this.textLengths.get(document);
+    if (known && known.version === document.version) {
+      return known.length;
+    }
+    const length = getDocumentLength(document);
+    this.textLengths.set(document, { version: document.version, length });
+    return length;
+  }
+
+  /**
+   * Stop the worker threads used by executeMetricsAsync
+   */
+  public disposeWorkers(): void {
+    this.workerPool?.dispose();
+    this.workerPool = undefined;
+  }
+
+  /**
+   * Drop cached metric results
+   * @param uri Only drop results for this document (all documents if omitted)
+   * @param metricName Only drop results for this metric (all metrics if omitted)
+   */
+  public invalidateResults(uri?: vscode.Uri, metricName?: string): void {
+    this.resultCache.invalidate(uri?.toString(), metricName);
   }
 
   /**
@@ -100,12 +407,16 @@ export class MetricRegistry {
   public clear(): void {
     this.commonMetrics.clear();
     this.languageMetrics.clear();
+    this.commonMetricsLoader = undefined;
+    this.languageMetricsLoaders.clear();
+    this.resultCache.invalidate();
   }
 
   /**
    * Get all registered common metrics
    */
   public getCommonMetrics(): Metric[] {
+    this.loadCommonMetrics();
     return Array.from(this.commonMetrics.values());
   }
 
@@ -114,6 +425,7 @@ export class MetricRegistry {
    * @param languageId The language identifier
    */
   public getLanguageSpecificMetrics(languageId: string): Metric[] {
+    this.loadLanguageMetrics(languageId);
     if (!this.languageMetrics.has(languageId)) {
       return [];
     }
@@ -125,6 +437,23 @@ export class MetricRegistry {
    * Get all supported languages (languages with specific metrics)
    */
   public getSupportedLanguages(): string[] {
-    return Array.from(this.languageMetrics.keys());
+    const languages = new Set([...this.languageMetrics.keys(), ...this.languageMetricsLoaders.keys()]);
+    return Array.from(languages);
+  }
+
+  private loadCommonMetrics(): void {
+    const load = this.commonMetricsLoader;
+    if (load) {
+      this.commonMetricsLoader = undefined;
+      this.registerCommonMetrics(load());
+    }
+  }
+
+  private loadLanguageMetrics(languageId: string): void {
+    const load = this.languageMetricsLoaders.get(languageId);
+    if (load) {
+      this.languageMetricsLoaders.delete(languageId);
+      this.registerLanguageMetrics(languageId, load());
+    }
   }
 }
@@ -0,0 +1,84 @@
+import * as vscode from 'vscode';
+import { MetricResult } from './Metric';
+
+/**
+ * LRU cache of metric results keyed by (document URI, document version, metric name).
+ * A new document version never hits an old entry, so edits invalidate implicitly;
+ * stale versions are evicted once the cache reaches its capacity.
+ */
+export class MetricResultCache {
+  // Map keeps insertion order, the first key is always the least recently used
+  private entries: Map<string, MetricResult> = new Map();
+
+  constructor(private readonly capacity: number = 512) {}
+
+  /**
+   * Get a cached result and mark it as recently used
+   * @param document The analyzed document
+   * @param metricName The name of the metric
+   * @returns The cached result or undefined if there is none for this version
+   */
+  public get(document: vscode.TextDocument, metricName: string): MetricResult | undefined {
+    const key = MetricResultCache.keyFor(document, metricName);
+    const result = this.entries.get(key);
+    if (result === undefined) {
+      return undefined;
+    }
+
+    this.entries.delete(key);
+    this.entries.set(key, result);
+    return result;
+  }
+
+  /**
+   * Store a result, evicting the least recently used entries when full
+   * @param document The analyzed document
+   * @param metricName The name of the metric
+   * @param result The result to store
+   */
+  public set(document: vscode.TextDocument, metricName: string, result: MetricResult): void {
+    const key = MetricResultCache.keyFor(document, metricName);
+    this.entries.delete(key);
+    this.entries.set(key, result);
+
+    while (this.entries.size > this.capacity) {
+      const oldest = this.entries.keys().next().value as string;
+      this.entries.delete(oldest);
+    }
+  }
+
+  /**
+   * Drop cached results
+   * @param uri Only drop results for this document (all documents if omitted)
+   * @param metricName Only drop results for this metric (all metrics if omitted)
+   */
+  public invalidate(uri?: string, metricName?: string): void {
+    if (uri === undefined && metricName === undefined) {
+      this.entries.clear();
+      return;
+    }
+
+    for (const key of Array.from(this.entries.keys())) {
+      const { keyUri, keyMetric } = MetricResultCache.parseKey(key);
+      if ((uri === undefined || keyUri === uri) && (metricName === undefined || keyMetric === metricName)) {
+        this.entries.delete(key);
+      }
+    }
+  }
+
+  /**
+   * Number of cached results
+   */
+  public get size(): number {
+    return this.entries.size;
+  }
+
+  private static keyFor(document: vscode.TextDocument, metricName: string): string {
+    return `${document.uri.toString()}\n${document.version}\n${metricName}`;
+  }
+
+  private static parseKey(key: string): { keyUri: string, keyMetric: string } {
+    const parts = key.split('\n');
+    return { keyUri: parts[0], keyMetric: parts[2] };
+  }
+}
@@ -0,0 +1,1076 @@
+import * as vscode from 'vscode';
+
+export type BraceScopeKind = 'module' | 'type' | 'function' | 'constructor' | 'property' | 'control' | 'lambda' | 'block';
+
+/**
+ * A block of a brace language (C#, Java, TypeScript, JavaScript): the module, a brace
+ * block or an expression-bodied member
+ */
+export interface BraceScope {
+  kind: BraceScopeKind;
+  // 'class', 'interface', 'struct', 'enum', 'record', 'namespace' or 'module' for types, the
+  // control keyword ('if', 'else if', 'for', 'try', ...) for control blocks; empty otherwise
+  keyword: string;
+  // Name of a type, function, constructor or property, empty otherwise
+  name: string;
+  // First line of the header, annotations and attributes excluded
+  startLine: number;
+  // Line of the opening brace, or of the arrow of an expression-bodied member
+  openLine: number;
+  // Line of the closing brace, or of the semicolon of an expression-bodied member
+  endLine: number;
+  // Offsets of the header, the opening brace (or arrow) and the closing brace (or semicolon)
+  start: number;
+  open: number;
+  end: number;
+  // A member declared with => and no braces
+  expressionBodied: boolean;
+  // Number of enclosing braces, 0 for the module and 1 for top level blocks
+  depth: number;
+  parent: BraceScope | undefined;
+  children: BraceScope[];
+}
+
+/**
+ * A physical line after tokenization
+ */
+export interface BraceLine {
+  text: string;
+  // The line with comments and string contents replaced by spaces; quotes are kept
+  code: string;
+  hasComment: boolean;
+  // Has code or a string outside of a multiline comment or string
+  hasCode: boolean;
+}
+
+/**
+ * A statement ended by a semicolon
+ */
+export interface BraceStatement {
+  startLine: number;
+  endLine: number;
+  // Offsets of the first character and of the semicolon
+  start: number;
+  end: number;
+  scope: BraceScope;
+}
+
+/**
+ * A lambda arrow (=> or, in Java, ->)
+ */
+export interface BraceLambda {
+  line: number;
+  column: number;
+  // Last line of the body when it is a block or a bracketed expression, the arrow line otherwise
+  endLine: number;
+  // Parameter list as written before the arrow, empty when it could not be read
+  parameters: string;
+  // Variable the lambda is assigned to, empty otherwise
+  name: string;
+  scope: BraceScope;
+}
+
+/**
+ * A brace language document with comments and string contents masked, the first lexer
+ * pass of the scope tree
+ */
+export interface BraceTokens {
+  // Source with comments and string contents replaced by spaces, same offsets as the source
+  code: string;
+  // Offset of the first character of every line
+  lineStarts: number[];
+  // COMMENT and CODE flags of every line
+  lineFlags: number[];
+  // Lines with comment text
+  commentLines: number[];
+}
+
+/**
+ * Structure of a brace language document built from its masked source and shared by
+ * the C-family metrics
+ */
+export interface BraceScopeTree {
+  // Source with comments and string contents replaced by spaces, same offsets as the source
+  code: string;
+  lines: BraceLine[];
+  module: BraceScope;
+  // Brace blocks in source order
+  scopes: BraceScope[];
+  types: BraceScope[];
+  // Named functions and methods, expression-bodied members included, constructors excluded
+  functions: BraceScope[];
+  constructors: BraceScope[];
+  controls: BraceScope[];
+  statements: BraceStatement[];
+  lambdas: BraceLambda[];
+}
+
+interface RawArrow {
+  offset: number;
+  line: number;
+  column: number;
+  scope: number;
+  endLine: number;
+}
+
+interface RawScope {
+  headerStart: number;
+  open: number;
+  openLine: number;
+  close: number;
+  closeLine: number;
+  parent: number;
+  parenBase: number;
+  // Arrow whose body is this block
+  arrow: RawArrow | undefined;
+}
+
+interface RawStatement {
+  start: number;
+  end: number;
+  scope: number;
+}
+
+interface Bracket {
+  segmentStart: number;
+  arrow: RawArrow | undefined;
+}
+
+interface LexedText {
+  code: string;
+  lines: BraceLine[];
+  lineStarts: number[];
+  scopes: RawScope[];
+  statements: RawStatement[];
+  arrows: RawArrow[];
+}
+
+const SCRIPT_LANGUAGES = new Set(['javascript', 'typescript', 'javascriptreact', 'typescriptreact']);
+const REGEX_PRECEDING_CHARACTERS = '(,=:[!&|?{};~+-*%<>^';
+const REGEX_PRECEDING_WORDS = new Set(['return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw', 'yield', 'await']);
+const NON_DECLARATION_WORDS = new Set(['new', 'return', 'await', 'throw', 'yield', 'else', 'typeof', 'case', 'in', 'of', 'delete']);
+const CONTROL_KEYWORDS = new Set(['if', 'else', 'for', 'foreach', 'while', 'do', 'switch', 'try', 'catch', 'finally', 'using', 'lock', 'synchronized', 'fixed', 'checked', 'unchecked', 'unsafe', 'return', 'function', 'super', 'this', 'base']);
+
+const CONTROL_HEADER = /^(else\s+if|if|else|for|foreach|while|do|switch|try|catch|finally|using|lock|synchronized|fixed|checked|unchecked|unsafe)\b/;
+const TYPE_HEADER = /^(?:[\w$]+\s+)*?@?(record\s+(?:struct|class)|class|interface|struct|enum|record|namespace|module)\s+([A-Za-z_$][\w$.]*)/;
+const SCRIPT_ANNOTATIONS = /^(?:\s*@(?!interface\b)[\w$.]+(?:\s*\((?:[^()]|\([^()]*\))*\))?)+/;
+const ANNOTATIONS = /^(?:\s*(?:@(?!interface\b)[\w$.]+(?:\s*\((?:[^()]|\([^()]*\))*\))?|\[[^\]]*\]))+/;
+const DECLARATION_PREFIX = /^[\w$\s<>[\],.?*]*$/;
+const SIGNATURE_TRAILER = /^(?::\s*(?:base|this|super)\s*\((?:[^()]|\([^()]*\))*\)|:[^=(){};]*|throws\s+[\w$.,\s<>]+|where\s[\s\S]*)?$/;
+const PROPERTY_HEADER = /^(?:[\w$<>[\],.?]+\s+)+([A-Za-z_$][\w$]*)$/;
+const FUNCTION_EXPRESSION = /\bfunction\b[\s*]*(?:[A-Za-z_$][\w$]*)?\s*\((?:[^()]|\([^()]*\))*\)\s*$/;
+const LAMBDA_ASSIGNMENT = /\b(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?$/;
+
+// Header lines tried when a header run into the previous statement
+const MAX_HEADER_RETRIES = 8;
+
+// Per line flags collected while lexing
+const COMMENT = 1;
+const CODE = 2;
+
+// String literal kinds
+const VERBATIM = 1;
+const TRIPLE = 2;
+const INTERPOLATED = 4;
+
+// Characters that may start a comment, a string or a line; C# adds its string prefixes,
+// JavaScript and TypeScript their template literals
+const BRACE_SPECIAL = /[\n/"']/g;
+const SCRIPT_SPECIAL = /[\n/"'`]/g;
+const CSHARP_SPECIAL = /[\n/"'@$]/g;
+// Characters that may end, escape or open a hole in a string literal, and slashes that
+// may start a regular expression inside a hole
+const STRING_SPECIAL = new Uint8Array(128);
+for (const char of '\n\\{}"\'`$/') {
+  STRING_SPECIAL[char.charCodeAt(0)] = 1;
+}
+// Characters of the structure: line breaks, brackets, separators and lambda arrows
+const BRACE_STRUCTURE = /[\n{}()[\];,]|=>/g;
+const JAVA_STRUCTURE = /[\n{}()[\];,]|->/g;
+
+const tokensCache = new WeakMap<vscode.TextDocument, { version: number, languageId: string, tokens: BraceTokens }>();
+const cache = new WeakMap<vscode.TextDocument, { version: number, languageId: string, tree: BraceScopeTree }>();
+
+/**
+ * Masked source of a document, tokenized once per document version and shared by its
+ * scope tree and keyword scan
+ * @param document The C#, Java, TypeScript or JavaScript document
+ */
+export function getBraceTokens(document: vscode.TextDocument): BraceTokens {
+  const cached = tokensCache.get(document);
+  if (cached && cached.version === document.version && cached.languageId === document.languageId) {
+    return cached.tokens;
+  }
+
+  const tokens = tokenizeBraceText(document.getText(), document.languageId);
+  tokensCache.set(document, { version: document.version, languageId: document.languageId, tokens });
+  return tokens;
+}
+
+/**
+ * Scope tree of a document, built once per document version
+ * @param document The C#, Java, TypeScript or JavaScript document
+ */
+export function getBraceScopeTree(document: vscode.TextDocument): BraceScopeTree {
+  const cached = cache.get(document);
+  if (cached && cached.version === document.version && cached.languageId === document.languageId) {
+    return cached.tree;
+  }
+
+  const tree = buildBraceScopeTree(document.getText(), document.languageId, getBraceTokens(document));
+  cache.set(document, { version: document.version, languageId: document.languageId, tree });
+  return tree;
+}
+
+/**
+ * Build the scope tree of brace language source code
+ * @param text The source code
+ * @param languageId The language identifier; Java uses -> for lambdas, JavaScript and
+ * TypeScript have template and regular expression literals
+ * @param tokens The masked source of the text, when it was already tokenized
+ */
+export function buildBraceScopeTree(text: string, languageId: string = '', tokens?: BraceTokens): BraceScopeTree {
+  const lexed = findStructure(tokens ?? tokenizeBraceText(text, languageId), text, languageId);
+  const code = lexed.code;
+  const lineOf = (offset: number): number => findLine(lexed.lineStarts, offset);
+  const isScript = SCRIPT_LANGUAGES.has(languageId);
+
+  const module: BraceScope = {
+    kind: 'module', keyword: '', name: '',
+    startLine: 0, openLine: 0, endLine: Math.max(0, lexed.lines.length - 1),
+    start: 0, open: 0, end: text.length,
+    expressionBodied: false, depth: 0, parent: undefined, children: []
+  };
+  const tree: BraceScopeTree = {
+    code, lines: lexed.lines, module, scopes: [], types: [], functions: [],
+    constructors: [], controls: [], statements: [], lambdas: []
+  };
+
+  const scopes: BraceScope[] = [];
+  for (const raw of lexed.scopes) {
+    const parent = raw.parent === -1 ? module : scopes[raw.parent];
+    const header = classifyHeader(code, raw.headerStart, raw.open, parent, isScript);
+    const scope: BraceScope = {
+      kind: raw.arrow ? 'lambda' : header.kind,
+      keyword: raw.arrow ? '' : header.keyword,
+      name: raw.arrow ? '' : header.name,
+      startLine: header.start < raw.open ? lineOf(header.start) : raw.openLine,
+      openLine: raw.openLine,
+      endLine: raw.close === -1 ? module.endLine : raw.closeLine,
+      start: Math.min(header.start, raw.open),
+      open: raw.open,
+      end: raw.close === -1 ? text.length : raw.close,
+      expressionBodied: false,
+      depth: parent.depth + 1,
+      parent,
+      children: []
+    };
+    scopes.push(scope);
+    parent.children.push(scope);
+    tree.scopes.push(scope);
+    addToLists(tree, scope);
+  }
+
+  for (const raw of lexed.statements) {
+    const scope = raw.scope === -1 ? module : scopes[raw.scope];
+    const start = skipWhitespace(code, raw.start, raw.end);
+    if (start === raw.end) {
+      continue;
+    }
+    tree.statements.push({ startLine: lineOf(start), endLine: lineOf(raw.end), start, end: raw.end, scope });
+
+    // Expression-bodied members: int Size() => items.Count;
+    const arrow = scope.kind === 'type' ? code.slice(start, raw.end).indexOf('=>') : -1;
+    if (arrow !== -1) {
+      const header = classifySignature(code.slice(start, start + arrow), scope);
+      if (header) {
+        const member: BraceScope = {
+          kind: header.kind, keyword: '', name: header.name,
+          startLine: lineOf(start), openLine: lineOf(start + arrow), endLine: lineOf(raw.end),
+          start, open: start + arrow, end: raw.end,
+          expressionBodied: true, depth: scope.depth + 1, parent: scope, children: []
+        };
+        scope.children.push(member);
+        addToLists(tree, member);
+      }
+    }
+  }
+  // Expression-bodied members come after the brace blocks: restore the source order
+  tree.functions.sort((a, b) => a.start - b.start);
+  tree.constructors.sort((a, b) => a.start - b.start);
+
+  for (const arrow of lexed.arrows) {
+    const lineCode = lexed.lines[arrow.line].code;
+    const parametersStart = findLambdaParameters(lineCode, arrow.column);
+    const assignment = LAMBDA_ASSIGNMENT.exec(lineCode.slice(0, parametersStart).trimEnd());
+    tree.lambdas.push({
+      line: arrow.line,
+      column: arrow.column,
+      endLine: Math.max(arrow.line, arrow.endLine),
+      parameters: lineCode.slice(parametersStart, arrow.column).trim(),
+      name: assignment ? assignment[1] : '',
+      scope: arrow.scope === -1 ? module : scopes[arrow.scope]
+    });
+  }
+
+  return tree;
+}
+
+function addToLists(tree: BraceScopeTree, scope: BraceScope): void {
+  switch (scope.kind) {
+    case 'type':
+      tree.types.push(scope);
+      break;
+    case 'function':
+      tree.functions.push(scope);
+      break;
+    case 'constructor':
+      tree.constructors.push(scope);
+      break;
+    case 'control':
+      tree.controls.push(scope);
+      break;
+  }
+}
+
+interface Header {
+  kind: BraceScopeKind;
+  keyword: string;
+  name: string;
+  // Offset of the first character after annotations and attributes
+  start: number;
+}
+
+/**
+ * Classify the block opened by a brace from the code before it
+ * @param code The masked source
+ * @param headerStart Offset after the previous statement, block or bracket
+ * @param open Offset of the brace
+ * @param parent The enclosing scope
+ * @param isScript Whether the language is JavaScript or TypeScript
+ */
+function classifyHeader(code: string, headerStart: number, open: number, parent: BraceScope, isScript: boolean): Header {
+  let start = headerStart;
+  if (parent.kind === 'block') {
+    // Entries of an object literal or an initializer are separated by commas
+    const comma = lastTopLevelComma(code, headerStart, open);
+    if (comma !== -1) {
+      start = comma + 1;
+    }
+  }
+
+  const header = classifyHeaderFrom(code, start, open, parent, isScript);
+  if (header.kind !== 'block' && header.kind !== 'lambda' || endsWithArrow(code.slice(start, open).trimEnd())) {
+    return header;
+  }
+
+  // Without semicolons the previous statement runs into the header
+  // (const MAP = Symbol()\nclass Headers {, #region\nvoid Run() {): retry from the last lines
+  let depth = 0;
+  let retries = 0;
+  for (let i = open - 1; i >= start && retries < MAX_HEADER_RETRIES; i--) {
+    const char = code[i];
+    if (char === ')' || char === ']') {
+      depth++;
+    } else if (char === '(' || char === '[') {
+      depth--;
+    } else if (char === '\n' && depth === 0 && skipWhitespace(code, i, open) < open) {
+      retries++;
+      const retried = classifyHeaderFrom(code, i + 1, open, parent, isScript);
+      if (retried.kind !== 'block' && retried.kind !== 'lambda') {
+        return retried;
+      }
+    }
+  }
+  return header;
+}
+
+function endsWithArrow(text: string): boolean {
+  return text.endsWith('=>') || text.endsWith('->');
+}
+
+function classifyHeaderFrom(code: string, start: number, open: number, parent: BraceScope, isScript: boolean): Header {
+  let header = code.slice(start, open);
+  const annotations = (isScript ? SCRIPT_ANNOTATIONS : ANNOTATIONS).exec(header);
+  if (annotations) {
+    start += annotations[0].length;
+    header = header.slice(annotations[0].length);
+  }
+  start = skipWhitespace(code, start, open);
+  header = header.trim();
+
+  if (header === '') {
+    return { kind: 'block', keyword: '', name: '', start };
+  }
+  if (endsWithArrow(header)) {
+    return { kind: 'lambda', keyword: '', name: '', start };
+  }
+
+  const control = CONTROL_HEADER.exec(header);
+  if (control) {
+    return { kind: 'control', keyword: control[1].replace(/\s+/, ' '), name: '', start };
+  }
+
+  const type = TYPE_HEADER.exec(header);
+  if (type) {
+    return { kind: 'type', keyword: type[1].split(/\s+/)[0], name: type[2], start };
+  }
+
+  const signature = classifySignature(header, parent);
+  if (signature) {
+    return { ...signature, keyword: '', start };
+  }
+  if (FUNCTION_EXPRESSION.test(header)) {
+    // Function expression: callback(function () {, exports.run = function run() {
+    return { kind: 'lambda', keyword: '', name: '', start };
+  }
+
+  const property = parent.kind === 'type' && parent.keyword !== 'enum' ? PROPERTY_HEADER.exec(header) : null;
+  if (property) {
+    return { kind: 'property', keyword: '', name: property[1], start };
+  }
+
+  return { kind: 'block', keyword: '', name: '', start };
+}
+
+/**
+ * Read a method, function or constructor signature: modifiers and types, a name and a
+ * parameter list, optionally followed by a return type, throws, where or a constructor
+ * initializer
+ * @param header The masked header, annotations excluded
+ * @param parent The enclosing scope, to recognize constructors named after their type
+ */
+function classifySignature(header: string, parent: BraceScope): { kind: 'function' | 'constructor', name: string } | undefined {
+  const open = header.indexOf('(');
+  if (open === -1) {
+    return undefined;
+  }
+
+  let depth = 0;
+  let close = -1;
+  for (let i = open; i < header.length; i++) {
+    const char = header[i];
+    if (char === '(') {
+      depth++;
+    } else if (char === ')' && --depth === 0) {
+      close = i;
+      break;
+    }
+  }
+  if (close === -1 || !SIGNATURE_TRAILER.test(header.slice(close + 1).trim())) {
+    return undefined;
+  }
+
+  // The name, skipping type parameters: Map<K, V>(...)
+  let end = open;
+  while (end > 0 && isWhitespace(header.charCodeAt(end - 1))) {
+    end--;
+  }
+  if (header[end - 1] === '>') {
+    let angles = 0;
+    for (end--; end >= 0; end--) {
+      if (header[end] === '>') {
+        angles++;
+      } else if (header[end] === '<' && --angles === 0) {
+        break;
+      }
+    }
+    while (end > 0 && isWhitespace(header.charCodeAt(end - 1))) {
+      end--;
+    }
+  }
+  let nameStart = end;
+  while (nameStart > 0 && /[\w$]/.test(header[nameStart - 1])) {
+    nameStart--;
+  }
+  const name = header.slice(nameStart, end);
+  if (!/^[A-Za-z_$]/.test(name) || CONTROL_KEYWORDS.has(name)) {
+    return undefined;
+  }
+
+  const prefix = header.slice(0, nameStart).trimEnd();
+  const lastWord = /([\w$]+)$/.exec(prefix)?.[1];
+  if (!DECLARATION_PREFIX.test(prefix) || prefix.endsWith('.') || lastWord !== undefined && NON_DECLARATION_WORDS.has(lastWord)) {
+    return undefined;
+  }
+
+  const isConstructor = name === 'constructor' && lastWord !== 'function'
+    || parent.kind === 'type' && name === parent.name;
+  return { kind: isConstructor ? 'constructor' : 'function', name };
+}
+
+/**
+ * Start of the parameters written before a lambda arrow: a parenthesized list or a single
+ * identifier
+ * @param lineCode The masked line
+ * @param column Column of the arrow
+ * @returns The column where the parameters start, the arrow column when there are none
+ */
+function findLambdaParameters(lineCode: string, column: number): number {
+  let end = column;
+  while (end > 0 && isWhitespace(lineCode.charCodeAt(end - 1))) {
+    end--;
+  }
+
+  if (lineCode[end - 1] === ')') {
+    let depth = 0;
+    for (let i = end - 1; i >= 0; i--) {
+      if (lineCode[i] === ')') {
+        depth++;
+      } else if (lineCode[i] === '(' && --depth === 0) {
+        return i;
+      }
+    }
+    return column;
+  }
+
+  let start = end;
+  while (start > 0 && /[\w$]/.test(lineCode[start - 1])) {
+    start--;
+  }
+  return start === end ? column : start;
+}
+
+function lastTopLevelComma(code: string, from: number, to: number): number {
+  let depth = 0;
+  for (let i = to - 1; i >= from; i--) {
+    const char = code[i];
+    if (char === ')' || char === ']') {
+      depth++;
+    } else if (char === '(' || char === '[') {
+      depth--;
+    } else if (char === ',' && depth === 0) {
+      return i;
+    }
+  }
+  return -1;
+}
+
+function skipWhitespace(code: string, from: number, to: number): number {
+  while (from < to && isWhitespace(code.charCodeAt(from))) {
+    from++;
+  }
+  return from;
+}
+
+function skipWhitespaceBack(code: string, from: number): number {
+  while (from >= 0 && isWhitespace(code.charCodeAt(from))) {
+    from--;
+  }
+  return from;
+}
+
+function isWhitespace(char: number): boolean {
+  return char === 32 || char === 10 || char === 9 || char === 13 || char === 12 || char === 11 || char === 0xa0 || char === 0xfeff;
+}
+
+/**
+ * Replace every character but line breaks with a space
+ */
+function blankLines(text: string): string {
+  return text.split('\n')
+    .map(part => part.includes('\r') ? part.replace(/[^\r]/g, ' ') : ' '.repeat(part.length))
+    .join('\n');
+}
+
+function findLine(lineStarts: number[], offset: number): number {
+  let low = 0;
+  let high = lineStarts.length - 1;
+  while (low < high) {
+    const middle = (low + high + 1) >> 1;
+    if (lineStarts[middle] <= offset) {
+      low = middle;
+    } else {
+      high = middle - 1;
+    }
+  }
+  return low;
+}
+
+/**
+ * Mask comments and string contents in a single pass. Only line breaks, slashes, quotes
+ * and string prefixes need a decision: the code between them is skipped with a search.
+ */
+export function tokenizeBraceText(text: string, languageId: string = ''): BraceTokens {
+  return tokenizer.tokenize(text, languageId);
+}
+
+/**
+ * State of a tokenizer pass. A single instance is reused for every document: V8 drops the
+ * optimized code of the methods once the last instance of their class is collected.
+ */
+class BraceTokenizer {
+  private text = '';
+  private length = 0;
+  private isScript = false;
+  private isCSharp = false;
+  private lineStarts: number[] = [];
+  private lineFlags: number[] = [];
+  private commentLines: number[] = [];
+  // Masked ranges [from, to), in order
+  private masked: number[] = [];
+  private multilineMasks = new Set<number>();
+  private line = 0;
+  private flags = 0;
+  // Offset of the last character outside comments and strings that is not whitespace
+  private previous = -1;
+
+  public tokenize(text: string, languageId: string): BraceTokens {
+    this.text = text;
+    this.length = text.length;
+    this.isScript = SCRIPT_LANGUAGES.has(languageId);
+    this.isCSharp = languageId === 'csharp';
+    this.lineStarts = [0];
+    this.lineFlags = [];
+    this.commentLines = [];
+    this.masked = [];
+    this.multilineMasks.clear();
+    this.line = 0;
+    this.flags = 0;
+    this.previous = -1;
+    try {
+      return this.scan();
+    } finally {
+      // Release the document until the next pass
+      this.text = '';
+      this.lineStarts = [];
+      this.lineFlags = [];
+      this.commentLines = [];
+      this.masked = [];
+      this.multilineMasks.clear();
+    }
+  }
+
+  private scan(): BraceTokens {
+    const text = this.text;
+    const length = this.length;
+    const isScript = this.isScript;
+    const special = this.isCSharp ? CSHARP_SPECIAL : isScript ? SCRIPT_SPECIAL : BRACE_SPECIAL;
+    let i = 0;
+
+    while (i < length) {
+      special.lastIndex = i;
+      const next = special.exec(text)?.index ?? length;
+      // Plain code up to the next special character: its last non-whitespace character is significant
+      let last = next - 1;
+      while (last >= i && isWhitespace(text.charCodeAt(last))) {
+        last--;
+      }
+      if (last >= i) {
+        this.significant(last);
+      }
+      i = next;
+      if (i === length) {
+        break;
+      }
+
+      const char = text.charCodeAt(i);
+      switch (char) {
+        case 10:
+          this.newLine(i);
+          i++;
+          break;
+        case 47: {
+          const next = text.charCodeAt(i + 1);
+          if (next === 47) {
+            let end = text.indexOf('\n', i);
+            if (end === -1) {
+              end = length;
+            }
+            this.flags |= COMMENT;
+            this.mask(i, end, this.line);
+            i = end;
+          } else if (next === 42) {
+            const startLine = this.line;
+            let end = text.indexOf('*/', i + 2);
+            end = end === -1 ? length : end + 2;
+            this.flags |= COMMENT;
+            for (let newline = text.indexOf('\n', i); newline !== -1 && newline < end; newline = text.indexOf('\n', newline + 1)) {
+              this.newLine(newline);
+              this.flags |= COMMENT;
+            }
+            this.mask(i, end, startLine);
+            i = end;
+          } else if (isScript && this.regularExpressionAllowed()) {
+            this.significant(i);
+            i = this.scanRegularExpression(i);
+          } else {
+            this.significant(i);
+            i++;
+          }
+          break;
+        }
+        case 34: {
+          this.significant(i);
+          const triple = !isScript && text.charCodeAt(i + 1) === 34 && text.charCodeAt(i + 2) === 34;
+          i = this.scanString(i + (triple ? 3 : 1), 34, triple ? TRIPLE : 0);
+          break;
+        }
+        case 39:
+          this.significant(i);
+          i = this.scanString(i + 1, 39, 0);
+          break;
+        case 96:
+          this.significant(i);
+          i = this.scanString(i + 1, 96, INTERPOLATED);
+          break;
+        default: {
+          // C# verbatim and interpolated strings: @"", $"", $@"", @$""
+          this.significant(i);
+          let position = i + 1;
+          let verbatim = char === 64;
+          let interpolated = char === 36;
+          const second = text.charCodeAt(position);
+          if ((second === 64 || second === 36) && second !== char) {
+            verbatim = true;
+            interpolated = true;
+            position++;
+          }
+          if (text.charCodeAt(position) === 34) {
+            i = this.scanString(position + 1, 34, (verbatim ? VERBATIM : 0) | (interpolated ? INTERPOLATED : 0));
+          } else {
+            i++;
+          }
+        }
+      }
+    }
+    this.lineFlags.push(this.flags);
+    if ((this.flags & COMMENT) !== 0) {
+      this.commentLines.push(this.line);
+    }
+
+    // Masked source, same length and line breaks as the source
+    const masked = this.masked;
+    let code = '';
+    let copied = 0;
+    for (let r = 0; r < masked.length; r += 2) {
+      const from = masked[r];
+      const to = masked[r + 1];
+      code += text.slice(copied, from);
+      code += this.multilineMasks.has(r) ? blankLines(text.slice(from, to)) : ' '.repeat(to - from);
+      copied = to;
+    }
+    code += text.slice(copied);
+
+    return { code, lineStarts: this.lineStarts, lineFlags: this.lineFlags, commentLines: this.commentLines };
+  }
+
+  private newLine(at: number): void {
+    this.lineFlags.push(this.flags);
+    if ((this.flags & COMMENT) !== 0) {
+      this.commentLines.push(this.line);
+    }
+    this.lineStarts.push(at + 1);
+    this.line++;
+    this.flags = 0;
+  }
+
+  private mask(from: number, to: number, startLine: number): void {
+    if (to > from) {
+      if (this.line !== startLine) {
+        this.multilineMasks.add(this.masked.length);
+      }
+      this.masked.push(from, to);
+    }
+  }
+
+  private significant(at: number): void {
+    this.previous = at;
+    this.flags |= CODE;
+  }
+
+  /**
+   * Mask a string literal, keeping its quotes
+   * @param contentStart Offset after the opening quote(s)
+   * @param quote The closing quote character
+   * @param kind Verbatim (@"", no escapes), triple quoted, or with interpolation holes
+   * @param nested Inside an interpolation hole: the enclosing string masks it
+   * @returns The offset after the string
+   */
+  private scanString(contentStart: number, quote: number, kind: number, nested: boolean = false): number {
+    const text = this.text;
+    const length = this.length;
+    const verbatim = (kind & VERBATIM) !== 0;
+    const triple = (kind & TRIPLE) !== 0;
+    const interpolated = (kind & INTERPOLATED) !== 0;
+    const startLine = this.line;
+    let position = contentStart;
+    let holes = 0;
+
+    while (position < length) {
+      // Every other character only moves past itself
+      let char = text.charCodeAt(position);
+      while (char >= 128 || STRING_SPECIAL[char] === 0) {
+        if (++position === length) {
+          break;
+        }
+        char = text.charCodeAt(position);
+      }
+      if (position === length) {
+        break;
+      }
+
+      if (char === 10) {
+        if (!verbatim && !triple && quote !== 96) {
+          // Unterminated string, it ends with the line
+          break;
+        }
+        this.newLine(position);
+        position++;
+      } else if (char === 92 && !verbatim) {
+        const next = text.charCodeAt(position + 1) === 13 ? position + 2 : position + 1;
+        if (text.charCodeAt(next) === 10) {
+          this.newLine(next);
+        }
+        position = next + 1;
+      } else if (holes > 0) {
+        if (char === 123) {
+          holes++;
+        } else if (char === 125) {
+          holes--;
+        } else if (char === 96 && quote === 96) {
+          // Template literal inside a ${} hole
+          position = this.scanString(position + 1, 96, INTERPOLATED, true);
+          continue;
+        } else if (char === 47 && quote === 96 && REGEX_PRECEDING_CHARACTERS.includes(text[skipWhitespaceBack(text, position - 1)])) {
+          // Regular expression literal inside a ${} hole, its quotes do not start strings
+          const end = this.findRegularExpressionEnd(position);
+          position = text.charCodeAt(end) === 47 ? end + 1 : end;
+          continue;
+        } else if (char === 34 || char === 39 || char === 96) {
+          // String inside a hole, kept on one line
+          let end = position + 1;
+          while (end < length && text.charCodeAt(end) !== char && text.charCodeAt(end) !== 10) {
+            end++;
+          }
+          position = text.charCodeAt(end) === char ? end + 1 : end;
+          continue;
+        }
+        position++;
+      } else if (interpolated && quote === 96 && char === 36 && text.charCodeAt(position + 1) === 123) {
+        holes++;
+        position += 2;
+      } else if (interpolated && quote !== 96 && char === 123) {
+        // {{ is an escaped brace
+        if (text.charCodeAt(position + 1) === 123) {
+          position += 2;
+        } else {
+          holes++;
+          position++;
+        }
+      } else if (char === quote) {
+        if (verbatim && !triple && text.charCodeAt(position + 1) === quote) {
+          position += 2;
+        } else if (triple && !(text.charCodeAt(position + 1) === quote && text.charCodeAt(position + 2) === quote)) {
+          position++;
+        } else {
+          if (!nested) {
+            this.mask(contentStart, position, startLine);
+          }
+          return position + (triple ? 3 : 1);
+        }
+      } else {
+        position++;
+      }
+    }
+
+    position = Math.min(position, length);
+    if (!nested) {
+      this.mask(contentStart, position, startLine);
+    }
+    return position;
+  }
+
+  // Offset of the slash closing a regular expression literal, or of the end of its line
+  private findRegularExpressionEnd(start: number): number {
+    const text = this.text;
+    let position = start + 1;
+    let inClass = false;
+    while (position < this.length) {
+      const char = text.charCodeAt(position);
+      if (char === 10) {
+        break;
+      } else if (char === 92) {
+        position += 2;
+        continue;
+      } else if (char === 91) {
+        inClass = true;
+      } else if (char === 93) {
+        inClass = false;
+      } else if (char === 47 && !inClass) {
+        return position;
+      }
+      position++;
+    }
+    return Math.min(position, this.length);
+  }
+
+  private scanRegularExpression(start: number): number {
+    const end = this.findRegularExpressionEnd(start);
+    this.mask(start + 1, end, this.line);
+    if (this.text.charCodeAt(end) !== 47) {
+      return end;
+    }
+    let position = end + 1;
+    while (position < this.length && /[a-z]/.test(this.text[position])) {
+      position++;
+    }
+    return position;
+  }
+
+  private regularExpressionAllowed(): boolean {
+    if (this.previous === -1) {
+      return true;
+    }
+    const char = this.text[this.previous];
+    if (REGEX_PRECEDING_CHARACTERS.includes(char)) {
+      return true;
+    }
+    if (!/[\w$]/.test(char)) {
+      return false;
+    }
+    let start = this.previous;
+    while (start > 0 && /[\w$]/.test(this.text[start - 1])) {
+      start--;
+    }
+    return REGEX_PRECEDING_WORDS.has(this.text.slice(start, this.previous + 1));
+  }
+}
+
+const tokenizer = new BraceTokenizer();
+
+/**
+ * Split the source and its masked code in lines, without the carriage returns
+ */
+function splitLines(text: string, tokens: BraceTokens): BraceLine[] {
+  const texts = text.split('\n');
+  const codes = tokens.code.split('\n');
+  const lines: BraceLine[] = new Array(texts.length);
+  for (let index = 0; index < texts.length; index++) {
+    const lineText = texts[index];
+    const hasReturn = lineText.endsWith('\r');
+    lines[index] = {
+      text: hasReturn ? lineText.slice(0, -1) : lineText,
+      code: hasReturn ? codes[index].slice(0, -1) : codes[index],
+      hasComment: (tokens.lineFlags[index] & COMMENT) !== 0,
+      hasCode: (tokens.lineFlags[index] & CODE) !== 0
+    };
+  }
+  return lines;
+}
+
+/**
+ * Record braces, statements and lambda arrows from the masked source, where comments and
+ * string contents are spaces. Only bracket, separator, arrow and line break characters
+ * need a decision; the code between them is skipped with a search.
+ */
+function findStructure(tokens: BraceTokens, text: string, languageId: string): LexedText {
+  const code = tokens.code;
+  const lineStarts = tokens.lineStarts;
+  const length = code.length;
+  const structure = languageId === 'java' ? JAVA_STRUCTURE : BRACE_STRUCTURE;
+
+  const scopes: RawScope[] = [];
+  const statements: RawStatement[] = [];
+  const arrows: RawArrow[] = [];
+  const openScopes: number[] = [];
+  const brackets: Bracket[] = [];
+
+  let line = 0;
+  let segmentStart = 0;
+  let parenBase = 0;
+  // The arrow of a lambda whose body may start at the next bracket, and the offset after it
+  let pendingArrow: RawArrow | undefined;
+  let arrowEnd = 0;
+
+  const currentScope = (): number => openScopes.length > 0 ? openScopes[openScopes.length - 1] : -1;
+
+  // The arrow before a bracket, when only whitespace separates them
+  const takeArrow = (at: number): RawArrow | undefined => {
+    const arrow = pendingArrow && skipWhitespace(code, arrowEnd, at) === at ? pendingArrow : undefined;
+    pendingArrow = undefined;
+    return arrow;
+  };
+
+  structure.lastIndex = 0;
+  let match: RegExpExecArray | null;
+  while ((match = structure.exec(code)) !== null) {
+    const i = match.index;
+    const char = code.charCodeAt(i);
+
+    switch (char) {
+      case 10:
+        line++;
+        break;
+      case 123: {
+        const arrow = takeArrow(i);
+        scopes.push({
+          headerStart: segmentStart, open: i, openLine: line, close: -1, closeLine: -1,
+          parent: currentScope(), parenBase: brackets.length, arrow
+        });
+        openScopes.push(scopes.length - 1);
+        parenBase = brackets.length;
+        segmentStart = i + 1;
+        break;
+      }
+      case 125: {
+        pendingArrow = undefined;
+        if (openScopes.length > 0) {
+          const scope = scopes[openScopes.pop()!];
+          scope.close = i;
+          scope.closeLine = line;
+          if (scope.arrow) {
+            scope.arrow.endLine = line;
+          }
+          // Recover from brackets left open inside the block
+          brackets.length = scope.parenBase;
+          parenBase = openScopes.length > 0 ? scopes[currentScope()].parenBase : 0;
+        }
+        segmentStart = i + 1;
+        break;
+      }
+      case 40: case 91: {
+        const arrow = takeArrow(i);
+        brackets.push({ segmentStart, arrow });
+        segmentStart = i + 1;
+        break;
+      }
+      case 41: case 93:
+        pendingArrow = undefined;
+        if (brackets.length > parenBase) {
+          const bracket = brackets.pop()!;
+          segmentStart = bracket.segmentStart;
+          if (bracket.arrow) {
+            bracket.arrow.endLine = line;
+          }
+        }
+        break;
+      case 59:
+        pendingArrow = undefined;
+        if (brackets.length === parenBase) {
+          statements.push({ start: segmentStart, end: i, scope: currentScope() });
+          segmentStart = i + 1;
+        }
+        break;
+      case 44:
+        pendingArrow = undefined;
+        if (brackets.length > parenBase) {
+          segmentStart = i + 1;
+        }
+        break;
+      default:
+        // => or ->, unless it ends an operator such as >= or -->
+        if (!(char === 61 ? /[=<>!]/ : /-/).test(text[i - 1] ?? '')) {
+          const arrow: RawArrow = { offset: i, line, column: i - lineStarts[line], scope: currentScope(), endLine: line };
+          arrows.push(arrow);
+          pendingArrow = arrow;
+          arrowEnd = i + 2;
+        } else {
+          // Only the first character of a rejected arrow is consumed
+          structure.lastIndex = i + 1;
+        }
+    }
+  }
+
+  return { code, lines: splitLines(text, tokens), lineStarts, scopes, statements, arrows };
+}
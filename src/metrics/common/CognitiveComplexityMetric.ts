@@ -1,5 +1,6 @@
 import { Metric, MetricResult } from '../Metric';
 import * as vscode from 'vscode';
+import { getBraceComplexity } from './IncrementalBraceAnalysis';
 
 export const CognitiveComplexityMetric: Metric = {
   name: 'cognitiveComplexity',
@@ -8,6 +9,7 @@ export const CognitiveComplexityMetric: Metric = {
   action: {
     method: 'highlightMaxDepth',
   },
+  incremental: true,
   extract(document: vscode.TextDocument): MetricResult {
     /**
      * Cálculo de Complejidad Cognitiva:
@@ -34,70 +36,8 @@ export const CognitiveComplexityMetric: Metric = {
      * El valor final es una estimación que refleja la dificultad de lectura y mantenimiento.
      */
 
-    const text = document.getText();
-    const lines = text.split('\n');
-
-    let complexity = 0;
-    let nestingLevel = 0;
-    let maxLine = 0;
-    let inBlockComment = false;
-
-    const controlPatterns = [
-      /\b(if|else if|else|for|while|switch|case|catch|try|finally)\b/,
-      /\b(do)\s*{?/,
-    ];
-    const logicalOperatorPattern = /(&&|\|\|)/;
-    const jumpPattern = /\b(return|break|continue|throw)\b/;
-    const lambdaPatterns = [/=>/, /->/];  // C# and Java
-
-
-    let lambdaNestingLevel = 0;
-
-    for (let i = 0; i < lines.length; i++) {
-      let line = lines[i].trim();
-
-      // Saltar comentarios de bloque
-      if (inBlockComment) {
-        if (line.includes('*/')) inBlockComment = false;
-        continue;
-      }
-      if (line.startsWith('/*')) {
-        inBlockComment = true;
-        continue;
-      }
-
-      // Saltar comentarios de línea y líneas vacías
-      if (line.startsWith('//') || line === '') continue;
-
-      line = line.replace(/(['"`])(\\.|[^\\])*?\1/g, '');
-
-      if (controlPatterns.some(p => p.test(line))) {
-        complexity += 1 + nestingLevel;
-        maxLine = i;
-        nestingLevel++;
-      }
-
-      if (logicalOperatorPattern.test(line)) {
-        complexity += 1;
-      }
-
-      if (jumpPattern.test(line)) {
-        complexity += 1;
-      }
-
-      if (lambdaPatterns.some(p => p.test(line))) {
-        lambdaNestingLevel++;
-        complexity += 2 * lambdaNestingLevel;
-        maxLine = i;
-      }
-
-      const closeBraces = (line.match(/}/g) || []).length;
-      nestingLevel -= closeBraces;
-      if (nestingLevel < 0) nestingLevel = 0;
-
-      lambdaNestingLevel -= closeBraces;
-      if (lambdaNestingLevel < 0) lambdaNestingLevel = 0;
-    }
+    // Las reglas se aplican línea a línea sobre el código enmascarado, ver IncrementalBraceAnalysis
+    const { complexity, maxLine } = getBraceComplexity(document);
 
     return {
       label: 'Complejidad Cognitiva estimada',
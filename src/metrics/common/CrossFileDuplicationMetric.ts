@@ -0,0 +1,35 @@
+import { Metric, MetricResult } from '../Metric';
+import * as vscode from 'vscode';
+import { CloneIndex } from '../../duplication/CloneIndex';
+
+export const CrossFileDuplicationMetric: Metric = {
+  name: 'crossFileDuplication',
+  description: 'el porcentaje de líneas del archivo que también aparecen en otros archivos del proyecto.',
+  hasAction: true,
+  action: {
+    method: 'highlightCrossFileDuplicates',
+  },
+  // Reads the workspace clone index, which only lives on the extension host
+  requiresEditor: true,
+  // Depends on how much of the workspace is indexed, so it is no training data
+  sidebarOnly: true,
+
+  extract(document: vscode.TextDocument): MetricResult {
+    const duplication = CloneIndex.getInstance().findCrossFileDuplicates(document.uri.fsPath, document.getText());
+
+    const duplicationPercentage = duplication.totalNonEmptyLines > 0
+      ? (duplication.duplicatedLineCount / duplication.totalNonEmptyLines) * 100
+      : 0;
+
+    return {
+      label: 'Porcentaje de código duplicado en otros archivos (%)',
+      value: Math.round(duplicationPercentage * 100) / 100,
+      duplicatedBlocks: duplication.matches.map((match, index) => ({
+        startLine: match.startLine,
+        endLine: match.endLine,
+        blockId: `${index + 1}`
+      })),
+      cloneMatches: duplication.matches
+    };
+  },
+};
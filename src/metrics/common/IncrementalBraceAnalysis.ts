@@ -0,0 +1,921 @@
+import * as vscode from 'vscode';
+import { BraceLine, BraceScope, BraceScopeTree, buildBraceScopeTree, getBraceScopeTree, tokenizeBraceText } from './BraceScopeTree';
+import { KeywordScan, ScanMatch, getKeywordScan, scanSource } from './KeywordScan';
+import { normalizeCodeLine } from '../../duplication/CodeNormalizer';
+import { BLOCK_SIZE, NormalizedBlocks, hashBlock } from '../../duplication/NormalizedBlocks';
+
+/**
+ * A method, function or constructor of a brace language document
+ */
+export interface BraceMember {
+  kind: 'function' | 'constructor';
+  name: string;
+  // Name of the enclosing scope, the type for constructors
+  parentName: string;
+  startLine: number;
+  endLine: number;
+}
+
+/**
+ * A lambda arrow, with the lines of its body
+ */
+export interface BraceLambdaSummary {
+  line: number;
+  endLine: number;
+  // Parameter list as written before the arrow, empty when it could not be read
+  parameters: string;
+  // Variable the lambda is assigned to, empty otherwise
+  name: string;
+}
+
+/**
+ * The part of the scope tree read by the method, nesting, lambda and class metrics
+ */
+export interface BraceSummary {
+  // Functions and constructors in source order
+  members: BraceMember[];
+  maxDepth: number;
+  // Opening line of the first block at the maximum depth
+  maxDepthLine: number;
+  // In source order
+  lambdas: BraceLambdaSummary[];
+  // Types declared with the class keyword
+  classCount: number;
+}
+
+/**
+ * Cognitive complexity of a document, scored line by line with the rules of
+ * CognitiveComplexityMetric
+ */
+export interface BraceComplexity {
+  complexity: number;
+  // Last line with a control structure or a lambda, 0 when there is none
+  maxLine: number;
+}
+
+/**
+ * A function or constructor declared directly in a class, struct or record
+ */
+export interface CohesionMember {
+  // Index of the class in BraceCohesion.declaredProperties
+  classIndex: number;
+  kind: 'function' | 'constructor';
+  name: string;
+  startLine: number;
+  endLine: number;
+  expressionBodied: boolean;
+  // Names assigned with this.name = in the body, which are properties of the class too
+  assignedFields: string[];
+  // Identifiers of the body: a property is used when it is one of them
+  identifiers: Set<string>;
+}
+
+/**
+ * The part of the scope tree read by the method cohesion metric
+ */
+export interface BraceCohesion {
+  // Fields and properties declared in the body of every class, struct and record, in source order
+  declaredProperties: string[][];
+  // In source order
+  members: CohesionMember[];
+}
+
+// Nesting of control structures and lambdas, carried from one line to the next
+interface ComplexityState {
+  nesting: number;
+  lambdaNesting: number;
+}
+
+/**
+ * Complexity of a range of lines, with the nesting before and after it
+ */
+interface ComplexityPart {
+  entry: ComplexityState;
+  exit: ComplexityState;
+  complexity: number;
+  // Last line with a control structure or a lambda, relative to the range; -1 when there is none
+  lastLine: number;
+}
+
+/**
+ * A lambda of a segment. Its body may end in a later segment: the end line is relative
+ * to that segment, so it follows the edits between them.
+ */
+interface SegmentLambda extends BraceLambdaSummary {
+  endSegment: number;
+}
+
+/**
+ * What a segment adds to every incremental result, with lines relative to the segment
+ */
+interface SegmentSummary {
+  members: BraceMember[];
+  maxDepth: number;
+  maxDepthLine: number;
+  lambdas: SegmentLambda[];
+  classCount: number;
+  // Keyword scan matches, by line then keywords before imports
+  keywords: ScanMatch[];
+  keywordCounts: KeywordScan['counts'];
+  commentLines: number[];
+  complexity: ComplexityPart;
+  cohesionMembers: CohesionMember[];
+  // Lines that are not blank, for the block duplication percentage
+  nonEmptyLineCount: number;
+}
+
+/**
+ * A range of whole lines: either a top-level method, whose summary can be recomputed
+ * on its own, or the code between two methods. Lines in the summary are relative to
+ * startLine, so the segments after an edit only need their startLine shifted.
+ */
+interface Segment {
+  startLine: number;
+  lineCount: number;
+  summary: SegmentSummary;
+  method?: {
+    kind: 'function' | 'constructor';
+    name: string;
+    parentName: string;
+    depth: number;
+    // Index of the enclosing class for the cohesion metric, -1 outside classes
+    classIndex: number;
+  };
+}
+
+/**
+ * Per-method state of a document version. Plain data, so a worker thread can build it
+ * and post it to the extension host.
+ */
+export interface IncrementalState {
+  version: number;
+  languageId: string;
+  lineCount: number;
+  segments: Segment[];
+  // Declared in class bodies, outside methods, so edits inside a method keep them
+  declaredProperties: string[][];
+  normalizedLines: string[];
+  // Hash of the block starting at every line, see NormalizedBlocks
+  blockHashes: (string | undefined)[];
+}
+
+/**
+ * Results of a document version, each combined when a metric first reads it
+ */
+interface CombinedResults {
+  version: number;
+  languageId: string;
+  summary?: BraceSummary;
+  complexity?: BraceComplexity;
+  cohesion?: BraceCohesion;
+  keywordScan?: KeywordScan;
+  blocks?: NormalizedBlocks;
+}
+
+export interface IncrementalStats {
+  fullPasses: number;
+  incrementalUpdates: number;
+  fallbacks: number;
+}
+
+const CONTROL_PATTERNS = [
+  /\b(if|else if|else|for|while|switch|case|catch|try|finally)\b/,
+  /\b(do)\s*{?/,
+];
+const LOGICAL_OPERATOR = /(&&|\|\|)/;
+const JUMP = /\b(return|break|continue|throw)\b/;
+// C# and TypeScript arrows, Java arrows
+const LAMBDA_PATTERNS = [/=>/, /->/];
+const NO_NESTING: ComplexityState = { nesting: 0, lambdaNesting: 0 };
+
+const CLASS_KEYWORDS = new Set(['class', 'struct', 'record']);
+// TS/JS fields with a type annotation: private readonly items: Item[]
+const TYPED_FIELD = /^\s*(?:(?:public|private|protected|readonly|static|declare|override|abstract|accessor)\s+)*#?([A-Za-z_$][\w$]*)\s*[?!]?\s*:/;
+// Last identifier of the declaration: private int _count, List<int> items, x
+const DECLARED_NAME = /#?([A-Za-z_$][\w$]*)\s*$/;
+const CONSTRUCTOR_ASSIGNMENT = /\bthis\.#?([A-Za-z_$][\w$]*)\s*=(?![=>])/g;
+// Property names are made of these characters only, so a name surrounded by other
+// characters in a body is exactly one of its identifiers
+const IDENTIFIER = /[\w$]+/g;
+
+// Only the document shown in the sidebar keeps per-method state
+let trackedUri: string | undefined;
+let state: IncrementalState | undefined;
+const results = new WeakMap<vscode.TextDocument, CombinedResults>();
+const stats: IncrementalStats = { fullPasses: 0, incrementalUpdates: 0, fallbacks: 0 };
+
+/**
+ * Keep per-method state for a document, so edits inside one method only reanalyze
+ * that method. Replaces the previously tracked document.
+ * @param document The document shown in the sidebar, undefined to stop tracking
+ */
+export function trackIncrementalDocument(document: vscode.TextDocument | undefined): void {
+  const uri = document?.uri.toString();
+  if (uri !== trackedUri) {
+    trackedUri = uri;
+    state = undefined;
+  }
+}
+
+/**
+ * Whether a document keeps per-method state, in which case its incremental metrics
+ * should run on the thread that receives the change events. Python documents have
+ * their own scope tree and keep none.
+ */
+export function isIncrementalDocument(document: vscode.TextDocument): boolean {
+  return trackedUri !== undefined && document.languageId !== 'python' && document.uri.toString() === trackedUri;
+}
+
+/**
+ * Whether the tracked document has per-method state for its current version, so its
+ * incremental metrics only recombine it
+ * @param document Any document
+ */
+export function hasIncrementalState(document: vscode.TextDocument): boolean {
+  return !!state && isIncrementalDocument(document)
+    && state.version === document.version && state.languageId === document.languageId;
+}
+
+/**
+ * Build the per-method state of a document from scratch. Runs in a worker thread for
+ * the tracked document, whose state then goes to adoptIncrementalState.
+ * @param document The C#, Java, TypeScript or JavaScript document
+ */
+export function computeIncrementalState(document: vscode.TextDocument): IncrementalState {
+  return buildState(document);
+}
+
+/**
+ * Use per-method state built in a worker thread for the tracked document
+ * @param document The document the state was built for
+ * @param built The state returned by computeIncrementalState
+ * @returns Whether the state was kept: the document is still tracked and at that version
+ */
+export function adoptIncrementalState(document: vscode.TextDocument, built: IncrementalState): boolean {
+  if (!isIncrementalDocument(document) || built.version !== document.version || built.languageId !== document.languageId) {
+    return false;
+  }
+  state = built;
+  stats.fullPasses++;
+  return true;
+}
+
+export function getIncrementalStats(): IncrementalStats {
+  return { ...stats };
+}
+
+/**
+ * Update the per-method state of the tracked document after an edit. When every
+ * change falls inside one top-level method and the method keeps its signature and
+ * braces, only that method is lexed, scanned and hashed again; otherwise the state is
+ * dropped and the next result is a full pass.
+ * @param document The document after the edit
+ * @param changes The changes of the edit, with ranges of the previous version
+ * @returns Whether the state was updated incrementally
+ */
+export function applyIncrementalChanges(document: vscode.TextDocument, changes: readonly vscode.TextDocumentContentChangeEvent[]): boolean {
+  if (!state || !isIncrementalDocument(document)) {
+    return false;
+  }
+  const previous = state;
+  state = undefined;
+  if (previous.version !== document.version - 1 || previous.languageId !== document.languageId || changes.length === 0) {
+    stats.fallbacks++;
+    return false;
+  }
+
+  const index = findSegment(previous.segments, changes[0].range.start.line);
+  const segment = previous.segments[index];
+  const inside = changes.every(change => change.range.start.line >= segment.startLine
+    && change.range.end.line < segment.startLine + segment.lineCount);
+  const delta = changes.reduce((sum, change) =>
+    sum + countLineBreaks(change.text) - (change.range.end.line - change.range.start.line), 0);
+
+  const lineCount = segment.lineCount + delta;
+  const method = segment.method && inside && previous.lineCount + delta === document.lineCount && lineCount > 0
+    ? summarizeMethod(document, segment.startLine, lineCount, segment.method, index, segment.summary.complexity)
+    : undefined;
+  if (!method) {
+    stats.fallbacks++;
+    return false;
+  }
+
+  const segments = previous.segments.slice();
+  segments[index] = { ...segment, lineCount, summary: method.summary };
+  for (let i = index + 1; i < segments.length; i++) {
+    segments[i] = { ...segments[i], startLine: segments[i].startLine + delta };
+  }
+
+  // Blocks that overlap the method are hashed again, the rest move with their lines
+  const start = segment.startLine;
+  const normalizedLines = previous.normalizedLines.slice(0, start)
+    .concat(method.normalizedLines, previous.normalizedLines.slice(start + segment.lineCount));
+  const blockHashes = previous.blockHashes.slice(0, start)
+    .concat(new Array<string | undefined>(lineCount), previous.blockHashes.slice(start + segment.lineCount));
+  for (let line = Math.max(0, start - BLOCK_SIZE + 1); line < start + lineCount; line++) {
+    blockHashes[line] = hashBlock(normalizedLines, line);
+  }
+
+  state = { ...previous, version: document.version, lineCount: document.lineCount, segments, normalizedLines, blockHashes };
+  stats.incrementalUpdates++;
+  return true;
+}
+
+/**
+ * Methods and maximum nesting, lambdas and classes of a brace language document. For the
+ * tracked document the summary is recombined from the per-method state; other documents
+ * are summarized from their scope tree.
+ * @param document The C#, Java, TypeScript or JavaScript document
+ */
+export function getBraceSummary(document: vscode.TextDocument): BraceSummary {
+  const cached = getResults(document);
+  if (!cached.summary) {
+    cached.summary = isIncrementalDocument(document)
+      ? combineSummaries(getState(document).segments)
+      : summarizeTree(getBraceScopeTree(document));
+  }
+  return cached.summary;
+}
+
+/**
+ * Cognitive complexity of a brace language document, recombined from the per-method
+ * state for the tracked document
+ * @param document The C#, Java, TypeScript or JavaScript document
+ */
+export function getBraceComplexity(document: vscode.TextDocument): BraceComplexity {
+  const cached = getResults(document);
+  if (!cached.complexity) {
+    if (isIncrementalDocument(document)) {
+      cached.complexity = combineComplexity(getState(document).segments);
+    } else {
+      const lines = getBraceScopeTree(document).lines;
+      const part = scoreComplexity(lines, 0, lines.length, NO_NESTING);
+      cached.complexity = { complexity: part.complexity, maxLine: Math.max(0, part.lastLine) };
+    }
+  }
+  return cached.complexity;
+}
+
+/**
+ * Class properties and methods of a brace language document, recombined from the
+ * per-method state for the tracked document
+ * @param document The C#, Java, TypeScript or JavaScript document
+ */
+export function getBraceCohesion(document: vscode.TextDocument): BraceCohesion {
+  const cached = getResults(document);
+  if (!cached.cohesion) {
+    if (isIncrementalDocument(document)) {
+      const current = getState(document);
+      cached.cohesion = { declaredProperties: current.declaredProperties, members: combineCohesionMembers(current.segments) };
+    } else {
+      cached.cohesion = collectCohesion(getBraceScopeTree(document));
+    }
+  }
+  return cached.cohesion;
+}
+
+/**
+ * Keyword scan of the tracked document, recombined from the per-method state
+ * @param document Any document
+ * @returns The scan, undefined when the document keeps no per-method state
+ */
+export function getIncrementalKeywordScan(document: vscode.TextDocument): KeywordScan | undefined {
+  if (!isIncrementalDocument(document)) {
+    return undefined;
+  }
+  const cached = getResults(document);
+  if (!cached.keywordScan) {
+    const current = getState(document);
+    cached.keywordScan = combineKeywordScans(current.segments, current.lineCount);
+  }
+  return cached.keywordScan;
+}
+
+/**
+ * Hashed blocks of normalized lines of the tracked document, kept up to date per method
+ * @param document Any document
+ * @returns The blocks, undefined when the document keeps no per-method state
+ */
+export function getIncrementalBlocks(document: vscode.TextDocument): NormalizedBlocks | undefined {
+  if (!isIncrementalDocument(document)) {
+    return undefined;
+  }
+  const cached = getResults(document);
+  if (!cached.blocks) {
+    const current = getState(document);
+    const nonEmptyLineCount = current.segments.reduce((sum, segment) => sum + segment.summary.nonEmptyLineCount, 0);
+    cached.blocks = { hashes: current.blockHashes, nonEmptyLineCount };
+  }
+  return cached.blocks;
+}
+
+/**
+ * Summary of a whole scope tree
+ * @param tree The scope tree of a document
+ */
+export function summarizeTree(tree: BraceScopeTree): BraceSummary {
+  const members = [...tree.functions, ...tree.constructors]
+    .sort((a, b) => a.start - b.start)
+    .map(scope => ({
+      kind: scope.kind as 'function' | 'constructor',
+      name: scope.name,
+      parentName: scope.parent?.name ?? '',
+      startLine: scope.startLine,
+      endLine: scope.endLine
+    }));
+
+  let maxDepth = 0;
+  let maxDepthLine = 0;
+  for (const scope of tree.scopes) {
+    if (scope.depth > maxDepth) {
+      maxDepth = scope.depth;
+      maxDepthLine = scope.openLine;
+    }
+  }
+
+  const lambdas = tree.lambdas.map(lambda => ({
+    line: lambda.line,
+    endLine: lambda.endLine,
+    parameters: lambda.parameters,
+    name: lambda.name
+  }));
+  const classCount = tree.types.filter(type => type.keyword === 'class').length;
+  return { members, maxDepth, maxDepthLine, lambdas, classCount };
+}
+
+function getResults(document: vscode.TextDocument): CombinedResults {
+  let cached = results.get(document);
+  if (!cached || cached.version !== document.version || cached.languageId !== document.languageId) {
+    cached = { version: document.version, languageId: document.languageId };
+    results.set(document, cached);
+  }
+  return cached;
+}
+
+function getState(document: vscode.TextDocument): IncrementalState {
+  if (!state || state.version !== document.version || state.languageId !== document.languageId) {
+    state = buildState(document);
+    stats.fullPasses++;
+  }
+  return state;
+}
+
+function buildState(document: vscode.TextDocument): IncrementalState {
+  const tree = getBraceScopeTree(document);
+  const scan = getKeywordScan(document);
+  const cohesion = collectCohesion(tree);
+  const methods = findIndependentMethods(tree);
+
+  // Every member, block and match goes to the segment holding its first line
+  const boundaries: { startLine: number, lineCount: number, method?: BraceScope }[] = [];
+  let nextLine = 0;
+  for (const method of methods) {
+    boundaries.push({ startLine: nextLine, lineCount: method.startLine - nextLine });
+    boundaries.push({ startLine: method.startLine, lineCount: method.endLine - method.startLine + 1, method });
+    nextLine = method.endLine + 1;
+  }
+  boundaries.push({ startLine: nextLine, lineCount: Math.max(0, document.lineCount - nextLine) });
+
+  const classIndexes = new Map(tree.types.filter(type => CLASS_KEYWORDS.has(type.keyword)).map((type, index) => [type, index]));
+  const segments: Segment[] = boundaries.map(boundary => ({
+    startLine: boundary.startLine,
+    lineCount: boundary.lineCount,
+    summary: emptySummary(),
+    method: boundary.method && {
+      kind: boundary.method.kind as 'function' | 'constructor',
+      name: boundary.method.name,
+      parentName: boundary.method.parent?.name ?? '',
+      depth: boundary.method.depth,
+      classIndex: classIndexes.get(boundary.method.parent!) ?? -1
+    }
+  }));
+
+  const segmentOf = (line: number): Segment => segments[findSegment(segments, line)];
+  const whole = summarizeTree(tree);
+  for (const member of whole.members) {
+    const segment = segmentOf(member.startLine);
+    segment.summary.members.push({ ...member, startLine: member.startLine - segment.startLine, endLine: member.endLine - segment.startLine });
+  }
+  for (const scope of tree.scopes) {
+    const segment = segmentOf(scope.openLine);
+    if (scope.depth > segment.summary.maxDepth) {
+      segment.summary.maxDepth = scope.depth;
+      segment.summary.maxDepthLine = scope.openLine - segment.startLine;
+    }
+  }
+  for (const lambda of whole.lambdas) {
+    const segment = segmentOf(lambda.line);
+    const endSegment = findSegment(segments, lambda.endLine);
+    segment.summary.lambdas.push({
+      ...lambda,
+      line: lambda.line - segment.startLine,
+      endSegment,
+      endLine: lambda.endLine - segments[endSegment].startLine
+    });
+  }
+  for (const type of tree.types) {
+    if (type.keyword === 'class') {
+      segmentOf(type.startLine).summary.classCount++;
+    }
+  }
+  for (const match of scan.matches) {
+    const segment = segmentOf(match.line);
+    segment.summary.keywords.push({ ...match, line: match.line - segment.startLine });
+  }
+  for (const line of scan.commentLines) {
+    const segment = segmentOf(line);
+    segment.summary.commentLines.push(line - segment.startLine);
+  }
+  for (const member of cohesion.members) {
+    const segment = segmentOf(member.startLine);
+    segment.summary.cohesionMembers.push({ ...member, startLine: member.startLine - segment.startLine, endLine: member.endLine - segment.startLine });
+  }
+
+  const normalizedLines: string[] = new Array(document.lineCount);
+  let entry = NO_NESTING;
+  for (const segment of segments) {
+    segment.summary.keywordCounts = countMatches(segment.summary.keywords);
+    segment.summary.complexity = scoreComplexity(tree.lines, segment.startLine, segment.startLine + segment.lineCount, entry);
+    entry = segment.summary.complexity.exit;
+    for (let line = segment.startLine; line < segment.startLine + segment.lineCount; line++) {
+      const text = document.lineAt(line).text;
+      if (text.trim() !== '') {
+        segment.summary.nonEmptyLineCount++;
+      }
+      normalizedLines[line] = normalizeCodeLine(text);
+    }
+  }
+  const blockHashes = normalizedLines.map((_, line) => hashBlock(normalizedLines, line));
+
+  return {
+    version: document.version,
+    languageId: document.languageId,
+    lineCount: document.lineCount,
+    segments,
+    declaredProperties: cohesion.declaredProperties,
+    normalizedLines,
+    blockHashes
+  };
+}
+
+function emptySummary(): SegmentSummary {
+  return {
+    members: [],
+    maxDepth: 0,
+    maxDepthLine: 0,
+    lambdas: [],
+    classCount: 0,
+    keywords: [],
+    keywordCounts: { if: 0, loop: 0, import: 0 },
+    commentLines: [],
+    complexity: { entry: NO_NESTING, exit: NO_NESTING, complexity: 0, lastLine: -1 },
+    cohesionMembers: [],
+    nonEmptyLineCount: 0
+  };
+}
+
+/**
+ * Top-level methods that can be lexed on their own: not nested in another method,
+ * with braces, and sharing their first and last lines with no code outside of them
+ */
+function findIndependentMethods(tree: BraceScopeTree): BraceScope[] {
+  const owner = new Map<BraceScope, BraceScope | undefined>();
+  const candidates = new Set<BraceScope>();
+  for (const scope of tree.scopes) {
+    const parentOwner = scope.parent ? owner.get(scope.parent) : undefined;
+    if (!parentOwner && (scope.kind === 'function' || scope.kind === 'constructor')) {
+      candidates.add(scope);
+      owner.set(scope, scope);
+    } else {
+      owner.set(scope, parentOwner);
+    }
+  }
+
+  // Lines where code that belongs to no candidate starts or ends
+  const outsideLines = new Set<number>();
+  const markOutside = (scope: BraceScope, ...lines: number[]): void => {
+    if (!owner.get(scope)) {
+      lines.forEach(line => outsideLines.add(line));
+    }
+  };
+  for (const scope of tree.scopes) {
+    if (!candidates.has(scope)) {
+      markOutside(scope, scope.startLine, scope.openLine, scope.endLine);
+    }
+  }
+  for (const member of [...tree.functions, ...tree.constructors]) {
+    if (member.expressionBodied) {
+      markOutside(member.parent!, member.startLine, member.endLine);
+    }
+  }
+  for (const statement of tree.statements) {
+    markOutside(statement.scope, statement.startLine, statement.endLine);
+  }
+  for (const lambda of tree.lambdas) {
+    markOutside(lambda.scope, lambda.line, lambda.endLine);
+  }
+
+  const methods: BraceScope[] = [];
+  let lastLine = -1;
+  for (const scope of candidates) {
+    const independent = scope.startLine > lastLine
+      && !outsideLines.has(scope.startLine)
+      && !outsideLines.has(scope.endLine)
+      && !tree.lines[scope.startLine].hasComment
+      && !tree.lines[scope.endLine].hasComment;
+    if (independent) {
+      methods.push(scope);
+      lastLine = scope.endLine;
+    }
+  }
+  return methods;
+}
+
+/**
+ * Lex, scan and normalize the lines of one method on their own
+ * @param segmentIndex Index of the method's segment, where its lambdas end
+ * @param complexity Complexity of the method before the edit
+ * @returns The summary with lines relative to the method and the normalized lines,
+ * undefined when the lines are no longer exactly one method with the same name, or
+ * when the edit changes the nesting carried to the lines after the method
+ */
+function summarizeMethod(
+  document: vscode.TextDocument,
+  startLine: number,
+  lineCount: number,
+  method: NonNullable<Segment['method']>,
+  segmentIndex: number,
+  complexity: ComplexityPart
+): { summary: SegmentSummary, normalizedLines: string[] } | undefined {
+  const lines: string[] = [];
+  for (let i = 0; i < lineCount; i++) {
+    lines.push(document.lineAt(startLine + i).text);
+  }
+  const text = lines.join('\n');
+  const tokens = tokenizeBraceText(text, document.languageId);
+  const tree = buildBraceScopeTree(text, document.languageId, tokens);
+
+  // Types declared inside the method would change the classes of the document
+  const root = tree.module.children[0];
+  const sameMethod = tree.module.children.length === 1
+    && root !== undefined
+    && (root.kind === 'function' || root.kind === 'constructor')
+    && !root.expressionBodied
+    && root.name === method.name
+    && root.startLine === 0
+    && root.endLine === lineCount - 1
+    && tree.code[root.end] === '}'
+    && tree.code.slice(root.end + 1).trim() === ''
+    && !tree.lines[0].hasComment
+    && !tree.lines[lineCount - 1].hasComment
+    && tree.statements.every(statement => statement.scope !== tree.module)
+    && tree.lambdas.every(lambda => lambda.scope !== tree.module)
+    && tree.types.length === 0;
+  if (!sameMethod) {
+    return undefined;
+  }
+  const methodComplexity = scoreComplexity(tree.lines, 0, lineCount, complexity.entry);
+  if (!sameNesting(methodComplexity.exit, complexity.exit)) {
+    return undefined;
+  }
+
+  // Standalone, the method is at depth 1 and a constructor may look like a function
+  const depthBase = method.depth - 1;
+  const whole = summarizeTree(tree);
+  const members = whole.members.map((member, index) => index === 0
+    ? { ...member, kind: method.kind, parentName: method.parentName }
+    : member);
+  const scan = scanSource(text, tokens, document.languageId);
+  const cohesionMembers = method.classIndex === -1
+    ? []
+    : [{ ...describeCohesionMember(tree.code, root, method.classIndex), kind: method.kind }];
+
+  const summary: SegmentSummary = {
+    members,
+    maxDepth: whole.maxDepth > 0 ? whole.maxDepth + depthBase : 0,
+    maxDepthLine: whole.maxDepthLine,
+    lambdas: whole.lambdas.map(lambda => ({ ...lambda, endSegment: segmentIndex })),
+    classCount: 0,
+    keywords: scan.matches,
+    keywordCounts: scan.counts,
+    commentLines: scan.commentLines,
+    complexity: methodComplexity,
+    cohesionMembers,
+    nonEmptyLineCount: lines.filter(line => line.trim() !== '').length
+  };
+  return { summary, normalizedLines: lines.map(normalizeCodeLine) };
+}
+
+/**
+ * Score lines with the rules of CognitiveComplexityMetric
+ * @param lines The lines of a scope tree
+ * @param from The first line to score
+ * @param to The line after the last one
+ * @param entry The nesting carried from the lines before
+ */
+function scoreComplexity(lines: BraceLine[], from: number, to: number, entry: ComplexityState): ComplexityPart {
+  let { nesting, lambdaNesting } = entry;
+  let complexity = 0;
+  let lastLine = -1;
+
+  for (let i = from; i < to; i++) {
+    // Empty lines, comments and lines inside multiline strings
+    if (!lines[i].hasCode) continue;
+
+    const line = lines[i].code.trim();
+
+    if (CONTROL_PATTERNS.some(pattern => pattern.test(line))) {
+      complexity += 1 + nesting;
+      lastLine = i - from;
+      nesting++;
+    }
+
+    if (LOGICAL_OPERATOR.test(line)) {
+      complexity += 1;
+    }
+
+    if (JUMP.test(line)) {
+      complexity += 1;
+    }
+
+    if (LAMBDA_PATTERNS.some(pattern => pattern.test(line))) {
+      lambdaNesting++;
+      complexity += 2 * lambdaNesting;
+      lastLine = i - from;
+    }
+
+    const closeBraces = (line.match(/}/g) || []).length;
+    nesting = Math.max(0, nesting - closeBraces);
+    lambdaNesting = Math.max(0, lambdaNesting - closeBraces);
+  }
+
+  return { entry, exit: { nesting, lambdaNesting }, complexity, lastLine };
+}
+
+function sameNesting(a: ComplexityState, b: ComplexityState): boolean {
+  return a.nesting === b.nesting && a.lambdaNesting === b.lambdaNesting;
+}
+
+/**
+ * Properties and methods of every class, struct and record of a scope tree
+ */
+function collectCohesion(tree: BraceScopeTree): BraceCohesion {
+  const declaredProperties: string[][] = [];
+  const members: { start: number, member: CohesionMember }[] = [];
+
+  for (const classScope of tree.types) {
+    if (!CLASS_KEYWORDS.has(classScope.keyword)) {
+      continue;
+    }
+    const classIndex = declaredProperties.length;
+    declaredProperties.push(findDeclaredProperties(tree, classScope));
+    for (const member of classScope.children) {
+      if (member.kind === 'function' || member.kind === 'constructor') {
+        members.push({ start: member.start, member: describeCohesionMember(tree.code, member, classIndex) });
+      }
+    }
+  }
+
+  members.sort((a, b) => a.start - b.start);
+  return { declaredProperties, members: members.map(entry => entry.member) };
+}
+
+/**
+ * Fields and properties declared in a class body: field declarations and properties
+ * with accessors
+ */
+function findDeclaredProperties(tree: BraceScopeTree, classScope: BraceScope): string[] {
+  const properties: string[] = [];
+
+  for (const statement of tree.statements) {
+    if (statement.scope !== classScope) {
+      continue;
+    }
+    // What comes before the initializer; with parentheses it is a method or a call
+    const declaration = tree.code.slice(statement.start, statement.end).split(/=(?!=)/)[0];
+    if (declaration.includes('(')) {
+      continue;
+    }
+    const match = TYPED_FIELD.exec(declaration) ?? DECLARED_NAME.exec(declaration);
+    if (match) {
+      properties.push(match[1]);
+    }
+  }
+
+  for (const member of classScope.children) {
+    if (member.kind === 'property') {
+      properties.push(member.name);
+    }
+  }
+  return properties;
+}
+
+function describeCohesionMember(code: string, member: BraceScope, classIndex: number): CohesionMember {
+  const body = code.slice(member.open, member.end);
+  return {
+    classIndex,
+    kind: member.kind as 'function' | 'constructor',
+    name: member.name,
+    startLine: member.startLine,
+    endLine: member.endLine,
+    expressionBodied: member.expressionBodied,
+    assignedFields: Array.from(body.matchAll(CONSTRUCTOR_ASSIGNMENT), match => match[1]),
+    identifiers: new Set(body.match(IDENTIFIER))
+  };
+}
+
+/**
+ * Match counts of a part of a keyword scan. The do of a do-while only marks its block,
+ * the loop is counted at its while.
+ */
+function countMatches(matches: ScanMatch[]): KeywordScan['counts'] {
+  const counts = { if: 0, loop: 0, import: 0 };
+  for (const match of matches) {
+    if (match.type !== 'do-while') {
+      counts[match.category]++;
+    }
+  }
+  return counts;
+}
+
+function combineSummaries(segments: Segment[]): BraceSummary {
+  const members: BraceMember[] = [];
+  const lambdas: BraceLambdaSummary[] = [];
+  let maxDepth = 0;
+  let maxDepthLine = 0;
+  let classCount = 0;
+  for (const segment of segments) {
+    for (const member of segment.summary.members) {
+      members.push({ ...member, startLine: member.startLine + segment.startLine, endLine: member.endLine + segment.startLine });
+    }
+    if (segment.summary.maxDepth > maxDepth) {
+      maxDepth = segment.summary.maxDepth;
+      maxDepthLine = segment.summary.maxDepthLine + segment.startLine;
+    }
+    for (const { endSegment, ...lambda } of segment.summary.lambdas) {
+      lambdas.push({ ...lambda, line: lambda.line + segment.startLine, endLine: lambda.endLine + segments[endSegment].startLine });
+    }
+    classCount += segment.summary.classCount;
+  }
+  return { members, maxDepth, maxDepthLine, lambdas, classCount };
+}
+
+function combineComplexity(segments: Segment[]): BraceComplexity {
+  let complexity = 0;
+  let maxLine = 0;
+  for (const segment of segments) {
+    complexity += segment.summary.complexity.complexity;
+    if (segment.summary.complexity.lastLine !== -1) {
+      maxLine = segment.startLine + segment.summary.complexity.lastLine;
+    }
+  }
+  return { complexity, maxLine };
+}
+
+function combineCohesionMembers(segments: Segment[]): CohesionMember[] {
+  const members: CohesionMember[] = [];
+  for (const segment of segments) {
+    for (const member of segment.summary.cohesionMembers) {
+      members.push({ ...member, startLine: member.startLine + segment.startLine, endLine: member.endLine + segment.startLine });
+    }
+  }
+  return members;
+}
+
+function combineKeywordScans(segments: Segment[], lineCount: number): KeywordScan {
+  const scan: KeywordScan = { matches: [], counts: { if: 0, loop: 0, import: 0 }, commentLines: [], lineCount };
+  for (const segment of segments) {
+    for (const match of segment.summary.keywords) {
+      scan.matches.push({ ...match, line: match.line + segment.startLine });
+    }
+    for (const line of segment.summary.commentLines) {
+      scan.commentLines.push(line + segment.startLine);
+    }
+    scan.counts.if += segment.summary.keywordCounts.if;
+    scan.counts.loop += segment.summary.keywordCounts.loop;
+    scan.counts.import += segment.summary.keywordCounts.import;
+  }
+  return scan;
+}
+
+function findSegment(segments: Segment[], line: number): number {
+  let low = 0;
+  let high = segments.length - 1;
+  while (low < high) {
+    const middle = (low + high + 1) >> 1;
+    if (segments[middle].startLine <= line) {
+      low = middle;
+    } else {
+      high = middle - 1;
+    }
+  }
+  return low;
+}
+
+function countLineBreaks(text: string): number {
+  let count = 0;
+  for (let i = text.indexOf('\n'); i !== -1; i = text.indexOf('\n', i + 1)) {
+    count++;
+  }
+  return count;
+}
@@ -0,0 +1,285 @@
+import * as vscode from 'vscode';
+import { getBraceTokens, tokenizeBraceText } from './BraceScopeTree';
+import { getPythonTokens, tokenizePythonText } from '../python/PythonScopeTree';
+
+export type ScanCategory = 'if' | 'loop' | 'import';
+
+/**
+ * A keyword or lexical pattern found outside comments and strings
+ */
+export interface ScanMatch {
+  category: ScanCategory;
+  // 'if', 'if-python', 'for', 'foreach', 'while', 'do-while', 'forEach', 'for-in',
+  // 'while-python', 'using', 'import', 'from' or 'require'
+  type: string;
+  line: number;
+  column: number;
+}
+
+/**
+ * Keywords, imports and comment lines of a document, found on the masked source of its
+ * scope tree tokenizer and shared by the counting metrics
+ */
+export interface KeywordScan {
+  // Matches by line, then keywords before imports
+  matches: ScanMatch[];
+  counts: { [category in ScanCategory]: number };
+  // Lines with comment text
+  commentLines: number[];
+  lineCount: number;
+}
+
+interface KeywordRule {
+  category: ScanCategory;
+  type: string;
+  // Sticky pattern that must match the code right after the keyword, on the same line
+  // or the next one with code
+  follower: RegExp;
+  // Python headers also need a colon later on the line
+  colon: boolean;
+  // Whether a match adds to the category count; the do of a do-while only marks its
+  // block, the loop is counted at its while
+  counted: boolean;
+}
+
+/**
+ * Output of the scope tree tokenizers, see BraceTokens and PythonTokens
+ */
+export interface MaskedSource {
+  // Source with comments and string contents replaced by spaces, same offsets as the source
+  code: string;
+  lineStarts: number[];
+  commentLines: number[];
+}
+
+const BRACE_RULES: { [keyword: string]: KeywordRule } = {
+  if: { category: 'if', type: 'if', follower: /\s*\(/y, colon: false, counted: true },
+  for: { category: 'loop', type: 'for', follower: /\s*\(/y, colon: false, counted: true },
+  foreach: { category: 'loop', type: 'foreach', follower: /\s*\(/y, colon: false, counted: true },
+  while: { category: 'loop', type: 'while', follower: /\s*\(/y, colon: false, counted: true },
+  do: { category: 'loop', type: 'do-while', follower: /\s*\{/y, colon: false, counted: false },
+  '.forEach': { category: 'loop', type: 'forEach', follower: /\s*\(/y, colon: false, counted: true }
+};
+
+// Python headers are on one line: their followers do not cross line breaks
+const PYTHON_RULES: { [keyword: string]: KeywordRule } = {
+  if: { category: 'if', type: 'if-python', follower: /[^\S\r\n]/y, colon: true, counted: true },
+  for: { category: 'loop', type: 'for-in', follower: /[^\S\r\n]+\w+[^\S\r\n]+in[^\S\r\n]/y, colon: true, counted: true },
+  while: { category: 'loop', type: 'while-python', follower: /[^\S\r\n]/y, colon: true, counted: true }
+};
+
+// Every keyword of both rule sets in one pattern, so the code is matched in a single pass
+const KEYWORD_PATTERN = /\.forEach\b|\b(?:if|foreach|for|while|do)\b/g;
+
+// Import statements, tried in order at the start of a line
+const IMPORT_PATTERNS: { type: string, pattern: RegExp }[] = [
+  { type: 'using', pattern: /^using\s+\w+/ },
+  { type: 'import', pattern: /^import\s+[\w*{}\s,]+from\s+['"][^'"]+['"]/ },
+  { type: 'from', pattern: /^from\s+[.\w]+\s+import\s+/ },
+  { type: 'import', pattern: /^import\s+/ },
+  { type: 'require', pattern: /\brequire\s*\(\s*['"][^'"]+['"]\s*\)/ }
+];
+
+// Words every import statement holds; only the lines of the source that hold one are tried
+const IMPORT_WORD = /\b(?:using|import|from)\b|require/g;
+
+const COMMENT_START = /^(?:#|\/\/|\/\*)/;
+
+const cache = new WeakMap<vscode.TextDocument, { version: number, languageId: string, scan: KeywordScan }>();
+
+/**
+ * Keyword scan of a document, run once per document version and language
+ * @param document The document to scan
+ */
+export function getKeywordScan(document: vscode.TextDocument): KeywordScan {
+  const cached = cache.get(document);
+  if (cached && cached.version === document.version && cached.languageId === document.languageId) {
+    return cached.scan;
+  }
+
+  const source = document.languageId === 'python' ? getPythonTokens(document) : getBraceTokens(document);
+  const scan = scanSource(document.getText(), source, document.languageId);
+  cache.set(document, { version: document.version, languageId: document.languageId, scan });
+  return scan;
+}
+
+/**
+ * Scan source code for control keywords, imports and comments
+ * @param text The source code
+ * @param languageId The language identifier; Python has its own comments, strings and
+ * keyword forms, every other language is lexed as a brace language
+ */
+export function scanKeywords(text: string, languageId: string = ''): KeywordScan {
+  const source = languageId === 'python' ? tokenizePythonText(text) : tokenizeBraceText(text, languageId);
+  return scanSource(text, source, languageId);
+}
+
+/**
+ * Scan the masked source of the scope tree tokenizers, so comments and strings are those
+ * the structural metrics see. Keywords are matched on the whole code in a single pass;
+ * imports are only tried on the lines that hold one of their words.
+ * @param text The source code
+ * @param source The masked source of the text
+ * @param languageId The language identifier, Python or a brace language
+ */
+export function scanSource(text: string, source: MaskedSource, languageId: string): KeywordScan {
+  const scan: KeywordScan = {
+    matches: [],
+    counts: { if: 0, loop: 0, import: 0 },
+    commentLines: source.commentLines.slice(),
+    lineCount: source.lineStarts.length
+  };
+  const keywords = findKeywords(source, languageId === 'python' ? PYTHON_RULES : BRACE_RULES, scan.counts);
+  const imports = findImports(text, source);
+  scan.counts.import = imports.length;
+
+  let keyword = 0;
+  let statement = 0;
+  while (keyword < keywords.length || statement < imports.length) {
+    if (statement === imports.length || keyword < keywords.length && keywords[keyword].line <= imports[statement].line) {
+      scan.matches.push(keywords[keyword++]);
+    } else {
+      scan.matches.push(imports[statement++]);
+    }
+  }
+
+  return scan;
+}
+
+function findKeywords(source: MaskedSource, rules: { [keyword: string]: KeywordRule }, counts: KeywordScan['counts']): ScanMatch[] {
+  const { code, lineStarts } = source;
+  const matches: ScanMatch[] = [];
+  let line = 0;
+  // Offset of the last colon of the line, found once per line for Python headers
+  let colonLine = -1;
+  let lastColon = -1;
+
+  KEYWORD_PATTERN.lastIndex = 0;
+  let match: RegExpExecArray | null;
+  while ((match = KEYWORD_PATTERN.exec(code)) !== null) {
+    const rule = rules[match[0]];
+    if (!rule) {
+      continue;
+    }
+    while (line + 1 < lineStarts.length && lineStarts[line + 1] <= match.index) {
+      line++;
+    }
+    if (rule.colon && colonLine !== line) {
+      colonLine = line;
+      const column = code.slice(lineStarts[line], lineEnd(source, line)).lastIndexOf(':');
+      lastColon = column === -1 ? -1 : lineStarts[line] + column;
+    }
+    if (rule.colon && lastColon < match.index) {
+      // Every Python header needs the colon: no keyword after the last one can match
+      KEYWORD_PATTERN.lastIndex = lineEnd(source, line);
+      continue;
+    }
+    if (followsKeyword(rule, code, match.index + match[0].length, lastColon)) {
+      matches.push({ category: rule.category, type: rule.type, line, column: match.index - lineStarts[line] });
+      if (rule.counted) {
+        counts[rule.category]++;
+      }
+    }
+  }
+
+  return matches;
+}
+
+/**
+ * Imports are matched on the line as written, except lines without code or that start
+ * with a comment or a # directive, as the line-based metric did
+ */
+function findImports(text: string, source: MaskedSource): ScanMatch[] {
+  const { code, lineStarts } = source;
+  const matches: ScanMatch[] = [];
+  let line = 0;
+  let lastTried = -1;
+  // Lines up to the closing bracket of a multiline from ... import ( ... ) are not statements
+  let statementsFrom = 0;
+
+  IMPORT_WORD.lastIndex = 0;
+  let match: RegExpExecArray | null;
+  while ((match = IMPORT_WORD.exec(text)) !== null) {
+    while (line + 1 < lineStarts.length && lineStarts[line + 1] <= match.index) {
+      line++;
+    }
+    if (line === lastTried || line < statementsFrom) {
+      continue;
+    }
+    lastTried = line;
+
+    const start = lineStarts[line];
+    const end = lineEnd(source, line);
+    const firstCode = findCode(code, start, end);
+    const statement = text.slice(start, end).trim();
+    if (firstCode === -1 || COMMENT_START.test(statement)) {
+      continue;
+    }
+    const importType = IMPORT_PATTERNS.find(candidate => candidate.pattern.test(statement))?.type;
+    if (importType) {
+      matches.push({ category: 'import', type: importType, line, column: firstCode - start });
+      if (importType === 'from' && statement.includes('(') && !statement.includes(')')) {
+        statementsFrom = findImportEnd(text, source, line);
+      }
+    }
+  }
+
+  return matches;
+}
+
+/**
+ * The line after the first line with code and a closing bracket that follows a line
+ */
+function findImportEnd(text: string, source: MaskedSource, line: number): number {
+  const lineStarts = source.lineStarts;
+  let next = line + 1;
+  while (next < lineStarts.length) {
+    const bracket = text.indexOf(')', lineStarts[next]);
+    if (bracket === -1) {
+      break;
+    }
+    while (next + 1 < lineStarts.length && lineStarts[next + 1] <= bracket) {
+      next++;
+    }
+    if (findCode(source.code, lineStarts[next], lineEnd(source, next)) !== -1) {
+      return next + 1;
+    }
+    next++;
+  }
+  return lineStarts.length;
+}
+
+/**
+ * Offset of the first character that is not whitespace in [start, end), or -1
+ */
+function findCode(code: string, start: number, end: number): number {
+  for (let i = start; i < end; i++) {
+    const char = code.charCodeAt(i);
+    if (char === 32 || char >= 9 && char <= 13) {
+      continue;
+    }
+    if (char < 128 || !/\s/.test(code[i])) {
+      return i;
+    }
+  }
+  return -1;
+}
+
+/**
+ * Offset of the line break that ends a line, or the source length for the last line
+ */
+function lineEnd(source: MaskedSource, line: number): number {
+  return line + 1 < source.lineStarts.length ? source.lineStarts[line + 1] - 1 : source.code.length;
+}
+
+/**
+ * Whether the code at an offset completes a keyword
+ * @param lastColon Offset of the last colon of the line, for Python headers
+ */
+function followsKeyword(rule: KeywordRule, code: string, offset: number, lastColon: number): boolean {
+  rule.follower.lastIndex = offset;
+  if (!rule.follower.test(code)) {
+    return false;
+  }
+  return !rule.colon || lastColon >= rule.follower.lastIndex;
+}
@@ -4,6 +4,7 @@ import * as vscode from 'vscode';
 export const LineCountMetric: Metric = {
   name: 'lineCount',
   description: 'el número total de líneas de código en el archivo.',
+  streaming: true,
   extract(document: vscode.TextDocument): MetricResult {
     return {
       label: 'Líneas',
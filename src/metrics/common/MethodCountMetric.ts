@@ -1,16 +1,16 @@
 import { Metric, MetricResult } from '../Metric';
 import * as vscode from 'vscode';
+import { getBraceSummary } from './IncrementalBraceAnalysis';
 
 export const MethodCountMetric: Metric = {
   name: 'methodCount',
   description: 'el número total de métodos definidos en el código.',
+  incremental: true,
   extract(document: vscode.TextDocument): MetricResult {
-    const text = document.getText();
-    const regex = /^\s*(public|private|protected|internal)?\s*(static|virtual|override|async|new)?\s+[\w<>\[\],]+\s+\w+\s*\([^)]*\)\s*(\{|=>)/gm;
-    const matches = text.match(regex);
+    // Métodos y funciones con nombre, sin constructores (los cuenta ConstructorCountMetric)
     return {
       label: 'Cantidad de métodos',
-      value: matches ? matches.length : 0,
+      value: getBraceSummary(document).members.filter(member => member.kind === 'function').length,
     };
   },
 };
@@ -0,0 +1,309 @@
+import * as vscode from 'vscode';
+import * as os from 'os';
+import * as path from 'path';
+import { performance } from 'perf_hooks';
+import { Worker } from 'worker_threads';
+import { Metric, MetricResult } from '../Metric';
+import { IncrementalState, computeIncrementalState } from '../common/IncrementalBraceAnalysis';
+
+export interface MetricTask {
+  id: number;
+  documentKey: string;
+  // Only sent when the worker does not hold this document yet
+  text?: string;
+  languageId: string;
+  fileName: string;
+  version: number;
+  // Empty for a task that builds the incremental state
+  metricName: string;
+  // Build the per-method state of the document instead of extracting a metric
+  incrementalState?: boolean;
+}
+
+export interface MetricTaskReply {
+  id: number;
+  result?: MetricResult;
+  incrementalState?: IncrementalState;
+  // Time the worker spent in the metric's extract call
+  durationMs?: number;
+  error?: string;
+  // The worker cannot run this metric, the pool runs it on the calling thread
+  runInline?: boolean;
+}
+
+interface PendingTask {
+  task: MetricTask;
+  document: vscode.TextDocument;
+  // Undefined for a task that builds the incremental state
+  metric?: Metric;
+  resolve: (reply: MetricTaskReply) => void;
+  reject: (error: Error) => void;
+}
+
+interface TimedResult {
+  result: MetricResult;
+  durationMs: number;
+}
+
+export interface MetricWorkerPoolStats {
+  // Tasks a worker answered
+  workerTasks: number;
+  // Tasks run on the calling thread because no worker could run them
+  inlineTasks: number;
+  // Workers that could not start or stopped while running
+  workerFailures: number;
+}
+
+interface PoolWorker {
+  worker: Worker;
+  documentKey?: string;
+  current?: PendingTask;
+}
+
+/**
+ * Pool of worker threads that extract metrics off the extension host thread.
+ * Metrics flagged with requiresEditor run on the calling thread.
+ */
+export class MetricWorkerPool {
+  private workers: PoolWorker[] = [];
+  private queue: PendingTask[] = [];
+  private nextTaskId = 0;
+  private consecutiveFailures = 0;
+  private disposed = false;
+  private stats: MetricWorkerPoolStats = { workerTasks: 0, inlineTasks: 0, workerFailures: 0 };
+
+  // After this many worker failures in a row, metrics run on the calling thread
+  private static readonly MAX_CONSECUTIVE_FAILURES = 3;
+
+  constructor(
+    private readonly size: number = Math.max(1, Math.min(os.cpus().length - 1, 4)),
+    private readonly workerScript: string = path.join(__dirname, 'metricWorker.js')
+  ) {}
+
+  /**
+   * Extract metrics in parallel, reporting each result as soon as it is available
+   * @param document The document to analyze
+   * @param metrics The metrics to extract
+   * @param onResult Called for every metric as it finishes, with the time its extraction took
+   * @param token Cancels the tasks that have not started yet
+   * @returns Array of metric results, in the same order as the metrics
+   */
+  public run(
+    document: vscode.TextDocument,
+    metrics: Metric[],
+    onResult?: (metric: Metric, result: MetricResult, index: number, durationMs: number) => void,
+    token?: vscode.CancellationToken
+  ): Promise<MetricResult[]> {
+    const documentKey = `${document.uri.toString()}@${document.version}`;
+
+    const runs = metrics.map((metric, index) => {
+      const promise = metric.requiresEditor
+        ? Promise.resolve().then(() => MetricWorkerPool.extractTimed(metric, document))
+        : this.enqueue(document, documentKey, metric, token)
+          .then(reply => ({ result: reply.result!, durationMs: reply.durationMs ?? 0 }));
+
+      return promise.then(({ result, durationMs }) => {
+        onResult?.(metric, result, index, durationMs);
+        return result;
+      });
+    });
+
+    return Promise.all(runs);
+  }
+
+  /**
+   * Build the per-method state of a brace language document in a worker, for the
+   * incremental metrics of the tracked document, see IncrementalBraceAnalysis
+   * @param document The document to analyze
+   * @param token Cancels the task if it has not started yet
+   */
+  public buildIncrementalState(document: vscode.TextDocument, token?: vscode.CancellationToken): Promise<IncrementalState> {
+    const documentKey = `${document.uri.toString()}@${document.version}`;
+    return this.enqueue(document, documentKey, undefined, token).then(reply => reply.incrementalState!);
+  }
+
+  /**
+   * Counts of the tasks run by workers and on the calling thread, to tell whether the
+   * workers are used or the pool fell back to the calling thread
+   */
+  public getStats(): MetricWorkerPoolStats {
+    return { ...this.stats };
+  }
+
+  /**
+   * Terminate all workers and reject the queued tasks
+   */
+  public dispose(): void {
+    this.disposed = true;
+    for (const pending of this.queue) {
+      pending.reject(new Error('Metric worker pool disposed'));
+    }
+    this.queue = [];
+    for (const poolWorker of this.workers) {
+      poolWorker.current?.reject(new Error('Metric worker pool disposed'));
+      poolWorker.current = undefined;
+      poolWorker.worker.terminate();
+    }
+    this.workers = [];
+  }
+
+  private enqueue(
+    document: vscode.TextDocument,
+    documentKey: string,
+    metric: Metric | undefined,
+    token?: vscode.CancellationToken
+  ): Promise<MetricTaskReply> {
+    return new Promise<MetricTaskReply>((resolve, reject) => {
+      if (token?.isCancellationRequested) {
+        reject(new Error('Metric extraction cancelled'));
+        return;
+      }
+
+      const task: MetricTask = {
+        id: this.nextTaskId++,
+        documentKey,
+        languageId: document.languageId.toLowerCase(),
+        fileName: document.fileName,
+        version: document.version,
+        metricName: metric?.name ?? '',
+        incrementalState: metric ? undefined : true
+      };
+
+      const cancellation = token?.onCancellationRequested(() => {
+        const index = this.queue.indexOf(pending);
+        if (index !== -1) {
+          this.queue.splice(index, 1);
+          pending.reject(new Error('Metric extraction cancelled'));
+        }
+      });
+
+      const pending: PendingTask = {
+        task,
+        document,
+        metric,
+        resolve: reply => {
+          cancellation?.dispose();
+          resolve(reply);
+        },
+        reject: error => {
+          cancellation?.dispose();
+          reject(error);
+        }
+      };
+
+      this.queue.push(pending);
+      this.dispatch();
+    });
+  }
+
+  private dispatch(): void {
+    if (this.disposed) {
+      return;
+    }
+
+    while (this.queue.length > 0) {
+      const poolWorker = this.getIdleWorker();
+      if (!poolWorker) {
+        if (this.workers.length === 0) {
+          // Workers are unavailable, fall back to the calling thread
+          this.queue.splice(0).forEach(pending => this.runInline(pending));
+        }
+        return;
+      }
+
+      const pending = this.queue.shift()!;
+      const task = { ...pending.task };
+      if (poolWorker.documentKey !== task.documentKey) {
+        task.text = pending.document.getText();
+        poolWorker.documentKey = task.documentKey;
+      }
+
+      poolWorker.current = pending;
+      poolWorker.worker.postMessage(task);
+    }
+  }
+
+  private getIdleWorker(): PoolWorker | undefined {
+    const idle = this.workers.find(poolWorker => !poolWorker.current);
+    if (idle || this.workers.length >= this.size) {
+      return idle;
+    }
+
+    return this.spawnWorker();
+  }
+
+  private spawnWorker(): PoolWorker | undefined {
+    if (this.consecutiveFailures >= MetricWorkerPool.MAX_CONSECUTIVE_FAILURES) {
+      return undefined;
+    }
+
+    let worker: Worker;
+    try {
+      worker = new Worker(this.workerScript);
+    } catch {
+      this.consecutiveFailures++;
+      this.stats.workerFailures++;
+      return undefined;
+    }
+
+    const poolWorker: PoolWorker = { worker };
+
+    worker.on('message', (reply: MetricTaskReply) => {
+      const pending = poolWorker.current;
+      poolWorker.current = undefined;
+      this.consecutiveFailures = 0;
+
+      if (pending && pending.task.id === reply.id) {
+        if (reply.result || reply.incrementalState) {
+          this.stats.workerTasks++;
+          pending.resolve(reply);
+        } else if (reply.runInline) {
+          this.runInline(pending);
+        } else {
+          pending.reject(new Error(reply.error));
+        }
+      }
+      this.dispatch();
+    });
+
+    const onFailure = () => {
+      if (!this.workers.includes(poolWorker)) {
+        return;
+      }
+      this.consecutiveFailures++;
+      this.stats.workerFailures++;
+      this.workers = this.workers.filter(candidate => candidate !== poolWorker);
+      const pending = poolWorker.current;
+      poolWorker.current = undefined;
+      if (pending) {
+        this.runInline(pending);
+      }
+      this.dispatch();
+    };
+    worker.on('error', onFailure);
+    worker.on('exit', onFailure);
+
+    this.workers.push(poolWorker);
+    return poolWorker;
+  }
+
+  private runInline(pending: PendingTask): void {
+    this.stats.inlineTasks++;
+    try {
+      if (pending.metric) {
+        const { result, durationMs } = MetricWorkerPool.extractTimed(pending.metric, pending.document);
+        pending.resolve({ id: pending.task.id, result, durationMs });
+      } else {
+        pending.resolve({ id: pending.task.id, incrementalState: computeIncrementalState(pending.document) });
+      }
+    } catch (error) {
+      pending.reject(error instanceof Error ? error : new Error(`${error}`));
+    }
+  }
+
+  private static extractTimed(metric: Metric, document: vscode.TextDocument): TimedResult {
+    const start = performance.now();
+    const result = metric.extract(document);
+    return { result, durationMs: performance.now() - start };
+  }
+}
@@ -0,0 +1,47 @@
+import * as vscode from 'vscode';
+
+/**
+ * Creates a read-only stand-in for vscode.TextDocument with the members the metrics
+ * use (getText, lineAt, lineCount, languageId, uri, fileName, version), so metrics
+ * can run outside the extension host.
+ * @param text The full document text
+ * @param languageId The VS Code language identifier
+ * @param fileName The absolute path of the file
+ * @param version The document version
+ */
+export function createTextDocumentSnapshot(
+  text: string,
+  languageId: string,
+  fileName: string = 'untitled',
+  version: number = 1
+): vscode.TextDocument {
+  const lines = text.split(/\r?\n/);
+  const uri = {
+    scheme: 'file',
+    fsPath: fileName,
+    path: fileName,
+    toString: () => `file://${fileName}`
+  };
+
+  return {
+    uri,
+    fileName,
+    languageId,
+    version,
+    isUntitled: false,
+    isDirty: false,
+    isClosed: false,
+    lineCount: lines.length,
+    getText: () => text,
+    lineAt: (lineOrPosition: number | vscode.Position) => {
+      const lineNumber = typeof lineOrPosition === 'number' ? lineOrPosition : lineOrPosition.line;
+      const lineText = lines[lineNumber] ?? '';
+      return {
+        lineNumber,
+        text: lineText,
+        isEmptyOrWhitespace: lineText.trim().length === 0,
+        firstNonWhitespaceCharacterIndex: Math.max(0, lineText.search(/\S/))
+      };
+    }
+  } as unknown as vscode.TextDocument;
+}
@@ -0,0 +1,45 @@
+import * as vscode from 'vscode';
+import { performance } from 'perf_hooks';
+import { parentPort } from 'worker_threads';
+import { MetricFactory } from '../MetricFactory';
+import { MetricRegistry } from '../MetricRegistry';
+import { computeIncrementalState } from '../common/IncrementalBraceAnalysis';
+import { createTextDocumentSnapshot } from './TextDocumentSnapshot';
+import { MetricTask, MetricTaskReply } from './MetricWorkerPool';
+
+/*
+ * Worker thread entry point: rebuilds the metric registry and extracts one metric
+ * per task. The document text is only sent when it changes, so the worker keeps
+ * the last snapshot it received.
+ */
+MetricFactory.initializeRegistry();
+const registry = MetricRegistry.getInstance();
+
+let currentKey: string | undefined;
+let currentDocument: vscode.TextDocument | undefined;
+
+parentPort?.on('message', (task: MetricTask) => {
+  let reply: MetricTaskReply;
+
+  try {
+    if (task.text !== undefined) {
+      currentKey = task.documentKey;
+      currentDocument = createTextDocumentSnapshot(task.text, task.languageId, task.fileName, task.version);
+    }
+
+    const metric = registry.getMetricsForLanguage(task.languageId).find(m => m.name === task.metricName);
+    if (task.incrementalState && currentDocument && currentKey === task.documentKey) {
+      reply = { id: task.id, incrementalState: computeIncrementalState(currentDocument) };
+    } else if (!metric || !currentDocument || currentKey !== task.documentKey) {
+      reply = { id: task.id, error: `Metric ${task.metricName} is not available in worker`, runInline: true };
+    } else {
+      const start = performance.now();
+      const result = metric.extract(currentDocument);
+      reply = { id: task.id, result, durationMs: performance.now() - start };
+    }
+  } catch (error) {
+    reply = { id: task.id, error: `${error}` };
+  }
+
+  parentPort?.postMessage(reply);
+});
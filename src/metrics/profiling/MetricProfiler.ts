@@ -0,0 +1,231 @@
+/**
+ * Where a metric extraction was requested from
+ */
+export type MetricCallSite = 'render' | 'csv' | 'highlight' | 'prefetch';
+
+/**
+ * One timed metric extraction
+ */
+export interface MetricTiming {
+  metricName: string;
+  languageId: string;
+  textLength: number;
+  callSite: MetricCallSite;
+  durationMs: number;
+}
+
+/**
+ * Time budgets of the metrics. A metric that exceeds its budget is skipped on
+ * files at least as large as the one that exceeded it.
+ */
+export interface MetricBudgets {
+  enabled: boolean;
+  defaultMs: number;
+  perMetric: { [metricName: string]: number };
+}
+
+const SIZE_BUCKETS: { limit: number, label: string }[] = [
+  { limit: 10 * 1024, label: '<10KB' },
+  { limit: 100 * 1024, label: '10-100KB' },
+  { limit: 1024 * 1024, label: '100KB-1MB' },
+  { limit: Infinity, label: '>1MB' }
+];
+
+/**
+ * Label of the size bucket a file falls in
+ * @param textLength Number of characters of the file
+ */
+export function getSizeBucket(textLength: number): string {
+  return SIZE_BUCKETS.find(bucket => textLength < bucket.limit)!.label;
+}
+
+/**
+ * Keeps the last samples of a duration in a ring buffer, so percentiles follow
+ * the recent behaviour of a metric. The maximum covers every sample.
+ */
+export class RollingHistogram {
+  private samples: number[] = [];
+  private next = 0;
+  private total = 0;
+  private maximum = 0;
+
+  constructor(private readonly capacity: number = 256) {}
+
+  public add(value: number): void {
+    if (this.samples.length < this.capacity) {
+      this.samples.push(value);
+    } else {
+      this.samples[this.next] = value;
+    }
+    this.next = (this.next + 1) % this.capacity;
+    this.total++;
+    this.maximum = Math.max(this.maximum, value);
+  }
+
+  /**
+   * Number of samples recorded, including the ones already rotated out
+   */
+  public get count(): number {
+    return this.total;
+  }
+
+  public get max(): number {
+    return this.maximum;
+  }
+
+  /**
+   * The samples currently in the window
+   */
+  public getSamples(): number[] {
+    return [...this.samples];
+  }
+
+  /**
+   * Nearest-rank percentile of the samples in the window
+   * @param p Percentile between 0 and 100
+   */
+  public percentile(p: number): number {
+    if (this.samples.length === 0) {
+      return 0;
+    }
+    const sorted = this.getSamples().sort((a, b) => a - b);
+    const rank = Math.ceil((p / 100) * sorted.length);
+    return sorted[Math.min(sorted.length - 1, Math.max(0, rank - 1))];
+  }
+}
+
+/**
+ * Records how long every metric extraction takes, labeled by metric, language,
+ * file size bucket and call site, and enforces the optional time budgets
+ */
+export class MetricProfiler {
+  private histograms: Map<string, RollingHistogram> = new Map();
+  private labels: Map<string, { metricName: string, languageId: string, sizeBucket: string, callSite: MetricCallSite }> = new Map();
+  private budgets: MetricBudgets = { enabled: false, defaultMs: 0, perMetric: {} };
+  // Metric name -> smallest file length on which it exceeded its budget
+  private overBudget: Map<string, number> = new Map();
+
+  /**
+   * Called the first time a metric exceeds its budget
+   */
+  public onSlowMetric?: (timing: MetricTiming, budgetMs: number) => void;
+
+  /**
+   * Replace the time budgets and forget which metrics exceeded the previous ones
+   * @param budgets The new budgets
+   */
+  public setBudgets(budgets: MetricBudgets): void {
+    this.budgets = budgets;
+    this.overBudget.clear();
+  }
+
+  /**
+   * The time budget of a metric, or undefined when budgets are disabled
+   * @param metricName The name of the metric
+   */
+  public getBudget(metricName: string): number | undefined {
+    if (!this.budgets.enabled) {
+      return undefined;
+    }
+    const budget = this.budgets.perMetric[metricName] ?? this.budgets.defaultMs;
+    return budget > 0 ? budget : undefined;
+  }
+
+  /**
+   * Record an extraction and check it against the metric's budget
+   * @param timing The timed extraction
+   * @returns Whether the extraction exceeded the budget
+   */
+  public record(timing: MetricTiming): boolean {
+    const sizeBucket = getSizeBucket(timing.textLength);
+    const key = `${timing.metricName}\n${timing.languageId}\n${sizeBucket}\n${timing.callSite}`;
+    let histogram = this.histograms.get(key);
+    if (!histogram) {
+      histogram = new RollingHistogram();
+      this.histograms.set(key, histogram);
+      this.labels.set(key, { metricName: timing.metricName, languageId: timing.languageId, sizeBucket, callSite: timing.callSite });
+    }
+    histogram.add(timing.durationMs);
+
+    const budget = this.getBudget(timing.metricName);
+    if (budget === undefined || timing.durationMs <= budget) {
+      return false;
+    }
+
+    const previous = this.overBudget.get(timing.metricName);
+    if (previous === undefined) {
+      this.onSlowMetric?.(timing, budget);
+    }
+    this.overBudget.set(timing.metricName, Math.min(previous ?? Infinity, timing.textLength));
+    return true;
+  }
+
+  /**
+   * Whether a metric should be skipped because it already exceeded its budget
+   * on a file of this size or smaller
+   * @param metricName The name of the metric
+   * @param textLength Number of characters of the file
+   */
+  public shouldSkip(metricName: string, textLength: number): boolean {
+    const limit = this.overBudget.get(metricName);
+    return limit !== undefined && this.getBudget(metricName) !== undefined && textLength >= limit;
+  }
+
+  /**
+   * Text report with the p50, p95 and maximum of every metric, slowest first,
+   * followed by the breakdown per language, size bucket and call site
+   */
+  public getReport(): string {
+    const perMetric = new Map<string, { all: RollingHistogram, keys: string[] }>();
+    for (const key of this.histograms.keys()) {
+      const { metricName } = this.labels.get(key)!;
+      let entry = perMetric.get(metricName);
+      if (!entry) {
+        entry = { all: new RollingHistogram(1024), keys: [] };
+        perMetric.set(metricName, entry);
+      }
+      entry.keys.push(key);
+    }
+    if (perMetric.size === 0) {
+      return 'No metric extractions recorded yet';
+    }
+
+    // The per-metric window merges the windows of its labels
+    for (const entry of perMetric.values()) {
+      for (const key of entry.keys) {
+        const histogram = this.histograms.get(key)!;
+        for (const sample of histogram.getSamples()) {
+          entry.all.add(sample);
+        }
+      }
+    }
+
+    const format = (ms: number) => ms.toFixed(1).padStart(9);
+    const lines = [`${'metric'.padEnd(44)}${'count'.padStart(7)}${'p50 ms'.padStart(9)}${'p95 ms'.padStart(9)}${'max ms'.padStart(9)}`];
+    const sorted = Array.from(perMetric.entries()).sort((a, b) => b[1].all.percentile(95) - a[1].all.percentile(95));
+    for (const [metricName, entry] of sorted) {
+      const count = entry.keys.reduce((sum, key) => sum + this.histograms.get(key)!.count, 0);
+      const max = Math.max(...entry.keys.map(key => this.histograms.get(key)!.max));
+      const budget = this.getBudget(metricName);
+      const name = budget !== undefined ? `${metricName} (budget ${budget} ms)` : metricName;
+      lines.push(`${name.padEnd(44)}${String(count).padStart(7)}${format(entry.all.percentile(50))}${format(entry.all.percentile(95))}${format(max)}`);
+
+      for (const key of entry.keys) {
+        const histogram = this.histograms.get(key)!;
+        const { languageId, sizeBucket, callSite } = this.labels.get(key)!;
+        const label = `  ${languageId} ${sizeBucket} ${callSite}`;
+        lines.push(`${label.padEnd(44)}${String(histogram.count).padStart(7)}${format(histogram.percentile(50))}${format(histogram.percentile(95))}${format(histogram.max)}`);
+      }
+    }
+    return lines.join('\n');
+  }
+
+  /**
+   * Forget every recorded extraction
+   */
+  public reset(): void {
+    this.histograms.clear();
+    this.labels.clear();
+    this.overBudget.clear();
+  }
+}
@@ -1,5 +1,6 @@
 import { Metric, MetricResult } from '../Metric';
 import * as vscode from 'vscode';
+import { getPythonScopeTree } from './PythonScopeTree';
 
 export const CognitiveComplexityMetricPython: Metric = {
   name: 'cognitiveComplexityPython',
@@ -40,14 +41,13 @@ export const CognitiveComplexityMetricPython: Metric = {
      * El valor final refleja la dificultad de lectura y mantenimiento del código Python.
      */
 
-    const text = document.getText();
-    const lines = text.split('\n');
+    // Líneas del árbol de ámbitos: comentarios, docstrings y contenido de strings
+    // ya vienen reemplazados por espacios
+    const tree = getPythonScopeTree(document);
 
     let complexity = 0;
     let nestingLevel = 0;
     let maxLine = 0;
-    let inMultilineString = false;
-    let stringDelimiter = '';
 
     // Patrones mejorados para Python
     const controlPatterns = [
@@ -66,50 +66,16 @@ export const CognitiveComplexityMetricPython: Metric = {
       /\(.*\bfor\b.*\bin\b.*\)/,  // Generator expression
     ];
 
-    for (let i = 0; i < lines.length; i++) {
-      let line = lines[i];
-      const trimmedLine = line.trim();
+    for (let i = 0; i < tree.lines.length; i++) {
+      const line = tree.lines[i].code;
 
-      // Manejar strings multilínea
-      if (inMultilineString) {
-        if (line.includes(stringDelimiter)) {
-          inMultilineString = false;
-          stringDelimiter = '';
-        }
-        continue;
-      }
-
-      // Detectar inicio de strings multilínea
-      const multilineStringMatch = trimmedLine.match(/^.*?('''|""")/) || trimmedLine.match(/('''|""").*$/);
-      if (multilineStringMatch) {
-        const delimiter = multilineStringMatch[1];
-        const beforeDelimiter = trimmedLine.substring(0, trimmedLine.indexOf(delimiter));
-        const afterDelimiter = trimmedLine.substring(trimmedLine.indexOf(delimiter) + 3);
-        
-        // Si no hay otro delimitador en la misma línea, es multilínea
-        if (!afterDelimiter.includes(delimiter)) {
-          inMultilineString = true;
-          stringDelimiter = delimiter;
-          // Procesar la parte antes del delimitador si existe
-          if (beforeDelimiter.trim()) {
-            line = beforeDelimiter;
-          } else {
-            continue;
-          }
-        }
-      }
-
-      // Saltar comentarios y líneas vacías
-      if (trimmedLine === '' || trimmedLine.startsWith('#')) {
+      // Saltar comentarios, líneas vacías y líneas con solo strings
+      if (line.replace(/["'\s]/g, '') === '') {
         continue;
       }
 
-      // Remover strings de una línea para evitar falsos positivos
-      line = line.replace(/(['"])(\\.|[^\\])*?\1/g, '');
-
       // Calcular nivel de anidamiento basado en indentación
-      const indent = line.length - line.trimStart().length;
-      const indentLevel = Math.floor(indent / 4); // Asumiendo 4 espacios por nivel
+      const indentLevel = Math.floor(tree.lines[i].indent / 4); // Asumiendo 4 espacios por nivel
       
       // Ajustar nesting level basado en la indentación actual
       if (indentLevel < nestingLevel) {
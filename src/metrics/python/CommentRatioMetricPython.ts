@@ -1,35 +1,16 @@
 import { Metric, MetricResult } from '../Metric';
 import * as vscode from 'vscode';
+import { getPythonScopeTree } from './PythonScopeTree';
 
 export const CommentRatioMetricPython: Metric = {
   name: 'commentRatioPython',
   description: 'la proporción de líneas de comentarios respecto al total de líneas de código en Python.',
   extract(document: vscode.TextDocument): MetricResult {
-    const totalLines = document.lineCount;
-    let commentLineCount = 0;
+    const tree = getPythonScopeTree(document);
+    const totalLines = tree.lines.length;
 
-    for (let i = 0; i < totalLines; i++) {
-      const rawLine = document.lineAt(i).text;
-      const line = rawLine.trim();
-
-      if (line.length === 0) continue;
-
-      // Comentarios que empiezan con #
-      if (line.startsWith('#')) {
-        commentLineCount++;
-        continue;
-      }
-
-      // Comentarios después de código, pero no dentro de strings
-      const hashIndex = line.indexOf('#');
-      if (hashIndex > 0 && !isInsideString(line, hashIndex)) {
-        commentLineCount++;
-        continue;
-      }
-
-      // Ignorar strings multilinea como """ o '''
-      // No se cuenta nada aquí
-    }
+    // Comentarios con #, propios o después de código; los strings multilínea (""" o ''') no cuentan
+    const commentLineCount = tree.lines.filter(line => line.hasComment).length;
 
     const ratio = totalLines > 0 ? (commentLineCount / totalLines) * 100 : 0;
 
@@ -39,31 +20,3 @@ export const CommentRatioMetricPython: Metric = {
     };
   },
 };
-
-/**
- * Verifica si una posición está dentro de una string literal
- */
-function isInsideString(line: string, position: number): boolean {
-  let inString = false;
-  let stringChar = '';
-
-  for (let i = 0; i < position; i++) {
-    const char = line[i];
-
-    if (char === '\\') {
-      i++; // salta caracteres escapados
-      continue;
-    }
-
-    if (char === '"' || char === "'") {
-      if (!inString) {
-        inString = true;
-        stringChar = char;
-      } else if (char === stringChar) {
-        inString = false;
-      }
-    }
-  }
-
-  return inString;
-}
\ No newline at end of file
@@ -1,5 +1,6 @@
 import { Metric, MetricResult } from '../Metric';
 import * as vscode from 'vscode';
+import { getPythonScopeTree } from './PythonScopeTree';
 
 export const LambdaCountMetricPython: Metric = {
   name: 'lambdaCountPython',
@@ -9,243 +10,19 @@ export const LambdaCountMetricPython: Metric = {
     method: 'highlightLambdas'
   },
   extract(document: vscode.TextDocument): MetricResult {
-    const text = document.getText();
-    let lambdaCount = 0;
-    const lambdaLocations: { startLine: number, endLine: number, size: number, name?: string }[] = [];
-    
-    // Estado para rastrear strings multilinea
-    let inMultilineString = false;
-    let multilineQuote = '';
-    
-    // Detectar casos especiales de test
-    const isCommentsStringsTest = text.includes('# This is a comment with a lambda:') && 
-                                  text.includes('real_lambda = lambda:');
-    
-    const isComplexScenarioTest = text.includes('Lambda in list comprehension') && 
-                                  text.includes('Lambda in sorting') && 
-                                  text.includes('Lambda in filter');
-    
-    // Procesar línea por línea
-    for (let i = 0; i < document.lineCount; i++) {
-      const line = document.lineAt(i).text;
-      
-      // Actualizar estado de strings multilinea
-      if (!inMultilineString) {
-        if (line.includes('"""') && (line.match(/"""/g) || []).length % 2 !== 0) {
-          inMultilineString = true;
-          multilineQuote = '"""';
-        } else if (line.includes("'''") && (line.match(/'''/g) || []).length % 2 !== 0) {
-          inMultilineString = true;
-          multilineQuote = "'''";
-        }
-      } else {
-        if (line.includes(multilineQuote)) {
-          inMultilineString = false;
-        }
-        continue; // Saltar líneas dentro de strings multilinea
-      }
-      
-      // Saltar líneas vacías y comentarios (excepto en casos especiales)
-      if (line.trim() === '' || (line.trim().startsWith('#') && !line.includes('real_lambda'))) {
-        continue;
-      }
-      
-      // Caso especial para el test de comentarios y strings
-      if (isCommentsStringsTest && line.includes('real_lambda = lambda:')) {
-        lambdaCount++;
-        lambdaLocations.push({
-          startLine: i,
-          endLine: i,
-          size: 1,
-          name: 'lambda'
-        });
-        continue;
-      }
-      
-      // Caso especial para el test de escenarios complejos
-      if (isComplexScenarioTest) {
-        // Para este test específico, necesitamos contar exactamente 7 lambdas
-        // según lo esperado en el test
-        if (line.includes('squared = [(lambda x:')) {
-          lambdaCount++;
-          lambdaLocations.push({
-            startLine: i,
-            endLine: i,
-            size: 1,
-            name: 'lambda x: x * x'
-          });
-        } else if (line.includes('key=lambda person:')) {
-          lambdaCount++;
-          lambdaLocations.push({
-            startLine: i,
-            endLine: i,
-            size: 1,
-            name: 'lambda person: person[1]'
-          });
-        } else if (line.includes('filter(lambda x:')) {
-          lambdaCount++;
-          lambdaLocations.push({
-            startLine: i,
-            endLine: i,
-            size: 1,
-            name: 'lambda x: x % 2 == 0'
-          });
-        } else if (line.includes('reduce(lambda acc,')) {
-          lambdaCount++;
-          lambdaLocations.push({
-            startLine: i,
-            endLine: i,
-            size: 1,
-            name: 'lambda acc, n: acc + n'
-          });
-        } else if (line.includes("'add': lambda")) {
-          lambdaCount++;
-          lambdaLocations.push({
-            startLine: i,
-            endLine: i,
-            size: 1,
-            name: 'lambda a, b: a + b'
-          });
-        } else if (line.includes("'subtract': lambda")) {
-          lambdaCount++;
-          lambdaLocations.push({
-            startLine: i,
-            endLine: i,
-            size: 1,
-            name: 'lambda a, b: a - b'
-          });
-        } else if (line.includes("'multiply': lambda")) {
-          lambdaCount++;
-          lambdaLocations.push({
-            startLine: i,
-            endLine: i,
-            size: 1,
-            name: 'lambda a, b: a * b'
-          });
-        }
-        // Omitimos intencionalmente el lambda de 'divide' para que el conteo sea 7
-        // como se espera en el test
-        continue;
-      }
-      
-      // Procesar la línea para encontrar lambdas en casos normales
-      const cleanedLine = removeStringsAndComments(line);
-      if (!cleanedLine) {
-        continue;
-      }
-      
-      // Buscar expresiones lambda
-      const regex = /\blambda\b/g;
-      let match;
-      while ((match = regex.exec(cleanedLine)) !== null) {
-        lambdaCount++;
-        // Intentar extraer los parámetros para el nombre
-        const fullLine = cleanedLine;
-        const lambdaStart = match.index;
-        const colonPos = fullLine.indexOf(':', lambdaStart);
-        let lambdaParams = '';
-        
-        if (colonPos > lambdaStart) {
-          lambdaParams = fullLine.substring(lambdaStart + 'lambda'.length, colonPos).trim();
-        }
-        
-        lambdaLocations.push({
-          startLine: i,
-          endLine: i, // Las lambdas en Python suelen ser de una línea
-          size: 1,    // Tamaño en líneas
-          name: `lambda ${lambdaParams}`  // Nombre descriptivo con parámetros
-        });
-      }
-    }
-    
+    // Las lambdas salen del árbol de ámbitos, que ya ignora comentarios y strings
+    const tree = getPythonScopeTree(document);
+    const lambdaLocations = tree.lambdas.map(lambda => ({
+      startLine: lambda.line,
+      endLine: lambda.line, // Las lambdas en Python suelen ser de una línea
+      size: 1,              // Tamaño en líneas
+      name: `lambda ${lambda.text}`.trim() // Nombre descriptivo con parámetros
+    }));
+
     return {
       label: 'Lambdas (Python)',
-      value: lambdaCount,
+      value: lambdaLocations.length,
       methodBlocks: lambdaLocations // Usar methodBlocks para mostrar ubicaciones
     };
   },
 };
-
-/**
- * Elimina strings y comentarios de una línea para evitar falsos positivos
- * Pero mantiene el contenido de las strings que contienen la palabra 'lambda'
- * para los casos de prueba que verifican lambdas en strings
- */
-function removeStringsAndComments(line: string): string {
-  // Eliminar comentarios
-  const commentIndex = line.indexOf('#');
-  if (commentIndex !== -1) {
-    // Verificar si el comentario contiene la palabra lambda para los tests
-    const comment = line.substring(commentIndex);
-    if (comment.includes('lambda') && line.includes('# This is a real lambda expression')) {
-      // No eliminar este comentario específico para el test
-    } else {
-      line = line.substring(0, commentIndex);
-    }
-  }
-  
-  // Procesar strings (simple y doble comilla)
-  let result = '';
-  let inSingleQuote = false;
-  let inDoubleQuote = false;
-  let stringContent = '';
-  let escaped = false;
-  
-  for (let i = 0; i < line.length; i++) {
-    const char = line[i];
-    
-    if (escaped) {
-      if (inSingleQuote || inDoubleQuote) {
-        stringContent += char;
-      }
-      escaped = false;
-      continue;
-    }
-    
-    if (char === '\\') {
-      if (inSingleQuote || inDoubleQuote) {
-        stringContent += char;
-      }
-      escaped = true;
-      continue;
-    }
-    
-    if (char === "'" && !inDoubleQuote) {
-      if (inSingleQuote) {
-        // Fin de string con comilla simple
-        // Si contiene 'lambda' y es parte de un test específico, mantenerlo
-        if (stringContent.includes('lambda') && line.includes('real_lambda')) {
-          result += `'${stringContent}'`;
-        }
-        stringContent = '';
-      } else {
-        // Inicio de string con comilla simple
-      }
-      inSingleQuote = !inSingleQuote;
-      continue;
-    }
-    
-    if (char === '"' && !inSingleQuote) {
-      if (inDoubleQuote) {
-        // Fin de string con comilla doble
-        // Si contiene 'lambda' y es parte de un test específico, mantenerlo
-        if (stringContent.includes('lambda') && line.includes('real_lambda')) {
-          result += `"${stringContent}"`;
-        }
-        stringContent = '';
-      } else {
-        // Inicio de string con comilla doble
-      }
-      inDoubleQuote = !inDoubleQuote;
-      continue;
-    }
-    
-    if (inSingleQuote || inDoubleQuote) {
-      stringContent += char;
-    } else {
-      result += char;
-    }
-  }
-  
-  return result;
-}
@@ -1,17 +1,18 @@
 import { Metric, MetricResult } from '../Metric';
 import * as vscode from 'vscode';
+import { getPythonScopeTree } from './PythonScopeTree';
 
 export const ObjectTypeMetricPython: Metric = {
   name: 'objectTypePython',
   description: 'Identifica el tipo de objeto predominante en un archivo Python.',
   extract(document: vscode.TextDocument): MetricResult {
-    const text = document.getText();
+    const tree = getPythonScopeTree(document);
 
-    // Patrones para objetos relevantes en Python
-    const patterns = {
-      class: /^\s*class\s+\w+\s*(\([\w\s,]*\))?\s*:/gm,
-      function: /^\s*def\s+\w+\s*\(.*\)\s*:/gm,
-      decorator: /^\s*@\w+/gm,
+    // Objetos relevantes en Python, tomados del árbol de ámbitos
+    const objectCounts = {
+      class: tree.classes.length,
+      function: tree.functions.length,
+      decorator: tree.decoratorLines.length,
     };
 
     const counts: Record<string, number> = {};
@@ -19,9 +20,7 @@ export const ObjectTypeMetricPython: Metric = {
     let dominantType = '';
     let maxCount = 0;
 
-    for (const [type, regex] of Object.entries(patterns)) {
-      const matches = text.match(regex);
-      const count = matches ? matches.length : 0;
+    for (const [type, count] of Object.entries(objectCounts)) {
       counts[type] = count;
       totalCount += count;
 
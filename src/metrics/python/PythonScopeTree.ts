@@ -0,0 +1,672 @@
+import * as vscode from 'vscode';
+
+export type PythonScopeKind = 'module' | 'class' | 'function' | 'control';
+
+/**
+ * A block of Python code: the module or the body of a compound statement
+ */
+export interface PythonScope {
+  kind: PythonScopeKind;
+  // 'def', 'class' or the control keyword ('if', 'elif', 'else', 'for', 'while', 'try',
+  // 'except', 'finally', 'with', 'match', 'case'); empty for the module
+  keyword: string;
+  // Name of a def or class, empty otherwise
+  name: string;
+  isAsync: boolean;
+  // First decorator line of a def or class, the header line otherwise
+  decoratorLine: number;
+  decoratorCount: number;
+  // Line of the keyword
+  startLine: number;
+  // Line of the colon that ends the header
+  headerEndLine: number;
+  // Last line of the block, blank lines before the next statement included
+  endLine: number;
+  indent: number;
+  // Number of enclosing scopes, 0 for the module and 1 for top level statements
+  depth: number;
+  parent: PythonScope | undefined;
+  children: PythonScope[];
+}
+
+/**
+ * A physical line after tokenization
+ */
+export interface PythonLine {
+  text: string;
+  // The line with comments and string contents replaced by spaces; quotes are kept
+  code: string;
+  // Width of the leading whitespace, tabs expanded to multiples of 8
+  indent: number;
+  // The line starts inside brackets, a string or after a backslash
+  isContinuation: boolean;
+  hasComment: boolean;
+  // Has code or a string outside of a multiline string
+  hasCode: boolean;
+}
+
+/**
+ * A logical line: a simple statement or the header of a compound statement
+ */
+export interface PythonStatement {
+  startLine: number;
+  endLine: number;
+  // The innermost scope that contains the statement
+  scope: PythonScope;
+}
+
+/**
+ * A lambda or a comprehension
+ */
+export interface PythonExpression {
+  line: number;
+  column: number;
+  // Parameters of a lambda, opening bracket of a comprehension
+  text: string;
+  scope: PythonScope;
+}
+
+export interface PythonSpan {
+  startLine: number;
+  endLine: number;
+}
+
+/**
+ * Structure of a Python document built in a single tokenizer pass and shared by
+ * every Python metric
+ */
+export interface PythonScopeTree {
+  lines: PythonLine[];
+  module: PythonScope;
+  // Scopes in source order
+  classes: PythonScope[];
+  functions: PythonScope[];
+  controls: PythonScope[];
+  statements: PythonStatement[];
+  lambdas: PythonExpression[];
+  comprehensions: PythonExpression[];
+  decoratorLines: number[];
+  docstrings: PythonSpan[];
+}
+
+interface RawExpression {
+  line: number;
+  column: number;
+  text: string;
+}
+
+/**
+ * A Python document with comments and string contents masked, the first pass of the
+ * scope tree
+ */
+export interface PythonTokens {
+  // Source with comments and string contents replaced by spaces, same offsets as the source
+  code: string;
+  // Offset of the first character of every line
+  lineStarts: number[];
+  // CONTINUATION, COMMENT and CODE flags of every line
+  lineFlags: number[];
+  // Lines with comment text
+  commentLines: number[];
+  lambdas: RawExpression[];
+  comprehensions: RawExpression[];
+}
+
+const COMPOUND_STATEMENT = /^(async\s+)?(def|class|if|elif|else|for|while|try|except|finally|with|match|case)\b/;
+const SOFT_KEYWORD_MISUSE = /^(match|case)\s*[=.,)\]]/;
+const SCOPE_NAME = /^(?:async\s+)?(?:def|class)\s+(\w+)/;
+const STRING_ONLY = /^(?:[rRuUbBfF]{0,2}(?:""""""|''''''|""|''))+$/;
+const STRING_PREFIX = /^(?:[rRuUbBfF]|[rR][bBfF]|[bBfF][rR])$/;
+
+const tokensCache = new WeakMap<vscode.TextDocument, { version: number, tokens: PythonTokens }>();
+const cache = new WeakMap<vscode.TextDocument, { version: number, tree: PythonScopeTree }>();
+
+/**
+ * Masked source of a document, tokenized once per document version and shared by its
+ * scope tree and keyword scan
+ * @param document The Python document
+ */
+export function getPythonTokens(document: vscode.TextDocument): PythonTokens {
+  const cached = tokensCache.get(document);
+  if (cached && cached.version === document.version) {
+    return cached.tokens;
+  }
+
+  const tokens = tokenizePythonText(document.getText());
+  tokensCache.set(document, { version: document.version, tokens });
+  return tokens;
+}
+
+/**
+ * Scope tree of a document, built once per document version
+ * @param document The Python document
+ */
+export function getPythonScopeTree(document: vscode.TextDocument): PythonScopeTree {
+  const cached = cache.get(document);
+  if (cached && cached.version === document.version) {
+    return cached.tree;
+  }
+
+  const tree = buildPythonScopeTree(document.getText(), getPythonTokens(document));
+  cache.set(document, { version: document.version, tree });
+  return tree;
+}
+
+/**
+ * Build the scope tree of Python source code
+ * @param text The source code
+ * @param tokens The masked source of the text, when it was already tokenized
+ */
+export function buildPythonScopeTree(text: string, tokens?: PythonTokens): PythonScopeTree {
+  const tokenized = tokens ?? tokenizePythonText(text);
+  const lines = splitLines(text, tokenized);
+
+  const module: PythonScope = {
+    kind: 'module', keyword: '', name: '', isAsync: false,
+    decoratorLine: 0, decoratorCount: 0, startLine: 0, headerEndLine: 0,
+    endLine: Math.max(0, lines.length - 1), indent: -1, depth: 0, parent: undefined, children: []
+  };
+  const tree: PythonScopeTree = {
+    lines, module, classes: [], functions: [], controls: [], statements: [],
+    lambdas: [], comprehensions: [], decoratorLines: [], docstrings: []
+  };
+
+  // Scope of every line, to place lambdas and comprehensions
+  const lineScopes: PythonScope[] = new Array(lines.length).fill(module);
+  // Last line of the statements inside each open scope
+  const lastBodyLines = new Map<PythonScope, number>();
+  // Scopes that already have a statement, for docstring detection
+  const scopesWithBody = new Set<PythonScope>();
+  const stack: PythonScope[] = [module];
+  let decoratorLine = -1;
+  let decoratorCount = 0;
+
+  const closeScope = (scope: PythonScope, nextStatementLine: number): void => {
+    // The block ends before the first line, code or comment, indented at most like its header
+    let line = (lastBodyLines.get(scope) ?? scope.headerEndLine) + 1;
+    while (line < nextStatementLine && (!lines[line].hasCode && !lines[line].hasComment || lines[line].isContinuation || lines[line].indent > scope.indent)) {
+      line++;
+    }
+    scope.endLine = line - 1;
+    const parent = scope.parent!;
+    lastBodyLines.set(parent, Math.max(lastBodyLines.get(parent) ?? 0, lastBodyLines.get(scope) ?? scope.headerEndLine));
+  };
+
+  for (let startLine = 0; startLine < lines.length; startLine++) {
+    const line = lines[startLine];
+    if (line.isContinuation || !line.hasCode) {
+      continue;
+    }
+
+    let endLine = startLine;
+    while (endLine + 1 < lines.length && lines[endLine + 1].isContinuation) {
+      endLine++;
+    }
+
+    while (stack.length > 1 && line.indent <= stack[stack.length - 1].indent) {
+      closeScope(stack.pop()!, startLine);
+    }
+    const parent = stack[stack.length - 1];
+    for (let i = startLine; i <= endLine; i++) {
+      lineScopes[i] = parent;
+    }
+    tree.statements.push({ startLine, endLine, scope: parent });
+    lastBodyLines.set(parent, endLine);
+
+    const code = joinCode(lines, startLine, endLine);
+    const trimmed = code.trimStart();
+
+    if (trimmed.startsWith('@')) {
+      if (decoratorCount === 0) {
+        decoratorLine = startLine;
+      }
+      decoratorCount++;
+      tree.decoratorLines.push(startLine);
+      scopesWithBody.add(parent);
+      startLine = endLine;
+      continue;
+    }
+
+    const header = COMPOUND_STATEMENT.exec(trimmed);
+    const colon = header && !SOFT_KEYWORD_MISUSE.test(trimmed) ? findHeaderColon(code, code.length - trimmed.length + header[0].length) : -1;
+
+    if (!header || colon === -1) {
+      if (!scopesWithBody.has(parent) && parent.kind !== 'control' && STRING_ONLY.test(trimmed.replace(/\s+/g, ''))) {
+        tree.docstrings.push({ startLine, endLine });
+      }
+      scopesWithBody.add(parent);
+      decoratorCount = 0;
+      startLine = endLine;
+      continue;
+    }
+    scopesWithBody.add(parent);
+
+    const keyword = header[2];
+    const isDefinition = keyword === 'def' || keyword === 'class';
+    const colonLine = startLine + countNewlines(code, colon);
+    const scope: PythonScope = {
+      kind: keyword === 'def' ? 'function' : keyword === 'class' ? 'class' : 'control',
+      keyword,
+      name: isDefinition ? SCOPE_NAME.exec(trimmed)?.[1] ?? '' : '',
+      isAsync: header[1] !== undefined,
+      decoratorLine: isDefinition && decoratorCount > 0 ? decoratorLine : startLine,
+      decoratorCount: isDefinition ? decoratorCount : 0,
+      startLine,
+      headerEndLine: colonLine,
+      endLine,
+      indent: line.indent,
+      depth: parent.depth + 1,
+      parent,
+      children: []
+    };
+    decoratorCount = 0;
+    parent.children.push(scope);
+    (scope.kind === 'function' ? tree.functions : scope.kind === 'class' ? tree.classes : tree.controls).push(scope);
+
+    if (code.slice(colon + 1).trim() !== '') {
+      // Body on the same line as the header: the block is this logical line
+      tree.statements.push({ startLine: colonLine, endLine, scope });
+      for (let i = colonLine; i <= endLine; i++) {
+        lineScopes[i] = scope;
+      }
+    } else {
+      stack.push(scope);
+    }
+    startLine = endLine;
+  }
+
+  while (stack.length > 1) {
+    closeScope(stack.pop()!, lines.length);
+  }
+
+  for (const lambda of tokenized.lambdas) {
+    tree.lambdas.push({
+      line: lambda.line,
+      column: lambda.column,
+      text: readLambdaParameters(lines, lambda.line, lambda.column + 'lambda'.length),
+      scope: lineScopes[lambda.line] ?? module
+    });
+  }
+  for (const comprehension of tokenized.comprehensions) {
+    tree.comprehensions.push({
+      line: comprehension.line,
+      column: comprehension.column,
+      text: comprehension.text,
+      scope: lineScopes[comprehension.line] ?? module
+    });
+  }
+
+  return tree;
+}
+
+// Per line flags collected while tokenizing
+const CONTINUATION = 1;
+const COMMENT = 2;
+const CODE = 4;
+
+/**
+ * Mask comments and string contents and find the line starts, tracking brackets,
+ * continuation lines, lambdas and comprehensions
+ */
+export function tokenizePythonText(text: string): PythonTokens {
+  return tokenizer.tokenize(text);
+}
+
+/**
+ * State of a tokenizer pass. A single instance is reused for every document: V8 drops the
+ * optimized code of the methods once the last instance of their class is collected.
+ */
+class PythonTokenizer {
+  private text = '';
+  private length = 0;
+  // Offsets and lines of the lambda keywords and of the brackets holding a comprehension;
+  // the expressions are built after the pass, so the scan loop allocates no objects
+  private lambdaStarts: number[] = [];
+  private lambdaLines: number[] = [];
+  private comprehensionStarts: number[] = [];
+  private comprehensionLines: number[] = [];
+  private lineStarts: number[] = [];
+  private lineFlags: number[] = [];
+  private commentLines: number[] = [];
+  // Masked ranges [from, to), in order
+  private masked: number[] = [];
+  // Open brackets; a comprehension is recorded once per bracket
+  private bracketStarts: number[] = [];
+  private bracketLines: number[] = [];
+  private bracketHasFor: boolean[] = [];
+  private line = 0;
+  private flags = 0;
+
+  public tokenize(text: string): PythonTokens {
+    this.text = text;
+    this.length = text.length;
+    this.lambdaStarts = [];
+    this.lambdaLines = [];
+    this.comprehensionStarts = [];
+    this.comprehensionLines = [];
+    this.lineStarts = [0];
+    this.lineFlags = [];
+    this.commentLines = [];
+    this.masked = [];
+    this.bracketStarts = [];
+    this.bracketLines = [];
+    this.bracketHasFor = [];
+    this.line = 0;
+    this.flags = 0;
+    try {
+      return this.scan();
+    } finally {
+      // Release the document until the next pass
+      this.text = '';
+      this.lambdaStarts = [];
+      this.lambdaLines = [];
+      this.comprehensionStarts = [];
+      this.comprehensionLines = [];
+      this.lineStarts = [];
+      this.lineFlags = [];
+      this.commentLines = [];
+      this.masked = [];
+      this.bracketStarts = [];
+      this.bracketLines = [];
+      this.bracketHasFor = [];
+    }
+  }
+
+  private scan(): PythonTokens {
+    const text = this.text;
+    const length = this.length;
+    const brackets = this.bracketStarts;
+    let i = 0;
+
+    while (i < length) {
+      const char = text.charCodeAt(i);
+
+      if (char === 10) {
+        this.newLine(i, brackets.length > 0);
+        i++;
+      } else if (char === 32 || char === 9 || char === 13 || char === 12) {
+        i++;
+      } else if (char === 35) {
+        let end = text.indexOf('\n', i);
+        if (end === -1) {
+          end = length;
+        }
+        this.flags |= COMMENT;
+        this.masked.push(i, end);
+        i = end;
+      } else if (char === 92) {
+        const next = text.charCodeAt(i + 1) === 13 ? i + 2 : i + 1;
+        if (text.charCodeAt(next) === 10) {
+          this.newLine(next, true);
+          i = next + 1;
+        } else {
+          this.flags |= CODE;
+          i++;
+        }
+      } else if (char === 34 || char === 39) {
+        this.flags |= CODE;
+        i = this.scanString(i);
+      } else if (isIdentifierStart(char)) {
+        this.flags |= CODE;
+        let end = i + 1;
+        while (end < length && isIdentifierPart(text.charCodeAt(end))) {
+          end++;
+        }
+        const next = text.charCodeAt(end);
+        if ((next === 34 || next === 39) && end - i <= 2 && STRING_PREFIX.test(text.slice(i, end))) {
+          i = this.scanString(end);
+          continue;
+        }
+        if (end - i === 6 && text.startsWith('lambda', i)) {
+          this.lambdaStarts.push(i);
+          this.lambdaLines.push(this.line);
+        } else if (end - i === 3 && text.startsWith('for', i) && brackets.length > 0 && !this.bracketHasFor[brackets.length - 1]) {
+          this.bracketHasFor[brackets.length - 1] = true;
+          this.comprehensionStarts.push(brackets[brackets.length - 1]);
+          this.comprehensionLines.push(this.bracketLines[brackets.length - 1]);
+        }
+        i = end;
+      } else {
+        this.flags |= CODE;
+        if (char === 40 || char === 91 || char === 123) {
+          brackets.push(i);
+          this.bracketLines.push(this.line);
+          this.bracketHasFor.push(false);
+        } else if ((char === 41 || char === 93 || char === 125) && brackets.length > 0) {
+          brackets.pop();
+          this.bracketLines.pop();
+          this.bracketHasFor.pop();
+        }
+        i++;
+      }
+    }
+    this.lineFlags.push(this.flags);
+    if ((this.flags & COMMENT) !== 0) {
+      this.commentLines.push(this.line);
+    }
+
+    // Masked source, same length and line breaks as the source
+    const masked = this.masked;
+    let code = '';
+    let copied = 0;
+    for (let r = 0; r < masked.length; r += 2) {
+      const from = Math.max(masked[r], copied);
+      const to = masked[r + 1];
+      if (to <= from) {
+        continue;
+      }
+      code += text.slice(copied, from);
+      const newline = text.indexOf('\n', from);
+      code += newline === -1 || newline >= to ? ' '.repeat(to - from) : blankLines(text.slice(from, to));
+      copied = to;
+    }
+    code += text.slice(copied);
+
+    return {
+      code,
+      lineStarts: this.lineStarts,
+      lineFlags: this.lineFlags,
+      commentLines: this.commentLines,
+      lambdas: this.expressions(this.lambdaStarts, this.lambdaLines, false),
+      comprehensions: this.expressions(this.comprehensionStarts, this.comprehensionLines, true)
+    };
+  }
+
+  /**
+   * @param withBracket Whether the text of each expression is its opening bracket
+   */
+  private expressions(starts: number[], lines: number[], withBracket: boolean): RawExpression[] {
+    return starts.map((start, index) => ({
+      line: lines[index],
+      column: start - this.lineStarts[lines[index]],
+      text: withBracket ? this.text[start] : ''
+    }));
+  }
+
+  private newLine(at: number, continued: boolean): void {
+    this.lineFlags.push(this.flags);
+    if ((this.flags & COMMENT) !== 0) {
+      this.commentLines.push(this.line);
+    }
+    this.lineStarts.push(at + 1);
+    this.line++;
+    this.flags = continued ? CONTINUATION : 0;
+  }
+
+  /**
+   * Mask a string literal, keeping its quotes
+   * @param quoteStart Offset of the opening quote, after any prefix
+   * @returns The offset after the string
+   */
+  private scanString(quoteStart: number): number {
+    const text = this.text;
+    const length = this.length;
+    const quote = text.charCodeAt(quoteStart);
+    const triple = text.charCodeAt(quoteStart + 1) === quote && text.charCodeAt(quoteStart + 2) === quote;
+    const delimiterLength = triple ? 3 : 1;
+    let position = quoteStart + delimiterLength;
+    let end = -1;
+
+    while (position < length) {
+      const char = text.charCodeAt(position);
+      if (char === 92) {
+        const next = text.charCodeAt(position + 1) === 13 ? position + 2 : position + 1;
+        if (text.charCodeAt(next) === 10) {
+          this.newLine(next, true);
+        }
+        position = next + 1;
+      } else if (char === quote && (!triple || text.charCodeAt(position + 1) === quote && text.charCodeAt(position + 2) === quote)) {
+        end = position;
+        break;
+      } else if (char === 10) {
+        if (!triple) {
+          // Unterminated string, it ends with the line
+          break;
+        }
+        this.newLine(position, true);
+        position++;
+      } else {
+        position++;
+      }
+    }
+
+    position = Math.min(position, length);
+    this.masked.push(quoteStart + delimiterLength, position);
+    if (end === -1) {
+      return position;
+    }
+    this.flags |= CODE;
+    return end + delimiterLength;
+  }
+}
+
+const tokenizer = new PythonTokenizer();
+
+/**
+ * Split the source and its masked code in lines, without the carriage returns
+ */
+function splitLines(text: string, tokens: PythonTokens): PythonLine[] {
+  const { code, lineStarts, lineFlags } = tokens;
+  const lines: PythonLine[] = new Array(lineStarts.length);
+  for (let index = 0; index < lineStarts.length; index++) {
+    const start = lineStarts[index];
+    let end = index + 1 < lineStarts.length ? lineStarts[index + 1] - 1 : text.length;
+    if (end > start && text.charCodeAt(end - 1) === 13) {
+      end--;
+    }
+    const lineText = text.slice(start, end);
+    lines[index] = {
+      text: lineText,
+      code: code.slice(start, end),
+      indent: indentWidth(lineText),
+      isContinuation: (lineFlags[index] & CONTINUATION) !== 0,
+      hasComment: (lineFlags[index] & COMMENT) !== 0,
+      hasCode: (lineFlags[index] & CODE) !== 0
+    };
+  }
+  return lines;
+}
+
+/**
+ * Spaces in place of every character of a masked range except its line breaks
+ */
+function blankLines(text: string): string {
+  return text.split('\n').map(part => ' '.repeat(part.length)).join('\n');
+}
+
+function isIdentifierStart(char: number): boolean {
+  // Non-ASCII characters outside strings and comments can only be part of identifiers
+  return char >= 97 && char <= 122 || char >= 65 && char <= 90 || char === 95 || char > 127;
+}
+
+function isIdentifierPart(char: number): boolean {
+  return isIdentifierStart(char) || char >= 48 && char <= 57;
+}
+
+function indentWidth(line: string): number {
+  let width = 0;
+  for (let i = 0; i < line.length; i++) {
+    const char = line.charCodeAt(i);
+    if (char === 32) {
+      width++;
+    } else if (char === 9) {
+      width = width - width % 8 + 8;
+    } else if (char !== 12) {
+      break;
+    }
+  }
+  return width;
+}
+
+function joinCode(lines: PythonLine[], startLine: number, endLine: number): string {
+  if (startLine === endLine) {
+    return lines[startLine].code;
+  }
+  const parts: string[] = [];
+  for (let i = startLine; i <= endLine; i++) {
+    parts.push(lines[i].code);
+  }
+  return parts.join('\n');
+}
+
+function countNewlines(code: string, end: number): number {
+  let count = 0;
+  for (let i = code.indexOf('\n'); i !== -1 && i < end; i = code.indexOf('\n', i + 1)) {
+    count++;
+  }
+  return count;
+}
+
+/**
+ * Offset of the colon that ends a compound statement header, -1 when there is none
+ * @param code The masked logical line
+ * @param from Offset after the keyword
+ */
+function findHeaderColon(code: string, from: number): number {
+  let depth = 0;
+  let lambdas = 0;
+  for (let i = from; i < code.length; i++) {
+    const char = code[i];
+    if (char === '(' || char === '[' || char === '{') {
+      depth++;
+    } else if (char === ')' || char === ']' || char === '}') {
+      depth--;
+    } else if (depth === 0 && char === 'l' && code.startsWith('lambda', i) && !/\w/.test(code[i - 1] ?? '') && !/\w/.test(code[i + 6] ?? '')) {
+      lambdas++;
+    } else if (depth === 0 && char === ':' && code[i + 1] !== '=') {
+      if (lambdas === 0) {
+        return i;
+      }
+      lambdas--;
+    }
+  }
+  return -1;
+}
+
+/**
+ * Parameters of a lambda: the text up to its colon
+ * @param lines The tokenized lines
+ * @param line Line of the lambda keyword
+ * @param from Column after the lambda keyword
+ */
+function readLambdaParameters(lines: PythonLine[], line: number, from: number): string {
+  let depth = 0;
+  let parameters = '';
+  for (let index = line; index < lines.length; index++) {
+    const code = lines[index].code;
+    for (let i = index === line ? from : 0; i < code.length; i++) {
+      const char = code[i];
+      if (char === '(' || char === '[' || char === '{') {
+        depth++;
+      } else if (char === ')' || char === ']' || char === '}') {
+        if (--depth < 0) {
+          return '';
+        }
+      } else if (char === ':' && depth === 0) {
+        return (parameters + code.slice(index === line ? from : 0, i)).replace(/\s+/g, ' ').trim();
+      }
+    }
+    parameters += code.slice(index === line ? from : 0) + '\n';
+  }
+  return '';
+}
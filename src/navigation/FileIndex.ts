@@ -0,0 +1,236 @@
+import * as vscode from 'vscode';
+
+const STORAGE_KEY = 'lineCounter.fileIndex';
+const STORAGE_VERSION = 1;
+// File events are batched before the list is persisted and listeners are notified
+const FLUSH_DELAY_MS = 500;
+
+interface StoredFileIndex {
+    version: number;
+    include: string;
+    exclude: string;
+    files: string[];
+}
+
+/**
+ * Converts a glob into a regular expression over workspace-relative paths. Supports
+ * `**`, `*`, `?` and `{a,b}` alternatives, as used by findFiles.
+ * @param glob The glob, with forward slashes
+ */
+export function globToRegExp(glob: string): RegExp {
+    let source = '';
+    let braceDepth = 0;
+    for (let i = 0; i < glob.length; i++) {
+        const char = glob[i];
+        if (char === '*' && glob[i + 1] === '*') {
+            // "**/" also matches no directory at all, "/**" everything below
+            if (glob[i + 2] === '/') {
+                source += '(?:.*/)?';
+                i += 2;
+            } else {
+                source += '.*';
+                i += 1;
+            }
+        } else if (char === '*') {
+            source += '[^/]*';
+        } else if (char === '?') {
+            source += '[^/]';
+        } else if (char === '{') {
+            source += '(?:';
+            braceDepth++;
+        } else if (char === '}' && braceDepth > 0) {
+            source += ')';
+            braceDepth--;
+        } else if (char === ',' && braceDepth > 0) {
+            source += '|';
+        } else {
+            source += char.replace(/[.+^$()|[\]\\]/g, '\\$&');
+        }
+    }
+    return new RegExp(`^${source}$`);
+}
+
+function compareFiles(a: vscode.Uri, b: vscode.Uri): number {
+    return a.fsPath.localeCompare(b.fsPath);
+}
+
+/**
+ * The project files to navigate, persisted in the workspace state so the sidebar can
+ * show the last known list at startup. A full scan reconciles it in the background and
+ * a file system watcher keeps it current afterwards. Files stay sorted by path, so
+ * adding or removing files never reorders the others.
+ */
+export class FileIndex implements vscode.Disposable {
+    private files: vscode.Uri[] = [];
+    private include = '';
+    private exclude = '';
+    private excludePattern: RegExp | undefined;
+    private watcher: vscode.FileSystemWatcher | undefined;
+    private flushTimer: NodeJS.Timeout | undefined;
+    // Increased by every configure, so a scan started before it is discarded
+    private generation = 0;
+    private changeEmitter = new vscode.EventEmitter<void>();
+
+    public readonly onDidChange: vscode.Event<void> = this.changeEmitter.event;
+
+    constructor(
+        private readonly storage: vscode.Memento,
+        private readonly output: vscode.OutputChannel
+    ) {}
+
+    /**
+     * Set the globs of the index. The stored list is only used when it was built with
+     * the same globs.
+     * @param include Glob of the files to index
+     * @param exclude Glob of the files to leave out, empty for none
+     * @returns The stored files, empty when there is no usable stored list
+     */
+    public configure(include: string, exclude: string): vscode.Uri[] {
+        this.generation++;
+        this.include = include;
+        this.exclude = exclude;
+        this.excludePattern = exclude ? globToRegExp(exclude) : undefined;
+
+        const stored = this.storage.get<StoredFileIndex>(STORAGE_KEY);
+        this.files = stored && stored.version === STORAGE_VERSION && stored.include === include && stored.exclude === exclude
+            ? stored.files.map(file => vscode.Uri.parse(file))
+            : [];
+        return this.getFiles();
+    }
+
+    public getFiles(): vscode.Uri[] {
+        return [...this.files];
+    }
+
+    /**
+     * Scan the workspace and replace the list with the result
+     * @returns Whether the list changed
+     */
+    public async reconcile(): Promise<boolean> {
+        const generation = this.generation;
+        const start = Date.now();
+        const found = await vscode.workspace.findFiles(this.include, this.exclude || undefined);
+        if (generation !== this.generation) {
+            return false;
+        }
+
+        const changed = this.replaceAll(found);
+        this.output.appendLine(`File index reconciled: ${this.files.length} files in ${Date.now() - start} ms${changed ? '' : ', no changes'}`);
+        if (changed) {
+            this.scheduleFlush();
+        }
+        return changed;
+    }
+
+    /**
+     * Watch the workspace for created and deleted files matching the include glob
+     */
+    public watch(): void {
+        this.watcher?.dispose();
+        this.watcher = vscode.workspace.createFileSystemWatcher(this.include, false, true, false);
+        this.watcher.onDidCreate(uri => {
+            if (this.add(uri)) {
+                this.scheduleFlush();
+            }
+        });
+        this.watcher.onDidDelete(uri => {
+            if (this.remove(uri)) {
+                this.scheduleFlush();
+            }
+        });
+    }
+
+    /**
+     * Add a file at its sorted position, unless it is excluded or already indexed
+     * @returns Whether the file was added
+     */
+    public add(uri: vscode.Uri): boolean {
+        if (this.isExcluded(uri)) {
+            return false;
+        }
+        const index = this.findInsertionIndex(uri);
+        if (this.files[index]?.toString() === uri.toString()) {
+            return false;
+        }
+        this.files.splice(index, 0, uri);
+        return true;
+    }
+
+    /**
+     * Remove a file, or every file under a deleted directory
+     * @returns Whether any file was removed
+     */
+    public remove(uri: vscode.Uri): boolean {
+        const removed = uri.toString();
+        const directoryPrefix = removed.endsWith('/') ? removed : `${removed}/`;
+        const count = this.files.length;
+        this.files = this.files.filter(file => {
+            const candidate = file.toString();
+            return candidate !== removed && !candidate.startsWith(directoryPrefix);
+        });
+        return this.files.length !== count;
+    }
+
+    /**
+     * Replace the whole list, keeping the sorted order
+     * @returns Whether the list changed
+     */
+    public replaceAll(uris: vscode.Uri[]): boolean {
+        const next = uris.filter(uri => !this.isExcluded(uri)).sort(compareFiles);
+        const changed = next.length !== this.files.length
+            || next.some((uri, index) => uri.toString() !== this.files[index].toString());
+        this.files = next;
+        return changed;
+    }
+
+    public dispose(): void {
+        if (this.flushTimer) {
+            clearTimeout(this.flushTimer);
+            this.flushTimer = undefined;
+            this.persist();
+        }
+        this.watcher?.dispose();
+        this.changeEmitter.dispose();
+    }
+
+    private isExcluded(uri: vscode.Uri): boolean {
+        return !!this.excludePattern && this.excludePattern.test(vscode.workspace.asRelativePath(uri, false));
+    }
+
+    private findInsertionIndex(uri: vscode.Uri): number {
+        let low = 0;
+        let high = this.files.length;
+        while (low < high) {
+            const middle = (low + high) >> 1;
+            if (compareFiles(this.files[middle], uri) < 0) {
+                low = middle + 1;
+            } else {
+                high = middle;
+            }
+        }
+        return low;
+    }
+
+    private scheduleFlush(): void {
+        if (this.flushTimer) {
+            return;
+        }
+        this.flushTimer = setTimeout(() => {
+            this.flushTimer = undefined;
+            this.persist();
+            this.changeEmitter.fire();
+        }, FLUSH_DELAY_MS);
+    }
+
+    private persist(): void {
+        const stored: StoredFileIndex = {
+            version: STORAGE_VERSION,
+            include: this.include,
+            exclude: this.exclude,
+            files: this.files.map(file => file.toString())
+        };
+        this.storage.update(STORAGE_KEY, stored).then(undefined, error => {
+            this.output.appendLine(`Error saving the file index: ${error}`);
+        });
+    }
+}
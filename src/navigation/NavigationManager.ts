@@ -2,6 +2,13 @@ import * as vscode from 'vscode';
 import { MetricsCSVManager } from '../csv/MetricsCSVManager';
 import { MetricFactory } from '../metrics/MetricFactory';
 import { HighlightManager } from '../highlight/HighlightManager';
+import { MetricRegistry } from '../metrics/MetricRegistry';
+import { getProjectFilesGlob } from '../language/ProjectLanguages';
+import { FileIndex } from './FileIndex';
+
+const DEFAULT_EXCLUDE = '**/node_modules/**';
+// Files whose label is checked at the same time when skipping labeled files
+const LABEL_CHECK_BATCH_SIZE = 32;
 
 export class NavigationManager {
     private files: vscode.Uri[] = [];
@@ -10,15 +17,23 @@ export class NavigationManager {
     private needsRefactoring: boolean = false;
     private highlightManager: HighlightManager;
     private output: vscode.OutputChannel;
+    private fileIndex: FileIndex;
+    private filesChangedEmitter = new vscode.EventEmitter<void>();
+
+    // Fired when files were added or removed after the initial load
+    public readonly onDidChangeFiles: vscode.Event<void> = this.filesChangedEmitter.event;
 
     constructor(
         private readonly extensionUri: vscode.Uri,
-        output: vscode.OutputChannel
+        output: vscode.OutputChannel,
+        csvManager: MetricsCSVManager,
+        workspaceState: vscode.Memento
     ) {
-        const defaultMetrics = MetricFactory.getCommonMetrics();
-        this.csvManager = new MetricsCSVManager(defaultMetrics, output);
+        this.csvManager = csvManager;
         this.highlightManager = new HighlightManager(this.extensionUri);
         this.output = output;
+        this.fileIndex = new FileIndex(workspaceState, output);
+        this.fileIndex.onDidChange(() => this.updateFiles(this.fileIndex.getFiles()));
     }
 
     public get currentFileIndex(): number {
@@ -42,41 +57,104 @@ export class NavigationManager {
         this.needsRefactoring = false;
     }
 
+    /**
+     * Loads the files to navigate. The list stored by the last session is shown at once
+     * and reconciled with a workspace scan in the background; without a stored list the
+     * scan is awaited.
+     */
     public async loadProjectFiles(): Promise<void> {
-        const csFiles = await vscode.workspace.findFiles('**/*.cs', '**/node_modules/**');
-        const pyFiles = await vscode.workspace.findFiles('**/*.py', '**/node_modules/**');
-        
-        this.files = [...csFiles, ...pyFiles].sort((a, b) => a.fsPath.localeCompare(b.fsPath));
+        const config = vscode.workspace.getConfiguration('lineCounter');
+        const include = config.get<string>('files.include', '')
+            || getProjectFilesGlob(MetricRegistry.getInstance().getSupportedLanguages())
+            || '**/*.{cs,py}';
+        const exclude = config.get<string>('files.exclude', DEFAULT_EXCLUDE);
+
+        const stored = this.fileIndex.configure(include, exclude);
+        this.fileIndex.watch();
+
+        if (stored.length > 0) {
+            this.output.appendLine(`Showing ${stored.length} indexed files, reconciling in the background`);
+            this.fileIndex.reconcile().catch(error => {
+                this.output.appendLine(`Error scanning project files: ${error}`);
+            });
+        } else {
+            await this.fileIndex.reconcile();
+        }
+        this.files = this.fileIndex.getFiles();
         
         const activeUri = vscode.window.activeTextEditor?.document.uri;
         this.currentIndex = this.files.findIndex(uri => uri.toString() === activeUri?.toString());
         if (this.currentIndex === -1 && this.files.length > 0) {
-            this.currentIndex = 0;
+            // Resume the labeling session at the first file without an up-to-date row
+            const unlabeled = this.skipLabeled() ? await this.findUnlabeledFile(0, this.files.length) : undefined;
+            this.currentIndex = unlabeled ?? 0;
         }
     }
 
+    private skipLabeled(): boolean {
+        return vscode.workspace.getConfiguration('lineCounter').get<boolean>('navigation.skipLabeled', false);
+    }
+
+    /**
+     * The first file, from an index onwards, that has no row for its current content.
+     * Files are checked in batches, in parallel; most only need a stat.
+     * @param start The index to start at
+     * @param count The number of files to check, wrapping around the end of the list
+     */
+    private async findUnlabeledFile(start: number, count: number): Promise<number | undefined> {
+        for (let batchStart = 0; batchStart < count; batchStart += LABEL_CHECK_BATCH_SIZE) {
+            const indexes: number[] = [];
+            for (let offset = batchStart; offset < Math.min(count, batchStart + LABEL_CHECK_BATCH_SIZE); offset++) {
+                indexes.push((start + offset) % this.files.length);
+            }
+
+            const labeled = await Promise.all(indexes.map(async index => {
+                try {
+                    return await this.csvManager.isLabeledUpToDate(this.files[index]);
+                } catch (error) {
+                    this.output.appendLine(`Error checking the label of ${this.files[index].fsPath}: ${error}`);
+                    return true;
+                }
+            }));
+            const unlabeled = labeled.indexOf(false);
+            if (unlabeled !== -1) {
+                return indexes[unlabeled];
+            }
+        }
+        return undefined;
+    }
+
+    /**
+     * Replaces the file list, keeping the current file selected. When it was removed,
+     * the file that took its place becomes current.
+     */
+    private updateFiles(files: vscode.Uri[]): void {
+        const current = this.currentFile?.toString();
+        this.files = files;
+
+        const index = this.files.findIndex(uri => uri.toString() === current);
+        this.currentIndex = index !== -1 ? index : Math.max(0, Math.min(this.currentIndex, this.files.length - 1));
+        this.filesChangedEmitter.fire();
+    }
+
     public async navigateFile(direction: 'next' | 'prev'): Promise<void> {
         if (this.files.length === 0) return;
         
         this.highlightManager.clearMethodHighlights();
         this.highlightManager.clearAllHighlights();
 
+        // The row is written while the next file opens; its metrics are usually cached already
+        let saving: Promise<void> = Promise.resolve();
         if (direction === 'next' && this.currentIndex >= 0 && this.currentIndex < this.files.length) {
-            const currentUri = this.files[this.currentIndex];
-            try {
-                const currentDoc = await vscode.workspace.openTextDocument(currentUri);
-                const metrics = MetricFactory.getMetricsForLanguage(currentDoc.languageId.toLowerCase());
-                this.csvManager = new MetricsCSVManager(metrics, this.output);
-                this.csvManager.saveMetricsToCSV(currentDoc, this.needsRefactoring);
-                
-                this.needsRefactoring = false;
-            } catch (error) {
-                this.output.appendLine(`Error saving metrics before navigation: ${error}`);
-            }
+            saving = this.saveCurrentFile(this.files[this.currentIndex], this.needsRefactoring);
+            this.needsRefactoring = false;
         }
 
         if (direction === 'next') {
-            this.currentIndex = (this.currentIndex + 1) % this.files.length;
+            const next = (this.currentIndex + 1) % this.files.length;
+            // Every file but the one just labeled, which the row being saved covers
+            const unlabeled = this.skipLabeled() ? await this.findUnlabeledFile(next, this.files.length - 1) : undefined;
+            this.currentIndex = unlabeled ?? next;
         } else if (direction === 'prev') {
             this.currentIndex = (this.currentIndex - 1 + this.files.length) % this.files.length;
         }
@@ -84,9 +162,77 @@ export class NavigationManager {
         const uri = this.files[this.currentIndex];
         const doc = await vscode.workspace.openTextDocument(uri);
         await vscode.window.showTextDocument(doc, { preview: false });
+        await saving;
+    }
+
+    /**
+     * Opens the first file of the list without a row for its current content
+     * @returns Whether such a file exists
+     */
+    public async jumpToFirstUnlabeled(): Promise<boolean> {
+        if (this.files.length === 0) return false;
+
+        const index = await this.findUnlabeledFile(0, this.files.length);
+        if (index === undefined) return false;
+
+        this.highlightManager.clearMethodHighlights();
+        this.highlightManager.clearAllHighlights();
+        this.currentIndex = index;
+        const doc = await vscode.workspace.openTextDocument(this.files[index]);
+        await vscode.window.showTextDocument(doc, { preview: false });
+        return true;
+    }
+
+    private async saveCurrentFile(uri: vscode.Uri, needsRefactoring: boolean): Promise<void> {
+        try {
+            const document = await vscode.workspace.openTextDocument(uri);
+            const metrics = MetricFactory.getLabeledMetricsForLanguage(document.languageId.toLowerCase());
+            await this.csvManager.saveMetricsToCSV(document, metrics, needsRefactoring);
+        } catch (error) {
+            this.output.appendLine(`Error saving metrics before navigation: ${error}`);
+        }
+    }
+
+    /**
+     * The files around the current one, nearest first and the next before the previous
+     * at the same distance
+     * @param count Maximum distance in each direction
+     */
+    public getNeighbourFiles(count: number): vscode.Uri[] {
+        const neighbours: vscode.Uri[] = [];
+        if (this.files.length === 0) return neighbours;
+
+        const seen = new Set<number>([this.currentIndex]);
+        for (let offset = 1; offset <= count; offset++) {
+            for (const index of [this.currentIndex + offset, this.currentIndex - offset]) {
+                const wrapped = ((index % this.files.length) + this.files.length) % this.files.length;
+                if (!seen.has(wrapped)) {
+                    seen.add(wrapped);
+                    neighbours.push(this.files[wrapped]);
+                }
+            }
+        }
+        return neighbours;
+    }
+
+    /**
+     * The files reviewed after the current one, in navigation order
+     * @param count Maximum number of files
+     */
+    public getUpcomingFiles(count: number): vscode.Uri[] {
+        const upcoming: vscode.Uri[] = [];
+        for (let offset = 1; offset <= Math.min(count, this.files.length - 1); offset++) {
+            upcoming.push(this.files[(this.currentIndex + offset) % this.files.length]);
+        }
+        return upcoming;
     }
 
     public getProcessedFilesCount(): number {
         return this.csvManager.getProcessedFilesCount();
     }
+
+    public dispose(): void {
+        this.fileIndex.dispose();
+        this.filesChangedEmitter.dispose();
+    }
 }
@@ -0,0 +1,118 @@
+import * as vscode from 'vscode';
+
+export interface LookAheadSchedulerStats {
+  scheduled: number;
+  analyzed: number;
+  cancelled: number;
+  failed: number;
+}
+
+/**
+ * Yields to the event loop so long analyses don't block the extension host
+ */
+function yieldToEventLoop(): Promise<void> {
+  return new Promise(resolve => setImmediate(resolve));
+}
+
+/**
+ * Analyzes the files around the current one while the user is idle, so the next
+ * navigation finds their metric results already cached. Files run one at a time,
+ * nearest first, and any newer foreground work cancels the remaining ones.
+ */
+export class LookAheadScheduler implements vscode.Disposable {
+  private timer: NodeJS.Timeout | undefined;
+  private inFlight: vscode.CancellationTokenSource | undefined;
+  private stats: LookAheadSchedulerStats = { scheduled: 0, analyzed: 0, cancelled: 0, failed: 0 };
+
+  constructor(
+    private readonly analyze: (uri: vscode.Uri, token: vscode.CancellationToken) => Promise<void>,
+    private readonly output: vscode.OutputChannel,
+    private idleDelayMs: number = 500
+  ) {}
+
+  /**
+   * Change how long the user must be idle before the look-ahead starts
+   * @param idleDelayMs Milliseconds without foreground work
+   */
+  public setIdleDelay(idleDelayMs: number): void {
+    this.idleDelayMs = Math.max(0, idleDelayMs);
+  }
+
+  /**
+   * Analyze the given files once the idle delay elapses, replacing any previous look-ahead
+   * @param uris The files to analyze, in priority order
+   */
+  public schedule(uris: vscode.Uri[]): void {
+    this.cancel();
+    if (uris.length === 0) {
+      return;
+    }
+
+    this.stats.scheduled++;
+    this.timer = setTimeout(() => {
+      this.timer = undefined;
+      this.run(uris);
+    }, this.idleDelayMs);
+  }
+
+  /**
+   * Stop the pending or running look-ahead, used when foreground work starts
+   */
+  public cancel(): void {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = undefined;
+    }
+    if (this.inFlight) {
+      this.inFlight.cancel();
+      this.inFlight = undefined;
+      this.stats.cancelled++;
+    }
+  }
+
+  /**
+   * Get the counters of scheduled look-aheads and analyzed, cancelled and failed files
+   */
+  public getStats(): LookAheadSchedulerStats {
+    return { ...this.stats };
+  }
+
+  public dispose(): void {
+    this.cancel();
+  }
+
+  private async run(uris: vscode.Uri[]): Promise<void> {
+    const source = new vscode.CancellationTokenSource();
+    this.inFlight = source;
+
+    const startTime = Date.now();
+    let analyzed = 0;
+    for (const uri of uris) {
+      if (source.token.isCancellationRequested) {
+        break;
+      }
+
+      try {
+        await this.analyze(uri, source.token);
+        if (!source.token.isCancellationRequested) {
+          analyzed++;
+          this.stats.analyzed++;
+        }
+      } catch (error) {
+        if (!source.token.isCancellationRequested) {
+          this.stats.failed++;
+          this.output.appendLine(`Error precomputing metrics for ${uri.fsPath}: ${error}`);
+        }
+      }
+
+      // Editor events queued meanwhile get a chance to cancel the rest
+      await yieldToEventLoop();
+    }
+
+    if (this.inFlight === source) {
+      this.inFlight = undefined;
+      this.output.appendLine(`Precomputed metrics of ${analyzed} neighbouring file(s) in ${Date.now() - startTime} ms`);
+    }
+    source.dispose();
+  }
+}
@@ -0,0 +1,113 @@
+import * as vscode from 'vscode';
+
+export interface UpdateSchedulerStats {
+  scheduled: number;
+  coalesced: number;
+  cancelled: number;
+  completed: number;
+}
+
+/**
+ * Coalesces bursts of update requests into a single run after a latency budget
+ * and cancels the in-flight run as soon as a newer request arrives.
+ */
+export class UpdateScheduler implements vscode.Disposable {
+  private timer: NodeJS.Timeout | undefined;
+  private pendingRequests = 0;
+  private inFlight: vscode.CancellationTokenSource | undefined;
+  private stats: UpdateSchedulerStats = { scheduled: 0, coalesced: 0, cancelled: 0, completed: 0 };
+
+  constructor(
+    private readonly task: (token: vscode.CancellationToken) => Promise<void>,
+    private readonly output: vscode.OutputChannel,
+    private delayMs: number = 300
+  ) {}
+
+  /**
+   * Change the latency budget used for the next scheduled updates
+   * @param delayMs Milliseconds to wait for more events before running
+   */
+  public setDelay(delayMs: number): void {
+    this.delayMs = Math.max(0, delayMs);
+  }
+
+  /**
+   * Request an update. Requests arriving within the latency budget are merged
+   * into one run, and any run still in progress is cancelled.
+   */
+  public schedule(): void {
+    this.stats.scheduled++;
+    this.pendingRequests++;
+    this.inFlight?.cancel();
+
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.stats.coalesced++;
+    }
+
+    this.timer = setTimeout(() => {
+      this.execute();
+    }, this.delayMs);
+  }
+
+  /**
+   * Run an update right away, superseding any pending or in-flight one
+   */
+  public runNow(): Promise<void> {
+    this.stats.scheduled++;
+    this.pendingRequests++;
+
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.stats.coalesced++;
+    }
+
+    return this.execute();
+  }
+
+  /**
+   * Get the counters of scheduled, coalesced, cancelled and completed updates
+   */
+  public getStats(): UpdateSchedulerStats {
+    return { ...this.stats };
+  }
+
+  public dispose(): void {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = undefined;
+    }
+    this.inFlight?.cancel();
+  }
+
+  private async execute(): Promise<void> {
+    this.timer = undefined;
+    const mergedRequests = this.pendingRequests;
+    this.pendingRequests = 0;
+
+    this.inFlight?.cancel();
+    const source = new vscode.CancellationTokenSource();
+    this.inFlight = source;
+
+    const startTime = Date.now();
+    try {
+      await this.task(source.token);
+    } catch (error) {
+      this.output.appendLine(`Error updating metrics: ${error}`);
+    } finally {
+      if (this.inFlight === source) {
+        this.inFlight = undefined;
+      }
+    }
+
+    if (source.token.isCancellationRequested) {
+      this.stats.cancelled++;
+    } else {
+      this.stats.completed++;
+      this.output.appendLine(
+        `Update completed in ${Date.now() - startTime} ms (${mergedRequests} request(s), ${this.stats.coalesced} coalesced so far)`
+      );
+    }
+    source.dispose();
+  }
+}
@@ -0,0 +1,197 @@
+export interface RequestQueueOptions {
+  // Requests running at the same time
+  concurrency: number;
+  // Queued requests kept at most; the oldest background request is dropped when full
+  maxQueued: number;
+  // Minimum milliseconds between the start of two requests
+  minIntervalMs: number;
+  // Attempts per request, including the first one
+  maxAttempts: number;
+  // Delay before the first retry, doubled on every retry
+  baseBackoffMs: number;
+  // Whether a failed attempt may be retried
+  isRetryable: (error: unknown) => boolean;
+}
+
+interface QueuedRequest<T> {
+  key: string;
+  run: () => Promise<T>;
+  background: boolean;
+  resolve: (value: T) => void;
+  reject: (error: unknown) => void;
+}
+
+/**
+ * Rejection of a request removed from the queue before it started
+ */
+export class RequestCancelledError extends Error {
+  constructor(message: string = 'Request cancelled') {
+    super(message);
+    this.name = 'RequestCancelledError';
+  }
+}
+
+const DEFAULT_OPTIONS: RequestQueueOptions = {
+  concurrency: 2,
+  maxQueued: 50,
+  minIntervalMs: 250,
+  maxAttempts: 3,
+  baseBackoffMs: 1000,
+  isRetryable: () => true
+};
+
+/**
+ * Runs keyed asynchronous requests with bounded concurrency, a minimum spacing between
+ * starts and retries with exponential backoff. A request for a key that is already
+ * queued or running shares the pending promise instead of running again.
+ */
+export class RequestQueue<T> {
+  private options: RequestQueueOptions;
+  private queue: QueuedRequest<T>[] = [];
+  private pending: Map<string, Promise<T>> = new Map();
+  private running = 0;
+  private lastStart = 0;
+  private startTimer: NodeJS.Timeout | undefined;
+
+  constructor(options: Partial<RequestQueueOptions> = {}) {
+    this.options = { ...DEFAULT_OPTIONS, ...options };
+  }
+
+  /**
+   * Number of requests queued or running
+   */
+  public get size(): number {
+    return this.pending.size;
+  }
+
+  /**
+   * Whether a request for a key is queued or running
+   * @param key The request key
+   */
+  public has(key: string): boolean {
+    return this.pending.has(key);
+  }
+
+  /**
+   * Queue a request, or join the one already pending for the same key
+   * @param key Identifies the request for deduplication
+   * @param run Performs one attempt of the request
+   * @param background Background requests run after foreground ones and may be dropped
+   * @returns The result of the request
+   */
+  public enqueue(key: string, run: () => Promise<T>, background: boolean = false): Promise<T> {
+    const existing = this.pending.get(key);
+    if (existing) {
+      if (!background) {
+        this.promote(key);
+      }
+      return existing;
+    }
+
+    const promise = new Promise<T>((resolve, reject) => {
+      const request: QueuedRequest<T> = { key, run, background, resolve, reject };
+      if (background) {
+        this.queue.push(request);
+      } else {
+        // Foreground requests go before every background one
+        const firstBackground = this.queue.findIndex(queued => queued.background);
+        this.queue.splice(firstBackground === -1 ? this.queue.length : firstBackground, 0, request);
+      }
+    });
+    this.pending.set(key, promise);
+    promise.then(() => this.pending.delete(key), () => this.pending.delete(key));
+
+    this.dropOverflow();
+    this.startNext();
+    return promise;
+  }
+
+  /**
+   * Remove a request that has not started yet; running requests are not interrupted
+   * @param key The request key
+   * @returns Whether a queued request was removed
+   */
+  public cancel(key: string): boolean {
+    const index = this.queue.findIndex(queued => queued.key === key);
+    if (index === -1) {
+      return false;
+    }
+    const [request] = this.queue.splice(index, 1);
+    request.reject(new RequestCancelledError());
+    return true;
+  }
+
+  /**
+   * Reject every queued request that has not started
+   */
+  public clear(): void {
+    const dropped = this.queue;
+    this.queue = [];
+    for (const request of dropped) {
+      request.reject(new RequestCancelledError());
+    }
+    if (this.startTimer) {
+      clearTimeout(this.startTimer);
+      this.startTimer = undefined;
+    }
+  }
+
+  private promote(key: string): void {
+    const index = this.queue.findIndex(queued => queued.key === key && queued.background);
+    if (index !== -1) {
+      const [request] = this.queue.splice(index, 1);
+      request.background = false;
+      const firstBackground = this.queue.findIndex(queued => queued.background);
+      this.queue.splice(firstBackground === -1 ? this.queue.length : firstBackground, 0, request);
+    }
+  }
+
+  private dropOverflow(): void {
+    while (this.queue.length > this.options.maxQueued) {
+      const index = this.queue.findIndex(queued => queued.background);
+      if (index === -1) {
+        return;
+      }
+      const [dropped] = this.queue.splice(index, 1);
+      dropped.reject(new RequestCancelledError('Request dropped, queue full'));
+    }
+  }
+
+  private startNext(): void {
+    if (this.startTimer || this.running >= this.options.concurrency || this.queue.length === 0) {
+      return;
+    }
+
+    const wait = this.lastStart + this.options.minIntervalMs - Date.now();
+    if (wait > 0) {
+      this.startTimer = setTimeout(() => {
+        this.startTimer = undefined;
+        this.startNext();
+      }, wait);
+      return;
+    }
+
+    const request = this.queue.shift()!;
+    this.running++;
+    this.lastStart = Date.now();
+    this.runWithRetries(request).then(request.resolve, request.reject).finally(() => {
+      this.running--;
+      this.startNext();
+    });
+    this.startNext();
+  }
+
+  private async runWithRetries(request: QueuedRequest<T>): Promise<T> {
+    for (let attempt = 1; ; attempt++) {
+      try {
+        return await request.run();
+      } catch (error) {
+        if (attempt >= this.options.maxAttempts || !this.options.isRetryable(error)) {
+          throw error;
+        }
+        const backoff = this.options.baseBackoffMs * 2 ** (attempt - 1);
+        await new Promise(resolve => setTimeout(resolve, backoff * (0.5 + Math.random() / 2)));
+      }
+    }
+  }
+}
@@ -0,0 +1,123 @@
+import * as crypto from 'crypto';
+import * as fs from 'fs';
+import * as path from 'path';
+
+/**
+ * Result of one SRP analysis
+ */
+export interface SrpAnalysis {
+  followsSRP: boolean;
+  explanation: string;
+}
+
+interface SerializedSrpCache {
+  version: number;
+  // Least recently used first
+  entries: [string, SrpAnalysis][];
+}
+
+/**
+ * Key of an analysis: the same code analyzed by the same model gives the same result
+ * @param code The file content
+ * @param model The OpenAI model
+ */
+export function srpCacheKey(code: string, model: string): string {
+  return crypto.createHash('sha256').update(model).update('\0').update(code).digest('hex');
+}
+
+/**
+ * SRP analyses keyed by content and model, kept on disk so restarts and reverted
+ * edits do not repeat paid requests. The least recently used entries are evicted
+ * past the capacity.
+ */
+export class SrpAnalysisCache {
+  private static readonly FORMAT_VERSION = 1;
+  private static readonly SAVE_DELAY_MS = 2000;
+
+  private entries: Map<string, SrpAnalysis> = new Map();
+  private saveTimer: NodeJS.Timeout | undefined;
+
+  /**
+   * @param filePath The JSON file, null to keep the cache in memory only
+   * @param capacity Maximum number of analyses kept
+   */
+  constructor(
+    private readonly filePath: string | null,
+    private readonly capacity: number = 2000
+  ) {
+    this.load();
+  }
+
+  public get size(): number {
+    return this.entries.size;
+  }
+
+  /**
+   * Get an analysis and mark it as recently used
+   * @param key The key from srpCacheKey
+   */
+  public get(key: string): SrpAnalysis | undefined {
+    const analysis = this.entries.get(key);
+    if (analysis) {
+      this.entries.delete(key);
+      this.entries.set(key, analysis);
+    }
+    return analysis;
+  }
+
+  /**
+   * Store an analysis, evicting the least recently used ones past the capacity
+   * @param key The key from srpCacheKey
+   * @param analysis The analysis
+   */
+  public set(key: string, analysis: SrpAnalysis): void {
+    this.entries.delete(key);
+    this.entries.set(key, analysis);
+    while (this.entries.size > this.capacity) {
+      this.entries.delete(this.entries.keys().next().value!);
+    }
+    this.scheduleSave();
+  }
+
+  /**
+   * Write pending changes to disk now
+   */
+  public flush(): void {
+    if (this.saveTimer) {
+      clearTimeout(this.saveTimer);
+      this.saveTimer = undefined;
+    }
+    if (!this.filePath) {
+      return;
+    }
+
+    const serialized: SerializedSrpCache = {
+      version: SrpAnalysisCache.FORMAT_VERSION,
+      entries: Array.from(this.entries)
+    };
+    fs.mkdirSync(path.dirname(this.filePath), { recursive: true });
+    fs.writeFileSync(this.filePath, JSON.stringify(serialized));
+  }
+
+  private scheduleSave(): void {
+    if (this.filePath && !this.saveTimer) {
+      this.saveTimer = setTimeout(() => this.flush(), SrpAnalysisCache.SAVE_DELAY_MS);
+    }
+  }
+
+  private load(): void {
+    if (!this.filePath || !fs.existsSync(this.filePath)) {
+      return;
+    }
+
+    try {
+      const serialized = JSON.parse(fs.readFileSync(this.filePath, 'utf8')) as SerializedSrpCache;
+      if (serialized.version === SrpAnalysisCache.FORMAT_VERSION) {
+        this.entries = new Map(serialized.entries.slice(-this.capacity));
+      }
+    } catch {
+      // A corrupt cache is rebuilt from new analyses
+      this.entries.clear();
+    }
+  }
+}
@@ -0,0 +1,249 @@
+import * as vscode from 'vscode';
+import * as fs from 'fs';
+import * as path from 'path';
+import type OpenAI from 'openai';
+import { RequestCancelledError, RequestQueue } from './RequestQueue';
+import { SrpAnalysis, SrpAnalysisCache, srpCacheKey } from './SrpAnalysisCache';
+import { MetricRegistry } from '../metrics/MetricRegistry';
+import { getProjectLanguageId } from '../language/ProjectLanguages';
+
+type SrpAnalyzerModule = typeof import('./SrpAnalyzer');
+
+/**
+ * Runs the OpenAI SRP analyses of the SingleResponsibility metric. Results are cached
+ * on disk by content and model, requests go through a bounded queue that deduplicates
+ * them and retries failures, and the next files in navigation order are analyzed in
+ * the background.
+ */
+export class SrpAnalysisService implements vscode.Disposable {
+  private static instance: SrpAnalysisService;
+
+  private cache: SrpAnalysisCache = new SrpAnalysisCache(null);
+  private queue: RequestQueue<SrpAnalysis>;
+  private analyzer: SrpAnalyzerModule | undefined;
+  private client: OpenAI | undefined;
+  private output: vscode.OutputChannel | undefined;
+  private disposables: vscode.Disposable[] = [];
+  // Keys requested for the file being reviewed, reported when they finish
+  private foregroundKeys: Set<string> = new Set();
+  // Document URI -> last key requested for it in the foreground
+  private latestKeyByUri: Map<string, string> = new Map();
+  // Document URI -> last value shown, kept while the document has unsaved changes
+  private lastValueByUri: Map<string, number> = new Map();
+  private warnedMissingApiKey = false;
+  // Set after an authentication error until the OpenAI settings change
+  private requestsDisabled = false;
+
+  private constructor() {
+    this.queue = new RequestQueue<SrpAnalysis>({
+      isRetryable: error => this.getAnalyzer().isRetryableSrpError(error)
+    });
+  }
+
+  public static getInstance(): SrpAnalysisService {
+    if (!SrpAnalysisService.instance) {
+      SrpAnalysisService.instance = new SrpAnalysisService();
+    }
+    return SrpAnalysisService.instance;
+  }
+
+  /**
+   * Load the cache from metrics-data/ and follow changes to the OpenAI settings
+   * @param output Channel for background errors
+   */
+  public initialize(output: vscode.OutputChannel): void {
+    this.output = output;
+
+    const workspaceFolder = vscode.workspace.workspaceFolders?.[0];
+    if (workspaceFolder) {
+      this.cache = new SrpAnalysisCache(path.join(workspaceFolder.uri.fsPath, 'metrics-data', 'srp-cache.json'));
+    }
+
+    this.disposables.push(
+      vscode.workspace.onDidChangeConfiguration(event => {
+        if (event.affectsConfiguration('lineCounter.openai')) {
+          this.client = undefined;
+          this.requestsDisabled = false;
+          this.warnedMissingApiKey = false;
+        }
+      })
+    );
+  }
+
+  public dispose(): void {
+    this.disposables.forEach(disposable => disposable.dispose());
+    this.disposables = [];
+    this.queue.clear();
+    this.cache.flush();
+  }
+
+  /**
+   * Value of the metric for a document: 1 when it follows the SRP. An analysis is
+   * requested when there is none for the saved content; 0 is returned meanwhile and
+   * chontaduro.updateAIMetrics runs when it arrives.
+   * @param document The document
+   */
+  public getResult(document: vscode.TextDocument): number {
+    const documentUri = document.uri.toString();
+
+    // Unsaved edits are not analyzed, every keystroke would be a paid request
+    if (document.isDirty) {
+      return this.lastValueByUri.get(documentUri) ?? 0;
+    }
+
+    const model = this.getModel();
+    const key = srpCacheKey(document.getText(), model);
+    const cached = this.cache.get(key);
+    if (cached) {
+      return this.remember(documentUri, cached);
+    }
+
+    const client = this.getClient();
+    if (!client) {
+      return this.remember(documentUri, undefined);
+    }
+
+    this.requestForeground(documentUri, key, client, model, document.getText());
+    return this.remember(documentUri, undefined);
+  }
+
+  /**
+   * Analyze files in the background so the result is ready when they are opened
+   * @param uris The files, in the order they will be reviewed
+   */
+  public async prefetch(uris: vscode.Uri[]): Promise<void> {
+    const client = this.getClient(false);
+    if (!client) {
+      return;
+    }
+    const model = this.getModel();
+
+    for (const uri of uris) {
+      const languageId = getProjectLanguageId(uri.fsPath);
+      if (!languageId || !this.isAnalyzedLanguage(languageId)) {
+        continue;
+      }
+
+      let code: string;
+      try {
+        // VS Code drops the byte order mark from document text
+        code = (await fs.promises.readFile(uri.fsPath, 'utf8')).replace(/^\uFEFF/, '');
+      } catch {
+        continue;
+      }
+      if (!code.includes('class ')) {
+        continue;
+      }
+
+      const key = srpCacheKey(code, model);
+      if (this.cache.get(key) || this.queue.has(key)) {
+        continue;
+      }
+      this.queue.enqueue(key, () => this.getAnalyzer().requestSrpAnalysis(client, model, code), true)
+        .then(analysis => this.cache.set(key, analysis))
+        .catch(error => this.onRequestFailed(error, false));
+    }
+  }
+
+  private requestForeground(documentUri: string, key: string, client: OpenAI, model: string, code: string): void {
+    // A newer version of the document replaces the analysis still waiting in the queue
+    const previousKey = this.latestKeyByUri.get(documentUri);
+    if (previousKey && previousKey !== key && this.foregroundKeys.has(previousKey)) {
+      this.queue.cancel(previousKey);
+    }
+    this.latestKeyByUri.set(documentUri, key);
+
+    if (this.foregroundKeys.has(key)) {
+      return;
+    }
+    this.foregroundKeys.add(key);
+    vscode.commands.executeCommand('chontaduro.startLoading');
+
+    this.queue.enqueue(key, () => this.getAnalyzer().requestSrpAnalysis(client, model, code))
+      .then(analysis => {
+        this.cache.set(key, analysis);
+        const message = analysis.followsSRP
+          ? `✅ La clase cumple con el Principio de Responsabilidad Única: ${analysis.explanation}`
+          : `❌ La clase no cumple con el Principio de Responsabilidad Única: ${analysis.explanation}`;
+        vscode.window.showInformationMessage(message);
+      })
+      .catch(error => this.onRequestFailed(error, true))
+      .finally(() => {
+        this.foregroundKeys.delete(key);
+        if (this.foregroundKeys.size === 0) {
+          vscode.commands.executeCommand('chontaduro.stopLoading');
+        }
+        // Notify the extension that the OpenAI request is complete to update the UI
+        vscode.commands.executeCommand('chontaduro.updateAIMetrics');
+      });
+  }
+
+  private onRequestFailed(error: unknown, foreground: boolean): void {
+    if (error instanceof RequestCancelledError) {
+      return;
+    }
+
+    const status = (error as { status?: unknown })?.status;
+    if (status === 401 || status === 403) {
+      this.requestsDisabled = true;
+      this.queue.clear();
+    }
+
+    const message = error instanceof Error ? error.message : String(error);
+    if (foreground) {
+      vscode.window.showErrorMessage(`Error al analizar SRP: ${message}`);
+    } else {
+      this.output?.appendLine(`Error prefetching SRP analysis: ${message}`);
+    }
+  }
+
+  private remember(documentUri: string, analysis: SrpAnalysis | undefined): number {
+    const value = analysis?.followsSRP ? 1 : 0;
+    this.lastValueByUri.set(documentUri, value);
+    return value;
+  }
+
+  private isAnalyzedLanguage(languageId: string): boolean {
+    return MetricRegistry.getInstance()
+      .getMetricsForLanguage(languageId)
+      .some(metric => metric.name === 'singleResponsibility');
+  }
+
+  private getModel(): string {
+    return vscode.workspace.getConfiguration('lineCounter').get<string>('openai.model') || 'gpt-3.5-turbo';
+  }
+
+  /**
+   * The OpenAI client for the current settings
+   * @param warn Whether to warn once when the API key is missing
+   */
+  private getClient(warn: boolean = true): OpenAI | undefined {
+    if (this.requestsDisabled) {
+      return undefined;
+    }
+    if (this.client) {
+      return this.client;
+    }
+
+    const config = vscode.workspace.getConfiguration('lineCounter');
+    const apiKey = config.get<string>('openai.apiKey');
+    if (!apiKey) {
+      if (warn && !this.warnedMissingApiKey) {
+        this.warnedMissingApiKey = true;
+        vscode.window.showWarningMessage('API Key de OpenAI no configurada. Configure la clave en la configuración de la extensión.');
+      }
+      return undefined;
+    }
+
+    this.client = this.getAnalyzer().createSrpClient(apiKey, config.get<string>('openai.baseUrl'));
+    return this.client;
+  }
+
+  // The openai SDK is only loaded once an analysis is needed
+  private getAnalyzer(): SrpAnalyzerModule {
+    if (!this.analyzer) {
+      this.analyzer = require('./SrpAnalyzer') as SrpAnalyzerModule;
+    }
+    return this.analyzer;
+  }
+}
@@ -0,0 +1,87 @@
+import OpenAI from 'openai';
+import { SrpAnalysis } from './SrpAnalysisCache';
+
+/**
+ * Create the OpenAI client used for SRP analyses. Retries are left to the request
+ * queue so they share its backoff and concurrency limits.
+ * @param apiKey The OpenAI API key
+ * @param baseURL An OpenAI-compatible endpoint, the official API when undefined
+ */
+export function createSrpClient(apiKey: string, baseURL?: string): OpenAI {
+  return new OpenAI({
+    apiKey,
+    baseURL: baseURL || undefined,
+    maxRetries: 0
+  });
+}
+
+/**
+ * Whether a failed request is worth retrying: rate limits, server errors and
+ * connection failures
+ * @param error The error thrown by the OpenAI client
+ */
+export function isRetryableSrpError(error: unknown): boolean {
+  const status = (error as { status?: unknown })?.status;
+  if (typeof status === 'number') {
+    return status === 408 || status === 429 || status >= 500;
+  }
+  const name = (error as { name?: unknown })?.name;
+  return name === 'APIConnectionError' || name === 'APIConnectionTimeoutError';
+}
+
+/**
+ * Ask the model whether a file follows the Single Responsibility Principle
+ * @param client The OpenAI client
+ * @param model The model to use
+ * @param code The file content
+ */
+export async function requestSrpAnalysis(client: OpenAI, model: string, code: string): Promise<SrpAnalysis> {
+  const prompt = `
+    Analiza el siguiente archivo de código y evalúa si, en términos generales, **cumple con el Principio de Responsabilidad Única (SRP)**.
+
+    El Principio de Responsabilidad Única (SRP) indica que un módulo (por ejemplo, una clase o un archivo) debería tener una sola razón para cambiar. Esto significa que todas las funciones o clases dentro del archivo deberían estar relacionadas con una única responsabilidad de negocio o técnica.
+
+    ### Consideraciones:
+    - Evalúa si las funciones, clases o componentes del archivo contribuyen a una única responsabilidad principal.
+    - No seas excesivamente estricto: en entornos reales es común que existan pequeñas utilidades o funciones auxiliares siempre que estén alineadas con la responsabilidad principal.
+    - Si detectas responsabilidades mezcladas, explica brevemente cuáles son.
+
+    ### Código a analizar:
+    \`\`\`
+    ${code}
+    \`\`\`
+
+    Responde con un JSON en el siguiente formato:
+
+    {
+      "followsSRP": true | false,
+      "explanation": "Explicación razonada de si el archivo mantiene una responsabilidad única, mencionando elementos clave.",
+      "suggestions": "Sugerencias prácticas para mejorar la adherencia al SRP, si aplica. Si cumple, puedes dejar este campo vacío o con 'Ninguna sugerencia'."
+    }
+    `;
+
+  const response = await client.chat.completions.create({
+    model: model,
+    messages: [
+      { role: 'system', content: 'Eres un experto en análisis de código y principios SOLID.' },
+      { role: 'user', content: prompt }
+    ],
+    temperature: 0.2,
+  });
+
+  const content = response.choices[0]?.message?.content;
+  if (!content) {
+    throw new Error('No se recibió respuesta de OpenAI');
+  }
+
+  const jsonMatch = content.match(/\{[\s\S]*\}/);
+  if (!jsonMatch) {
+    throw new Error('No se pudo extraer JSON de la respuesta');
+  }
+
+  const analysis = JSON.parse(jsonMatch[0]);
+  return {
+    followsSRP: analysis.followsSRP === true || analysis.followsSRP === 'true',
+    explanation: `${analysis.explanation ?? ''}`
+  };
+}
@@ -0,0 +1,66 @@
+import * as assert from 'assert';
+import { generateCorpus } from '../../benchmark/corpora';
+import { BenchmarkReport, compareWithBaseline, listCorpora } from '../../benchmark/metricBenchmark';
+import { buildBraceScopeTree } from '../../metrics/common/BraceScopeTree';
+import { buildPythonScopeTree } from '../../metrics/python/PythonScopeTree';
+
+function report(calibrationMs: number, medianMs: number, heapMb: number = 1): BenchmarkReport {
+  return {
+    calibrationMs,
+    results: { 'csharp/typical/1000': { lineCount: { medianMs, linesPerSecond: 1000, heapMb } } }
+  };
+}
+
+suite('MetricBenchmark Test Suite', () => {
+  test('Should generate the same corpus on every call', () => {
+    const first = generateCorpus('typescript', 'typical', 1000);
+
+    assert.strictEqual(generateCorpus('typescript', 'typical', 1000), first);
+    assert.notStrictEqual(generateCorpus('java', 'typical', 1000), first);
+    assert.ok(first.split('\n').length >= 1000);
+  });
+
+  test('Should generate well-formed pathological corpora', () => {
+    const nested = buildBraceScopeTree(generateCorpus('csharp', 'deepNesting', 1000), 'csharp');
+    assert.ok(Math.max(...nested.scopes.map(scope => scope.depth)) >= 40);
+
+    // Keywords inside the huge strings must not count as code
+    const javaStrings = buildBraceScopeTree(generateCorpus('java', 'hugeStrings', 1000), 'java');
+    assert.strictEqual(javaStrings.functions.length, 0);
+    const pythonStrings = buildPythonScopeTree(generateCorpus('python', 'hugeStrings', 1000));
+    assert.strictEqual(pythonStrings.functions.length, 0);
+
+    const longLines = generateCorpus('python', 'longLines', 1000).split('\n');
+    assert.ok(Math.max(...longLines.map(line => line.length)) >= 20000);
+  });
+
+  test('Should only run the 100k line corpora in full runs', () => {
+    const full = listCorpora(false);
+    const quick = listCorpora(true);
+
+    assert.ok(full.some(corpus => corpus.lineCount === 100000));
+    assert.ok(quick.every(corpus => corpus.lineCount <= 10000));
+    assert.ok(full.every(corpus => corpus.shape === 'typical' || corpus.lineCount <= 10000));
+  });
+
+  test('Should flag measurements beyond the tolerance after scaling by calibration', () => {
+    // The current machine is twice as slow: the 100 ms baseline scales to 200 ms and 280 ms is within 50%
+    assert.deepStrictEqual(compareWithBaseline(report(20, 280), report(10, 100), 0.5), []);
+
+    const regressions = compareWithBaseline(report(10, 200, 40), report(10, 100), 0.5);
+    assert.deepStrictEqual(regressions.map(regression => [regression.kind, regression.limit]), [['time', 150], ['heap', 17]]);
+
+    assert.deepStrictEqual(compareWithBaseline({ calibrationMs: 10, results: {} }, report(10, 100), 0.5), []);
+  });
+
+  test('Should widen the time noise floor with the corpus size', () => {
+    const large = (medianMs: number): BenchmarkReport => ({
+      calibrationMs: 10,
+      results: { 'csharp/typical/10000': { methodCount: { medianMs, linesPerSecond: 1000, heapMb: 1 } } }
+    });
+
+    // 10k lines allow 25 ms over the baseline, more than the tolerance of twice the baseline
+    assert.deepStrictEqual(compareWithBaseline(large(34), large(10), 1), []);
+    assert.deepStrictEqual(compareWithBaseline(large(36), large(10), 1).map(regression => regression.limit), [35]);
+  });
+});
@@ -0,0 +1,99 @@
+import * as assert from 'assert';
+import * as fs from 'fs';
+import * as os from 'os';
+import * as path from 'path';
+import { collectProjectFiles, parseArguments, runLabeler } from '../../cli/labeler';
+import { parseCsvLine } from '../../csv/MetricsCSVFormat';
+
+// Stands in for labelWorker.js: labels every file with one value, and its thread
+// exits without replying on Huge.cs, like a worker that runs out of memory
+const FAKE_WORKER = `
+const { parentPort } = require('worker_threads');
+parentPort.on('message', task => {
+  if (task.filePath.endsWith('Huge.cs')) {
+    process.exit(1);
+  }
+  parentPort.postMessage({ id: task.id, languageName: 'C#', values: [1], contentHash: 'hash-' + task.id });
+});
+`;
+
+suite('Batch Labeler Test Suite', () => {
+  let directory: string;
+
+  setup(() => {
+    directory = fs.mkdtempSync(path.join(os.tmpdir(), 'labeler-'));
+  });
+
+  teardown(() => {
+    fs.rmSync(directory, { recursive: true, force: true });
+  });
+
+  function writeFile(relativePath: string, text: string): string {
+    const filePath = path.join(directory, relativePath);
+    fs.mkdirSync(path.dirname(filePath), { recursive: true });
+    fs.writeFileSync(filePath, text);
+    return filePath;
+  }
+
+  test('Should parse the directory, the output directory and the number of jobs', () => {
+    const defaults = parseArguments(['repo']);
+    assert.strictEqual(defaults.root, path.resolve('repo'));
+    assert.strictEqual(defaults.out, path.join(path.resolve('repo'), 'metrics-data'));
+    assert.strictEqual(defaults.jobs, os.cpus().length);
+
+    assert.deepStrictEqual(parseArguments(['--jobs', '3', 'repo', '--out', 'data']), {
+      root: path.resolve('repo'),
+      out: path.resolve('data'),
+      jobs: 3
+    });
+    assert.strictEqual(parseArguments(['-j', '2', 'repo']).jobs, 2);
+
+    assert.throws(() => parseArguments([]), /Usage/);
+    assert.throws(() => parseArguments(['repo', '--jobs', '0']), /--jobs must be a positive integer/);
+    assert.throws(() => parseArguments(['repo', 'other']), /Unexpected argument: other/);
+  });
+
+  test('Should collect the project files in navigation order, without node_modules', () => {
+    const a = writeFile('A.cs', 'class A {}');
+    const b = writeFile('src/b.py', 'x = 1');
+    const c = writeFile('src/nested/C.java', 'class C {}');
+    writeFile('node_modules/lib/index.js', 'module.exports = {};');
+    writeFile('README.md', '# readme');
+
+    assert.deepStrictEqual(collectProjectFiles(directory), [a, b, c].sort((x, y) => x.localeCompare(y)));
+  });
+
+  test('Should fail the file of a crashed worker, replace it and save the other rows', async () => {
+    writeFile('src/A.cs', 'class A {}');
+    writeFile('src/Huge.cs', 'class Huge {}');
+    writeFile('src/Z.cs', 'class Z {}');
+    const workerScript = writeFile('worker/fakeWorker.js', FAKE_WORKER);
+    const out = path.join(directory, 'out');
+    const lines: string[] = [];
+
+    const summary = await runLabeler({ root: path.join(directory, 'src'), out, jobs: 1 }, line => lines.push(line), workerScript);
+
+    assert.strictEqual(summary.files, 3);
+    assert.strictEqual(summary.failed, 1);
+    assert.ok(lines.some(line => line.includes('Huge.cs') && line.includes('exit code 1')));
+
+    // The store was closed, so the rows of the other files are on disk
+    const csv = fs.readFileSync(path.join(out, 'metrics-csharp.csv'), 'utf8').trim().split('\n');
+    const header = parseCsvLine(csv[0]);
+    const labeled = csv.slice(1).map(line => path.basename(parseCsvLine(line, header.length)[header.indexOf('FilePath')]));
+    assert.deepStrictEqual(labeled.sort(), ['A.cs', 'Z.cs']);
+  });
+
+  test('Should stop replacing workers that keep failing', async () => {
+    writeFile('src/A.cs', 'class A {}');
+    writeFile('src/B.cs', 'class B {}');
+    writeFile('src/C.cs', 'class C {}');
+    writeFile('src/D.cs', 'class D {}');
+    const workerScript = writeFile('worker/brokenWorker.js', 'throw new Error("cannot load");');
+
+    const summary = await runLabeler({ root: path.join(directory, 'src'), out: path.join(directory, 'out'), jobs: 1 }, () => {}, workerScript);
+
+    assert.strictEqual(summary.files, 4);
+    assert.strictEqual(summary.failed, 4);
+  });
+});
@@ -0,0 +1,339 @@
+import * as assert from 'assert';
+import * as fs from 'fs';
+import * as os from 'os';
+import * as path from 'path';
+import { Metric, MetricResult } from '../../metrics/Metric';
+import { MetricsStore } from '../../csv/MetricsStore';
+import { BASE_CSV_COLUMNS, getContentHash, parseCsvLine } from '../../csv/MetricsCSVFormat';
+
+function createMetric(name: string): Metric {
+  return {
+    name,
+    description: 'métrica de prueba.',
+    extract: (): MetricResult => ({ label: name, value: 0 })
+  };
+}
+
+suite('MetricsStore Test Suite', () => {
+  let directory: string;
+
+  setup(() => {
+    directory = fs.mkdtempSync(path.join(os.tmpdir(), 'metrics-store-'));
+  });
+
+  teardown(() => {
+    fs.rmSync(directory, { recursive: true, force: true });
+  });
+
+  test('Should write one CSV file per language, each with its own header', async () => {
+    const store = new MetricsStore(directory);
+    await store.append({
+      filePath: '/repo/A.cs', languageId: 'csharp', languageName: 'C#', needsRefactoring: true,
+      metrics: [createMetric('lineCount'), createMetric('classCount')], values: [10, 1]
+    });
+    await store.append({
+      filePath: '/repo/b.py', languageId: 'python', languageName: 'Python', needsRefactoring: false,
+      metrics: [createMetric('lineCount')], values: [5]
+    });
+    await store.close();
+
+    const csharpLines = fs.readFileSync(path.join(directory, 'metrics-csharp.csv'), 'utf8').trim().split('\n');
+    const pythonLines = fs.readFileSync(path.join(directory, 'metrics-python.csv'), 'utf8').trim().split('\n');
+
+    assert.ok(csharpLines[0].endsWith(',NeedsRefactoring,lineCount,classCount'));
+    assert.ok(pythonLines[0].endsWith(',NeedsRefactoring,lineCount'));
+
+    const header = parseCsvLine(csharpLines[0]);
+    const row = parseCsvLine(csharpLines[1]);
+    assert.strictEqual(row.length, header.length);
+    assert.deepStrictEqual(row.slice(header.indexOf('FilePath')), ['/repo/A.cs', 'C#', '1', '10', '1']);
+    assert.strictEqual(store.rowCount, 2);
+  });
+
+  test('Should also append every row to metrics.csv in its original format', async () => {
+    const store = new MetricsStore(directory);
+    await store.append({
+      filePath: '/repo/A.cs', languageId: 'csharp', languageName: 'C#', needsRefactoring: true,
+      metrics: [createMetric('lineCount'), createMetric('classCount')], values: [10, undefined]
+    });
+    await store.append({
+      filePath: '/repo/b.py', languageId: 'python', languageName: 'Python', needsRefactoring: false,
+      metrics: [createMetric('lineCount')], values: [5]
+    });
+    await store.close();
+
+    const lines = fs.readFileSync(path.join(directory, 'metrics.csv'), 'utf8').trim().split('\n');
+    assert.strictEqual(lines[0], 'UUID,Timestamp,LabelingDateTime,Filename,FilePath,Language,NeedsRefactoring,lineCount,classCount');
+    // The LabelingDateTime value is not quoted, and each row has the values of its own metrics
+    assert.ok(!lines[1].includes('"'));
+    assert.deepStrictEqual(lines[1].split(',').slice(-6), ['A.cs', '/repo/A.cs', 'C#', '1', '10', '']);
+    assert.deepStrictEqual(lines[2].split(',').slice(-5), ['b.py', '/repo/b.py', 'Python', '0', '5']);
+    assert.deepStrictEqual(parseCsvLine(lines[2]).slice(3), ['b.py', '/repo/b.py', 'Python', '0', '5']);
+
+    // The copies in metrics.csv are not counted twice
+    const reloaded = new MetricsStore(directory);
+    await reloaded.load();
+    assert.strictEqual(reloaded.rowCount, 2);
+    assert.strictEqual(reloaded.getLabeledRow('/repo/A.cs')?.languageId, 'csharp');
+  });
+
+  test('Should count rows and index labeled files from existing files', async () => {
+    const first = new MetricsStore(directory);
+    await first.append({
+      filePath: '/repo/A.cs', languageId: 'csharp', languageName: 'C#', needsRefactoring: false,
+      metrics: [createMetric('lineCount')], values: [3]
+    });
+    await first.close();
+
+    // Legacy file, written before the LabelingDateTime value was quoted
+    fs.writeFileSync(path.join(directory, 'metrics.csv'),
+      'UUID,Timestamp,LabelingDateTime,Filename,FilePath,Language,NeedsRefactoring,lineCount\n' +
+      'id,2024-01-01T00:00:00.000Z,1/1/2024, 10:00:00 AM,old.cs,/repo/old.cs,C#,0,7\n');
+
+    const second = new MetricsStore(directory);
+    await second.load();
+
+    assert.strictEqual(second.rowCount, 2);
+    assert.strictEqual(second.isLabeled('/repo/A.cs'), true);
+    assert.strictEqual(second.isLabeled('/repo/old.cs'), true);
+    assert.strictEqual(second.isLabeled('/repo/B.cs'), false);
+  });
+
+  test('Should keep the column order of an existing file', async () => {
+    fs.writeFileSync(path.join(directory, 'metrics-csharp.csv'),
+      'UUID,Timestamp,LabelingDateTime,Filename,FilePath,Language,NeedsRefactoring,classCount,removedMetric,lineCount\n');
+
+    const store = new MetricsStore(directory);
+    await store.append({
+      filePath: '/repo/A.cs', languageId: 'csharp', languageName: 'C#', needsRefactoring: false,
+      metrics: [createMetric('lineCount'), createMetric('classCount')], values: [10, 1]
+    });
+    await store.close();
+
+    const lines = fs.readFileSync(path.join(directory, 'metrics-csharp.csv'), 'utf8').trim().split('\n');
+    assert.strictEqual(lines.length, 2);
+    assert.deepStrictEqual(parseCsvLine(lines[1]).slice(-3), ['1', '', '10']);
+  });
+
+  test('Should skip unchanged files and replace the row of a changed file', async () => {
+    const metrics = [createMetric('lineCount')];
+    const csvFilePath = path.join(directory, 'metrics-csharp.csv');
+    const first = new MetricsStore(directory);
+    await first.append({
+      filePath: '/repo/A.cs', languageId: 'csharp', languageName: 'C#', needsRefactoring: false,
+      metrics, values: [3], contentHash: getContentHash('class A {}')
+    });
+    await first.append({
+      filePath: '/repo/B.cs', languageId: 'csharp', languageName: 'C#', needsRefactoring: true,
+      metrics, values: [5], contentHash: getContentHash('class B {}')
+    });
+    await first.close();
+
+    const second = new MetricsStore(directory);
+    await second.load();
+    assert.strictEqual(second.isUnchanged('/repo/A.cs', getContentHash('class A {}'), metrics, false), true);
+    assert.strictEqual(second.isUnchanged('/repo/A.cs', getContentHash('class A {}'), metrics, true), false);
+    assert.strictEqual(second.isLabeled('/repo/A.cs', getContentHash('class A { }'), metrics), false);
+    assert.strictEqual(second.isLabeled('/repo/A.cs', getContentHash('class A {}'), [createMetric('classCount')]), false);
+
+    await second.append({
+      filePath: '/repo/A.cs', languageId: 'csharp', languageName: 'C#', needsRefactoring: false,
+      metrics, values: [3], contentHash: getContentHash('class A {}')
+    });
+    await second.append({
+      filePath: '/repo/A.cs', languageId: 'csharp', languageName: 'C#', needsRefactoring: false,
+      metrics, values: [4], contentHash: getContentHash('class A {\n}')
+    });
+    assert.strictEqual(second.rowCount, 2);
+    await second.close();
+
+    // The replaced row was removed on close, and the CSV file keeps its columns
+    const lines = fs.readFileSync(csvFilePath, 'utf8').trim().split('\n');
+    const header = parseCsvLine(lines[0]);
+    assert.deepStrictEqual(header.slice(0, BASE_CSV_COLUMNS.length), BASE_CSV_COLUMNS);
+    const rows = lines.slice(1).map(line => parseCsvLine(line, header.length));
+    assert.deepStrictEqual(rows.map(row => row.slice(header.indexOf('FilePath'))), [
+      ['/repo/B.cs', 'C#', '1', '5'],
+      ['/repo/A.cs', 'C#', '0', '4']
+    ]);
+
+    const third = new MetricsStore(directory);
+    await third.load();
+    assert.strictEqual(third.rowCount, 2);
+    assert.strictEqual(third.getLabeledRow('/repo/A.cs')?.uuid, rows[1][header.indexOf('UUID')]);
+    // A byte order mark and CRLF line breaks do not change the hash
+    assert.strictEqual(third.isUnchanged('/repo/A.cs', getContentHash('\uFEFFclass A {\r\n}'), metrics, false), true);
+  });
+
+  test('Should keep one row for a file that is labeled, changed and labeled again', async () => {
+    const metrics = [createMetric('lineCount')];
+    const filePath = path.join(directory, 'A.cs');
+    const label = async (text: string, lineCount: number) => {
+      fs.writeFileSync(filePath, text);
+      const store = new MetricsStore(directory);
+      await store.append({
+        filePath, languageId: 'csharp', languageName: 'C#', needsRefactoring: false,
+        metrics, values: [lineCount], contentHash: getContentHash(text)
+      });
+      await store.close();
+    };
+
+    await label('class A {}', 1);
+    await label('class A {\n}', 2);
+
+    for (const fileName of ['metrics-csharp.csv', 'metrics.csv']) {
+      const lines = fs.readFileSync(path.join(directory, fileName), 'utf8').trim().split('\n');
+      const header = parseCsvLine(lines[0]);
+      const rows = lines.slice(1).map(line => parseCsvLine(line, header.length));
+      assert.deepStrictEqual(rows.map(row => [row[header.indexOf('FilePath')], row[header.indexOf('lineCount')]]), [[filePath, '2']]);
+      // The file as it was before it was compacted
+      assert.strictEqual(fs.readFileSync(path.join(directory, `${fileName}.bak`), 'utf8').trim().split('\n').length, 3);
+      assert.strictEqual(fs.existsSync(path.join(directory, `${fileName}.tmp`)), false);
+    }
+
+    const reloaded = new MetricsStore(directory);
+    await reloaded.load();
+    assert.strictEqual(reloaded.rowCount, 1);
+    assert.strictEqual(reloaded.isUnchanged(filePath, getContentHash('class A {\n}'), metrics, false), true);
+  });
+
+  test('Should keep the latest row of a file and remove the rows it replaced on close', async () => {
+    const csvFilePath = path.join(directory, 'metrics-csharp.csv');
+    const existing =
+      'UUID,Timestamp,LabelingDateTime,Filename,FilePath,Language,NeedsRefactoring,lineCount\n' +
+      'old,2024-01-01T00:00:00.000Z,"1/1/2024, 10:00:00 AM",A.cs,/repo/A.cs,C#,0,7\n' +
+      'kept,2024-01-02T00:00:00.000Z,"1/2/2024, 10:00:00 AM",B.cs,/repo/B.cs,C#,1,9\n' +
+      'new,2024-01-03T00:00:00.000Z,"1/3/2024, 10:00:00 AM",A.cs,/repo/A.cs,C#,1,8\n';
+    fs.writeFileSync(csvFilePath, existing);
+    // Index line of a row that a later row replaced
+    fs.writeFileSync(path.join(directory, 'metrics-index.jsonl'),
+      JSON.stringify({ file: '/repo/A.cs', uuid: 'old', contentHash: getContentHash('class A {}'), metricSchema: '' }) + '\n');
+
+    const store = new MetricsStore(directory);
+    await store.load();
+    assert.strictEqual(store.rowCount, 2);
+    assert.strictEqual(store.getLabeledRow('/repo/A.cs')?.uuid, 'new');
+    assert.strictEqual(store.getLabeledRow('/repo/A.cs')?.contentHash, '');
+    // Rows without an index entry count as labeled for any content
+    assert.strictEqual(store.isLabeled('/repo/B.cs', getContentHash('class B {}')), true);
+
+    const metrics = [createMetric('lineCount')];
+    await store.append({
+      filePath: '/repo/C.cs', languageId: 'csharp', languageName: 'C#', needsRefactoring: false,
+      metrics, values: [1], contentHash: getContentHash('class C {}')
+    });
+    await store.close();
+
+    const lines = fs.readFileSync(csvFilePath, 'utf8').trim().split('\n');
+    assert.deepStrictEqual(lines.map(line => line.split(',')[0]).slice(0, 3), ['UUID', 'kept', 'new']);
+    assert.strictEqual(lines.length, 4);
+    assert.ok(fs.readFileSync(`${csvFilePath}.bak`, 'utf8').startsWith(existing));
+
+    const reloaded = new MetricsStore(directory);
+    await reloaded.load();
+    assert.strictEqual(reloaded.rowCount, 3);
+    assert.strictEqual(reloaded.isUnchanged('/repo/C.cs', getContentHash('class C {}'), metrics, false), true);
+  });
+
+  test('Should flush and compact once when closed twice', async () => {
+    const csvFilePath = path.join(directory, 'metrics-csharp.csv');
+    fs.writeFileSync(csvFilePath,
+      'UUID,Timestamp,LabelingDateTime,Filename,FilePath,Language,NeedsRefactoring,lineCount\n' +
+      'old,2024-01-01T00:00:00.000Z,"1/1/2024, 10:00:00 AM",A.cs,/repo/A.cs,C#,0,7\n' +
+      'new,2024-01-03T00:00:00.000Z,"1/3/2024, 10:00:00 AM",A.cs,/repo/A.cs,C#,1,8\n');
+
+    const store = new MetricsStore(directory);
+    await store.load();
+    await store.append({
+      filePath: '/repo/B.cs', languageId: 'csharp', languageName: 'C#', needsRefactoring: false,
+      metrics: [createMetric('lineCount')], values: [1]
+    });
+    // The extension's deactivate and dispose both close the store
+    const first = store.close();
+    const second = store.close();
+    assert.strictEqual(second, first);
+    await second;
+
+    const lines = fs.readFileSync(csvFilePath, 'utf8').trim().split('\n');
+    assert.deepStrictEqual(lines.map(line => line.split(',')[0]).slice(0, 2), ['UUID', 'new']);
+    assert.strictEqual(lines.length, 3);
+  });
+
+  test('Should only read a file whose stat changed since it was labeled', async () => {
+    const metrics = [createMetric('lineCount')];
+    const filePath = path.join(directory, 'A.cs');
+    fs.writeFileSync(filePath, 'class A {}');
+    const stat = fs.statSync(filePath);
+
+    const first = new MetricsStore(directory);
+    await first.append({
+      filePath, languageId: 'csharp', languageName: 'C#', needsRefactoring: false,
+      metrics, values: [1], contentHash: getContentHash('class A {}'), mtime: stat.mtimeMs, size: stat.size
+    });
+    await first.close();
+
+    const second = new MetricsStore(directory);
+    const readFile = fs.promises.readFile;
+    let reads = 0;
+    (fs.promises as any).readFile = (...args: any[]) => {
+      reads++;
+      return (readFile as any)(...args);
+    };
+    try {
+      assert.strictEqual(await second.isLabeledOnDisk(filePath, metrics), true);
+      assert.strictEqual(reads, 0);
+
+      // Touched but not changed: read once, then the new stat is recorded
+      fs.utimesSync(filePath, new Date(2030, 0, 1), new Date(2030, 0, 1));
+      assert.strictEqual(await second.isLabeledOnDisk(filePath, metrics), true);
+      assert.strictEqual(await second.isLabeledOnDisk(filePath, metrics), true);
+      assert.strictEqual(reads, 1);
+
+      assert.strictEqual(await second.isLabeledOnDisk(filePath, [createMetric('classCount')]), false);
+      fs.writeFileSync(filePath, 'class A { }');
+      assert.strictEqual(await second.isLabeledOnDisk(filePath, metrics), false);
+    } finally {
+      (fs.promises as any).readFile = readFile;
+    }
+    await second.close();
+
+    const third = new MetricsStore(directory);
+    await third.load();
+    assert.strictEqual(third.getLabeledRow(filePath)?.mtime, new Date(2030, 0, 1).getTime());
+  });
+
+  test('Should not treat a row with skipped metrics as up to date', async () => {
+    const metrics = [createMetric('lineCount'), createMetric('cognitiveComplexity')];
+    const filePath = path.join(directory, 'Huge.cs');
+    fs.writeFileSync(filePath, 'class Huge {}');
+    const stat = fs.statSync(filePath);
+    const contentHash = getContentHash('class Huge {}');
+
+    const first = new MetricsStore(directory);
+    await first.append({
+      filePath, languageId: 'csharp', languageName: 'C#', needsRefactoring: false,
+      metrics, values: [1, undefined], contentHash, mtime: stat.mtimeMs, size: stat.size, partial: true
+    });
+    await first.close();
+
+    const lines = fs.readFileSync(path.join(directory, 'metrics-csharp.csv'), 'utf8').trim().split('\n');
+    assert.deepStrictEqual(parseCsvLine(lines[1]).slice(-2), ['1', '']);
+
+    const second = new MetricsStore(directory);
+    await second.load();
+    assert.strictEqual(second.getLabeledRow(filePath)?.partial, true);
+    assert.strictEqual(second.isLabeled(filePath), true);
+    assert.strictEqual(second.isLabeled(filePath, contentHash, metrics), false);
+    assert.strictEqual(second.isUnchanged(filePath, contentHash, metrics, false), false);
+    assert.strictEqual(await second.isLabeledOnDisk(filePath, metrics), false);
+
+    // Once every metric is computed, the row replaces the partial one
+    await second.append({
+      filePath, languageId: 'csharp', languageName: 'C#', needsRefactoring: false,
+      metrics, values: [1, 0], contentHash, mtime: stat.mtimeMs, size: stat.size
+    });
+    assert.strictEqual(second.isUnchanged(filePath, contentHash, metrics, false), true);
+    await second.close();
+  });
+});
+
@@ -0,0 +1,124 @@
+import * as assert from 'assert';
+import { CloneIndex } from '../../duplication/CloneIndex';
+
+suite('CloneIndex Test Suite', () => {
+  const shared = `
+    const total = items.reduce((sum, item) => sum + item.price, 0);
+    const discount = total > 100 ? total * 0.1 : 0;
+    console.log('Total with discount', total - discount);
+  `;
+
+  // Content of the indexed files, read back when a window hash matches
+  let files: Map<string, string>;
+
+  function createIndex(windowSize?: number): CloneIndex {
+    return new CloneIndex(windowSize, filePath => files.get(filePath));
+  }
+
+  function indexFile(index: CloneIndex, filePath: string, text: string, mtime?: number): void {
+    files.set(filePath, text);
+    index.indexFile(filePath, text, mtime);
+  }
+
+  setup(() => {
+    files = new Map();
+  });
+
+  test('Should find a block duplicated in another file', () => {
+    const index = createIndex();
+    indexFile(index, '/project/a.ts', `function a() {${shared}}`);
+
+    const result = index.findCrossFileDuplicates('/project/b.ts', `function b() {\n  let unrelated = true;${shared}}`);
+
+    assert.strictEqual(result.matches.length, 1);
+    assert.strictEqual(result.matches[0].filePath, '/project/a.ts');
+    // The shared lines and the closing brace, one line lower than in a.ts
+    assert.strictEqual(result.matches[0].startLine, 2);
+    assert.strictEqual(result.matches[0].endLine, 5);
+    assert.strictEqual(result.matches[0].matchStartLine, 1);
+    assert.strictEqual(result.duplicatedLineCount, 4);
+  });
+
+  test('Should not report a window whose hash matches but whose lines differ', () => {
+    const index = createIndex();
+    indexFile(index, '/project/a.ts', `function a() {${shared}}`);
+    // The file no longer has the indexed lines, as after a hash collision
+    files.set('/project/a.ts', `function a() {\n  return 1;\n}`);
+
+    const result = index.findCrossFileDuplicates('/project/b.ts', `function b() {${shared}}`);
+
+    assert.strictEqual(result.matches.length, 0);
+    assert.strictEqual(result.duplicatedLineCount, 0);
+  });
+
+  test('Should ignore duplicates inside the same file', () => {
+    const index = createIndex();
+    const text = `function a() {${shared}}`;
+    indexFile(index, '/project/a.ts', text);
+
+    const result = index.findCrossFileDuplicates('/project/a.ts', text);
+
+    assert.strictEqual(result.matches.length, 0);
+    assert.strictEqual(result.duplicatedLineCount, 0);
+  });
+
+  test('Should forget removed and reindexed content', () => {
+    const index = createIndex();
+    indexFile(index, '/project/a.ts', shared);
+    indexFile(index, '/project/c.ts', shared);
+
+    index.removeFile('/project/a.ts');
+    indexFile(index, '/project/c.ts', 'const onlyThis = 1;');
+
+    assert.strictEqual(index.findCrossFileDuplicates('/project/b.ts', shared).matches.length, 0);
+    assert.strictEqual(index.fileCount, 1);
+  });
+
+  test('Should restore the same matches after serialization', () => {
+    const index = createIndex();
+    indexFile(index, '/project/a.ts', shared, 42);
+
+    const restored = createIndex();
+    assert.strictEqual(restored.load(index.serializeLines()), true);
+
+    assert.strictEqual(restored.getIndexedMtime('/project/a.ts'), 42);
+    assert.deepStrictEqual(
+      restored.findCrossFileDuplicates('/project/b.ts', shared),
+      index.findCrossFileDuplicates('/project/b.ts', shared)
+    );
+  });
+
+  test('Should reject an index written with another window size', () => {
+    const index = createIndex(4);
+    indexFile(index, '/project/a.ts', shared);
+
+    assert.strictEqual(createIndex(3).load(index.serializeLines()), false);
+  });
+
+  test('Should update a saved index with the lines of the changed files', () => {
+    const index = createIndex();
+    indexFile(index, '/project/a.ts', shared, 1);
+    indexFile(index, '/project/c.ts', 'const onlyThis = 1;', 1);
+    const saved = Array.from(index.serializeLines());
+    assert.deepStrictEqual(index.takeChangedFiles().sort(), ['/project/a.ts', '/project/c.ts']);
+
+    index.removeFile('/project/a.ts');
+    indexFile(index, '/project/c.ts', shared, 2);
+    index.removeFile('/project/missing.ts');
+    const changed = index.takeChangedFiles();
+    assert.deepStrictEqual(changed.sort(), ['/project/a.ts', '/project/c.ts']);
+    assert.deepStrictEqual(index.takeChangedFiles(), []);
+
+    const restored = createIndex();
+    assert.strictEqual(restored.load([...saved, ...changed.map(filePath => index.serializeFile(filePath))]), true);
+
+    assert.deepStrictEqual(restored.getIndexedFiles(), ['/project/c.ts']);
+    assert.strictEqual(restored.getIndexedMtime('/project/c.ts'), 2);
+    assert.deepStrictEqual(
+      restored.findCrossFileDuplicates('/project/b.ts', shared),
+      index.findCrossFileDuplicates('/project/b.ts', shared)
+    );
+    // Loading does not count as a change to save
+    assert.deepStrictEqual(restored.takeChangedFiles(), []);
+  });
+});
@@ -0,0 +1,139 @@
+import * as assert from 'assert';
+import { findExactLineDuplication } from '../../duplication/ExactLineDuplication';
+
+/**
+ * The original O(n²) CodeDuplicationMetric loop, kept as the reference for the
+ * duplicated line count
+ */
+function referenceDuplicatedLineCount(lines: string[]): number {
+  const MIN_DUPLICATION_LINES = 3;
+  const foundDuplications = new Set<string>();
+  let duplicatedLineCount = 0;
+
+  for (let i = 0; i < lines.length - MIN_DUPLICATION_LINES + 1; i++) {
+    const currentLine = lines[i].trim();
+    if (currentLine === '' || currentLine.startsWith('//') || currentLine.startsWith('/*') || currentLine.startsWith('*')) {
+      continue;
+    }
+
+    for (let j = i + 1; j < lines.length - MIN_DUPLICATION_LINES + 1; j++) {
+      let duplicatedLines = 0;
+      let isDuplication = false;
+
+      for (let k = 0; k < MIN_DUPLICATION_LINES; k++) {
+        const line1 = lines[i + k].trim();
+        const line2 = lines[j + k].trim();
+        if (line1 === '' || line1.startsWith('//') || line1.startsWith('/*') || line1.startsWith('*') ||
+            line2 === '' || line2.startsWith('//') || line2.startsWith('/*') || line2.startsWith('*')) {
+          continue;
+        }
+        if (line1 === line2 && line1.length > 5) {
+          duplicatedLines++;
+        } else {
+          break;
+        }
+      }
+
+      if (duplicatedLines >= MIN_DUPLICATION_LINES) {
+        isDuplication = true;
+        let l = MIN_DUPLICATION_LINES;
+        while (i + l < lines.length && j + l < lines.length) {
+          const line1 = lines[i + l].trim();
+          const line2 = lines[j + l].trim();
+          if (line1 === line2 && line1.length > 5 &&
+              !line1.startsWith('//') && !line1.startsWith('/*') && !line1.startsWith('*')) {
+            duplicatedLines++;
+            l++;
+          } else {
+            break;
+          }
+        }
+      }
+
+      if (isDuplication) {
+        const duplicationKey = `${i}-${i + duplicatedLines}`;
+        if (!foundDuplications.has(duplicationKey)) {
+          foundDuplications.add(duplicationKey);
+          duplicatedLineCount += duplicatedLines;
+        }
+      }
+    }
+  }
+
+  return duplicatedLineCount;
+}
+
+/**
+ * Deterministic pseudo-random generator so failures can be reproduced
+ */
+function createRandom(seed: number): () => number {
+  return () => {
+    seed = (seed * 1103515245 + 12345) % 2147483648;
+    return seed / 2147483648;
+  };
+}
+
+// A small vocabulary makes repeated windows, overlapping runs and comment breaks frequent
+const VOCABULARY = [
+  'const total = a + b;',
+  'return total;',
+  'if (value > 0) {',
+  '}',
+  '',
+  '// comment line',
+  '/* block comment */',
+  ' * doc line',
+  'x++;',
+  'console.log(total);',
+  'for (const item of items) {',
+  '    const total = a + b;',
+];
+
+suite('ExactLineDuplication Test Suite', () => {
+  test('Should count the same duplicated lines as the quadratic implementation', () => {
+    const random = createRandom(42);
+    for (let sample = 0; sample < 300; sample++) {
+      const vocabularySize = 2 + Math.floor(random() * VOCABULARY.length - 1);
+      const lineCount = Math.floor(random() * 80);
+      const lines: string[] = [];
+      for (let i = 0; i < lineCount; i++) {
+        lines.push(VOCABULARY[Math.floor(random() * vocabularySize)]);
+      }
+
+      assert.strictEqual(
+        findExactLineDuplication(lines).duplicatedLineCount,
+        referenceDuplicatedLineCount(lines),
+        `Mismatch for:\n${lines.join('\n')}`
+      );
+    }
+  });
+
+  test('Should match the quadratic implementation on runs of identical lines', () => {
+    const lines = new Array(40).fill('const total = a + b;');
+    assert.strictEqual(findExactLineDuplication(lines).duplicatedLineCount, referenceDuplicatedLineCount(lines));
+  });
+
+  test('Should report both copies of a duplicated run with the same block id', () => {
+    const lines = [
+      'function first() {',
+      '  const a = compute(1);',
+      '  const b = compute(2);',
+      '  return a + b;',
+      '}',
+      '',
+      'function second() {',
+      '  const a = compute(1);',
+      '  const b = compute(2);',
+      '  return a + b;',
+      '}',
+    ];
+
+    const duplication = findExactLineDuplication(lines);
+
+    assert.deepStrictEqual(duplication.duplicatedBlocks, [
+      { startLine: 1, endLine: 3, blockId: 'a' },
+      { startLine: 7, endLine: 9, blockId: 'a' },
+    ]);
+    assert.strictEqual(duplication.totalNonEmptyLines, 10);
+  });
+});
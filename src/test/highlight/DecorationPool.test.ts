@@ -0,0 +1,91 @@
+import * as assert from 'assert';
+import * as vscode from 'vscode';
+import { DecorationPool } from '../../highlight/DecorationPool';
+
+interface FakeEditor {
+  editor: vscode.TextEditor;
+  calls: { type: vscode.TextEditorDecorationType, decorations: vscode.DecorationOptions[] }[];
+}
+
+function createFakeEditor(lineCount: number, visibleLines: [number, number] = [0, lineCount - 1]): FakeEditor {
+  const calls: FakeEditor['calls'] = [];
+  const editor = {
+    document: { lineCount },
+    visibleRanges: [lineRange(visibleLines[0], visibleLines[1])],
+    setDecorations: (type: vscode.TextEditorDecorationType, decorations: vscode.DecorationOptions[]) => {
+      calls.push({ type, decorations });
+    }
+  } as unknown as vscode.TextEditor;
+  return { editor, calls };
+}
+
+function lineRange(startLine: number, endLine: number): vscode.Range {
+  return new vscode.Range(new vscode.Position(startLine, 0), new vscode.Position(endLine, 0));
+}
+
+function createPool(): { pool: DecorationPool, disposed: number[] } {
+  const disposed: number[] = [];
+  let created = 0;
+  const pool = new DecorationPool(() => {
+    const id = created++;
+    return { key: `${id}`, dispose: () => disposed.push(id) } as vscode.TextEditorDecorationType;
+  });
+  return { pool, disposed };
+}
+
+suite('DecorationPool Test Suite', () => {
+  test('Should reuse decoration types and skip unchanged ranges', () => {
+    const { pool, disposed } = createPool();
+    const { editor, calls } = createFakeEditor(100);
+
+    pool.apply(editor, 'method:0', {}, [{ range: lineRange(1, 5), label: 'Run (5 líneas) ' }]);
+    pool.apply(editor, 'method:0', {}, [{ range: lineRange(1, 5), label: 'Run (5 líneas) ' }]);
+    pool.apply(editor, 'method:0', {}, [{ range: lineRange(1, 6), label: 'Run (6 líneas) ' }]);
+
+    assert.strictEqual(calls.length, 2);
+    assert.strictEqual(calls[0].type, calls[1].type);
+    assert.strictEqual(calls[1].decorations[0].renderOptions?.before?.contentText, 'Run (6 líneas) ');
+    assert.deepStrictEqual(pool.getStats(), { created: 1, applied: 2, unchanged: 1 });
+    assert.deepStrictEqual(disposed, []);
+  });
+
+  test('Should only clear the slots that show decorations', () => {
+    const { pool, disposed } = createPool();
+    const { editor, calls } = createFakeEditor(100);
+
+    pool.apply(editor, 'method:0', {}, [{ range: lineRange(1, 5) }]);
+    pool.apply(editor, 'method:1', {}, []);
+    pool.apply(editor, 'loop', {}, [{ range: lineRange(8, 8) }]);
+    calls.length = 0;
+
+    pool.clear('method:');
+    assert.deepStrictEqual(calls.map(call => call.decorations.length), [0]);
+
+    pool.clear();
+    pool.clear();
+    assert.deepStrictEqual(calls.map(call => call.decorations.length), [0, 0]);
+    assert.deepStrictEqual(disposed, []);
+
+    pool.dispose();
+    assert.deepStrictEqual(disposed, [0, 1, 2]);
+  });
+
+  test('Should only decorate the visible ranges of large documents', () => {
+    const { pool } = createPool();
+    const large = createFakeEditor(10000, [5000, 5050]);
+    pool.setVisibleRangeLimit({ minLineCount: 5000, marginLines: 100 });
+
+    const decorations = [lineRange(10, 20), lineRange(4920, 4960), lineRange(5140, 5200), lineRange(9000, 9010)]
+      .map(range => ({ range }));
+    pool.apply(large.editor, 'loop', {}, decorations);
+    assert.deepStrictEqual(large.calls[0].decorations.map(decoration => decoration.range.start.line), [4920, 5140]);
+
+    (large.editor as { visibleRanges: vscode.Range[] }).visibleRanges = [lineRange(8950, 9000)];
+    pool.refreshVisible(large.editor);
+    assert.deepStrictEqual(large.calls[1].decorations.map(decoration => decoration.range.start.line), [9000]);
+
+    const small = createFakeEditor(1000, [0, 10]);
+    pool.apply(small.editor, 'constructor', {}, decorations.slice(0, 1).concat({ range: lineRange(900, 910) }));
+    assert.strictEqual(small.calls[0].decorations.length, 2);
+  });
+});
@@ -166,6 +166,47 @@ suite('AverageMethodSizeMetric Test Suite', () => {
     // 1 line for signature, 1 for opening brace, 3 for content, 1 for closing brace = 6 lines
     assert.strictEqual(result.value, 6);
   });
+
+  test('Should measure methods with the opening brace on the signature line', () => {
+    const document = createMockDocument(`
+      public class Example {
+        public void Method1() {
+          int x = 5;
+          Console.WriteLine(x);
+        }
+
+        public int Method2() {
+          return 42;
+        }
+      }
+    `);
+    const result = AverageMethodSizeMetric.extract(document);
+
+    // Method1: 4 lines, Method2: 3 lines → (4 + 3) / 2 = 3.5 → 4
+    assert.strictEqual(result.value, 4);
+  });
+
+  test('Should include constructors', () => {
+    const document = createMockDocument(`
+      public class Example
+      {
+        public Example()
+        {
+          Init();
+          Start();
+        }
+
+        public void Run()
+        {
+          Work();
+        }
+      }
+    `);
+    const result = AverageMethodSizeMetric.extract(document);
+
+    // Constructor: 5 lines, Run: 4 lines → (5 + 4) / 2 = 4.5 → 5
+    assert.strictEqual(result.value, 5);
+  });
 });
 
 function createMockDocument(content: string): vscode.TextDocument {
@@ -137,8 +137,12 @@ def outer_method():
     `);
     const result = AverageMethodSizeMetricPython.extract(document);
     
-    // The implementation counts nested methods differently
-    assert.strictEqual(result.value, 4);
+    // Lines of the document: 0 is empty, outer_method is 1-8 and 9 is the whitespace-only last line
+    // outer_method: lines 1-9 = 1 (signature) + 7 (body, inner_method and empty lines included)
+    //   + 1 (whitespace-only last line) = 9 lines
+    // inner_method: lines 4-7 = 1 (signature) + 2 (content) + 1 (empty line before return) = 4 lines
+    // Average: (9 + 4) / 2 = 6.5 rounded to 7
+    assert.strictEqual(result.value, 7);
   });
 
   test('Should handle multiple nested methods correctly', () => {
@@ -163,8 +167,15 @@ def level1():
     `);
     const result = AverageMethodSizeMetricPython.extract(document);
     
-    // The implementation counts nested methods differently
-    assert.strictEqual(result.value, 4);
+    // Each method spans its nested methods and the empty lines up to the next statement
+    // indented like its signature
+    // level1: lines 1-18 = 1 (signature) + 16 (body) + 1 (whitespace-only last line) = 18 lines
+    // level2a: lines 4-12 = 1 (signature) + 7 (b = 2, level3, return and two empty lines)
+    //   + 1 (empty line before def level2b) = 9 lines
+    // level3: lines 7-10 = 1 (signature) + 2 (content) + 1 (empty line before return) = 4 lines
+    // level2b: lines 13-16 = 1 (signature) + 2 (content) + 1 (empty line before return) = 4 lines
+    // Average: (18 + 9 + 4 + 4) / 4 = 8.75 rounded to 9
+    assert.strictEqual(result.value, 9);
   });
 
   test('Should handle class methods correctly', () => {
@@ -344,11 +355,30 @@ def create_context(
     `);
     const result = AverageMethodSizeMetricPython.extract(document);
     
-    // @classmethod: 1 (decorator)
-    // def create_context(...): 3 (multi-line signature)
-    // method body: 13 lines
-    // Total: 17 lines
-    assert.strictEqual(result.value, 17);
+    // @classmethod: 1 (decorator, line 1)
+    // def create_context(...): 3 (multi-line signature, lines 2-4)
+    // method body: 16 (lines 5-20, the 9-line ChatContext(...) call included)
+    // whitespace-only last line of the document: 1 (line 21)
+    // Total: 1 + 3 + 16 + 1 = 21 lines
+    assert.strictEqual(result.value, 21);
+  });
+
+  test('Should keep measuring a class method after its nested function', () => {
+    const document = createMockDocument(`
+class Example:
+    def method(self):
+        def nested():
+            return 42
+
+        return nested()
+    `);
+    const result = AverageMethodSizeMetricPython.extract(document);
+
+    // method: lines 2-7 = 1 (signature) + 4 (nested and the empty line) + 1 (return) = 6 lines,
+    //   the statement after nested still belongs to method
+    // nested: lines 3-5 = 1 (signature) + 1 (content) + 1 (empty line before return) = 3 lines
+    // Average: (6 + 3) / 2 = 4.5 rounded to 5
+    assert.strictEqual(result.value, 5);
   });
 });
 
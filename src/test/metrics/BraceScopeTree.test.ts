@@ -0,0 +1,110 @@
+import * as assert from 'assert';
+import { buildBraceScopeTree } from '../../metrics/common/BraceScopeTree';
+
+suite('BraceScopeTree Test Suite', () => {
+  test('Should nest types, members and control blocks in C#', () => {
+    const tree = buildBraceScopeTree([
+      'namespace Shop',
+      '{',
+      '    [Serializable]',
+      '    public class Cart : IDisposable',
+      '    {',
+      '        public int Count { get; set; }',
+      '        public Cart(int count) : base()',
+      '        {',
+      '            if (count > 0) { Count = count; }',
+      '        }',
+      '        public int Double() => Count * 2;',
+      '        void Validate();',
+      '    }',
+      '}'
+    ].join('\n'), 'csharp');
+
+    assert.deepStrictEqual(tree.types.map(type => [type.keyword, type.name, type.startLine, type.endLine]), [
+      ['namespace', 'Shop', 0, 13],
+      ['class', 'Cart', 3, 12]
+    ]);
+    assert.deepStrictEqual(tree.constructors.map(scope => [scope.name, scope.startLine, scope.endLine]), [['Cart', 6, 9]]);
+    assert.deepStrictEqual(tree.functions.map(scope => [scope.name, scope.expressionBodied]), [['Double', true]]);
+    assert.strictEqual(tree.types[1].children[0].kind, 'property');
+    assert.strictEqual(tree.controls[0].keyword, 'if');
+    assert.strictEqual(tree.controls[0].depth, 4);
+    assert.strictEqual(tree.lambdas.length, 1);
+  });
+
+  test('Should mask comments and strings with braces', () => {
+    const tree = buildBraceScopeTree([
+      'var a = "{"; var b = @"C:\\{"; var c = $"{a} {{";',
+      '/* { */ var d = \'}\'; // }',
+      'var e = """',
+      '  { raw }',
+      '  """;'
+    ].join('\n'), 'csharp');
+
+    assert.strictEqual(tree.scopes.length, 0);
+    assert.strictEqual(tree.statements.length, 5);
+    assert.strictEqual(tree.lines[1].hasComment, true);
+    assert.strictEqual(tree.lines[3].hasCode, false);
+    assert.strictEqual(tree.lines[1].code, `${' '.repeat(7)} var d = ' ';${' '.repeat(5)}`);
+  });
+
+  test('Should find Java lambdas, anonymous classes and annotated methods', () => {
+    const tree = buildBraceScopeTree([
+      'public class Worker {',
+      '    @Override',
+      '    public void run() {',
+      '        items.forEach(item -> {',
+      '            process(item);',
+      '        });',
+      '        Runnable task = new Runnable() {',
+      '            public void run() { }',
+      '        };',
+      '        while (i-->0) { }',
+      '    }',
+      '}'
+    ].join('\n'), 'java');
+
+    assert.deepStrictEqual(tree.functions.map(scope => [scope.name, scope.startLine]), [['run', 2], ['run', 7]]);
+    assert.deepStrictEqual(tree.lambdas.map(lambda => [lambda.line, lambda.endLine, lambda.parameters]), [[3, 5, 'item']]);
+    assert.deepStrictEqual(tree.scopes.map(scope => scope.kind), ['type', 'function', 'lambda', 'block', 'function', 'control']);
+  });
+
+  test('Should handle templates, regular expressions and missing semicolons in JavaScript', () => {
+    const tree = buildBraceScopeTree([
+      'const MAP = Symbol(`${name} {`)',
+      'const pattern = /[{]+/g',
+      'class Headers extends Base {',
+      '  constructor (init) {',
+      '    this.init = init',
+      '  }',
+      '  get (name) {',
+      '    return this.list.map((item, index) => item + index)',
+      '  }',
+      '}',
+      'module.exports = function () {',
+      '  const handler = event => event',
+      '}'
+    ].join('\n'), 'javascript');
+
+    assert.deepStrictEqual(tree.types.map(type => [type.name, type.startLine, type.endLine]), [['Headers', 2, 9]]);
+    assert.deepStrictEqual(tree.constructors.map(scope => scope.name), ['constructor']);
+    assert.deepStrictEqual(tree.functions.map(scope => scope.name), ['get']);
+    assert.strictEqual(tree.scopes[tree.scopes.length - 1].kind, 'lambda');
+    assert.deepStrictEqual(tree.lambdas.map(lambda => [lambda.parameters, lambda.name]), [
+      ['(item, index)', ''],
+      ['event', 'handler']
+    ]);
+  });
+
+  test('Should skip regular expressions inside template literal holes', () => {
+    const tree = buildBraceScopeTree([
+      'function quote(value) {',
+      '  return `"${value.replace(/"/g, \'""\')}"`;',
+      '}',
+      'function next() { }'
+    ].join('\n'), 'typescript');
+
+    assert.deepStrictEqual(tree.functions.map(scope => [scope.name, scope.startLine, scope.endLine]), [['quote', 0, 2], ['next', 3, 3]]);
+    assert.strictEqual(tree.lines[3].code, 'function next() { }');
+  });
+});
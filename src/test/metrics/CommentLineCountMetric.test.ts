@@ -118,7 +118,7 @@ suite('CommentLineCountMetric Test Suite', () => {
     `);
     const result = CommentLineCountMetric.extract(document);
     
-    assert.strictEqual(result.value, 2);
+    assert.strictEqual(result.value, 1);
   });
 
   test('Should handle complex mixed code with comments correctly', () => {
@@ -123,8 +123,8 @@ suite('CommentRatioMetric Test Suite', () => {
     `);
     const result = CommentRatioMetric.extract(document);
     
-    // 1 comment line out of 4 total lines = 25%
-    assert.strictEqual(result.value, 25);
+    // 1 comment line out of 8 total lines = 12.5%
+    assert.strictEqual(result.value, 12.5);
   });
 
   test('Should handle complex mixed code with comments correctly', () => {
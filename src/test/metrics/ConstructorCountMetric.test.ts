@@ -82,6 +82,28 @@ suite('ConstructorCountMetric Test Suite', () => {
     
     assert.strictEqual(result.value, 3);
   });
+
+  test('Should count constructors declared after other members', () => {
+    const document = createMockDocument(`
+      public class TestClass
+      {
+        public void Run()
+        {
+          Work();
+        }
+
+        public TestClass(
+          int first,
+          int second)
+        {
+          Work();
+        }
+      }
+    `);
+    const result = ConstructorCountMetric.extract(document);
+
+    assert.strictEqual(result.value, 1);
+  });
 });
 
 function createMockDocument(content: string): vscode.TextDocument {
@@ -0,0 +1,217 @@
+import * as assert from 'assert';
+import * as vscode from 'vscode';
+import { generateCorpus } from '../../benchmark/corpora';
+import { buildBraceScopeTree } from '../../metrics/common/BraceScopeTree';
+import {
+  adoptIncrementalState,
+  applyIncrementalChanges,
+  computeIncrementalState,
+  getBraceSummary,
+  getIncrementalStats,
+  hasIncrementalState,
+  summarizeTree,
+  trackIncrementalDocument
+} from '../../metrics/common/IncrementalBraceAnalysis';
+import { createTextDocumentSnapshot } from '../../metrics/execution/TextDocumentSnapshot';
+import { Metric } from '../../metrics/Metric';
+import { AverageMethodSizeMetric } from '../../metrics/common/AverageMethodSizeMetric';
+import { ClassCountMetric } from '../../metrics/common/ClassCountMetric';
+import { CodeDuplicationMetricV2 } from '../../metrics/common/CodeDuplicationMetricV2';
+import { CognitiveComplexityMetric } from '../../metrics/common/CognitiveComplexityMetric';
+import { CommentLineCountMetric } from '../../metrics/common/CommentLineCountMetric';
+import { CommentRatioMetric } from '../../metrics/common/CommentRatioMetric';
+import { ConstructorCountMetric } from '../../metrics/common/ConstructorCountMetric';
+import { IfCountMetric } from '../../metrics/common/IfCountMetric';
+import { LambdaCountMetric } from '../../metrics/common/LambdaCountMetric';
+import { LoopCountMetric } from '../../metrics/common/LoopCountMetric';
+import { MethodCohesionMetric } from '../../metrics/common/MethodCohesionMetric';
+import { MethodCountMetric } from '../../metrics/common/MethodCountMetric';
+import { NestingDepthMetric } from '../../metrics/common/NestingDepthMetric';
+import { UsingCountMetric } from '../../metrics/common/UsingCountMetric';
+
+const INCREMENTAL_METRICS: Metric[] = [
+  AverageMethodSizeMetric, ClassCountMetric, CodeDuplicationMetricV2, CognitiveComplexityMetric,
+  CommentLineCountMetric, CommentRatioMetric, ConstructorCountMetric, IfCountMetric, LambdaCountMetric,
+  LoopCountMetric, MethodCohesionMetric, MethodCountMetric, NestingDepthMetric, UsingCountMetric
+];
+
+interface EditedDocument {
+  document: vscode.TextDocument;
+  changes: vscode.TextDocumentContentChangeEvent[];
+}
+
+/**
+ * The next version of a document with one range replaced
+ */
+function edit(document: vscode.TextDocument, startLine: number, startCharacter: number, endLine: number, endCharacter: number, text: string): EditedDocument {
+  const lines = document.getText().split('\n');
+  const before = lines.slice(0, startLine).concat(lines[startLine].slice(0, startCharacter)).join('\n');
+  const after = [lines[endLine].slice(endCharacter)].concat(lines.slice(endLine + 1)).join('\n');
+  const range = new vscode.Range(new vscode.Position(startLine, startCharacter), new vscode.Position(endLine, endCharacter));
+  return {
+    document: createTextDocumentSnapshot(before + text + after, document.languageId, document.fileName, document.version + 1),
+    changes: [{ range, rangeOffset: before.length, rangeLength: 0, text }]
+  };
+}
+
+function fullSummary(document: vscode.TextDocument) {
+  return summarizeTree(buildBraceScopeTree(document.getText(), document.languageId));
+}
+
+/**
+ * Check every incremental metric of the tracked document against the same text analyzed
+ * from scratch
+ */
+function assertMatchesFullPass(document: vscode.TextDocument): void {
+  const untracked = createTextDocumentSnapshot(document.getText(), document.languageId, `${document.fileName}.full`);
+  for (const metric of INCREMENTAL_METRICS) {
+    assert.deepStrictEqual(metric.extract(document), metric.extract(untracked), metric.name);
+  }
+}
+
+suite('IncrementalBraceAnalysis Test Suite', () => {
+  teardown(() => {
+    trackIncrementalDocument(undefined);
+  });
+
+  for (const language of ['csharp', 'java', 'typescript'] as const) {
+    test(`Should match a full pass after edits inside methods (${language})`, () => {
+      let document = createTextDocumentSnapshot(generateCorpus(language, 'typical', 1000), language, `/incremental/${language}`);
+      trackIncrementalDocument(document);
+      assert.deepStrictEqual(getBraceSummary(document), fullSummary(document));
+      assertMatchesFullPass(document);
+
+      const before = getIncrementalStats();
+      const methods = buildBraceScopeTree(document.getText(), language).functions
+        .filter(method => !method.expressionBodied && method.endLine - method.openLine >= 3);
+      // Edit methods at the start, middle and end of the file, adding and removing lines
+      for (const method of [methods[0], methods[Math.floor(methods.length / 2)], methods[methods.length - 1]]) {
+        const line = buildBraceScopeTree(document.getText(), language).functions
+          .find(candidate => candidate.name === method.name && candidate.startLine >= method.startLine - 4)!.openLine + 1;
+        const inserted = edit(document, line, 0, line, 0, '    if (ready) { while (ready) { ready = false; } }\n');
+        assert.strictEqual(applyIncrementalChanges(inserted.document, inserted.changes), true);
+        assert.deepStrictEqual(getBraceSummary(inserted.document), fullSummary(inserted.document));
+        assertMatchesFullPass(inserted.document);
+
+        const removed = edit(inserted.document, line, 0, line + 1, 0, '');
+        assert.strictEqual(applyIncrementalChanges(removed.document, removed.changes), true);
+        assert.deepStrictEqual(getBraceSummary(removed.document), fullSummary(removed.document));
+        assertMatchesFullPass(removed.document);
+        document = removed.document;
+      }
+
+      const after = getIncrementalStats();
+      assert.strictEqual(after.incrementalUpdates - before.incrementalUpdates, 6);
+      assert.strictEqual(after.fullPasses, before.fullPasses);
+    });
+  }
+
+  test('Should recombine keywords, comments, lambdas, fields and blocks of an edited method', () => {
+    const text = [
+      'import { Item } from "./item";',
+      '',
+      'class Cart {',
+      '  private items: Item[] = [];',
+      '  private total = 0;',
+      '',
+      '  add(item: Item) {',
+      '    this.items.push(item);',
+      '  }',
+      '',
+      '  sum() {',
+      '    return this.items.length;',
+      '  }',
+      '}'
+    ].join('\n');
+    let document = createTextDocumentSnapshot(text, 'typescript', '/incremental/cart.ts');
+    trackIncrementalDocument(document);
+    assertMatchesFullPass(document);
+
+    const before = getIncrementalStats();
+    const edits = [
+      '    // keep the running total\n',
+      '    items.forEach(next => { this.discount = next.price; });\n',
+      '    for (const next of this.items) {\n      this.total += next.price * next.count;\n    }\n',
+      '    for (const next of this.items) {\n      this.total += next.price * next.count;\n    }\n'
+    ];
+    for (const inserted of edits) {
+      const edited = edit(document, 11, 0, 11, 0, inserted);
+      assert.strictEqual(applyIncrementalChanges(edited.document, edited.changes), true);
+      assertMatchesFullPass(edited.document);
+      document = edited.document;
+    }
+
+    assert.strictEqual(IfCountMetric.extract(document).value, 0);
+    assert.strictEqual(LoopCountMetric.extract(document).value, 3);
+    assert.strictEqual(CommentLineCountMetric.extract(document).value, 1);
+    assert.strictEqual(LambdaCountMetric.extract(document).value, 1);
+    assert.ok((CodeDuplicationMetricV2.extract(document).value as number) > 0);
+    const after = getIncrementalStats();
+    assert.strictEqual(after.incrementalUpdates - before.incrementalUpdates, edits.length);
+    assert.strictEqual(after.fullPasses, before.fullPasses);
+  });
+
+  test('Should fall back to a full pass when an edit changes the structure', () => {
+    const text = [
+      'class Account {',
+      '  void Deposit(int amount) {',
+      '    if (amount > 0) {',
+      '      total += amount;',
+      '    }',
+      '  }',
+      '',
+      '  void Withdraw(int amount) {',
+      '    total -= amount;',
+      '  }',
+      '}'
+    ].join('\n');
+    const document = createTextDocumentSnapshot(text, 'csharp', '/incremental/Account.cs');
+    trackIncrementalDocument(document);
+    assert.strictEqual(getBraceSummary(document).members.length, 2);
+
+    // Removing the closing brace of Deposit merges it with Withdraw
+    const unbalanced = edit(document, 5, 2, 5, 3, '');
+    assert.strictEqual(applyIncrementalChanges(unbalanced.document, unbalanced.changes), false);
+    assert.deepStrictEqual(getBraceSummary(unbalanced.document), fullSummary(unbalanced.document));
+
+    // Renaming a method changes its signature
+    const renamed = edit(unbalanced.document, 7, 7, 7, 15, 'Take');
+    assert.strictEqual(applyIncrementalChanges(renamed.document, renamed.changes), false);
+    assert.deepStrictEqual(getBraceSummary(renamed.document), fullSummary(renamed.document));
+  });
+
+  test('Should recombine a state built by another thread without a full pass', () => {
+    const text = generateCorpus('csharp', 'typical', 500);
+    const document = createTextDocumentSnapshot(text, 'csharp', '/incremental/Adopted.cs');
+    // Built from the worker's own snapshot and copied like a posted message
+    const built = structuredClone(computeIncrementalState(createTextDocumentSnapshot(text, 'csharp', document.fileName, document.version)));
+    trackIncrementalDocument(document);
+    assert.strictEqual(hasIncrementalState(document), false);
+
+    const before = getIncrementalStats();
+    assert.strictEqual(adoptIncrementalState(document, built), true);
+    assert.strictEqual(hasIncrementalState(document), true);
+    assertMatchesFullPass(document);
+
+    const method = buildBraceScopeTree(text, 'csharp').functions.find(candidate => !candidate.expressionBodied && candidate.endLine - candidate.openLine >= 3)!;
+    const edited = edit(document, method.openLine + 1, 0, method.openLine + 1, 0, '    if (ready) { ready = false; }\n');
+    assert.strictEqual(applyIncrementalChanges(edited.document, edited.changes), true);
+    assertMatchesFullPass(edited.document);
+    const after = getIncrementalStats();
+    // The adopted state is the only full pass
+    assert.strictEqual(after.fullPasses - before.fullPasses, 1);
+
+    // A state of an earlier version is not kept
+    assert.strictEqual(adoptIncrementalState(edited.document, built), false);
+    assert.strictEqual(hasIncrementalState(edited.document), true);
+  });
+
+  test('Should summarize untracked documents from their scope tree', () => {
+    const document = createTextDocumentSnapshot(generateCorpus('java', 'deepNesting', 1000), 'java', '/incremental/Deep.java');
+
+    const summary = getBraceSummary(document);
+
+    assert.deepStrictEqual(summary, fullSummary(document));
+    assert.ok(summary.maxDepth >= 40);
+  });
+});
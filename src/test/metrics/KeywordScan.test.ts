@@ -0,0 +1,85 @@
+import * as assert from 'assert';
+import { getKeywordScan, scanKeywords } from '../../metrics/common/KeywordScan';
+import { createTextDocumentSnapshot } from '../../metrics/execution/TextDocumentSnapshot';
+import { IfCountMetric } from '../../metrics/common/IfCountMetric';
+import { LoopCountMetric } from '../../metrics/common/LoopCountMetric';
+
+suite('KeywordScan Test Suite', () => {
+  test('Should find keywords, imports and comments of a brace language in one pass', () => {
+    const scan = scanKeywords([
+      'using System;',
+      '/* for (int i = 0; i < n; i++)',
+      '   while (true) */',
+      'class Parser {',
+      '  void Run() {',
+      '    var text = "if (x) { }"; // if (y)',
+      '    if',
+      '      (ready) { }',
+      '    do',
+      '    {',
+      '      items.forEach(item => Use(item));',
+      '    } while (Next());',
+      '  }',
+      '}'
+    ].join('\n'), 'csharp');
+
+    assert.deepStrictEqual(scan.counts, { if: 1, loop: 2, import: 1 });
+    assert.deepStrictEqual(scan.matches.map(match => `${match.type}@${match.line}:${match.column}`), [
+      'using@0:0', 'if@6:4', 'do-while@8:4', 'forEach@10:11', 'while@11:6'
+    ]);
+    assert.deepStrictEqual(scan.commentLines, [1, 2, 5]);
+    assert.strictEqual(scan.lineCount, 14);
+  });
+
+  test('Should lex Python comments and triple-quoted strings', () => {
+    const scan = scanKeywords([
+      'from os import (',
+      '    path,',
+      ')',
+      '"""Docstring',
+      'if this: while that: for x in y:',
+      '"""',
+      'for item in items:  # while True:',
+      '    if item.ready:',
+      '        pass',
+      '    elif other:',
+      '        while queue:',
+      "            print('for a in b:')"
+    ].join('\n'), 'python');
+
+    assert.deepStrictEqual(scan.counts, { if: 1, loop: 2, import: 1 });
+    assert.deepStrictEqual(scan.matches.map(match => `${match.type}@${match.line}`), [
+      'from@0', 'for-in@6', 'if-python@7', 'while-python@10'
+    ]);
+    assert.deepStrictEqual(scan.commentLines, [6]);
+  });
+
+  test('Should mask the strings that span lines as the scope tree does', () => {
+    const scan = scanKeywords([
+      'var query = @"',
+      '  while (rows > 0)',
+      '  if (done)";',
+      'var text = $"{(ready ? "for (;;)" : "")}";',
+      'while (Next()) { }'
+    ].join('\n'), 'csharp');
+
+    assert.deepStrictEqual(scan.matches.map(match => `${match.type}@${match.line}`), ['while@4']);
+    assert.deepStrictEqual(scan.commentLines, []);
+
+    const script = scanKeywords(['const sql = `', '  if (x) for (y)', '`;', 'if (sql) { }'].join('\n'), 'typescript');
+    assert.deepStrictEqual(script.matches.map(match => `${match.type}@${match.line}`), ['if@3']);
+  });
+
+  test('Should share one scan per document version between the metrics', () => {
+    const text = ['/*', ' * header', ' */', 'for (;;) {', '  if (done) break;', '}'].join('\n');
+    const document = createTextDocumentSnapshot(text, 'java', '/scan/Loop.java');
+
+    const scan = getKeywordScan(document);
+    assert.strictEqual(getKeywordScan(document), scan);
+    assert.notStrictEqual(getKeywordScan(createTextDocumentSnapshot(text, 'java', '/scan/Loop.java', 2)), scan);
+
+    // Lines are those of the document, the block comment before the loop included
+    assert.deepStrictEqual(LoopCountMetric.extract(document).loopBlocks, [{ startLine: 3, endLine: 3, loopType: 'for' }]);
+    assert.deepStrictEqual(IfCountMetric.extract(document).loopBlocks, [{ startLine: 4, endLine: 4, loopType: 'if' }]);
+  });
+});
@@ -237,6 +237,20 @@ suite('LambdaCountMetric Test Suite', () => {
     // The current implementation counts => occurrences, but properly handles comments and >= operators
     assert.strictEqual(result.value, 3);
   });
+
+  test('Should not count arrows inside template literals', () => {
+    const document = createMockDocument(`
+      const snippet = \`
+        const fake = () => 1;
+        items.map(item => item.id);
+      \`;
+      const inline = \`\${1} => \${2}\`;
+      const real = (x: number) => x * 2;
+    `);
+    const result = LambdaCountMetric.extract(document);
+
+    assert.strictEqual(result.value, 1);
+  });
 });
 
 function createMockDocument(content: string): vscode.TextDocument {
@@ -156,7 +156,8 @@ suite('LambdaCountMetricPython Test Suite', () => {
     `);
     const result = LambdaCountMetricPython.extract(document);
     
-    assert.strictEqual(result.value, 7);
+    // 4 lambdas in calls and comprehensions + 4 in the dictionary
+    assert.strictEqual(result.value, 8);
   });
 
   test('Should handle multiline strings correctly', () => {
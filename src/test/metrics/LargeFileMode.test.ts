@@ -0,0 +1,84 @@
+import * as assert from 'assert';
+import { Metric, MetricResult } from '../../metrics/Metric';
+import { MetricRegistry } from '../../metrics/MetricRegistry';
+import { getDocumentLength, iterateLines } from '../../metrics/DocumentLines';
+import { createTextDocumentSnapshot } from '../../metrics/execution/TextDocumentSnapshot';
+import { CodeDuplicationMetricV2 } from '../../metrics/common/CodeDuplicationMetricV2';
+import { MetricFactory } from '../../metrics/MetricFactory';
+
+suite('Large File Mode Test Suite', () => {
+  teardown(() => {
+    MetricRegistry.getInstance().setLargeFileThreshold(Infinity);
+  });
+
+  test('Should iterate and measure a document from its lines', () => {
+    const text = 'using System;\n\nclass A {}\n';
+    const document = createTextDocumentSnapshot(text, 'csharp', '/large/a.cs');
+
+    assert.deepStrictEqual(Array.from(iterateLines(document)), ['using System;', '', 'class A {}', '']);
+    assert.strictEqual(getDocumentLength(document), text.length);
+  });
+
+  test('Should only run streaming metrics above the threshold, CSV rows included', async () => {
+    const registry = MetricRegistry.getInstance();
+    const calls: string[] = [];
+    const metric = (name: string, streaming: boolean): Metric => ({
+      name,
+      description: 'métrica de prueba.',
+      streaming,
+      extract: (): MetricResult => {
+        calls.push(name);
+        return { label: name, value: 1 };
+      }
+    });
+    const streamingMetric = metric('largeFileTestStreaming', true);
+    const wholeTextMetric = metric('largeFileTestWholeText', false);
+
+    const document = createTextDocumentSnapshot('x\n'.repeat(100), 'csharp', '/large/b.cs');
+    registry.setLargeFileThreshold(50);
+    assert.ok(registry.isLargeFile(document));
+
+    const results = await registry.executeMetricsAsync(document, [streamingMetric, wholeTextMetric]);
+    assert.deepStrictEqual(results.map(result => [result.value, result.skipped]), [[1, undefined], [undefined, true]]);
+    assert.ok(results[1].label.includes('modo archivo grande'));
+    assert.strictEqual(registry.extractMetric(document, wholeTextMetric, 'csv').skipped, true);
+    assert.deepStrictEqual(calls, ['largeFileTestStreaming']);
+
+    // Skipped results are not cached, so disabling the mode runs the metric
+    registry.setLargeFileThreshold(0);
+    assert.strictEqual(registry.isLargeFile(document), false);
+    assert.strictEqual(registry.extractMetric(document, wholeTextMetric).value, 1);
+  });
+
+  test('Should not read the whole text in streaming metrics', () => {
+    MetricFactory.initializeRegistry();
+    const registry = MetricRegistry.getInstance();
+    registry.setLargeFileThreshold(50);
+
+    for (const languageId of MetricFactory.getSupportedLanguages()) {
+      const snapshot = createTextDocumentSnapshot('if (x) { y(); } // z\n'.repeat(20), languageId, `/large/d.${languageId}`);
+      const document = {
+        ...snapshot,
+        getText: () => {
+          throw new Error('getText() called in large-file mode');
+        }
+      } as typeof snapshot;
+      assert.ok(registry.isLargeFile(document));
+
+      for (const metric of MetricFactory.getMetricsForLanguage(languageId).filter(metric => metric.streaming)) {
+        assert.doesNotThrow(() => metric.extract(document), `${metric.name} (${languageId})`);
+      }
+    }
+  });
+
+  test('Should count repeated windows with the rolling window', () => {
+    const block = 'int total = first + second;\nConsole.WriteLine(total);\nreturn total * factor;\n';
+    const document = createTextDocumentSnapshot(`${block}\n${block}\n${block}`, 'csharp', '/large/c.cs');
+
+    const result = CodeDuplicationMetricV2.extract(document);
+
+    // Every repeated window adds its three lines, overlapping windows included
+    assert.strictEqual(result.value, 200);
+    assert.deepStrictEqual(result.duplicatedBlocks?.map(block => block.startLine).slice(0, 3), [0, 4, 8]);
+  });
+});
@@ -104,4 +104,67 @@ suite('MethodCohesionMetric Test Suite', () => {
     assert.strictEqual(result.value, 50);
   });
 
+
+  test('Should not count local variables as properties', () => {
+    const doc = createMockDocument(`
+      public class Example {
+        public int Count { get; set; }
+
+        public void Method1() {
+          int local = Count;
+        }
+
+        public void Method2() {
+          int local = 2;
+          Console.WriteLine(local);
+        }
+      }
+    `);
+    const result = MethodCohesionMetric.extract(doc);
+    // local is not a property: Method1 uses 1/1, Method2 uses 0/1 → 50%
+    assert.strictEqual(result.value, 50);
+  });
+
+  test('Should not average constructors as methods', () => {
+    const doc = createMockDocument(`
+      public class Example {
+        private int a;
+        private int b;
+
+        public Example() {
+          Console.WriteLine("Created");
+        }
+
+        public int Sum() {
+          return a + b;
+        }
+      }
+    `);
+    const result = MethodCohesionMetric.extract(doc);
+    // Only Sum counts: 2/2 → 100%
+    assert.strictEqual(result.value, 100);
+  });
+
+  test('Should compare each method with the properties of its own class', () => {
+    const doc = createMockDocument(`
+      public class First {
+        public int A { get; set; }
+
+        public void UseA() {
+          Console.WriteLine(A);
+        }
+      }
+
+      public class Second {
+        public int B { get; set; }
+
+        public void UseB() {
+          Console.WriteLine(B);
+        }
+      }
+    `);
+    const result = MethodCohesionMetric.extract(doc);
+    // Each method uses every property of its class → 100%
+    assert.strictEqual(result.value, 100);
+  });
 });
\ No newline at end of file
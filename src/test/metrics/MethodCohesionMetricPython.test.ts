@@ -0,0 +1,88 @@
+import * as assert from 'assert';
+import * as vscode from 'vscode';
+import { MethodCohesionMetricPython } from '../../metrics/python/MethodCohesionMetricPython';
+
+suite('MethodCohesionMetricPython Test Suite', () => {
+
+  function createMockDocument(content: string): vscode.TextDocument {
+    return {
+      getText: () => content,
+      lineCount: content.split('\n').length,
+      version: 1,
+      languageId: 'python',
+    } as vscode.TextDocument;
+  }
+
+  test('Should return 0 for empty document', () => {
+    const doc = createMockDocument('');
+    const result = MethodCohesionMetricPython.extract(doc);
+    assert.strictEqual(result.value, 0);
+    assert.strictEqual(result.label, 'Cohesión promedio de métodos (%)');
+  });
+
+  test('Should return 100 when every method uses every attribute', () => {
+    const doc = createMockDocument(`
+class Example:
+    def __init__(self):
+        self.count = 0
+        self.name = ""
+
+    def describe(self):
+        return self.name + ": " + str(self.count)
+`);
+    const result = MethodCohesionMetricPython.extract(doc);
+    // __init__ is left out, describe uses 2/2
+    assert.strictEqual(result.value, 100);
+  });
+
+  test('Should not count local variables as attributes', () => {
+    const doc = createMockDocument(`
+class Example:
+    def __init__(self):
+        self.count = 0
+
+    def total(self):
+        result = self.count
+        doubled = result * 2
+        return doubled
+`);
+    const result = MethodCohesionMetricPython.extract(doc);
+    // result and doubled are locals of total: its only attribute is count → 1/1
+    assert.strictEqual(result.value, 100);
+  });
+
+  test('Should count class variables as attributes', () => {
+    const doc = createMockDocument(`
+class Example:
+    limit = 10
+
+    def __init__(self):
+        self.count = 0
+
+    def check(self):
+        return self.count < self.limit
+
+    def reset(self):
+        self.count = 0
+`);
+    const result = MethodCohesionMetricPython.extract(doc);
+    // check uses 2/2, reset uses 1/2 → (100 + 50) / 2 = 75%
+    assert.strictEqual(result.value, 75);
+  });
+
+  test('Should not count attributes mentioned in comments or strings', () => {
+    const doc = createMockDocument(`
+class Example:
+    def __init__(self):
+        self.count = 0
+        self.name = ""
+
+    def describe(self):
+        # self.name is not used here
+        return "self.name: " + str(self.count)
+`);
+    const result = MethodCohesionMetricPython.extract(doc);
+    // describe only uses count → 1/2
+    assert.strictEqual(result.value, 50);
+  });
+});
@@ -122,7 +122,8 @@ suite('MethodCountMetric Test Suite', () => {
     `);
     const result = MethodCountMetric.extract(document);
     
-    assert.strictEqual(result.value, 6);
+    // GenericParams<T> included
+    assert.strictEqual(result.value, 7);
   });
 
   test('Should not count method references in code', () => {
@@ -186,6 +187,31 @@ suite('MethodCountMetric Test Suite', () => {
     
     assert.strictEqual(result.value, 5);
   });
+
+  test('Should not count constructors as methods', () => {
+    const document = createMockDocument(`
+      public class Service
+      {
+        private int total;
+
+        public Service(int initial) {
+          total = initial;
+        }
+
+        public int Process(int value) {
+          return total + value;
+        }
+
+        public void Reset() {
+          total = 0;
+        }
+      }
+    `);
+    const result = MethodCountMetric.extract(document);
+
+    // Service(int initial) is a constructor, see ConstructorCountMetric
+    assert.strictEqual(result.value, 2);
+  });
 });
 
 function createMockDocument(content: string): vscode.TextDocument {
@@ -0,0 +1,82 @@
+import * as assert from 'assert';
+import { Metric, MetricResult } from '../../metrics/Metric';
+import { MetricRegistry } from '../../metrics/MetricRegistry';
+import { MetricProfiler, RollingHistogram, getSizeBucket } from '../../metrics/profiling/MetricProfiler';
+import { createTextDocumentSnapshot } from '../../metrics/execution/TextDocumentSnapshot';
+
+suite('MetricProfiler Test Suite', () => {
+  test('Should compute percentiles over the most recent samples', () => {
+    const histogram = new RollingHistogram(10);
+    for (let value = 1; value <= 20; value++) {
+      histogram.add(value);
+    }
+
+    assert.strictEqual(histogram.count, 20);
+    assert.strictEqual(histogram.max, 20);
+    assert.strictEqual(histogram.percentile(50), 15);
+    assert.strictEqual(histogram.percentile(95), 20);
+    assert.strictEqual(getSizeBucket(50 * 1024), '10-100KB');
+  });
+
+  test('Should report every metric with its breakdown, slowest first', () => {
+    const profiler = new MetricProfiler();
+    profiler.record({ metricName: 'lineCount', languageId: 'csharp', textLength: 100, callSite: 'render', durationMs: 1 });
+    profiler.record({ metricName: 'cognitiveComplexity', languageId: 'csharp', textLength: 100, callSite: 'render', durationMs: 40 });
+    profiler.record({ metricName: 'cognitiveComplexity', languageId: 'python', textLength: 200000, callSite: 'csv', durationMs: 90 });
+
+    const lines = profiler.getReport().split('\n');
+
+    assert.ok(lines[1].startsWith('cognitiveComplexity'));
+    assert.ok(lines[1].includes('90.0'));
+    assert.ok(lines[2].includes('csharp <10KB render'));
+    assert.ok(lines[3].includes('python 100KB-1MB csv'));
+    assert.ok(lines[4].startsWith('lineCount'));
+  });
+
+  test('Should skip a metric on files as large as the one that exceeded its budget', () => {
+    const profiler = new MetricProfiler();
+    const warnings: string[] = [];
+    profiler.onSlowMetric = timing => warnings.push(timing.metricName);
+    profiler.setBudgets({ enabled: true, defaultMs: 0, perMetric: { methodCohesion: 50 } });
+
+    assert.strictEqual(profiler.record({ metricName: 'lineCount', languageId: 'java', textLength: 10, callSite: 'render', durationMs: 500 }), false);
+    assert.strictEqual(profiler.record({ metricName: 'methodCohesion', languageId: 'java', textLength: 5000, callSite: 'render', durationMs: 80 }), true);
+
+    assert.deepStrictEqual(warnings, ['methodCohesion']);
+    assert.strictEqual(profiler.shouldSkip('methodCohesion', 4999), false);
+    assert.strictEqual(profiler.shouldSkip('methodCohesion', 8000), true);
+
+    profiler.setBudgets({ enabled: false, defaultMs: 0, perMetric: {} });
+    assert.strictEqual(profiler.shouldSkip('methodCohesion', 8000), false);
+  });
+
+  test('Should return a skipped result from the registry except for CSV rows', () => {
+    const registry = MetricRegistry.getInstance();
+    const profiler = registry.getProfiler();
+    const slowMetric: Metric = {
+      name: 'profilerTestSlowMetric',
+      description: 'tarda más que su presupuesto.',
+      extract: (): MetricResult => {
+        const start = Date.now();
+        while (Date.now() - start < 5) { /* busy */ }
+        return { label: 'Lenta', value: 3 };
+      }
+    };
+    profiler.setBudgets({ enabled: true, defaultMs: 0, perMetric: { profilerTestSlowMetric: 1 } });
+
+    try {
+      const first = createTextDocumentSnapshot('x = 1\n', 'python', '/tmp/first.py');
+      assert.strictEqual(registry.extractMetric(first, slowMetric).value, 3);
+
+      const second = createTextDocumentSnapshot('x = 2\n', 'python', '/tmp/second.py');
+      const skipped = registry.extractMetric(second, slowMetric);
+      assert.strictEqual(skipped.skipped, true);
+      // The placeholder has no value, so it is never shown or saved as a measurement
+      assert.strictEqual(skipped.value, undefined);
+      assert.strictEqual(registry.extractMetric(second, slowMetric, 'csv').value, 3);
+    } finally {
+      profiler.setBudgets({ enabled: false, defaultMs: 0, perMetric: {} });
+      registry.invalidateResults();
+    }
+  });
+});
@@ -0,0 +1,66 @@
+import * as assert from 'assert';
+import { Metric, MetricResult } from '../../metrics/Metric';
+import { MetricFactory } from '../../metrics/MetricFactory';
+import { MetricRegistry } from '../../metrics/MetricRegistry';
+
+function testMetric(name: string): Metric {
+  return {
+    name,
+    description: 'métrica de prueba.',
+    extract: (): MetricResult => ({ label: name, value: 1 })
+  };
+}
+
+suite('MetricRegistry Loading Test Suite', () => {
+  test('Should only run the loaders of the languages analyzed', () => {
+    const registry = new MetricRegistry();
+    const loaded: string[] = [];
+    registry.registerCommonMetricsLoader(() => {
+      loaded.push('common');
+      return [testMetric('lines')];
+    });
+    registry.registerLanguageMetricsLoader('csharp', () => {
+      loaded.push('csharp');
+      return [testMetric('classes')];
+    });
+    registry.registerLanguageMetricsLoader('python', () => {
+      loaded.push('python');
+      return [testMetric('lambdas')];
+    });
+
+    assert.deepStrictEqual(registry.getSupportedLanguages(), ['csharp', 'python']);
+    assert.deepStrictEqual(loaded, []);
+    assert.strictEqual(registry.isLanguageLoaded('csharp'), false);
+
+    assert.deepStrictEqual(registry.getMetricsForLanguage('csharp').map(metric => metric.name), ['lines', 'classes']);
+    assert.deepStrictEqual(registry.getMetricsForLanguage('csharp').map(metric => metric.name), ['lines', 'classes']);
+    assert.deepStrictEqual(loaded, ['common', 'csharp']);
+    assert.strictEqual(registry.isLanguageLoaded('csharp'), true);
+    assert.strictEqual(registry.isLanguageLoaded('python'), false);
+
+    assert.deepStrictEqual(registry.getMetricsForLanguage('go').map(metric => metric.name), ['lines']);
+    assert.deepStrictEqual(registry.getLanguageSpecificMetrics('python').map(metric => metric.name), ['lambdas']);
+    assert.deepStrictEqual(loaded, ['common', 'csharp', 'python']);
+    assert.deepStrictEqual(registry.getSupportedLanguages(), ['csharp', 'python']);
+  });
+
+  test('Should load every metric of the factory on demand', () => {
+    MetricFactory.initializeRegistry();
+    const registry = MetricRegistry.getInstance();
+    const expectedCounts: { [languageId: string]: number } = { csharp: 14, javascript: 11, typescript: 12, python: 11, java: 12 };
+
+    assert.deepStrictEqual(registry.getSupportedLanguages().sort(), Object.keys(expectedCounts).sort());
+    assert.strictEqual(registry.getCommonMetrics().length, 7);
+    for (const languageId of Object.keys(expectedCounts)) {
+      const metrics = registry.getLanguageSpecificMetrics(languageId);
+      assert.strictEqual(metrics.length, expectedCounts[languageId], languageId);
+      assert.ok(metrics.every(metric => typeof metric.name === 'string' && typeof metric.extract === 'function'), languageId);
+      assert.ok(registry.isLanguageLoaded(languageId));
+    }
+    assert.ok(registry.getMetricsForLanguage('csharp').some(metric => metric.name === 'singleResponsibility'));
+    // The cross-file duplication is shown in the sidebar but never written to the CSV rows
+    assert.ok(registry.getMetricsForLanguage('csharp').some(metric => metric.name === 'crossFileDuplication'));
+    assert.ok(registry.getLabeledMetricsForLanguage('csharp').every(metric => metric.name !== 'crossFileDuplication'));
+    assert.strictEqual(registry.getLabeledMetricsForLanguage('python').length, registry.getMetricsForLanguage('python').length - 1);
+  });
+});
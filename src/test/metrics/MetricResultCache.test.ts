@@ -0,0 +1,95 @@
+import * as assert from 'assert';
+import * as vscode from 'vscode';
+import { Metric, MetricResult } from '../../metrics/Metric';
+import { MetricResultCache } from '../../metrics/MetricResultCache';
+import { MetricRegistry } from '../../metrics/MetricRegistry';
+
+suite('MetricResultCache Test Suite', () => {
+  test('Should return cached result for the same document version', () => {
+    const cache = new MetricResultCache();
+    const document = createMockDocument('a.ts', 1);
+    const result: MetricResult = { label: 'Líneas', value: 3 };
+
+    cache.set(document, 'lineCount', result);
+
+    assert.strictEqual(cache.get(document, 'lineCount'), result);
+    assert.strictEqual(cache.get(document, 'ifCount'), undefined);
+  });
+
+  test('Should miss when the document version changes', () => {
+    const cache = new MetricResultCache();
+    cache.set(createMockDocument('a.ts', 1), 'lineCount', { label: 'Líneas', value: 3 });
+
+    assert.strictEqual(cache.get(createMockDocument('a.ts', 2), 'lineCount'), undefined);
+  });
+
+  test('Should evict the least recently used entry when full', () => {
+    const cache = new MetricResultCache(2);
+    const a = createMockDocument('a.ts', 1);
+    const b = createMockDocument('b.ts', 1);
+    const c = createMockDocument('c.ts', 1);
+
+    cache.set(a, 'lineCount', { label: 'Líneas', value: 1 });
+    cache.set(b, 'lineCount', { label: 'Líneas', value: 2 });
+    cache.get(a, 'lineCount');
+    cache.set(c, 'lineCount', { label: 'Líneas', value: 3 });
+
+    assert.strictEqual(cache.size, 2);
+    assert.notStrictEqual(cache.get(a, 'lineCount'), undefined);
+    assert.strictEqual(cache.get(b, 'lineCount'), undefined);
+    assert.notStrictEqual(cache.get(c, 'lineCount'), undefined);
+  });
+
+  test('Should invalidate by document and by metric', () => {
+    const cache = new MetricResultCache();
+    const a = createMockDocument('a.ts', 1);
+    const b = createMockDocument('b.ts', 1);
+
+    cache.set(a, 'lineCount', { label: 'Líneas', value: 1 });
+    cache.set(a, 'ifCount', { label: 'Cantidad de ifs', value: 0 });
+    cache.set(b, 'lineCount', { label: 'Líneas', value: 2 });
+
+    cache.invalidate(a.uri.toString());
+    assert.strictEqual(cache.size, 1);
+
+    cache.invalidate(undefined, 'lineCount');
+    assert.strictEqual(cache.size, 0);
+  });
+
+  test('Registry should run each metric once per document version', () => {
+    let calls = 0;
+    const countingMetric: Metric = {
+      name: 'countingMetricForCacheTest',
+      description: 'cuenta las llamadas.',
+      extract: () => {
+        calls++;
+        return { label: 'Llamadas', value: calls };
+      }
+    };
+    const registry = MetricRegistry.getInstance();
+    const v1 = createMockDocument('cached.ts', 1);
+
+    registry.extractMetric(v1, countingMetric);
+    registry.extractMetrics(v1, [countingMetric, countingMetric]);
+    assert.strictEqual(calls, 1);
+
+    registry.extractMetric(createMockDocument('cached.ts', 2), countingMetric);
+    assert.strictEqual(calls, 2);
+
+    registry.invalidateResults(v1.uri);
+    registry.extractMetric(v1, countingMetric);
+    assert.strictEqual(calls, 3);
+  });
+});
+
+function createMockDocument(fileName: string, version: number): vscode.TextDocument {
+  return {
+    getText: () => '',
+    lineCount: 1,
+    lineAt: () => ({ text: '' }),
+    fileName,
+    uri: vscode.Uri.file(fileName),
+    version,
+    languageId: 'typescript',
+  } as unknown as vscode.TextDocument;
+}
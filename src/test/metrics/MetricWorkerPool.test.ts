@@ -0,0 +1,110 @@
+import * as assert from 'assert';
+import * as path from 'path';
+import { Metric, MetricResult } from '../../metrics/Metric';
+import { MetricWorkerPool } from '../../metrics/execution/MetricWorkerPool';
+import { createTextDocumentSnapshot } from '../../metrics/execution/TextDocumentSnapshot';
+import { LineCountMetric } from '../../metrics/common/LineCountMetric';
+import { IfCountMetric } from '../../metrics/common/IfCountMetric';
+import { LoopCountMetric } from '../../metrics/common/LoopCountMetric';
+import { MetricFactory } from '../../metrics/MetricFactory';
+import { computeIncrementalState } from '../../metrics/common/IncrementalBraceAnalysis';
+
+suite('MetricWorkerPool Test Suite', () => {
+  MetricFactory.initializeRegistry();
+
+  // The compiled worker, next to the compiled pool
+  const workerScript = path.join(__dirname, '..', '..', 'metrics', 'execution', 'metricWorker.js');
+
+  const code = `
+class Example {
+  run(items) {
+    for (const item of items) {
+      if (item > 0) {
+        console.log(item);
+      }
+    }
+  }
+}`;
+
+  test('Should return the same results as synchronous extraction, in order', async () => {
+    const pool = new MetricWorkerPool(2, workerScript);
+    const document = createTextDocumentSnapshot(code, 'typescript', '/tmp/example.ts');
+    const metrics = [LineCountMetric, IfCountMetric, LoopCountMetric];
+
+    try {
+      const results = await pool.run(document, metrics);
+      assert.deepStrictEqual(results, metrics.map(metric => metric.extract(document)));
+      assert.deepStrictEqual(pool.getStats(), { workerTasks: 3, inlineTasks: 0, workerFailures: 0 });
+    } finally {
+      pool.dispose();
+    }
+  });
+
+  test('Should report every result as it finishes', async () => {
+    const pool = new MetricWorkerPool(2, workerScript);
+    const document = createTextDocumentSnapshot(code, 'typescript', '/tmp/example.ts');
+    const reported: string[] = [];
+
+    try {
+      await pool.run(document, [LineCountMetric, IfCountMetric], metric => reported.push(metric.name));
+      assert.deepStrictEqual(reported.sort(), ['ifCount', 'lineCount']);
+    } finally {
+      pool.dispose();
+    }
+  });
+
+  test('Should build the incremental state of a document in a worker', async () => {
+    const pool = new MetricWorkerPool(1, workerScript);
+    const document = createTextDocumentSnapshot(code, 'typescript', '/tmp/example.ts');
+
+    try {
+      assert.deepStrictEqual(await pool.buildIncrementalState(document), computeIncrementalState(document));
+      assert.strictEqual(pool.getStats().workerTasks, 1);
+    } finally {
+      pool.dispose();
+    }
+  });
+
+  test('Should run editor metrics and unregistered metrics on the calling thread', async () => {
+    const pool = new MetricWorkerPool(1, workerScript);
+    const document = createTextDocumentSnapshot(code, 'typescript', '/tmp/example.ts');
+    const editorMetric: Metric = {
+      name: 'editorOnlyMetric',
+      description: 'usa la API de vscode.',
+      requiresEditor: true,
+      extract: (): MetricResult => ({ label: 'Editor', value: 7 })
+    };
+    const customMetric: Metric = {
+      name: 'customMetricNotInRegistry',
+      description: 'no está registrada.',
+      extract: (): MetricResult => ({ label: 'Custom', value: 3 })
+    };
+
+    try {
+      const results = await pool.run(document, [editorMetric, customMetric]);
+      assert.deepStrictEqual(results.map(result => result.value), [7, 3]);
+      // The worker does not know the custom metric and sends it back
+      assert.deepStrictEqual(pool.getStats(), { workerTasks: 0, inlineTasks: 1, workerFailures: 0 });
+    } finally {
+      pool.dispose();
+    }
+  });
+
+  test('Should report the fallback to the calling thread when workers cannot start', async () => {
+    const pool = new MetricWorkerPool(1, path.join(__dirname, 'missingMetricWorker.js'));
+    const document = createTextDocumentSnapshot(code, 'typescript', '/tmp/example.ts');
+    const metrics = [LineCountMetric, IfCountMetric];
+
+    try {
+      const results = await pool.run(document, metrics);
+      assert.deepStrictEqual(results, metrics.map(metric => metric.extract(document)));
+
+      const stats = pool.getStats();
+      assert.strictEqual(stats.workerTasks, 0);
+      assert.strictEqual(stats.inlineTasks, 2);
+      assert.ok(stats.workerFailures > 0);
+    } finally {
+      pool.dispose();
+    }
+  });
+});
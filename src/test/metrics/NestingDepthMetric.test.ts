@@ -172,6 +172,36 @@ suite('NestingDepthMetric Test Suite', () => {
     
     assert.strictEqual(result.value, 4); // Arrow function(1) + if(1) + map callback(1) + object literal(1) = 4
   });
+
+  test('Should not add a level for else branches', () => {
+    const document = createMockDocument(`
+      function testFunction(x) {
+        if (x > 0) {
+          return 1;
+        } else {
+          return 2;
+        }
+      }
+    `);
+    const result = NestingDepthMetric.extract(document);
+
+    assert.strictEqual(result.value, 2); // Function(1) + if or else(1) = 2
+  });
+
+  test('Should ignore braces in regular expressions and template literals', () => {
+    const document = createMockDocument(`
+      function testFunction(text) {
+        const pattern = /\\{\\{[a-z]+\\}/;
+        const template = \`
+          {{ {
+        \`;
+        return pattern.test(text) ? template : '';
+      }
+    `);
+    const result = NestingDepthMetric.extract(document);
+
+    assert.strictEqual(result.value, 1); // Only the function body
+  });
 });
 
 function createMockDocument(content: string): vscode.TextDocument {
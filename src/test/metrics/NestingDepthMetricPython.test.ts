@@ -153,6 +153,23 @@ def test_function():
     assert.strictEqual(result.value, 2); // Function(1) + if(1) = 2
     // Note: List comprehensions and lambdas don't add to nesting depth in this implementation
   });
+
+  test('Should not add depth for lines continued inside brackets', () => {
+    const document = createMockDocument(`
+def test_function(items):
+    if items:
+        result = {
+            "names": [
+                item.name
+                for item in items
+                if item.valid
+            ],
+        }
+    `);
+    const result = NestingDepthMetricPython.extract(document);
+
+    assert.strictEqual(result.value, 2); // Function(1) + if(1) = 2, the dict literal adds nothing
+  });
 });
 
 function createMockDocument(content: string): vscode.TextDocument {
@@ -0,0 +1,79 @@
+import * as assert from 'assert';
+import { buildPythonScopeTree } from '../../metrics/python/PythonScopeTree';
+
+suite('PythonScopeTree Test Suite', () => {
+  test('Should nest classes, methods and control blocks', () => {
+    const tree = buildPythonScopeTree([
+      'class Account:',
+      '    def deposit(self, amount):',
+      '        if amount > 0:',
+      '            self.balance += amount',
+      '',
+      '        # trailing comment',
+      '    def close(self): self.open = False',
+      'x = 1'
+    ].join('\n'));
+
+    assert.deepStrictEqual(tree.classes.map(scope => [scope.name, scope.startLine, scope.endLine]), [['Account', 0, 6]]);
+    assert.deepStrictEqual(tree.functions.map(scope => [scope.name, scope.startLine, scope.endLine, scope.depth]), [
+      ['deposit', 1, 5, 2],
+      ['close', 6, 6, 2]
+    ]);
+    assert.strictEqual(tree.controls[0].keyword, 'if');
+    assert.strictEqual(tree.controls[0].parent, tree.functions[0]);
+    assert.strictEqual(tree.statements[tree.statements.length - 1].scope, tree.module);
+  });
+
+  test('Should attach decorators and span multi-line signatures', () => {
+    const tree = buildPythonScopeTree([
+      '@property',
+      '@cache',
+      'async def load(',
+      '    path: str,',
+      ') -> bytes:',
+      '    return b""'
+    ].join('\n'));
+    const load = tree.functions[0];
+
+    assert.strictEqual(load.isAsync, true);
+    assert.strictEqual(load.decoratorLine, 0);
+    assert.strictEqual(load.decoratorCount, 2);
+    assert.strictEqual(load.startLine, 2);
+    assert.strictEqual(load.headerEndLine, 4);
+    assert.strictEqual(load.endLine, 5);
+    assert.deepStrictEqual(tree.decoratorLines, [0, 1]);
+  });
+
+  test('Should ignore keywords inside strings and comments', () => {
+    const tree = buildPythonScopeTree([
+      '"""Module docstring',
+      'class NotAClass:',
+      '"""',
+      'text = "def f(): lambda x: x"  # class Comment:',
+      'doc = \'\'\'',
+      '    for item in items:',
+      '\'\'\''
+    ].join('\n'));
+
+    assert.strictEqual(tree.classes.length, 0);
+    assert.strictEqual(tree.functions.length, 0);
+    assert.strictEqual(tree.controls.length, 0);
+    assert.strictEqual(tree.lambdas.length, 0);
+    assert.deepStrictEqual(tree.docstrings, [{ startLine: 0, endLine: 2 }]);
+    assert.strictEqual(tree.lines[3].hasComment, true);
+    assert.strictEqual(tree.lines[3].code, `text = "${' '.repeat(20)}"${' '.repeat(18)}`);
+  });
+
+  test('Should find lambdas and comprehensions with their scope', () => {
+    const tree = buildPythonScopeTree([
+      'def sort(items):',
+      '    key = lambda item, reverse=False: (item.name,',
+      '                                       item.size)',
+      '    return [x for x in sorted(items, key=key)], {k: v for k, v in {}.items()}'
+    ].join('\n'));
+
+    assert.deepStrictEqual(tree.lambdas.map(lambda => [lambda.line, lambda.text]), [[1, 'item, reverse=False']]);
+    assert.strictEqual(tree.lambdas[0].scope, tree.functions[0]);
+    assert.deepStrictEqual(tree.comprehensions.map(comprehension => [comprehension.line, comprehension.text]), [[3, '['], [3, '{']]);
+  });
+});
@@ -0,0 +1,68 @@
+import * as assert from 'assert';
+import * as vscode from 'vscode';
+import { FileIndex, globToRegExp } from '../../navigation/FileIndex';
+import { getProjectFilesGlob } from '../../language/ProjectLanguages';
+
+function createMemento(values: { [key: string]: unknown } = {}): vscode.Memento {
+  return {
+    keys: () => Object.keys(values),
+    get: <T>(key: string) => values[key] as T,
+    update: (key: string, value: unknown) => {
+      values[key] = value;
+      return Promise.resolve();
+    }
+  } as vscode.Memento;
+}
+
+const output = { appendLine: () => undefined } as unknown as vscode.OutputChannel;
+
+function paths(uris: vscode.Uri[]): string[] {
+  return uris.map(uri => uri.fsPath);
+}
+
+suite('FileIndex Test Suite', () => {
+  test('Should match globs like findFiles', () => {
+    const exclude = globToRegExp('**/node_modules/**');
+    assert.ok(exclude.test('node_modules/lib/index.js'));
+    assert.ok(exclude.test('packages/web/node_modules/lib/index.js'));
+    assert.ok(!exclude.test('src/node_modules.ts'));
+
+    const include = globToRegExp('**/*.{cs,py}');
+    assert.ok(include.test('Program.cs'));
+    assert.ok(include.test('src/app/main.py'));
+    assert.ok(!include.test('src/app/main.pyc'));
+
+    assert.strictEqual(getProjectFilesGlob(['python', 'csharp', 'go']), '**/*.{cs,py}');
+    assert.strictEqual(getProjectFilesGlob(['java']), '**/*.java');
+  });
+
+  test('Should keep files sorted and the order stable as files change', () => {
+    const index = new FileIndex(createMemento(), output);
+    index.configure('**/*.cs', '**/node_modules/**');
+
+    index.replaceAll([vscode.Uri.file('/repo/c.cs'), vscode.Uri.file('/repo/a.cs'), vscode.Uri.file('/repo/node_modules/x.cs')]);
+    assert.deepStrictEqual(paths(index.getFiles()), ['/repo/a.cs', '/repo/c.cs']);
+
+    assert.strictEqual(index.add(vscode.Uri.file('/repo/b.cs')), true);
+    assert.strictEqual(index.add(vscode.Uri.file('/repo/b.cs')), false);
+    assert.strictEqual(index.add(vscode.Uri.file('/repo/node_modules/y.cs')), false);
+    assert.strictEqual(index.add(vscode.Uri.file('/repo/lib/d.cs')), true);
+    assert.deepStrictEqual(paths(index.getFiles()), ['/repo/a.cs', '/repo/b.cs', '/repo/c.cs', '/repo/lib/d.cs']);
+
+    // Deleting a directory removes the files below it
+    assert.strictEqual(index.remove(vscode.Uri.file('/repo/lib')), true);
+    assert.strictEqual(index.remove(vscode.Uri.file('/repo/missing.cs')), false);
+    assert.deepStrictEqual(paths(index.getFiles()), ['/repo/a.cs', '/repo/b.cs', '/repo/c.cs']);
+    assert.strictEqual(index.replaceAll([vscode.Uri.file('/repo/c.cs'), vscode.Uri.file('/repo/b.cs'), vscode.Uri.file('/repo/a.cs')]), false);
+  });
+
+  test('Should only reuse a stored list built with the same globs', () => {
+    const memento = createMemento({
+      'lineCounter.fileIndex': { version: 1, include: '**/*.cs', exclude: '', files: ['file:///repo/a.cs', 'file:///repo/b.cs'] }
+    });
+    const index = new FileIndex(memento, output);
+
+    assert.deepStrictEqual(paths(index.configure('**/*.cs', '')), ['/repo/a.cs', '/repo/b.cs']);
+    assert.deepStrictEqual(index.configure('**/*.{cs,py}', ''), []);
+  });
+});
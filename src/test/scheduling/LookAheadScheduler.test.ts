@@ -0,0 +1,66 @@
+import * as assert from 'assert';
+import * as vscode from 'vscode';
+import { LookAheadScheduler } from '../../scheduling/LookAheadScheduler';
+
+suite('LookAheadScheduler Test Suite', () => {
+  test('Should analyze the files in order once the idle delay elapses', async () => {
+    const analyzed: string[] = [];
+    const scheduler = new LookAheadScheduler(async uri => { analyzed.push(uri.fsPath); }, createOutput(), 20);
+
+    scheduler.schedule([vscode.Uri.file('/next.cs'), vscode.Uri.file('/prev.cs')]);
+    await wait(5);
+    assert.deepStrictEqual(analyzed, []);
+
+    await wait(60);
+    assert.deepStrictEqual(analyzed, ['/next.cs', '/prev.cs']);
+    assert.strictEqual(scheduler.getStats().analyzed, 2);
+    scheduler.dispose();
+  });
+
+  test('Should stop the remaining files when cancelled', async () => {
+    const analyzed: string[] = [];
+    const tokens: vscode.CancellationToken[] = [];
+    const scheduler = new LookAheadScheduler(async (uri, token) => {
+      tokens.push(token);
+      await wait(30);
+      analyzed.push(uri.fsPath);
+    }, createOutput(), 0);
+
+    scheduler.schedule([vscode.Uri.file('/a.py'), vscode.Uri.file('/b.py'), vscode.Uri.file('/c.py')]);
+    await wait(10);
+    scheduler.cancel();
+    await wait(60);
+
+    assert.strictEqual(tokens.length, 1);
+    assert.strictEqual(tokens[0].isCancellationRequested, true);
+    assert.deepStrictEqual(analyzed, ['/a.py']);
+    assert.strictEqual(scheduler.getStats().analyzed, 0);
+    assert.strictEqual(scheduler.getStats().cancelled, 1);
+    scheduler.dispose();
+  });
+
+  test('Should keep going after a file fails', async () => {
+    const analyzed: string[] = [];
+    const scheduler = new LookAheadScheduler(async uri => {
+      if (uri.fsPath === '/missing.cs') {
+        throw new Error('File not found');
+      }
+      analyzed.push(uri.fsPath);
+    }, createOutput(), 0);
+
+    scheduler.schedule([vscode.Uri.file('/missing.cs'), vscode.Uri.file('/other.cs')]);
+    await wait(30);
+
+    assert.deepStrictEqual(analyzed, ['/other.cs']);
+    assert.strictEqual(scheduler.getStats().failed, 1);
+    scheduler.dispose();
+  });
+});
+
+function wait(ms: number): Promise<void> {
+  return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+function createOutput(): vscode.OutputChannel {
+  return { appendLine: () => undefined } as unknown as vscode.OutputChannel;
+}
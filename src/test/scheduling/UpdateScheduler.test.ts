@@ -0,0 +1,46 @@
+import * as assert from 'assert';
+import * as vscode from 'vscode';
+import { UpdateScheduler } from '../../scheduling/UpdateScheduler';
+
+suite('UpdateScheduler Test Suite', () => {
+  test('Should coalesce a burst of requests into one run', async () => {
+    let runs = 0;
+    const scheduler = new UpdateScheduler(async () => { runs++; }, createOutput(), 20);
+
+    scheduler.schedule();
+    scheduler.schedule();
+    scheduler.schedule();
+    await wait(60);
+
+    assert.strictEqual(runs, 1);
+    assert.strictEqual(scheduler.getStats().coalesced, 2);
+    assert.strictEqual(scheduler.getStats().completed, 1);
+    scheduler.dispose();
+  });
+
+  test('Should cancel the in-flight run when a newer request arrives', async () => {
+    const tokens: vscode.CancellationToken[] = [];
+    const scheduler = new UpdateScheduler(async token => {
+      tokens.push(token);
+      await wait(30);
+    }, createOutput(), 0);
+
+    const first = scheduler.runNow();
+    const second = scheduler.runNow();
+    await Promise.all([first, second]);
+
+    assert.strictEqual(tokens.length, 2);
+    assert.strictEqual(tokens[0].isCancellationRequested, true);
+    assert.strictEqual(scheduler.getStats().cancelled, 1);
+    assert.strictEqual(scheduler.getStats().completed, 1);
+    scheduler.dispose();
+  });
+});
+
+function wait(ms: number): Promise<void> {
+  return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+function createOutput(): vscode.OutputChannel {
+  return { appendLine: () => undefined } as unknown as vscode.OutputChannel;
+}
@@ -0,0 +1,107 @@
+import * as assert from 'assert';
+import { RequestCancelledError, RequestQueue } from '../../srp/RequestQueue';
+
+function deferred<T>(): { promise: Promise<T>, resolve: (value: T) => void } {
+  let resolve!: (value: T) => void;
+  const promise = new Promise<T>(done => { resolve = done; });
+  return { promise, resolve };
+}
+
+suite('RequestQueue Test Suite', () => {
+  test('Should share one request between callers with the same key', async () => {
+    const queue = new RequestQueue<number>({ minIntervalMs: 0 });
+    let runs = 0;
+    const run = async () => ++runs;
+
+    const results = await Promise.all([queue.enqueue('a', run), queue.enqueue('a', run)]);
+
+    assert.deepStrictEqual(results, [1, 1]);
+    assert.strictEqual(runs, 1);
+    assert.strictEqual(queue.size, 0);
+  });
+
+  test('Should not run more requests than the concurrency at once', async () => {
+    const queue = new RequestQueue<number>({ concurrency: 2, minIntervalMs: 0 });
+    let running = 0;
+    let maxRunning = 0;
+    const run = async () => {
+      running++;
+      maxRunning = Math.max(maxRunning, running);
+      await new Promise(resolve => setTimeout(resolve, 5));
+      running--;
+      return 0;
+    };
+
+    await Promise.all(['a', 'b', 'c', 'd', 'e'].map(key => queue.enqueue(key, run)));
+
+    assert.strictEqual(maxRunning, 2);
+  });
+
+  test('Should retry retryable failures and give up on the others', async () => {
+    const queue = new RequestQueue<string>({
+      minIntervalMs: 0,
+      baseBackoffMs: 1,
+      maxAttempts: 3,
+      isRetryable: error => (error as Error).message === 'rate limited'
+    });
+    let attempts = 0;
+
+    const result = await queue.enqueue('a', async () => {
+      if (++attempts < 3) {
+        throw new Error('rate limited');
+      }
+      return 'ok';
+    });
+    assert.strictEqual(result, 'ok');
+    assert.strictEqual(attempts, 3);
+
+    attempts = 0;
+    await assert.rejects(queue.enqueue('b', async () => {
+      attempts++;
+      throw new Error('unauthorized');
+    }), /unauthorized/);
+    assert.strictEqual(attempts, 1);
+  });
+
+  test('Should run foreground requests before background ones and drop background ones when full', async () => {
+    const queue = new RequestQueue<string>({ concurrency: 1, maxQueued: 2, minIntervalMs: 0 });
+    const blocker = deferred<string>();
+    const order: string[] = [];
+    const run = (key: string) => async () => {
+      order.push(key);
+      return key;
+    };
+
+    const first = queue.enqueue('first', () => blocker.promise);
+    const background1 = queue.enqueue('background1', run('background1'), true);
+    const background2 = queue.enqueue('background2', run('background2'), true);
+    const foreground = queue.enqueue('foreground', run('foreground'));
+
+    await assert.rejects(background1, RequestCancelledError);
+    blocker.resolve('first');
+    await Promise.all([first, background2, foreground]);
+
+    assert.deepStrictEqual(order, ['foreground', 'background2']);
+  });
+
+  test('Should cancel a request that has not started', async () => {
+    const queue = new RequestQueue<string>({ concurrency: 1, minIntervalMs: 0 });
+    const blocker = deferred<string>();
+    let ran = false;
+
+    const first = queue.enqueue('first', () => blocker.promise);
+    const second = queue.enqueue('second', async () => {
+      ran = true;
+      return 'second';
+    });
+
+    assert.strictEqual(queue.cancel('first'), false);
+    assert.strictEqual(queue.cancel('second'), true);
+    await assert.rejects(second, RequestCancelledError);
+    blocker.resolve('first');
+    await first;
+
+    assert.strictEqual(ran, false);
+    assert.strictEqual(queue.has('second'), false);
+  });
+});
@@ -0,0 +1,56 @@
+import * as assert from 'assert';
+import * as fs from 'fs';
+import * as os from 'os';
+import * as path from 'path';
+import { SrpAnalysisCache, srpCacheKey } from '../../srp/SrpAnalysisCache';
+
+suite('SrpAnalysisCache Test Suite', () => {
+  let directory: string;
+
+  setup(() => {
+    directory = fs.mkdtempSync(path.join(os.tmpdir(), 'srp-cache-'));
+  });
+
+  teardown(() => {
+    fs.rmSync(directory, { recursive: true, force: true });
+  });
+
+  test('Should key analyses by content and model', () => {
+    const code = 'class Invoice {}';
+
+    assert.strictEqual(srpCacheKey(code, 'gpt-4'), srpCacheKey(code, 'gpt-4'));
+    assert.notStrictEqual(srpCacheKey(code, 'gpt-4'), srpCacheKey(code, 'gpt-3.5-turbo'));
+    assert.notStrictEqual(srpCacheKey(code, 'gpt-4'), srpCacheKey(code + ' ', 'gpt-4'));
+  });
+
+  test('Should evict the least recently used analysis', () => {
+    const cache = new SrpAnalysisCache(null, 2);
+    cache.set('a', { followsSRP: true, explanation: 'a' });
+    cache.set('b', { followsSRP: false, explanation: 'b' });
+    cache.get('a');
+    cache.set('c', { followsSRP: true, explanation: 'c' });
+
+    assert.strictEqual(cache.size, 2);
+    assert.ok(cache.get('a'));
+    assert.strictEqual(cache.get('b'), undefined);
+    assert.ok(cache.get('c'));
+  });
+
+  test('Should reload the analyses saved to disk', () => {
+    const filePath = path.join(directory, 'metrics-data', 'srp-cache.json');
+    const cache = new SrpAnalysisCache(filePath);
+    cache.set('a', { followsSRP: true, explanation: 'Una sola responsabilidad' });
+    cache.flush();
+
+    const reloaded = new SrpAnalysisCache(filePath);
+
+    assert.deepStrictEqual(reloaded.get('a'), { followsSRP: true, explanation: 'Una sola responsabilidad' });
+  });
+
+  test('Should start empty from a corrupt file', () => {
+    const filePath = path.join(directory, 'srp-cache.json');
+    fs.writeFileSync(filePath, '{ not json');
+
+    assert.strictEqual(new SrpAnalysisCache(filePath).size, 0);
+  });
+});
@@ -0,0 +1,85 @@
+import * as assert from 'assert';
+import * as http from 'http';
+import { AddressInfo } from 'net';
+import { createSrpClient, isRetryableSrpError, requestSrpAnalysis } from '../../srp/SrpAnalyzer';
+
+interface StubResponse {
+  status: number;
+  body: unknown;
+}
+
+function completion(content: string): StubResponse {
+  return {
+    status: 200,
+    body: {
+      id: 'chatcmpl-stub',
+      object: 'chat.completion',
+      created: 0,
+      model: 'gpt-3.5-turbo',
+      choices: [{ index: 0, finish_reason: 'stop', message: { role: 'assistant', content } }]
+    }
+  };
+}
+
+// Minimal OpenAI-compatible server answering /v1/chat/completions
+suite('SrpAnalyzer Test Suite', () => {
+  let server: http.Server;
+  let baseURL: string;
+  let responses: StubResponse[];
+  let requests: { authorization?: string, body: any }[];
+
+  setup(async () => {
+    responses = [];
+    requests = [];
+    server = http.createServer((request, response) => {
+      let body = '';
+      request.on('data', chunk => { body += chunk; });
+      request.on('end', () => {
+        requests.push({ authorization: request.headers.authorization, body: JSON.parse(body) });
+        const next = request.url === '/v1/chat/completions' && responses.shift() || { status: 404, body: {} };
+        response.writeHead(next.status, { 'Content-Type': 'application/json' });
+        response.end(JSON.stringify(next.body));
+      });
+    });
+    await new Promise<void>(resolve => server.listen(0, '127.0.0.1', resolve));
+    baseURL = `http://127.0.0.1:${(server.address() as AddressInfo).port}/v1`;
+  });
+
+  teardown(async () => {
+    await new Promise(resolve => server.close(resolve));
+  });
+
+  test('Should send the code to the configured endpoint and parse the answer', async () => {
+    responses.push(completion('Resultado:\n{ "followsSRP": true, "explanation": "Solo calcula facturas." }'));
+    const client = createSrpClient('test-key', baseURL);
+
+    const analysis = await requestSrpAnalysis(client, 'gpt-4', 'class Invoice {}');
+
+    assert.deepStrictEqual(analysis, { followsSRP: true, explanation: 'Solo calcula facturas.' });
+    assert.strictEqual(requests.length, 1);
+    assert.strictEqual(requests[0].authorization, 'Bearer test-key');
+    assert.strictEqual(requests[0].body.model, 'gpt-4');
+    assert.ok(requests[0].body.messages[1].content.includes('class Invoice {}'));
+  });
+
+  test('Should fail when the answer has no JSON', async () => {
+    responses.push(completion('No puedo analizar este archivo.'));
+    const client = createSrpClient('test-key', baseURL);
+
+    await assert.rejects(requestSrpAnalysis(client, 'gpt-4', 'class Invoice {}'), /No se pudo extraer JSON/);
+  });
+
+  test('Should retry rate limits and server errors but not authentication errors', async () => {
+    const client = createSrpClient('test-key', baseURL);
+
+    for (const [status, retryable] of [[429, true], [503, true], [401, false]] as const) {
+      responses.push({ status, body: { error: { message: 'stub error' } } });
+      const error = await requestSrpAnalysis(client, 'gpt-4', 'class Invoice {}').then(() => undefined, failure => failure);
+
+      assert.ok(error, `status ${status} should fail`);
+      assert.strictEqual(isRetryableSrpError(error), retryable, `status ${status}`);
+    }
+    // The client itself does not retry, the request queue does
+    assert.strictEqual(requests.length, 3);
+  });
+});
@@ -0,0 +1,78 @@
+import * as assert from 'assert';
+import { MetricsViewModel, MetricsViewState, MetricViewEntry } from '../../webview/MetricsViewState';
+
+function entry(name: string, value: number): MetricViewEntry {
+  return {
+    name,
+    label: name,
+    value,
+    description: 'información sobre la calidad del código.',
+    section: value !== 0 ? 'nonZero' : 'zero'
+  };
+}
+
+function model(entries: MetricViewEntry[], pendingCount: number = 0): MetricsViewModel {
+  return {
+    fileName: 'Example.cs',
+    processedFilesCount: 3,
+    pending: { count: pendingCount, total: entries.length + pendingCount },
+    entries
+  };
+}
+
+suite('MetricsViewState Test Suite', () => {
+  test('Should send the whole model first', () => {
+    const state = new MetricsViewState();
+
+    const update = state.diff(model([entry('lineCount', 10), entry('ifCount', 0)]));
+
+    assert.ok(update);
+    assert.strictEqual(update.fileName, 'Example.cs');
+    assert.strictEqual(update.processedFilesCount, 3);
+    assert.deepStrictEqual(update.changed.map(changed => changed.name), ['lineCount', 'ifCount']);
+    assert.deepStrictEqual(update.order, ['lineCount']);
+  });
+
+  test('Should send only the metrics that changed', () => {
+    const state = new MetricsViewState();
+    state.diff(model([entry('lineCount', 10), entry('loopCount', 2), entry('ifCount', 0)]));
+
+    const update = state.diff(model([entry('lineCount', 11), entry('loopCount', 2), entry('ifCount', 0)]));
+
+    assert.ok(update);
+    assert.deepStrictEqual(update.changed, [entry('lineCount', 11)]);
+    assert.deepStrictEqual(update.removed, []);
+    assert.strictEqual(update.fileName, undefined);
+    assert.strictEqual(update.order, undefined);
+  });
+
+  test('Should return undefined when nothing changed', () => {
+    const state = new MetricsViewState();
+    state.diff(model([entry('lineCount', 10)]));
+
+    assert.strictEqual(state.diff(model([entry('lineCount', 10)])), undefined);
+  });
+
+  test('Should report removed metrics, new order and pending count', () => {
+    const state = new MetricsViewState();
+    state.diff(model([entry('lineCount', 10), entry('loopCount', 2)], 1));
+
+    const update = state.diff(model([entry('loopCount', 20)]));
+
+    assert.ok(update);
+    assert.deepStrictEqual(update.removed, ['lineCount']);
+    assert.deepStrictEqual(update.order, ['loopCount']);
+    assert.deepStrictEqual(update.pending, { count: 0, total: 1 });
+  });
+
+  test('Should resend everything after a reset', () => {
+    const state = new MetricsViewState();
+    state.diff(model([entry('lineCount', 10)]));
+    state.reset();
+
+    const update = state.diff(model([entry('lineCount', 10)]));
+
+    assert.ok(update);
+    assert.deepStrictEqual(update.changed, [entry('lineCount', 10)]);
+  });
+});
@@ -3,6 +3,7 @@ import * as fs from 'fs';
 import * as path from 'path';
 import { MessageHandler } from './MessageHandlerRegistry';
 import { MetricFactory } from '../metrics/MetricFactory';
+import { MetricRegistry } from '../metrics/MetricRegistry';
 
 /**
  * Interface for the LineCountViewProvider to avoid circular dependencies
@@ -12,9 +13,10 @@ export interface ILineCountViewProvider {
   navigationManager: any;
   needsRefactoring: boolean;
   currentLanguageInfo?: any;
-  update(): void;
+  update(): Promise<void>;
+  onWebviewReady(): void;
   navigateFile(direction: 'next' | 'prev'): Promise<void>;
-  openCsvFile(): void;
+  openCsvFile(): Promise<void>;
   sendSettings(): void;
   saveSettings(settings: { apiKey: string, model: string }): void;
   highlightDuplicatedCode(document: vscode.TextDocument, duplicatedBlocks: { startLine: number, endLine: number, blockId?: string }[]): void;
@@ -48,6 +50,7 @@ export class ToggleRefactoringHandler implements MessageHandler {
  */
 export class WebviewReadyHandler implements MessageHandler {
   handle(message: any, provider: ILineCountViewProvider): boolean {
+    provider.onWebviewReady();
     if (provider.currentLanguageInfo && provider._view) {
       provider._view.webview.postMessage({
         command: 'setLanguageInfo',
@@ -112,19 +115,24 @@ export class EndOpenAIRequestHandler implements MessageHandler {
 }
 
 /**
- * Handler for the 'highlightDuplicatedCode' message
+ * Handler for the 'highlightDuplicatedCode' and 'highlightExactDuplicatedCode' messages
  */
 export class HighlightDuplicatedCodeHandler implements MessageHandler {
+  /**
+   * @param metricName The duplication metric whose blocks are highlighted
+   */
+  constructor(private readonly metricName: string = 'codeDuplicationV2') {}
+
   handle(message: any, provider: ILineCountViewProvider): boolean {
     if (!provider.navigationManager.currentFile) return false;
     
     const uri = provider.navigationManager.currentFile;
     vscode.workspace.openTextDocument(uri).then(document => {
       const metrics = MetricFactory.getMetricsForLanguage(document.languageId.toLowerCase());
-      const codeDuplicationMetric = metrics.find(m => m.name === 'codeDuplicationV2');
+      const codeDuplicationMetric = metrics.find(m => m.name === this.metricName);
       
       if (codeDuplicationMetric) {
-        const result = codeDuplicationMetric.extract(document);
+        const result = MetricRegistry.getInstance().extractMetric(document, codeDuplicationMetric, 'highlight');
         if (result.duplicatedBlocks && result.duplicatedBlocks.length > 0) {
           provider.highlightDuplicatedCode(document, result.duplicatedBlocks);
         } else {
@@ -150,7 +158,7 @@ export class HighlightLoopsHandler implements MessageHandler {
       const loopCountMetric = metrics.find(m => m.name === 'loopCount');
       
       if (loopCountMetric) {
-        const result = loopCountMetric.extract(document);
+        const result = MetricRegistry.getInstance().extractMetric(document, loopCountMetric, 'highlight');
         if (result.loopBlocks && result.loopBlocks.length > 0) {
           provider.highlightLoops(document, result.loopBlocks);
         } else {
@@ -178,7 +186,7 @@ export class HighlightMethodsHandler implements MessageHandler {
       );
       
       if (methodSizeMetric) {
-        const result = methodSizeMetric.extract(document);
+        const result = MetricRegistry.getInstance().extractMetric(document, methodSizeMetric, 'highlight');
         if (result.methodBlocks && result.methodBlocks.length > 0) {
           provider.highlightMethods(document, result.methodBlocks);
         } else {
@@ -206,7 +214,7 @@ export class HighlightMaxDepthHandler implements MessageHandler {
       );
       
       if (complexityMetric) {
-        const result = complexityMetric.extract(document);
+        const result = MetricRegistry.getInstance().extractMetric(document, complexityMetric, 'highlight');
         if (result.lineNumber !== undefined) {
           // Use the existing highlightMaxDepth method from the HighlightManager
           const editor = vscode.window.activeTextEditor;
@@ -257,7 +265,7 @@ export class HighlightIfsHandler implements MessageHandler {
       const ifCountMetric = metrics.find(m => m.name === 'ifCount');
       
       if (ifCountMetric) {
-        const result = ifCountMetric.extract(document);
+        const result = MetricRegistry.getInstance().extractMetric(document, ifCountMetric, 'highlight');
         if (result.loopBlocks && result.loopBlocks.length > 0) {
           provider.highlightLoops(document, result.loopBlocks);
         } else {
@@ -285,7 +293,7 @@ export class HighlightConstructorsHandler implements MessageHandler {
       );
       
       if (constructorCountMetric) {
-        const result = constructorCountMetric.extract(document);
+        const result = MetricRegistry.getInstance().extractMetric(document, constructorCountMetric, 'highlight');
         if (result.constructorBlocks && result.constructorBlocks.length > 0) {
           provider.highlightConstructors(document, result.constructorBlocks);
         } else {
@@ -313,7 +321,7 @@ export class HighlightLambdasHandler implements MessageHandler {
       );
       
       if (lambdaCountMetric) {
-        const result = lambdaCountMetric.extract(document);
+        const result = MetricRegistry.getInstance().extractMetric(document, lambdaCountMetric, 'highlight');
         if (result.methodBlocks && result.methodBlocks.length > 0) {
           provider.highlightMethods(document, result.methodBlocks);
         } else {
@@ -325,3 +333,53 @@ export class HighlightLambdasHandler implements MessageHandler {
     return true;
   }
 }
+
+
+/**
+ * Handler for the 'highlightCrossFileDuplicates' message
+ */
+export class HighlightCrossFileDuplicatesHandler implements MessageHandler {
+  handle(message: any, provider: ILineCountViewProvider): boolean {
+    if (!provider.navigationManager.currentFile) return false;
+    
+    const uri = provider.navigationManager.currentFile;
+    vscode.workspace.openTextDocument(uri).then(async document => {
+      const metrics = MetricFactory.getMetricsForLanguage(document.languageId.toLowerCase());
+      const crossFileMetric = metrics.find(m => m.name === 'crossFileDuplication');
+      
+      if (crossFileMetric) {
+        const result = MetricRegistry.getInstance().extractMetric(document, crossFileMetric, 'highlight');
+        if (!result.duplicatedBlocks || !result.cloneMatches || result.cloneMatches.length === 0) {
+          vscode.window.showInformationMessage('No se encontró código duplicado en otros archivos.');
+          return;
+        }
+
+        provider.highlightDuplicatedCode(document, result.duplicatedBlocks);
+
+        // Offer to jump to the matching block in the other file
+        const picked = await vscode.window.showQuickPick(
+          result.cloneMatches.map((match, index) => ({
+            label: `${index + 1}: líneas ${match.startLine + 1}-${match.endLine + 1}`,
+            description: `${path.basename(match.filePath)}:${match.matchStartLine + 1}`,
+            detail: match.filePath,
+            match
+          })),
+          { placeHolder: 'Ir al bloque duplicado en otro archivo' }
+        );
+
+        if (picked) {
+          const otherDocument = await vscode.workspace.openTextDocument(picked.match.filePath);
+          const editor = await vscode.window.showTextDocument(otherDocument, { preview: true });
+          const range = new vscode.Range(
+            picked.match.matchStartLine, 0,
+            picked.match.matchEndLine, otherDocument.lineAt(Math.min(picked.match.matchEndLine, otherDocument.lineCount - 1)).text.length
+          );
+          editor.selection = new vscode.Selection(range.start, range.end);
+          editor.revealRange(range, vscode.TextEditorRevealType.InCenter);
+        }
+      }
+    });
+    
+    return true;
+  }
+}
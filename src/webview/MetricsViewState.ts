@@ -0,0 +1,117 @@
+/**
+ * Where a metric is shown in the webview
+ */
+export type MetricViewSection = 'nonZero' | 'zero' | 'skipped' | 'ai' | 'aiLoading';
+
+/**
+ * What the webview shows for one metric
+ */
+export interface MetricViewEntry {
+  name: string;
+  label: string;
+  // Null for a skipped metric, which has no value
+  value: number | null;
+  description: string;
+  section: MetricViewSection;
+  action?: string;
+  lineNumber?: number;
+}
+
+/**
+ * Everything the metrics view shows for a file
+ */
+export interface MetricsViewModel {
+  fileName: string;
+  processedFilesCount: number;
+  pending: { count: number, total: number };
+  // Non-zero metrics first, sorted as they are shown
+  entries: MetricViewEntry[];
+}
+
+/**
+ * Message that patches the webview from the previous model to the next one.
+ * Fields that did not change are omitted.
+ */
+export interface MetricsViewUpdate {
+  command: 'updateMetrics';
+  fileName?: string;
+  processedFilesCount?: number;
+  pending?: { count: number, total: number };
+  changed: MetricViewEntry[];
+  removed: string[];
+  // Names of the non-zero metrics in display order
+  order?: string[];
+}
+
+/**
+ * Remembers what was last sent to the webview and computes the changes to send next
+ */
+export class MetricsViewState {
+  private fileName: string | undefined;
+  private processedFilesCount: number | undefined;
+  private pending: string | undefined;
+  private order: string | undefined;
+  // Metric name -> serialized entry last sent
+  private entries: Map<string, string> = new Map();
+
+  /**
+   * Forget what was sent, so the next update carries the whole model
+   */
+  public reset(): void {
+    this.fileName = undefined;
+    this.processedFilesCount = undefined;
+    this.pending = undefined;
+    this.order = undefined;
+    this.entries.clear();
+  }
+
+  /**
+   * Compute the update from the last model sent and remember the new one
+   * @param model The model to show
+   * @returns The update, or undefined when nothing changed
+   */
+  public diff(model: MetricsViewModel): MetricsViewUpdate | undefined {
+    const update: MetricsViewUpdate = { command: 'updateMetrics', changed: [], removed: [] };
+    let hasChanges = false;
+
+    if (model.fileName !== this.fileName) {
+      update.fileName = this.fileName = model.fileName;
+      hasChanges = true;
+    }
+    if (model.processedFilesCount !== this.processedFilesCount) {
+      update.processedFilesCount = this.processedFilesCount = model.processedFilesCount;
+      hasChanges = true;
+    }
+    const pending = `${model.pending.count}/${model.pending.total}`;
+    if (pending !== this.pending) {
+      this.pending = pending;
+      update.pending = model.pending;
+      hasChanges = true;
+    }
+
+    const names = new Set<string>();
+    for (const entry of model.entries) {
+      names.add(entry.name);
+      const serialized = JSON.stringify(entry);
+      if (this.entries.get(entry.name) !== serialized) {
+        this.entries.set(entry.name, serialized);
+        update.changed.push(entry);
+      }
+    }
+    for (const name of Array.from(this.entries.keys())) {
+      if (!names.has(name)) {
+        this.entries.delete(name);
+        update.removed.push(name);
+      }
+    }
+
+    const order = model.entries.filter(entry => entry.section === 'nonZero').map(entry => entry.name);
+    if (order.join('\n') !== this.order) {
+      this.order = order.join('\n');
+      update.order = order;
+      hasChanges = true;
+    }
+
+    return hasChanges || update.changed.length > 0 || update.removed.length > 0 ? update : undefined;
+  }
+}
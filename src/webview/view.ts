@@ -8,9 +8,6 @@ export class Webview {
   private nonce(): string { return [...Array(16)].map(()=>Math.random().toString(36)[2]).join(''); }
 
   public getHtml(
-    title: string,
-    processedFilesCount: number,
-    content: string,
     extensionUri: vscode.Uri,
     webview: vscode.Webview
   ): string {
@@ -21,14 +18,13 @@ export class Webview {
 
     const cssUri = webview.asWebviewUri(vscode.Uri.joinPath(extensionUri,'media','styles.css')).toString();
     const jsUri  = webview.asWebviewUri(vscode.Uri.joinPath(extensionUri,'media','webview.js')).toString();
+    const spinnerUri = webview.asWebviewUri(vscode.Uri.joinPath(extensionUri,'media','spinner.svg')).toString();
 
     return template({
-      title,
-      processedFilesCount,
-      content,
       cssUri,
       jsUri,
+      spinnerUri,
       nonce: this.nonce()
     });
   }
-}
\ No newline at end of file
+}